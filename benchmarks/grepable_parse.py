@@ -0,0 +1,113 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+"""
+Benchmark of parsing the results of a port only scan from the nmap XML output and from the grepable output.
+
+Both outputs describe the same hosts and ports, so the difference is the cost of the output format.
+
+    python benchmarks/grepable_parse.py --hosts 5000 --ports 20
+"""
+
+import argparse
+import json
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from deltascan.core.parser import Parser  # noqa: E402
+from deltascan.core.nmap.grepable import GrepableParser  # noqa: E402
+
+SERVICES = ["ssh", "http", "https", "smtp", "domain", "ftp", "telnet", "microsoft-ds"]
+STATES = ["open", "closed", "filtered"]
+
+
+def host_ports(idx, ports):
+    return [(22 + _p, STATES[(idx + _p) % len(STATES)], SERVICES[_p % len(SERVICES)]) for _p in range(ports)]
+
+
+def host_address(idx):
+    return f"10.{idx // 65536 % 256}.{idx // 256 % 256}.{idx % 256}"
+
+
+def xml_output(hosts, ports):
+    _out = ['<?xml version="1.0" encoding="UTF-8"?>\n<nmaprun scanner="nmap" args="nmap -oX - -vvv -sS 10.0.0.0/8" '
+            'start="1718000000" version="7.94">\n<scaninfo type="syn" protocol="tcp" numservices="1" services="22"/>\n']
+    for _i in range(hosts):
+        _out.append(f'<host starttime="1718000001" endtime="1718000002"><status state="up" reason="syn-ack" reason_ttl="64"/>\n'
+                    f'<address addr="{host_address(_i)}" addrtype="ipv4"/>\n<hostnames/>\n<ports>')
+        for _port, _state, _service in host_ports(_i, ports):
+            _out.append(f'<port protocol="tcp" portid="{_port}"><state state="{_state}" reason="syn-ack" reason_ttl="64"/>'
+                        f'<service name="{_service}" method="table" conf="3"/></port>\n')
+        _out.append('</ports>\n<times srtt="100" rttvar="50" to="100000"/>\n</host>\n')
+    _out.append(f'<runstats><finished time="1718000100" elapsed="100" exit="success"/><hosts up="{hosts}" down="0" total="{hosts}"/>'
+                '</runstats>\n</nmaprun>\n')
+    return "".join(_out)
+
+
+def grepable_output(hosts, ports):
+    _out = ["# Nmap 7.94 scan initiated Mon Jun 10 08:53:20 2024 as: nmap -oX - -vvv -sS -oG scan.gnmap 10.0.0.0/8\n"]
+    for _i in range(hosts):
+        _out.append(f"Host: {host_address(_i)} ()\tStatus: Up\n")
+        _ports = ", ".join([f"{_port}/{_state}/tcp//{_service}///" for _port, _state, _service in host_ports(_i, ports)])
+        _out.append(f"Host: {host_address(_i)} ()\tPorts: {_ports}\n")
+    _out.append(f"# Nmap done at Mon Jun 10 08:55:00 2024 -- {hosts} IP addresses ({hosts} hosts up) scanned in 100.00 seconds\n")
+    return "".join(_out)
+
+
+def run_parser(name, parse, output, repeat):
+    _times = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        _results = parse(output)
+        _times.append(time.perf_counter() - _start)
+    _best = min(_times)
+    return {
+        "format": name,
+        "hosts": len(_results["results"]),
+        "size_mb": round(len(output) / 2 ** 20, 2),
+        "parse_time_s": round(_best, 4),
+        "hosts_per_s": round(len(_results["results"]) / _best),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XML and grepable output parsing benchmark")
+    parser.add_argument("--hosts", type=int, default=5000, help="number of hosts of the scan")
+    parser.add_argument("--ports", type=int, default=20, help="number of ports of every host")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every parser, the fastest is reported")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = [
+        run_parser("xml", Parser.extract_port_scan_dict_results, xml_output(args.hosts, args.ports), args.repeat),
+        run_parser("grepable", GrepableParser.extract_port_scan_results, grepable_output(args.hosts, args.ports), args.repeat),
+    ]
+
+    print(f"{'format':<10}{'hosts':>8}{'size (MB)':>11}{'parse (s)':>11}{'hosts/s':>10}")
+    for _r in results:
+        print(f"{_r['format']:<10}{_r['hosts']:>8}{_r['size_mb']:>11}{_r['parse_time_s']:>11}{_r['hosts_per_s']:>10}")
+    print(f"grepable output is parsed {round(results[0]['parse_time_s'] / results[1]['parse_time_s'], 1)}x faster")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+"""
+Generator of synthetic nmap XML output, for parser and diff benchmarks.
+
+The output has the structure of a real `nmap -oX` run: scan info, task progress, hosts with addresses,
+hostnames, ports, services, NSE script output, OS matches, uptime and traces, and run stats. It is written
+host by host, so corpora larger than the memory can be generated. The same seed gives the same corpus.
+
+    python benchmarks/nmap_corpus.py scan.xml --hosts 10000 --ports 20 --script-size 512 --os-matches 3 --trace-hops 5
+"""
+
+from xml.sax.saxutils import quoteattr
+import argparse
+import io
+import random
+import sys
+
+SERVICES = [
+    ("ssh", "OpenSSH", "8.9p1 Ubuntu 3ubuntu0.6", "Ubuntu Linux; protocol 2.0", "cpe:/a:openbsd:openssh:8.9p1"),
+    ("http", "nginx", "1.18.0", "Ubuntu", "cpe:/a:igor_sysoev:nginx:1.18.0"),
+    ("https", "Apache httpd", "2.4.52", "(Ubuntu)", "cpe:/a:apache:http_server:2.4.52"),
+    ("smtp", "Postfix smtpd", "", "", "cpe:/a:postfix:postfix"),
+    ("domain", "ISC BIND", "9.18.18", "", "cpe:/a:isc:bind:9.18.18"),
+    ("microsoft-ds", "Samba smbd", "4.6.2", "workgroup: WORKGROUP", "cpe:/a:samba:samba"),
+    ("mysql", "MySQL", "8.0.36", "", "cpe:/a:mysql:mysql:8.0.36"),
+    ("rdp", "Microsoft Terminal Services", "", "", "cpe:/o:microsoft:windows"),
+]
+PORTS = [22, 80, 443, 25, 53, 445, 3306, 3389, 8080, 8443, 21, 23, 110, 143, 993, 995, 1433, 5432, 5900, 6379]
+STATES = [("open", "syn-ack"), ("closed", "reset"), ("filtered", "no-response")]
+OS_MATCHES = [
+    ("Linux 5.0 - 5.14", "Linux", "5.X", "general purpose"),
+    ("Linux 4.15 - 5.8", "Linux", "4.X", "general purpose"),
+    ("Microsoft Windows Server 2019", "Windows", "2019", "general purpose"),
+    ("FreeBSD 13.0-RELEASE", "FreeBSD", "13.X", "general purpose"),
+    ("MikroTik RouterOS 6.45 - 6.49", "RouterOS", "6.X", "router"),
+]
+WORDS = ["vulnerable", "certificate", "issuer", "subject", "cipher", "TLSv1.2", "header", "title", "server", "banner"]
+START_TIME = 1718000000
+
+
+def host_address(idx: int) -> str:
+    # Skips the network address of 10.0.0.0/8
+    idx += 1
+    return f"10.{idx // 65536 % 256}.{idx // 256 % 256}.{idx % 256}"
+
+
+def script_output(rng: random.Random, size: int) -> str:
+    """
+    Returns text of about `size` characters, in lines like the output of NSE scripts.
+    """
+    _words = []
+    _length = 0
+    while _length < size:
+        _word = rng.choice(WORDS) if len(_words) % 8 else "\n  "
+        _words.append(_word)
+        _length += len(_word) + 1
+    return " ".join(_words)
+
+
+def host_xml(idx: int, rng: random.Random, ports=20, script_size=0, os_matches=0, trace_hops=0) -> str:
+    """
+    Returns the `<host>` element of a host.
+
+    Args:
+        idx (int): The index of the host, that gives its address.
+        rng (random.Random): The random generator of the corpus.
+        ports (int, optional): The number of ports of the host.
+        script_size (int, optional): The size of the output of the NSE script of every open port. 0 runs no scripts.
+        os_matches (int, optional): The number of OS matches of the host.
+        trace_hops (int, optional): The number of hops of the trace of the host.
+
+    Returns:
+        str: The host XML.
+    """
+    _addr = host_address(idx)
+    _start = START_TIME + idx
+    _out = [f'<host starttime="{_start}" endtime="{_start + 5}"><status state="up" reason="syn-ack" reason_ttl="63"/>\n',
+            f'<address addr="{_addr}" addrtype="ipv4"/>\n',
+            f'<address addr="52:54:00:{idx // 65536 % 256:02X}:{idx // 256 % 256:02X}:{idx % 256:02X}" addrtype="mac"/>\n',
+            f'<hostnames>\n<hostname name="host-{idx}.example.internal" type="PTR"/>\n</hostnames>\n<ports>']
+    _closed = max(0, 1000 - ports)
+    if _closed > 0:
+        _out.append(f'<extraports state="closed" count="{_closed}">\n<extrareasons reason="reset" count="{_closed}" proto="tcp"/>\n</extraports>\n')
+    for _p in range(ports):
+        _portid = PORTS[_p] if _p < len(PORTS) else 10000 + _p
+        _state, _reason = STATES[0] if rng.random() < 0.6 else rng.choice(STATES[1:])
+        _name, _product, _version, _extra, _cpe = SERVICES[(idx + _p) % len(SERVICES)]
+        _out.append(f'<port protocol="tcp" portid="{_portid}"><state state="{_state}" reason="{_reason}" reason_ttl="63"/>')
+        _out.append(f'<service name="{_name}" product={quoteattr(_product)} version={quoteattr(_version)} '
+                    f'extrainfo={quoteattr(_extra)} method="probed" conf="10"><cpe>{_cpe}</cpe></service>')
+        if script_size > 0 and _state == "open":
+            _output = script_output(rng, script_size)
+            _out.append(f'<script id="{_name}-info" output={quoteattr(_output)}>'
+                        f'<elem key="summary">{_output[:64].strip()}</elem></script>')
+        _out.append('</port>\n')
+    _out.append('</ports>\n')
+    if os_matches > 0:
+        _out.append('<os><portused state="open" proto="tcp" portid="22"/>\n')
+        for _m in range(os_matches):
+            _name, _family, _gen, _type = OS_MATCHES[(idx + _m) % len(OS_MATCHES)]
+            _out.append(f'<osmatch name="{_name}" accuracy="{98 - _m}" line="{1000 + _m}">'
+                        f'<osclass type="{_type}" vendor="{_family}" osfamily="{_family}" osgen="{_gen}" accuracy="{98 - _m}">'
+                        f'<cpe>cpe:/o:{_family.lower()}:{_family.lower()}:{_gen.lower()}</cpe></osclass></osmatch>\n')
+        _out.append(f'<osfingerprint fingerprint="OS:SCAN(V=7.94%E=4%D=6/10%OT=22%CT=1%CU=3%PV=Y%DS=2%G=Y%TM={_start:X})"/>\n</os>\n')
+        _out.append(f'<uptime seconds="{3600 + idx}" lastboot="Mon Jun 10 07:53:{idx % 60:02d} 2024"/>\n')
+    _out.append(f'<distance value="{max(1, trace_hops)}"/>\n')
+    if trace_hops > 0:
+        _out.append('<trace port="80" proto="tcp">\n')
+        for _h in range(1, trace_hops):
+            _out.append(f'<hop ttl="{_h}" ipaddr="192.168.{_h}.1" rtt="{_h * 0.75:.2f}"/>\n')
+        _out.append(f'<hop ttl="{trace_hops}" ipaddr="{_addr}" rtt="{trace_hops * 0.75:.2f}"/>\n</trace>\n')
+    _out.append('<times srtt="712" rttvar="145" to="100000"/>\n</host>\n')
+    return "".join(_out)
+
+
+def write_corpus(file, hosts=1000, ports=20, script_size=0, os_matches=0, trace_hops=0, seed=0):
+    """
+    Writes the nmap XML output of a scan of `hosts` hosts.
+
+    Args:
+        file: The text file object to write to.
+        hosts (int, optional): The number of hosts.
+        ports (int, optional): The number of ports of every host.
+        script_size (int, optional): The size of the output of the NSE script of every open port.
+        os_matches (int, optional): The number of OS matches of every host.
+        trace_hops (int, optional): The number of hops of the trace of every host.
+        seed (int, optional): The seed of the random generator.
+    """
+    _rng = random.Random(seed)
+    file.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE nmaprun>\n'
+               f'<nmaprun scanner="nmap" args="nmap -oX - -vvv --stats-every 1s -sS -sV -O --traceroute 10.0.0.0/8" '
+               f'start="{START_TIME}" startstr="Mon Jun 10 07:53:20 2024" version="7.94" xmloutputversion="1.05">\n'
+               '<scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>\n'
+               '<verbose level="3"/>\n<debugging level="0"/>\n')
+    for _i in range(hosts):
+        if _i % 256 == 0:
+            file.write(f'<taskprogress task="SYN Stealth Scan" time="{START_TIME + _i}" '
+                       f'percent="{100 * _i / max(1, hosts):.2f}" remaining="{hosts - _i}"/>\n')
+        file.write(host_xml(_i, _rng, ports, script_size, os_matches, trace_hops))
+    file.write(f'<runstats><finished time="{START_TIME + hosts + 5}" timestr="Mon Jun 10 08:00:00 2024" '
+               f'summary="Nmap done" elapsed="{hosts + 5}" exit="success"/>'
+               f'<hosts up="{hosts}" down="0" total="{hosts}"/>\n</runstats>\n</nmaprun>\n')
+
+
+def generate(hosts=1000, ports=20, script_size=0, os_matches=0, trace_hops=0, seed=0) -> str:
+    """
+    Returns the nmap XML output of a scan of `hosts` hosts. See `write_corpus`.
+    """
+    _out = io.StringIO()
+    write_corpus(_out, hosts, ports, script_size, os_matches, trace_hops, seed)
+    return _out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic nmap XML output generator")
+    parser.add_argument("output", help="the XML file to write, - for the standard output")
+    parser.add_argument("--hosts", type=int, default=1000, help="number of hosts")
+    parser.add_argument("--ports", type=int, default=20, help="number of ports of every host")
+    parser.add_argument("--script-size", type=int, default=0, help="characters of NSE script output of every open port")
+    parser.add_argument("--os-matches", type=int, default=0, help="number of OS matches of every host")
+    parser.add_argument("--trace-hops", type=int, default=0, help="number of trace hops of every host")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+
+    if args.output == "-":
+        write_corpus(sys.stdout, args.hosts, args.ports, args.script_size, args.os_matches, args.trace_hops, args.seed)
+        return
+    with open(args.output, "w", encoding="utf-8") as f:
+        write_corpus(f, args.hosts, args.ports, args.script_size, args.os_matches, args.trace_hops, args.seed)
+
+
+if __name__ == "__main__":
+    main()
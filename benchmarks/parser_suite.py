@@ -0,0 +1,144 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+"""
+Benchmark suite of the nmap XML parser, on synthetic corpora of several sizes.
+
+For every size a corpus is written by `nmap_corpus` and parsed in its own interpreter, so the peak RSS of
+one run is not shared with the next. The `dict` mode parses the whole output as a string with
+`Parser.extract_port_scan_dict_results`, the `file` mode streams it from the file with
+`Parser.extract_port_scan_file_results`. The results are written as JSON, to compare the runs of two commits.
+
+    python benchmarks/parser_suite.py --sizes 100,1000,10000 --script-size 256 --output before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, ".")
+
+from benchmarks.nmap_corpus import write_corpus  # noqa: E402
+from deltascan.core.parser import Parser  # noqa: E402
+
+MODES = ["dict", "file"]
+
+
+def parse(mode, path):
+    if mode == "dict":
+        with open(path, "r", encoding="utf-8") as f:
+            return Parser.extract_port_scan_dict_results(f.read())
+    return Parser.extract_port_scan_file_results(path)
+
+
+def run_mode(mode, path, repeat):
+    """
+    Parses the corpus `repeat` times and once more under tracemalloc, and returns the measurements.
+    """
+    _times = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        _results = parse(mode, path)
+        _times.append(time.perf_counter() - _start)
+    _hosts = len(_results["results"])
+    del _results
+
+    # Tracing slows the parsing down, so the peak allocation is measured on a run of its own
+    tracemalloc.start()
+    parse(mode, path)
+    _peak_alloc = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    _best = min(_times)
+    _size_mb = os.path.getsize(path) / 2 ** 20
+    return {
+        "mode": mode,
+        "hosts": _hosts,
+        "size_mb": round(_size_mb, 2),
+        "parse_time_s": round(_best, 4),
+        "hosts_per_s": round(_hosts / _best),
+        "mb_per_s": round(_size_mb / _best, 2),
+        "peak_alloc_mb": round(_peak_alloc / 2 ** 20, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="nmap XML parser benchmark suite")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated numbers of hosts of the corpora")
+    parser.add_argument("--ports", type=int, default=20, help="number of ports of every host")
+    parser.add_argument("--script-size", type=int, default=256, help="characters of NSE script output of every open port")
+    parser.add_argument("--os-matches", type=int, default=3, help="number of OS matches of every host")
+    parser.add_argument("--trace-hops", type=int, default=5, help="number of trace hops of every host")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated parser modes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every parser, the fastest is reported")
+    parser.add_argument("--mode", choices=MODES, help="parse a single corpus file in this process")
+    parser.add_argument("--corpus", help="the corpus file of --mode")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        print(json.dumps(run_mode(args.mode, args.corpus, args.repeat)))
+        return
+
+    _sizes = [int(_s) for _s in args.sizes.split(",")]
+    _modes = [_m for _m in args.modes.split(",") if _m != ""]
+    results = []
+    with tempfile.TemporaryDirectory() as _dir:
+        for _size in _sizes:
+            _path = os.path.join(_dir, f"corpus-{_size}.xml")
+            with open(_path, "w", encoding="utf-8") as f:
+                write_corpus(f, _size, args.ports, args.script_size, args.os_matches, args.trace_hops)
+            for _mode in _modes:
+                _out = subprocess.run(
+                    [sys.executable, __file__, "--mode", _mode, "--corpus", _path, "--repeat", str(args.repeat)],
+                    capture_output=True, text=True, check=True)
+                results.append(json.loads(_out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<6}{'hosts':>8}{'size (MB)':>11}{'parse (s)':>11}{'hosts/s':>10}{'MB/s':>8}"
+          f"{'peak alloc (MB)':>17}{'peak rss (MB)':>15}")
+    for _r in results:
+        print(f"{_r['mode']:<6}{_r['hosts']:>8}{_r['size_mb']:>11}{_r['parse_time_s']:>11}{_r['hosts_per_s']:>10}"
+              f"{_r['mb_per_s']:>8}{_r['peak_alloc_mb']:>17}{_r['peak_rss_mb']:>15}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "corpus": {"ports": args.ports, "script_size": args.script_size, "os_matches": args.os_matches,
+                           "trace_hops": args.trace_hops},
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+"""
+Benchmark of the progress channel between the nmap process thread and the scan thread.
+
+Every mode runs in its own interpreter so that the CPU time and the peak RSS are not shared.
+A fake nmap process appends output lines at a fixed pace, so the results do not depend on nmap.
+
+    python benchmarks/progress_channel.py --scans 20 --duration 5
+"""
+
+from queue import Queue
+from threading import Thread, Event
+from unittest.mock import patch
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from deltascan.core.nmap.libnmap_wrapper import (  # noqa: E402
+    LibNmapWrapper,
+    QueueMsg,
+    QMESSAGE_TYPE,
+    QMESSAGE_MSG)
+
+NMAP_LINE = '<taskprogress task="SYN Stealth Scan" time="1718000000" percent="12.50" remaining="42" etc="1718000042"/>\n'
+
+
+class FakeNmapProcess(Thread):
+    """
+    Produces `lines_per_second` lines of nmap output for `duration` seconds.
+    """
+    duration = 5
+    lines_per_second = 200
+
+    def __init__(self, targets=None, options=None, **kwargs):
+        Thread.__init__(self, daemon=True)
+        self._stdout = ""
+        self._done = False
+        self._stopped = Event()
+        self.rc = None
+
+    def sudo_run_background(self):
+        self.start()
+
+    def run_background(self):
+        self.start()
+
+    def run(self):
+        _lines = int(self.duration * self.lines_per_second)
+        for _ in range(_lines):
+            if self._stopped.wait(1 / self.lines_per_second):
+                break
+            self._stdout += NMAP_LINE
+        self.rc = 0
+        self._done = True
+
+    def is_running(self):
+        return not self._done
+
+    def is_successful(self):
+        return self._done and self.rc == 0
+
+    def has_terminated(self):
+        return self._done
+
+    def stop(self):
+        self._stopped.set()
+
+    @property
+    def progress(self):
+        return "50.0"
+
+    @property
+    def stdout(self):
+        return self._stdout
+
+
+def legacy_run(self, queue, event):
+    """
+    The busy-poll producer that was used before the throttled progress channel.
+    """
+    np = FakeNmapProcess()
+    np.sudo_run_background()
+    while np.is_running() or np.is_successful() is False or np.rc != 0:
+        if event.is_set():
+            np.stop()
+            break
+        queue.put(self._create_queue_message(
+            QueueMsg.PROGRESS, self.target, {
+                "progress": int(float(np.progress)),
+                "stdout": np.stdout
+            }
+        ))
+    queue.put(self._create_queue_message(QueueMsg.DATA, self.target, np.stdout))
+    queue.put(self._create_queue_message(QueueMsg.EXIT, self.target, 1))
+
+
+def legacy_scan(self):
+    """
+    The consumer that was used before the throttled progress channel.
+    """
+    _q = Queue()
+    _e = Event()
+    _t = Thread(target=legacy_run, args=(self, _q, _e,))
+    _t.start()
+    _d = None
+    _current_stdout = None
+    while True:
+        _incoming_msg = _q.get()
+        if _incoming_msg[QMESSAGE_TYPE] == QueueMsg.DATA:
+            _d = _incoming_msg[QMESSAGE_MSG]
+        elif _incoming_msg[QMESSAGE_TYPE] == QueueMsg.EXIT:
+            break
+        elif _incoming_msg[QMESSAGE_TYPE] == QueueMsg.PROGRESS:
+            if _current_stdout != _incoming_msg[QMESSAGE_MSG]["stdout"]:
+                _current_stdout = _incoming_msg[QMESSAGE_MSG]["stdout"]
+    _t.join()
+    return _d
+
+
+def run_mode(mode, scans, duration):
+    FakeNmapProcess.duration = duration
+    _threads = []
+    _start = time.monotonic()
+    with patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess):
+        for _i in range(scans):
+            _wrapper = LibNmapWrapper(f"10.0.0.{_i}", "-vv")
+            _target = legacy_scan if mode == "legacy" else LibNmapWrapper._scan
+            _threads.append(Thread(target=_target, args=(_wrapper,)))
+        for _t in _threads:
+            _t.start()
+        for _t in _threads:
+            _t.join()
+    _usage = resource.getrusage(resource.RUSAGE_SELF)
+    _cpu = _usage.ru_utime + _usage.ru_stime
+    return {
+        "mode": mode,
+        "scans": scans,
+        "wall_time_s": round(time.monotonic() - _start, 3),
+        "cpu_time_s": round(_cpu, 3),
+        "cpu_time_per_scan_s": round(_cpu / scans, 4),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(_usage.ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Progress channel benchmark")
+    parser.add_argument("--scans", type=int, default=20, help="number of concurrent scans")
+    parser.add_argument("--duration", type=float, default=5, help="duration of every fake nmap run in seconds")
+    parser.add_argument("--mode", choices=["legacy", "throttled"], help="run a single mode in this process")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        print(json.dumps(run_mode(args.mode, args.scans, args.duration)))
+        return
+
+    results = []
+    for _mode in ["legacy", "throttled"]:
+        _out = subprocess.run(
+            [sys.executable, __file__, "--mode", _mode, "--scans", str(args.scans), "--duration", str(args.duration)],
+            check=True, capture_output=True, text=True)
+        results.append(json.loads(_out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<12}{'wall (s)':>10}{'cpu (s)':>10}{'cpu/scan (s)':>14}{'peak rss (MB)':>15}")
+    for _r in results:
+        print(f"{_r['mode']:<12}{_r['wall_time_s']:>10}{_r['cpu_time_s']:>10}"
+              f"{_r['cpu_time_per_scan_s']:>14}{_r['peak_rss_mb']:>15}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
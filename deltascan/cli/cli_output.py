@@ -304,6 +304,134 @@ class CliOutput(Output):
         console = Console()
         console.print(panel)
 
+    @classmethod
+    def jobs(cls, jobs):
+        _jobs_table = Table(show_header=True)
+        _jobs_table.add_column("Job", style="bright_yellow", no_wrap=True)
+        _jobs_table.add_column("Target", style="rosy_brown", no_wrap=False)
+        _jobs_table.add_column("Profile", style="rosy_brown", no_wrap=False)
+        _jobs_table.add_column("Status", style="bright_yellow", no_wrap=True)
+        _jobs_table.add_column("Saved hosts", style="rosy_brown", no_wrap=True)
+        _jobs_table.add_column("Pending hosts", style="rosy_brown", no_wrap=True)
+        _jobs_table.add_column("Updated at", style="bright_yellow", no_wrap=False, width=30)
+
+        for job in jobs:
+            _jobs_table.add_row(
+                job["uuid"], job["target"], job["profile_name"], job["status"],
+                str(len(job["hosts"])), str(job["pending"]), str(job["updated_at"]))
+
+        panel = Panel.fit(Columns([_jobs_table]), title="Scan jobs", border_style="conceal", padding=(1, 2))
+        console = Console()
+        console.print(panel)
+
+    @classmethod
+    def schedules(cls, schedules):
+        _schedules_table = Table(show_header=True)
+        _schedules_table.add_column("Schedule", style="bright_yellow", no_wrap=True)
+        _schedules_table.add_column("Target", style="rosy_brown", no_wrap=False)
+        _schedules_table.add_column("Profile", style="rosy_brown", no_wrap=False)
+        _schedules_table.add_column("Runs", style="rosy_brown", no_wrap=True)
+        _schedules_table.add_column("Jitter", style="rosy_brown", no_wrap=True)
+        _schedules_table.add_column("Next run", style="bright_yellow", no_wrap=False, width=20)
+        _schedules_table.add_column("Last run", style="rosy_brown", no_wrap=False, width=20)
+        _schedules_table.add_column("Started/Skipped", style="rosy_brown", no_wrap=True)
+
+        for schedule in schedules:
+            _runs = f"cron {schedule['cron']}" if schedule["cron"] is not None else f"every {schedule['interval']}s"
+            _last_run = "-" if schedule["last_run"] is None else f"{schedule['last_run']} ({schedule['last_status']})"
+            _schedules_table.add_row(
+                schedule["name"], schedule["target"], schedule["profile_name"], _runs, f"{schedule['jitter']}s",
+                str(schedule["next_run"]) if schedule["enabled"] else "disabled", _last_run,
+                f"{schedule['runs']}/{schedule['skipped']}")
+
+        panel = Panel.fit(Columns([_schedules_table]), title="Schedules", border_style="conceal", padding=(1, 2))
+        console = Console()
+        console.print(panel)
+
+    @classmethod
+    def stats(cls, stats):
+        _budget = "unlimited" if stats["max_rate"] == 0 else f"{stats['allocated_rate']}/{stats['max_rate']} pps allocated"
+        _limit = "-" if stats["limit"] is None else str(stats["limit"])
+        _stats_table = Table(show_header=True)
+        _stats_table.add_column("Scan", style="bright_yellow", no_wrap=False)
+        _stats_table.add_column("Rate (pps)", style="rosy_brown", no_wrap=True)
+        _stats_table.add_column("Progress", style="rosy_brown", no_wrap=True)
+        _stats_table.add_column("Progress/s", style="rosy_brown", no_wrap=True)
+        _stats_table.add_column("Stalled", style="bright_yellow", no_wrap=True)
+
+        for name, scan in stats["scans"].items():
+            _stats_table.add_row(
+                name, "-" if scan["rate"] is None else str(scan["rate"]), f"{scan['progress']}%",
+                "-" if scan["progress_rate"] is None else str(scan["progress_rate"]), str(scan["stalled"]))
+        for name in stats["waiting"]:
+            _stats_table.add_row(name, "waiting", "-", "-", "-")
+
+        _tables = [_stats_table]
+        _watchdog = stats.get("watchdog")
+        if _watchdog is not None:
+            _deadlines_table = Table(show_header=True)
+            _deadlines_table.add_column("Scan", style="bright_yellow", no_wrap=False)
+            _deadlines_table.add_column("Deadline", style="rosy_brown", no_wrap=True)
+            for name, remaining in _watchdog["watched"].items():
+                _deadlines_table.add_row(name, f"{remaining}s left")
+            for _t in _watchdog["timed_out"]:
+                _deadlines_table.add_row(_t["name"], f"timed out after {_t['elapsed']}s")
+            _tables.append(_deadlines_table)
+
+        _queue = stats.get("queue")
+        if _queue is not None:
+            _queue_table = Table(
+                show_header=True,
+                title=f"Running: {_queue['running']}, started: {_queue['started']}, "
+                      f"rejected: {_queue['rejected']}, promoted: {_queue.get('promoted', 0)}")
+            _queue_table.add_column("Priority", style="bright_yellow", no_wrap=True)
+            _queue_table.add_column("Queued", style="rosy_brown", no_wrap=True)
+            _queue_table.add_column("Wait mean/p95/max (s)", style="rosy_brown", no_wrap=True)
+            for _priority, _depth in _queue.get("depth", {}).items():
+                _queue_table.add_row(_priority, str(_depth), cls.__latency(_queue["latency_by_priority"][_priority]))
+            _queue_table.add_row(
+                "all", f"{_queue['queued']}/{_queue['max_size'] if _queue['max_size'] > 0 else '-'}",
+                cls.__latency(_queue["latency"]))
+            _tables.append(_queue_table)
+
+        _pipeline = stats.get("pipeline")
+        if _pipeline is not None:
+            _pipeline_table = Table(show_header=True, title=f"Results pipeline, in flight: {_pipeline['in_flight']}")
+            _pipeline_table.add_column("Stage", style="bright_yellow", no_wrap=True)
+            _pipeline_table.add_column("Workers", style="rosy_brown", no_wrap=True)
+            _pipeline_table.add_column("Queued/max", style="rosy_brown", no_wrap=True)
+            _pipeline_table.add_column("Done/failed", style="rosy_brown", no_wrap=True)
+            _pipeline_table.add_column("Items/s", style="rosy_brown", no_wrap=True)
+            _pipeline_table.add_column("Time mean/p95/max (s)", style="rosy_brown", no_wrap=True)
+            for _name, _stage in _pipeline["stages"].items():
+                _pipeline_table.add_row(
+                    _name, f"{_stage['busy']}/{_stage['workers']}", f"{_stage['queue_depth']}/{_stage['max_queue_depth']}",
+                    f"{_stage['processed']}/{_stage['failed']}", str(_stage["throughput"]), cls.__latency(_stage["service_time"]))
+            _tables.append(_pipeline_table)
+
+        panel = Panel.fit(
+            Columns(_tables),
+            title=f"Rate budget: {_budget}, concurrent scans: {stats['active']}/{_limit}" +
+                  ("" if _watchdog is None else f", timed out scans: {_watchdog['timeouts']}"),
+            border_style="conceal", padding=(1, 2))
+        console = Console()
+        console.print(panel)
+
+    @staticmethod
+    def __latency(latency):
+        """
+        Formats the mean, 95th percentile and maximum of a latency summary.
+
+        Args:
+            latency (dict): The latency summary or None.
+
+        Returns:
+            str: The formatted latencies.
+        """
+        if latency is None:
+            return "-"
+        return f"{latency['mean']}/{latency['p95']}/{latency['max']}"
+
     @staticmethod
     def __convert_to_string(value):
         """
@@ -16,7 +16,9 @@
 
 from deltascan.core.deltascan import DeltaScan
 from deltascan.core.exceptions import (AppExceptions, ExitInteractiveShell)
-from deltascan.core.config import (BANNER, VERSION_STR)
+from deltascan.core.server import DeltaScanServer
+from deltascan.core.status import (ScanStatusRegistry, UIRenderLoop)
+from deltascan.core.config import (BANNER, VERSION_STR, SCAN_PRIORITIES, SERVE_HOST, SERVE_PORT)
 from deltascan.core.utils import ThreadWithException
 from deltascan.cli.cli_output import (CliOutput)
 import argparse
@@ -79,6 +81,31 @@ def interactive_shell(_app, _ui, _interactive, open_shell=False):
         _ui["ui_live"].start()
 
 
+def run_shell(_app, _ui, _renderer, _interactive):
+    """
+    Runs the scans of the application with the interactive shell open.
+
+    The display is refreshed only by the render loop, so it runs for as long as the scans do. Otherwise
+    the scans queued from the shell would not show their progress once the shell is left.
+
+    Args:
+        _app (object): The application object.
+        _ui (dict): A dictionary containing UI related objects.
+        _renderer (UIRenderLoop): The render loop of the display.
+        _interactive (bool): Whether the shell is opened again when a scan is running.
+    """
+    _dscan_thread = ThreadWithException(target=_app.scan)
+    _shell_thread = ThreadWithException(
+        target=interactive_shell, args=(_app, _ui, _interactive, True))
+    _renderer.start()
+    try:
+        _dscan_thread.start()
+        _shell_thread.start()
+        _dscan_thread.join()
+    finally:
+        _renderer.stop()
+
+
 class Shell(cmd.Cmd):
     intro = ''
 
@@ -160,18 +187,95 @@ class Shell(cmd.Cmd):
 
     def do_scan(self, v):
         """scan
-        Add ad-hoc scans: scan 10.10.10.10 PROFILE_NAME"""
+        Add ad-hoc scans: scan 10.10.10.10 PROFILE_NAME
+        Ex. scan 10.10.10.10 PROFILE_NAME 600 (stop the scan after 600 seconds)
+        Ex. scan 10.10.10.10 PROFILE_NAME deadline=600 priority=high (high, normal or low)"""
         try:
-            if len(v.split(" ")) != 2:
-                print("Invalid input. Provide a host and a profile: scan <host> <profile>")
+            _args = v.split()
+            _options = dict([_a.split("=", 1) for _a in _args[2:] if "=" in _a])
+            _positional = [_a for _a in _args[2:] if "=" not in _a]
+            if len(_args) < 2 or len(_positional) > 1 or any([_o not in ["deadline", "priority"] for _o in _options]):
+                print("Invalid input. Provide a host, a profile and optionally a deadline in seconds and a priority: "
+                      "scan <host> <profile> [deadline=<seconds>] [priority=<high|normal|low>]")
                 return
-            v1, v2 = v.split(" ")
-            _r = self._app.add_scan(v1, v2)
+            v1, v2 = _args[:2]
+            _deadline = _positional[0] if len(_positional) == 1 else _options.get("deadline")
+            _r = self._app.add_scan(
+                v1, v2, deadline=float(_deadline) if _deadline is not None else None, priority=_options.get("priority"))
             if _r is False:
                 print("Not starting scan. Check your host and profile. Maybe the scan is already in the queue.")
         except Exception as e:
             print(str(e))
 
+    def do_resume(self, v):
+        """resume
+        Resume an unfinished scan job. Only the hosts that have not been saved yet are scanned.
+        Ex. resume (the latest unfinished job)
+        Ex. resume 6f1c2a9e-0d4b-4c8e-9a51-3b2f7d6e8c10"""
+        try:
+            _job = self._app.resume(None if v.strip() == "" else v.strip())
+            print(f"Resuming scan job {_job['uuid']}: {_job['target']} {_job['profile_name']} ({_job['pending']} hosts pending)")
+        except Exception as e:
+            print(str(e))
+
+    def do_schedule(self, v):
+        """schedule
+        Store a recurring scan: schedule <name> <host> <profile> every=<seconds> or cron=<min,hour,day,month,weekday>
+        The cron fields are separated by commas instead of spaces. Runs are delayed by up to jitter seconds.
+        Ex. schedule nightly 10.10.10.0/24 PROFILE_NAME cron=0,2,*,*,* jitter=300 priority=low deadline=3600
+        Ex. schedule web 10.10.10.10 PROFILE_NAME every=900"""
+        try:
+            _args = v.split()
+            _options = dict([_a.split("=", 1) for _a in _args[3:] if "=" in _a])
+            if len(_args) < 3 or len(_options) != len(_args) - 3 or \
+                    any([_o not in ["every", "cron", "jitter", "priority", "deadline"] for _o in _options]):
+                print("Invalid input. Provide a name, a host, a profile and either every=<seconds> or cron=<expression>: "
+                      "schedule <name> <host> <profile> [every=<seconds>] [cron=<expression>] [jitter=<seconds>] "
+                      "[priority=<high|normal|low>] [deadline=<seconds>]")
+                return
+            _schedule = self._app.add_schedule(
+                _args[0], _args[1], _args[2],
+                cron=_options["cron"].replace(",", " ") if "cron" in _options else None,
+                interval=int(_options["every"]) if "every" in _options else None,
+                jitter=int(_options.get("jitter", 0)),
+                priority=_options.get("priority"),
+                deadline=float(_options["deadline"]) if "deadline" in _options else None)
+            print(f"Schedule {_schedule['name']} stored. Next run at {_schedule['next_run']}")
+        except Exception as e:
+            print(str(e))
+
+    def do_unschedule(self, v):
+        """unschedule
+        Remove a recurring scan: unschedule <name>"""
+        try:
+            self._app.remove_schedule(v.strip())
+        except Exception as e:
+            print(str(e))
+
+    def do_schedules(self, _):
+        """schedules
+        List the recurring scans with their next run and the outcome of their last run"""
+        try:
+            CliOutput.schedules(self._app.schedules())
+        except Exception as e:
+            print(str(e))
+
+    def do_jobs(self, _):
+        """jobs
+        List the latest scan jobs with their saved and pending hosts"""
+        try:
+            CliOutput.jobs(self._app.scan_jobs())
+        except Exception as e:
+            print(str(e))
+
+    def do_stats(self, _):
+        """stats
+        Show the packet rate allocated to every running scan, the scan deadlines and the scan queue"""
+        try:
+            CliOutput.stats(self._app.stats())
+        except Exception as e:
+            print(str(e))
+
     def do_view(self, _):
         """view
         Execute the view action using the current configuration"""
@@ -302,7 +406,8 @@ def run():
     parser = argparse.ArgumentParser(
         prog='deltascan', description='A package for scanning deltas')
     parser.add_argument(
-        "action", help='the command to run', choices=['scan', 'diff', 'view', 'import', 'shell', 'version'])
+        "action", help='the command to run',
+        choices=['scan', 'resume', 'scheduler', 'serve', 'dispatch', 'worker', 'diff', 'view', 'import', 'shell', 'version'])
     parser.add_argument("-o", "--output", help='output file', required=False)
     parser.add_argument("-d", "--diff-files",
                         help='comma separated files to find their differences (xml)',
@@ -345,6 +450,25 @@ def run():
     parser.add_argument(
         "-t", "--target", dest="host",
         help="select target host/subnet to scan", required=False)
+    parser.add_argument(
+        "--job", help="the scan job to resume. The latest unfinished scan job is resumed if not given", required=False)
+    parser.add_argument(
+        "--deadline", type=float,
+        help="stop the scan after this number of seconds. It overrides the deadline of the profile", required=False)
+    parser.add_argument(
+        "--priority", choices=SCAN_PRIORITIES,
+        help="the priority of the scan in the scan queue. It overrides the priority of the profile", required=False)
+    parser.add_argument(
+        "--listen", default=SERVE_HOST,
+        help=f"the address the serve action listens on. Defaults to {SERVE_HOST}", required=False)
+    parser.add_argument(
+        "--port", type=int, default=SERVE_PORT,
+        help=f"the port the serve action listens on. Defaults to {SERVE_PORT}", required=False)
+    parser.add_argument(
+        "--socket", help="the Unix socket the serve action listens on, instead of the address and port", required=False)
+    parser.add_argument(
+        "--worker-name", dest="worker_name",
+        help="the name of a worker in the job table. Defaults to the host name and process id", required=False)
     parser.add_argument(
         "-it", "--interactive", default=False, action='store_true',
         help="execute action and go in interactive mode", required=False)
@@ -356,9 +480,9 @@ def run():
 
     output_file = clargs.output
 
-    if clargs.action == 'scan' and (clargs.host is None or
-                                    clargs.profile is None or
-                                    clargs.conf_file is None):
+    if clargs.action in ['scan', 'dispatch'] and (clargs.host is None or
+                                                  clargs.profile is None or
+                                                  clargs.conf_file is None):
         print("Host, profile or configuration file not provided")
         os._exit(1)
 
@@ -404,14 +528,18 @@ def run():
     }
 
     result = []
-    lv = Live(None, refresh_per_second=5)
+    # The display is refreshed only by the render loop, at a fixed frame rate
+    lv = Live(None, auto_refresh=False)
 
     ui_context["ui_live"] = lv
     ui_context["ui_instances"] = {}
+    ui_context["ui_status"] = ScanStatusRegistry()
     ui_context["show_nmap_logs"] = False
+    _renderer = UIRenderLoop(ui_context)
 
     try:
-        _dscan = DeltaScan(config, ui_context, result)
+        # The daemon has no terminal UI
+        _dscan = DeltaScan(config, ui_context if clargs.action != "serve" else None, result)
         _version = pkg_resources.require("deltascan")[0].version
         if clargs.action == "version":
             print(VERSION_STR.format(_version))
@@ -426,10 +554,19 @@ def run():
             output_file,
             clargs.db_path))
 
-        if clargs.action == 'scan':
+        if clargs.action in ['scan', 'resume', 'scheduler']:
             _dscan_thread = ThreadWithException(target=_dscan.scan)
-            _dscan.add_scan(config["host"], config["profile"])
+            if clargs.action == 'resume':
+                _job = _dscan.resume(clargs.job)
+                print(f"Resuming scan job {_job['uuid']}: {_job['target']} {_job['profile_name']} ({_job['pending']} hosts pending)")
+            elif clargs.action == 'scheduler':
+                # The scans keep running until the scheduler is stopped by exiting
+                _dscan.start_scheduler()
+                print(f"Running {len(_dscan.schedules())} schedules...")
+            else:
+                _dscan.add_scan(config["host"], config["profile"], deadline=clargs.deadline, priority=clargs.priority)
             ui_context["ui_live"].start()
+            _renderer.start()
             _shell_thread = ThreadWithException(
                 target=interactive_shell, args=(_dscan, ui_context, clargs.interactive,))
 
@@ -440,6 +577,9 @@ def run():
             if clargs.interactive or _dscan.is_interactive:
                 _dscan.is_interactive = True
             else:
+                # Render the final status of the scans before the display is closed
+                _renderer.stop()
+                ui_context["ui_live"].stop()
                 print("No scans left in the queue... Exiting.")
                 output = CliOutput([
                     item for sublist in [
@@ -450,6 +590,25 @@ def run():
                 output.display()
                 os._exit(0)
 
+        elif clargs.action == 'dispatch':
+            _job_uuid = _dscan.distribute_scan(config["host"], config["profile"])
+            print(f"Scan job {_job_uuid} added for the workers. Waiting for their results...")
+            _statuses = _dscan.wait_distributed_scans([_job_uuid])
+            print(f"Scan job {_job_uuid} {_statuses[_job_uuid]}")
+            output = CliOutput([
+                item for sublist in [_s["scans"] for _s in _dscan.result if "scans" in _s] for item in sublist
+            ], _dscan.verbose)
+            output.display()
+        elif clargs.action == 'worker':
+            print("Running the scans of the distributed scan jobs...")
+            _dscan.run_worker(clargs.worker_name)
+        elif clargs.action == 'serve':
+            _server = DeltaScanServer(_dscan, clargs.listen, clargs.port, socket_path=clargs.socket, logger=_dscan.logger)
+            print(f"Serving the DeltaScan API on {_server.address}")
+            try:
+                _server.serve()
+            except KeyboardInterrupt:
+                _server.stop()
         elif clargs.action == 'diff':
             if clargs.diff_files is not None:
                 _r = _dscan.files_diff()
@@ -466,12 +625,7 @@ def run():
             output = CliOutput(_r, _dscan.verbose)
             output.display()
         elif clargs.action == 'shell':
-            _dscan_thread = ThreadWithException(target=_dscan.scan)
-            _shell_thread = ThreadWithException(
-                target=interactive_shell, args=(_dscan, ui_context, clargs.interactive, True))
-            _dscan_thread.start()
-            _shell_thread.start()
-            _dscan_thread.join()
+            run_shell(_dscan, ui_context, _renderer, clargs.interactive)
         else:
             if clargs.interactive is True:
                 print("No action provided. Starting interactive shell.")
@@ -0,0 +1,138 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.config import (
+    BATCH_WINDOW,
+    MAX_BATCH_SIZE)
+import ipaddress
+import time
+
+
+def is_batchable(scan: dict) -> bool:
+    """
+    Checks if a queued scan can run in a batch with other scans.
+
+    Only new scans of a single IP address are batched. The results of a batch are split by the address
+    that nmap reports, which is not known beforehand for hostnames and subnets. Scans with their own
+    deadline run alone, since a batch has the deadline of its profile.
+
+    Args:
+        scan (dict): The queued scan, with its host, profile, name, job and deadline.
+
+    Returns:
+        bool: True if the scan can be batched.
+    """
+    if scan.get("job") is not None or scan.get("deadline") is not None:
+        return False
+    try:
+        ipaddress.ip_address(scan["host"])
+    except ValueError:
+        return False
+    return True
+
+
+class ScanBatcher:
+    """
+    Groups the single host scans of the same profile that are queued close together, so that they run
+    as one nmap scan instead of one nmap process for every host.
+
+    A batch is released when it has `max_batch_size` scans or when `window` milliseconds have passed
+    since its first scan was added.
+    """
+    def __init__(self, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+        """
+        Initializes a new instance of the ScanBatcher class.
+
+        Args:
+            window (int, optional): The milliseconds a batch waits for more scans.
+            max_batch_size (int, optional): The maximum number of scans of a batch. 1 disables batching.
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._batches = {}
+
+    @property
+    def enabled(self):
+        return self.max_batch_size is not None and self.max_batch_size > 1
+
+    @property
+    def pending(self):
+        return sum([len(_b["scans"]) for _b in self._batches.values()])
+
+    @property
+    def scans(self):
+        return [_s for _b in self._batches.values() for _s in _b["scans"]]
+
+    def add(self, scan: dict, now=None):
+        """
+        Adds a scan to the batch of its profile and priority.
+
+        Args:
+            scan (dict): The queued scan.
+            now (float, optional): The current monotonic time in seconds.
+        """
+        _now = now if now is not None else time.monotonic()
+        _batch = self._batches.setdefault((scan["profile"], scan.get("priority")), {"since": _now, "scans": []})
+        if scan["host"] in [_s["host"] for _s in _batch["scans"]]:
+            # The host is already in the batch. Its results are stored once
+            return
+        _batch["scans"].append(scan)
+
+    def ready(self, now=None, flush=False) -> list:
+        """
+        Takes the batches that are ready to run.
+
+        Args:
+            now (float, optional): The current monotonic time in seconds.
+            flush (bool, optional): Take all the batches, even if their window has not passed.
+
+        Returns:
+            list: The batches, every one a list of queued scans of the same profile and priority.
+        """
+        _now = now if now is not None else time.monotonic()
+        _ready = []
+        for _key in list(self._batches.keys()):
+            _batch = self._batches[_key]
+            while len(_batch["scans"]) >= self.max_batch_size:
+                _ready.append(_batch["scans"][:self.max_batch_size])
+                _batch["scans"] = _batch["scans"][self.max_batch_size:]
+                _batch["since"] = _now
+            if len(_batch["scans"]) > 0 and (flush is True or (_now - _batch["since"]) * 1000 >= self.window):
+                _ready.append(_batch["scans"])
+                _batch["scans"] = []
+            if len(_batch["scans"]) == 0:
+                del self._batches[_key]
+        return _ready
+
+    def next_ready(self, now=None):
+        """
+        Finds when the next batch is ready to run.
+
+        Args:
+            now (float, optional): The current monotonic time in seconds.
+
+        Returns:
+            float: The seconds until the window of the oldest batch passes, 0 if a batch is ready now,
+                or None if there are no batches.
+        """
+        if len(self._batches) == 0:
+            return None
+        _now = now if now is not None else time.monotonic()
+        if any([len(_b["scans"]) >= self.max_batch_size for _b in self._batches.values()]):
+            return 0
+        _since = min([_b["since"] for _b in self._batches.values()])
+        return max(0, _since + self.window / 1000 - _now)
@@ -0,0 +1,87 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import ipaddress
+
+
+def _target_network(target: str):
+    """
+    Returns:
+        The network of an IP host or subnet target, or None if the target is a hostname.
+    """
+    try:
+        return ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return None
+
+
+def _done_addresses(network, done_hosts: list) -> list:
+    """
+    Returns:
+        list: The done hosts that are addresses in the network.
+    """
+    _addresses = []
+    for _h in done_hosts:
+        try:
+            _address = ipaddress.ip_address(_h)
+        except ValueError:
+            continue
+        if _address in network:
+            _addresses.append(_address)
+    return _addresses
+
+
+def pending_hosts_count(target: str, done_hosts: list) -> int:
+    """
+    Counts the hosts of a scan target that have not been saved yet.
+
+    Args:
+        target (str): The target host or subnet of the scan.
+        done_hosts (list): The hosts whose results have been saved.
+
+    Returns:
+        int: The number of pending hosts.
+    """
+    _network = _target_network(target)
+    if _network is None:
+        # A hostname resolves to a single host, whose address is not known beforehand
+        return 0 if len(done_hosts) > 0 else 1
+    return _network.num_addresses - len(set(_done_addresses(_network, done_hosts)))
+
+
+def exclude_arguments(target: str, done_hosts: list, networks=None) -> str:
+    """
+    Builds the nmap arguments that skip the hosts of a target that have already been saved.
+
+    The done hosts are collapsed to as few networks as possible, so a resumed subnet scan passes
+    a short `--exclude` list to nmap even if most of the subnet has been scanned.
+
+    Args:
+        target (str): The target host or subnet of the scan.
+        done_hosts (list): The hosts whose results have been saved.
+        networks (list, optional): Networks of the target that are skipped as well, e.g. because other scans cover them.
+
+    Returns:
+        str: The nmap arguments, or an empty string if there is nothing to exclude.
+    """
+    _network = _target_network(target)
+    if _network is None:
+        return ""
+    _excluded = [str(_n) for _n in ipaddress.collapse_addresses(
+        _done_addresses(_network, done_hosts) + [_n for _n in (networks or []) if _n.subnet_of(_network)])]
+    if len(_excluded) == 0:
+        return ""
+    return f"--exclude {','.join(_excluded)}"
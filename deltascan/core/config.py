@@ -46,6 +46,134 @@ LOG_CONF = {
     "datefmt": "%Y-%m-%d %H:%M:%S",
 }
 
+# Scan engines. The thread engine is the default one
+THREAD_ENGINE = "thread"
+ASYNCIO_ENGINE = "asyncio"
+
+# Nmap progress updates published per second for every running scan
+PROGRESS_RATE = 2
+# Frames per second of the live display of the running scans
+UI_FRAME_RATE = 10
+# Maximum number of pending messages between the nmap process thread and the scan thread
+PROGRESS_QUEUE_SIZE = 32
+# Subnets with more hosts than this are split in shards of this size. 0 disables sharding
+SHARD_SIZE = 256
+# Maximum number of shards of a subnet scan that run at the same time
+MAX_PARALLEL_SHARDS = 4
+# Number of nmap output characters kept and shown in the UI for every running scan
+NMAP_LOG_TAIL = 300
+# Directory where the whole nmap output of every scan is written. None keeps only the tail in memory
+LOG_SPILL_DIR = None
+
+# Packets per second shared by all the running scans. 0 disables the packet rate budget
+MAX_RATE = 0
+# Minimum packets per second of a single scan. Scans wait until this rate is available
+MIN_SCAN_RATE = 100
+# Minimum number of seconds between two changes of the number of concurrent scans
+RATE_CONTROL_INTERVAL = 5
+
+# Worker processes that parse the nmap XML output. 0 parses it in the calling thread
+PARSE_WORKERS = 0
+# Documents larger than this number of characters are split by host and parsed by several workers
+PARSE_SPLIT_SIZE = 2 ** 20
+
+# Milliseconds that single host scans of the same profile wait to run in one nmap batch
+BATCH_WINDOW = 200
+# Maximum number of single host scans of a batch. 1 disables batching
+MAX_BATCH_SIZE = 64
+
+# Directory where nmap writes the XML output of every scan before it is parsed. None keeps the output in memory
+SPOOL_DIR = None
+# Hours that spool files are kept after their scan has finished. 0 removes them as soon as they are parsed
+SPOOL_RETENTION = 0
+# Take the results of port only scans, without services, OS, scripts or traces, from the nmap grepable output
+GREPABLE_OUTPUT = False
+
+# Seconds a scan may run before the watchdog kills it. 0 disables the deadline. Profiles and scans may set their own
+SCAN_DEADLINE = 0
+# Maximum number of seconds between two checks of the scan deadlines
+WATCHDOG_INTERVAL = 1
+
+# Maximum number of scans, or batches of scans, that run at the same time
+MAX_CONCURRENT_SCANS = 8
+# Maximum number of scans waiting to start. New scans are rejected when the queue is full. 0 does not limit the queue
+MAX_QUEUED_SCANS = 256
+# Seconds a new scan waits for room in a full queue before it is rejected
+QUEUE_TIMEOUT = 0
+
+# Scan priorities, from the most to the least urgent. Queued scans of a higher priority start first
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+SCAN_PRIORITIES = [PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW]
+DEFAULT_PRIORITY = PRIORITY_NORMAL
+# Seconds after which a queued scan is treated as one priority higher, so that low priority scans are not starved.
+# 0 disables it
+PRIORITY_AGING = 600
+
+# Maximum number of seconds between two checks of the stored schedules
+SCHEDULER_INTERVAL = 60
+
+# Scan job statuses. Jobs that have not finished can be resumed
+JOB_RUNNING = "running"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+JOB_TIMED_OUT = "timed_out"
+JOB_FINISHED = "finished"
+# Status of a scan that waits in the scan queue, before its job is created
+SCAN_QUEUED = "queued"
+
+# Statuses of the jobs that distributed workers run
+WORK_PENDING = "pending"
+WORK_LEASED = "leased"
+WORK_DONE = "done"
+WORK_INGESTED = "ingested"
+WORK_FAILED = "failed"
+# Seconds a worker holds a job without renewing its lease. The job of a dead worker is run again after that
+LEASE_DURATION = 60
+# Number of times a distributed job is run before it is failed
+MAX_WORK_ATTEMPTS = 3
+# Seconds an idle worker, or the coordinator, waits before checking the jobs again
+WORKER_POLL_INTERVAL = 2
+
+# Stages that the results of a finished scan go through
+PIPELINE_STAGES = ["parse", "validate", "hash", "store", "diff", "export"]
+# Worker threads of every pipeline stage. Stages that are not given have one
+PIPELINE_WORKERS = {_s: 1 for _s in PIPELINE_STAGES}
+# Maximum number of scan results that wait for every pipeline stage
+PIPELINE_QUEUE_SIZE = 16
+
+# Address and port of the HTTP API of the serve action
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8470
+
+DEFAULT_SETTINGS = {
+    "scan_engine": THREAD_ENGINE,
+    "progress_rate": PROGRESS_RATE,
+    "progress_queue_size": PROGRESS_QUEUE_SIZE,
+    "shard_size": SHARD_SIZE,
+    "max_parallel_shards": MAX_PARALLEL_SHARDS,
+    "log_tail_size": NMAP_LOG_TAIL,
+    "log_spill_dir": LOG_SPILL_DIR,
+    "max_rate": MAX_RATE,
+    "min_scan_rate": MIN_SCAN_RATE,
+    "parse_workers": PARSE_WORKERS,
+    "batch_window": BATCH_WINDOW,
+    "max_batch_size": MAX_BATCH_SIZE,
+    "spool_dir": SPOOL_DIR,
+    "spool_retention": SPOOL_RETENTION,
+    "grepable_output": GREPABLE_OUTPUT,
+    "scan_deadline": SCAN_DEADLINE,
+    "max_concurrent_scans": MAX_CONCURRENT_SCANS,
+    "max_queued_scans": MAX_QUEUED_SCANS,
+    "queue_timeout": QUEUE_TIMEOUT,
+    "priority_aging": PRIORITY_AGING,
+    "lease_duration": LEASE_DURATION,
+    "max_work_attempts": MAX_WORK_ATTEMPTS,
+    "pipeline_workers": PIPELINE_WORKERS,
+    "pipeline_queue_size": PIPELINE_QUEUE_SIZE,
+}
+
 
 @dataclass
 class Config:
@@ -21,11 +21,17 @@ from peewee import (
     CharField,
     DateTimeField,
     AutoField,
+    BooleanField,
+    FloatField,
+    IntegerField,
     ForeignKeyField,
     DoesNotExist,
     IntegrityError,
-    OperationalError
+    OperationalError,
+    JOIN,
+    fn
 )
+from playhouse.migrate import (SqliteMigrator, migrate)
 import datetime
 import logging
 from deltascan.core.config import LOG_CONF
@@ -74,6 +80,7 @@ class Scans(BaseModel):
         custom_command (str): The custom command used for the scan (optional).
         results (str): The results of the scan.
         result_hash (str): The hash of the scan results.
+        projection (str): The JSON fields that were kept of the results, or None if all of them were kept.
         created_at (datetime): The timestamp when the scan was created.
     """
     id = AutoField()
@@ -85,9 +92,152 @@ class Scans(BaseModel):
     custom_command = CharField(null=True)
     results = CharField()
     result_hash = CharField()
+    projection = CharField(null=True)
     created_at = DateTimeField(default=datetime.datetime.now().strftime(APP_DATE_FORMAT))
 
 
+class ScanJobs(BaseModel):
+    """
+    Represents a scan job in the database. A scan job is a logical scan run of a target with a profile,
+    which may be completed by several nmap runs when it is resumed.
+
+    Attributes:
+        id (int): The unique identifier of the scan job.
+        uuid (str): The UUID of the scan job.
+        target (str): The target host or subnet of the scan job.
+        profile (Profiles): The profile associated with the scan job.
+        status (str): The status of the scan job (running, cancelled, failed, finished).
+        created_at (datetime): The timestamp when the scan job was created.
+        updated_at (datetime): The timestamp when the status of the scan job was last changed.
+    """
+    id = AutoField()
+    uuid = CharField(unique=True)
+    target = CharField()
+    profile = ForeignKeyField(Profiles, field="id", null=False)
+    status = CharField()
+    created_at = DateTimeField()
+    updated_at = DateTimeField()
+
+
+class ScanJobHosts(BaseModel):
+    """
+    Represents a host checkpoint of a scan job in the database: a host whose results have been saved.
+
+    Attributes:
+        id (int): The unique identifier of the checkpoint.
+        job (ScanJobs): The scan job of the host.
+        host (str): The host that was scanned.
+        scan_uuid (str): The UUID of the saved scan of the host.
+        created_at (datetime): The timestamp when the host was saved.
+    """
+    id = AutoField()
+    job = ForeignKeyField(ScanJobs, field="id", null=False)
+    host = CharField()
+    scan_uuid = CharField()
+    created_at = DateTimeField()
+
+
+class Schedules(BaseModel):
+    """
+    Represents a recurring scan in the database.
+
+    Attributes:
+        id (int): The unique identifier of the schedule.
+        name (str): The unique name of the schedule.
+        target (str): The target host or subnet of the scans.
+        profile (Profiles): The profile of the scans.
+        cron (str): The cron expression of the run times, if the schedule does not run at an interval.
+        interval (int): The seconds between two runs, if the schedule does not have a cron expression.
+        jitter (int): The maximum seconds a run is delayed, to spread the runs of schedules that are due together.
+        priority (str): The priority of the scans in the scan queue.
+        deadline (float): The seconds a scan may run.
+        enabled (bool): Whether the schedule runs.
+        next_run (datetime): The time of the next run, before the jitter.
+        last_run (datetime): The time of the last run.
+        last_status (str): The outcome of the last run (started, skipped, failed).
+        runs (int): The number of started runs.
+        skipped (int): The number of runs skipped because the previous run was still going.
+        created_at (datetime): The timestamp when the schedule was created.
+    """
+    id = AutoField()
+    name = CharField(unique=True)
+    target = CharField()
+    profile = ForeignKeyField(Profiles, field="id", null=False)
+    cron = CharField(null=True)
+    interval = IntegerField(null=True)
+    jitter = IntegerField(default=0)
+    priority = CharField(null=True)
+    deadline = FloatField(null=True)
+    enabled = BooleanField(default=True)
+    next_run = DateTimeField(index=True)
+    last_run = DateTimeField(null=True)
+    last_status = CharField(null=True)
+    runs = IntegerField(default=0)
+    skipped = IntegerField(default=0)
+    created_at = DateTimeField()
+
+
+class WorkerJobs(BaseModel):
+    """
+    Represents a part of a scan job that a distributed worker runs.
+
+    A worker claims a job by taking a lease on it, which it renews while the scan runs. A job whose lease
+    expired, because its worker died, can be claimed by another worker.
+
+    Attributes:
+        id (int): The unique identifier of the worker job.
+        uuid (str): The UUID of the worker job.
+        job (ScanJobs): The scan job that the worker job is part of.
+        target (str): The host or subnet to scan.
+        arguments (str): The nmap arguments of the scan.
+        status (str): The status of the worker job (pending, leased, done, ingested, failed).
+        worker (str): The worker that last claimed the job.
+        lease (str): The token of the current lease.
+        lease_expires (datetime): The time the current lease expires.
+        attempts (int): The number of times the job was claimed.
+        results (str): The JSON results of the scan, until they are ingested.
+        error (str): Why the job failed.
+        created_at (datetime): The timestamp when the worker job was created.
+        updated_at (datetime): The timestamp when the worker job was last changed.
+    """
+    id = AutoField()
+    uuid = CharField(unique=True)
+    job = ForeignKeyField(ScanJobs, field="id", null=False)
+    target = CharField()
+    arguments = CharField()
+    status = CharField(index=True)
+    worker = CharField(null=True)
+    lease = CharField(null=True, index=True)
+    lease_expires = DateTimeField(null=True)
+    attempts = IntegerField(default=0)
+    results = CharField(null=True)
+    error = CharField(null=True)
+    created_at = DateTimeField()
+    updated_at = DateTimeField()
+
+
+class Diffs(BaseModel):
+    """
+    Represents the differences between a scan and the previous scan of the same host with the same profile.
+
+    The differences are computed when the scan is saved, so that listing them does not read and compare the scans.
+
+    Attributes:
+        id (int): The unique identifier of the diff.
+        scan (Scans): The newer scan.
+        previous (Scans): The previous scan of the host with the same profile.
+        changed (bool): Whether the results of the scans differ.
+        diffs (str): The JSON added, removed and changed fields of the scan.
+        created_at (datetime): The timestamp when the diff was computed.
+    """
+    id = AutoField()
+    scan = ForeignKeyField(Scans, field="id", null=False, unique=True, backref="diff")
+    previous = ForeignKeyField(Scans, field="id", null=False, index=True, backref="next_diffs")
+    changed = BooleanField(index=True)
+    diffs = CharField()
+    created_at = DateTimeField()
+
+
 class RDBMS:
     def __init__(self, db_path, logger=None):
         """
@@ -102,10 +252,13 @@ class RDBMS:
         """
         self.logger = logger if logger is not None else logging.basicConfig(**LOG_CONF)
         try:
-            db.init(db_path)
+            # Initializing the database closes its connection, which is shared with the other RDBMS objects
+            if db.is_closed() or db.database != db_path:
+                db.init(db_path)
             if db.is_closed():
                 db.connect()
-                db.create_tables([Profiles, Scans], safe=True)
+                db.create_tables([Profiles, Scans, ScanJobs, ScanJobHosts, Schedules, WorkerJobs, Diffs], safe=True)
+                self._migrate()
         except OperationalError as e:
             self.logger.error("Operation not permitted.")
             raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
@@ -113,19 +266,35 @@ class RDBMS:
             self.logger.error("Error initializing database: " + str(e))
             DatabaseExceptions.DScanRDBMSException("Error initializing database: " + str(e))
 
-    def __del__(self):
+    @staticmethod
+    def _migrate():
+        """
+        Adds the columns that are missing from the tables of a database created by an older version.
+        """
+        _columns = [_c.name for _c in db.get_columns(Scans._meta.table_name)]
+        if Scans.projection.column_name not in _columns:
+            migrate(SqliteMigrator(db).add_column(Scans._meta.table_name, Scans.projection.column_name, Scans.projection))
+
+    def close(self):
         """
-        Destructor for the RDBMS class.
+        Closes the database connection.
+
+        The connection is shared by every RDBMS object of the process, so it is closed only by an explicit call
+        and never while a transaction is open on it.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the connection can not be closed.
+            DatabaseExceptions.DScanRDBMSException: If there is an error closing the connection.
         """
         try:
-            if not db.is_closed():
+            if not db.is_closed() and not db.in_transaction():
                 db.close()
         except OperationalError as e:
             self.logger.error("Operation not permitted.")
             raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
         except Exception as e:
             self.logger.error("Error closing database connection: " + str(e))
-            DatabaseExceptions.DScanRDBMSException("Error closing database connection: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSException("Error closing database connection: " + str(e))
 
     def create_port_scan(self,
                          uuid: str,
@@ -136,7 +305,8 @@ class RDBMS:
                          results: str,
                          results_hash: str,
                          custom_command=None,
-                         created_at=None):
+                         created_at=None,
+                         projection=None):
         """
         Creates a new port scan entry in the database.
 
@@ -149,6 +319,7 @@ class RDBMS:
             results_hash (str): The hash value of the scan results.
             custom_command (Optional[str]): Custom command used for the scan (default: None).
             created_at (Optional[str]): The creation timestamp of the scan (default: None).
+            projection (Optional[str]): The JSON fields that were kept of the results (default: None, all of them).
 
         Returns:
             The newly created port scan entry.
@@ -168,6 +339,7 @@ class RDBMS:
                 custom_command=custom_command,
                 results=results,
                 result_hash=results_hash,
+                projection=projection,
                 created_at=datetime.datetime.now().strftime(APP_DATE_FORMAT) if created_at is None else created_at
             )
 
@@ -179,6 +351,598 @@ class RDBMS:
             self.logger.error("Error setting scan results: " + str(e))
             raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error creating profile: " + str(e))
 
+    def create_scan_job(self, uuid: str, target: str, profile: str, status: str):
+        """
+        Creates a new scan job entry in the database.
+
+        Args:
+            uuid (str): The UUID of the scan job.
+            target (str): The target host or subnet.
+            profile (str): The name of the profile associated with the scan job.
+            status (str): The initial status of the scan job.
+
+        Returns:
+            The newly created scan job entry.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error creating the scan job entry.
+        """
+        try:
+            profile_id = Profiles.select().where(
+                Profiles.profile_name == profile).get().id
+            _now = datetime.datetime.now().strftime(APP_DATE_FORMAT)
+            return ScanJobs.create(
+                uuid=uuid,
+                target=target,
+                profile_id=profile_id,
+                status=status,
+                created_at=_now,
+                updated_at=_now)
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: create scan job")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except (DatabaseError, DoesNotExist) as e:
+            self.logger.error("Error creating scan job: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error creating scan job: " + str(e))
+
+    def update_scan_job_status(self, uuid: str, status: str):
+        """
+        Updates the status of a scan job.
+
+        Args:
+            uuid (str): The UUID of the scan job.
+            status (str): The new status.
+
+        Returns:
+            int: The number of updated scan jobs.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error updating the scan job.
+        """
+        try:
+            return ScanJobs.update(
+                status=status,
+                updated_at=datetime.datetime.now().strftime(APP_DATE_FORMAT)
+            ).where(ScanJobs.uuid == uuid).execute()
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: update scan job")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except DatabaseError as e:
+            self.logger.error("Error updating scan job: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error updating scan job: " + str(e))
+
+    def create_scan_job_host(self, job_uuid: str, host: str, scan_uuid: str):
+        """
+        Records that the results of a host of a scan job have been saved.
+
+        Args:
+            job_uuid (str): The UUID of the scan job.
+            host (str): The host.
+            scan_uuid (str): The UUID of the saved scan of the host.
+
+        Returns:
+            The newly created checkpoint entry.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error creating the checkpoint entry.
+        """
+        try:
+            job_id = ScanJobs.select().where(ScanJobs.uuid == job_uuid).get().id
+            return ScanJobHosts.create(
+                job_id=job_id,
+                host=host,
+                scan_uuid=scan_uuid,
+                created_at=datetime.datetime.now().strftime(APP_DATE_FORMAT))
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: create scan job host")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except (DatabaseError, DoesNotExist) as e:
+            self.logger.error("Error creating scan job host: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error creating scan job host: " + str(e))
+
+    def get_scan_jobs(self, uuid=None, status=None, limit=None):
+        """
+        Retrieves scan jobs from the database, newest first.
+
+        Args:
+            uuid (str, optional): The UUID of the scan job to retrieve.
+            status (list, optional): The statuses of the scan jobs to retrieve.
+            limit (int, optional): The maximum number of scan jobs to retrieve.
+
+        Returns:
+            list: A list of dictionaries representing the scan jobs.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            query = ScanJobs.select(
+                ScanJobs.id,
+                ScanJobs.uuid,
+                ScanJobs.target,
+                ScanJobs.status,
+                ScanJobs.created_at,
+                ScanJobs.updated_at,
+                Profiles.profile_name,
+                Profiles.arguments).join(Profiles)
+            if uuid is not None:
+                query = query.where(ScanJobs.uuid == uuid)
+            if status is not None:
+                query = query.where(ScanJobs.status << status)
+            query = query.order_by(ScanJobs.id.desc())
+            if limit is not None:
+                query = query.limit(limit)
+            return list(query.dicts())
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get scan jobs")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    def get_scan_job_hosts(self, job_uuid: str):
+        """
+        Retrieves the host checkpoints of a scan job.
+
+        Args:
+            job_uuid (str): The UUID of the scan job.
+
+        Returns:
+            list: A list of dictionaries with the host and the scan UUID of every saved host.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            return list(ScanJobHosts.select(
+                ScanJobHosts.host,
+                ScanJobHosts.scan_uuid).join(ScanJobs).where(ScanJobs.uuid == job_uuid).order_by(ScanJobHosts.id).dicts())
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get scan job hosts")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    def create_schedule(self, name: str, target: str, profile: str, next_run: str, cron=None, interval=None,
+                        jitter=0, priority=None, deadline=None):
+        """
+        Creates a new schedule entry in the database.
+
+        Args:
+            name (str): The unique name of the schedule.
+            target (str): The target host or subnet.
+            profile (str): The name of the profile of the scans.
+            next_run (str): The time of the first run.
+            cron (str, optional): The cron expression of the run times.
+            interval (int, optional): The seconds between two runs.
+            jitter (int, optional): The maximum seconds a run is delayed.
+            priority (str, optional): The priority of the scans.
+            deadline (float, optional): The seconds a scan may run.
+
+        Returns:
+            The newly created schedule entry.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error creating the schedule entry.
+        """
+        try:
+            profile_id = Profiles.select().where(
+                Profiles.profile_name == profile).get().id
+            return Schedules.create(
+                name=name,
+                target=target,
+                profile_id=profile_id,
+                cron=cron,
+                interval=interval,
+                jitter=jitter,
+                priority=priority,
+                deadline=deadline,
+                next_run=next_run,
+                created_at=datetime.datetime.now().strftime(APP_DATE_FORMAT))
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: create schedule")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except (DatabaseError, DoesNotExist, IntegrityError) as e:
+            self.logger.error("Error creating schedule: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error creating schedule: " + str(e))
+
+    def get_schedules(self, name=None, enabled=None):
+        """
+        Retrieves schedules from the database, the next to run first.
+
+        Args:
+            name (str, optional): The name of the schedule to retrieve.
+            enabled (bool, optional): Retrieve only the enabled, or only the disabled, schedules.
+
+        Returns:
+            list: A list of dictionaries representing the schedules.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            query = Schedules.select(
+                Schedules.name,
+                Schedules.target,
+                Schedules.cron,
+                Schedules.interval,
+                Schedules.jitter,
+                Schedules.priority,
+                Schedules.deadline,
+                Schedules.enabled,
+                Schedules.next_run,
+                Schedules.last_run,
+                Schedules.last_status,
+                Schedules.runs,
+                Schedules.skipped,
+                Schedules.created_at,
+                Profiles.profile_name).join(Profiles)
+            if name is not None:
+                query = query.where(Schedules.name == name)
+            if enabled is not None:
+                query = query.where(Schedules.enabled == enabled)
+            return list(query.order_by(Schedules.next_run).dicts())
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get schedules")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    def update_schedule(self, name: str, **fields):
+        """
+        Updates the fields of a schedule.
+
+        Args:
+            name (str): The name of the schedule.
+            **fields: The new values of the fields.
+
+        Returns:
+            int: The number of updated schedules.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error updating the schedule.
+        """
+        try:
+            return Schedules.update(**fields).where(Schedules.name == name).execute()
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: update schedule")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except DatabaseError as e:
+            self.logger.error("Error updating schedule: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error updating schedule: " + str(e))
+
+    def delete_schedule(self, name: str):
+        """
+        Deletes a schedule.
+
+        Args:
+            name (str): The name of the schedule.
+
+        Returns:
+            int: The number of deleted schedules.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be written.
+        """
+        try:
+            return Schedules.delete().where(Schedules.name == name).execute()
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: delete schedule")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    def create_worker_job(self, uuid: str, job_uuid: str, target: str, arguments: str, status: str):
+        """
+        Creates a new worker job entry in the database.
+
+        Args:
+            uuid (str): The UUID of the worker job.
+            job_uuid (str): The UUID of the scan job.
+            target (str): The host or subnet to scan.
+            arguments (str): The nmap arguments of the scan.
+            status (str): The initial status of the worker job.
+
+        Returns:
+            The newly created worker job entry.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error creating the worker job entry.
+        """
+        try:
+            job_id = ScanJobs.select().where(ScanJobs.uuid == job_uuid).get().id
+            _now = datetime.datetime.now().strftime(APP_DATE_FORMAT)
+            return WorkerJobs.create(
+                uuid=uuid,
+                job_id=job_id,
+                target=target,
+                arguments=arguments,
+                status=status,
+                created_at=_now,
+                updated_at=_now)
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: create worker job")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except (DatabaseError, DoesNotExist, IntegrityError) as e:
+            self.logger.error("Error creating worker job: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error creating worker job: " + str(e))
+
+    def claim_worker_job(self, worker: str, lease: str, now: str, lease_expires: str, claimable: list, leased: str,
+                         max_attempts: int):
+        """
+        Leases the oldest job that is waiting, or whose lease has expired, to a worker.
+
+        The job is picked and leased by a single UPDATE statement, so concurrent workers never lease the same job.
+
+        Args:
+            worker (str): The name of the worker.
+            lease (str): The token of the new lease.
+            now (str): The current time.
+            lease_expires (str): The time the new lease expires.
+            claimable (list): The statuses of the jobs that are waiting.
+            leased (str): The status of the leased jobs.
+            max_attempts (int): Jobs that have been claimed this many times are not claimed again.
+
+        Returns:
+            int: The number of leased jobs, 0 or 1.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error leasing the job.
+        """
+        try:
+            _candidate = WorkerJobs.select(WorkerJobs.id).where(
+                ((WorkerJobs.status << claimable) | ((WorkerJobs.status == leased) & (WorkerJobs.lease_expires < now))) &
+                (WorkerJobs.attempts < max_attempts)).order_by(WorkerJobs.id).limit(1)
+            return WorkerJobs.update(
+                status=leased,
+                worker=worker,
+                lease=lease,
+                lease_expires=lease_expires,
+                attempts=WorkerJobs.attempts + 1,
+                updated_at=now).where(WorkerJobs.id << _candidate).execute()
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: claim worker job")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except DatabaseError as e:
+            self.logger.error("Error claiming worker job: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error claiming worker job: " + str(e))
+
+    def update_worker_job(self, where: dict, **fields):
+        """
+        Updates the fields of the worker jobs that match the given field values.
+
+        Args:
+            where (dict): The values of the fields of the worker jobs to update. Lists match any of their values.
+                The `lease_expires_before` key matches the jobs whose lease expired before the given time.
+            **fields: The new values of the fields.
+
+        Returns:
+            int: The number of updated worker jobs.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If there is an error updating the worker jobs.
+        """
+        try:
+            query = WorkerJobs.update(updated_at=datetime.datetime.now().strftime(APP_DATE_FORMAT), **fields)
+            for _field, _value in where.items():
+                if _field == "lease_expires_before":
+                    query = query.where(WorkerJobs.lease_expires < _value)
+                elif isinstance(_value, list):
+                    query = query.where(getattr(WorkerJobs, _field) << _value)
+                else:
+                    query = query.where(getattr(WorkerJobs, _field) == _value)
+            return query.execute()
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: update worker job")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except DatabaseError as e:
+            self.logger.error("Error updating worker job: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error updating worker job: " + str(e))
+
+    def get_worker_jobs(self, status=None, lease=None, job_uuid=None):
+        """
+        Retrieves worker jobs, with the target and profile of their scan job, oldest first.
+
+        Args:
+            status (list, optional): The statuses of the worker jobs to retrieve.
+            lease (str, optional): The lease token of the worker job to retrieve.
+            job_uuid (str, optional): The UUID of the scan job of the worker jobs.
+
+        Returns:
+            list: A list of dictionaries representing the worker jobs.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            query = WorkerJobs.select(
+                WorkerJobs.uuid,
+                WorkerJobs.target,
+                WorkerJobs.arguments,
+                WorkerJobs.status,
+                WorkerJobs.worker,
+                WorkerJobs.lease,
+                WorkerJobs.lease_expires,
+                WorkerJobs.attempts,
+                WorkerJobs.results,
+                WorkerJobs.error,
+                WorkerJobs.created_at,
+                WorkerJobs.updated_at,
+                ScanJobs.uuid.alias("job_uuid"),
+                ScanJobs.target.alias("job_target"),
+                Profiles.profile_name).join(ScanJobs).join(Profiles)
+            if status is not None:
+                query = query.where(WorkerJobs.status << status)
+            if lease is not None:
+                query = query.where(WorkerJobs.lease == lease)
+            if job_uuid is not None:
+                query = query.where(ScanJobs.uuid == job_uuid)
+            return list(query.order_by(WorkerJobs.id).dicts())
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get worker jobs")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    @staticmethod
+    def atomic():
+        """
+        Returns a context manager that runs the database operations in it in a single transaction.
+
+        Returns:
+            The transaction context manager. Transactions inside it are nested as savepoints.
+        """
+        return db.atomic()
+
+    def get_adjacent_scan(self, scan_id: int, previous=True):
+        """
+        Retrieves the scan of the same host with the same profile that was created right before or after a scan.
+
+        Only scans whose results were projected to the same fields are compared, so a scan of a profile whose
+        projection changed is not adjacent to the scans before the change.
+
+        Args:
+            scan_id (int): The ID of the scan.
+            previous (bool, optional): Whether to retrieve the previous scan or the next one.
+
+        Returns:
+            dict: The ID, UUID, results and result hash of the adjacent scan, or None if there is none.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSEntryNotFound: If the scan does not exist.
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            _scan = Scans.get_by_id(scan_id)
+            query = Scans.select(Scans.id, Scans.uuid, Scans.results, Scans.result_hash, Scans.created_at).where(
+                (Scans.host == _scan.host) & (Scans.profile == _scan.profile_id) & (Scans.id != _scan.id) &
+                (Scans.projection.is_null() if _scan.projection is None else Scans.projection == _scan.projection))
+            # Scans created in the same second are ordered by their ID
+            if previous is True:
+                query = query.where(
+                    (Scans.created_at < _scan.created_at) |
+                    ((Scans.created_at == _scan.created_at) & (Scans.id < _scan.id))
+                ).order_by(Scans.created_at.desc(), Scans.id.desc())
+            else:
+                query = query.where(
+                    (Scans.created_at > _scan.created_at) |
+                    ((Scans.created_at == _scan.created_at) & (Scans.id > _scan.id))
+                ).order_by(Scans.created_at, Scans.id)
+            return query.dicts().first()
+        except DoesNotExist:
+            raise DatabaseExceptions.DScanRDBMSEntryNotFound(f"Scan {scan_id} not found")
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get adjacent scan")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    def create_diff(self, scan_id: int, previous_id: int, diffs: str, changed: bool):
+        """
+        Creates the diff of a scan against its previous scan, replacing the diff that the scan already has.
+
+        Args:
+            scan_id (int): The ID of the newer scan.
+            previous_id (int): The ID of the previous scan.
+            diffs (str): The JSON differences of the scans.
+            changed (bool): Whether the results of the scans differ.
+
+        Returns:
+            int: The ID of the diff.
+
+        Raises:
+            DatabaseExceptions.DScanRDBMSErrorCreatingEntry: If the diff can not be created.
+        """
+        try:
+            return Diffs.insert(
+                scan=scan_id,
+                previous=previous_id,
+                changed=changed,
+                diffs=diffs,
+                created_at=datetime.datetime.now().strftime(APP_DATE_FORMAT)
+            ).on_conflict_replace().execute()
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: create diff")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+        except (DatabaseError, IntegrityError) as e:
+            self.logger.error("Error creating diff: " + str(e))
+            raise DatabaseExceptions.DScanRDBMSErrorCreatingEntry("Error creating diff: " + str(e))
+
+    def get_scans_without_diff(self, host=None, limit=None, profile=None, from_date=None, to_date=None):
+        """
+        Retrieves the scans that match the given filters and have a previous scan, but no saved diff against it.
+
+        These are the scans that were saved before the diffs were saved along with the scans.
+
+        Args:
+            host (str, optional): The host or subnet of the scans.
+            limit (int, optional): The maximum number of latest scans to select.
+            profile (str, optional): The profile name of the scans.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+
+        Returns:
+            list: A list of dictionaries with the ID, UUID, results and result hash of the scans, oldest first.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            _scan_ids = self._get_scans_with_optional_params(
+                Scans, None, host, limit, profile, from_date, to_date, [Scans.id])
+            Previous = Scans.alias()
+            _previous = Previous.select(Previous.id).where(
+                (Previous.host == Scans.host) & (Previous.profile == Scans.profile) &
+                ((Previous.projection == Scans.projection) | (Previous.projection.is_null() & Scans.projection.is_null())) &
+                ((Previous.created_at < Scans.created_at) | ((Previous.created_at == Scans.created_at) & (Previous.id < Scans.id))))
+            query = Scans.select(Scans.id, Scans.uuid, Scans.results, Scans.result_hash).join(
+                Diffs, JOIN.LEFT_OUTER, on=(Diffs.scan == Scans.id)
+            ).where(
+                (Scans.id << _scan_ids) & Diffs.id.is_null() & fn.EXISTS(_previous)
+            ).order_by(Scans.created_at, Scans.id)
+            return list(query.dicts())
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get scans without diff")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
+    def get_diffs(self, host=None, limit=None, profile=None, from_date=None, to_date=None, n_diffs=None):
+        """
+        Retrieves the changed diffs between the scans that match the given filters, newest first.
+
+        The filters select the scans as in `get_scans`. A diff is retrieved if both of its scans are selected.
+
+        Args:
+            host (str, optional): The host or subnet of the scans.
+            limit (int, optional): The maximum number of latest scans to select.
+            profile (str, optional): The profile name of the scans.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+            n_diffs (int, optional): The maximum number of diffs to retrieve.
+
+        Returns:
+            list: A list of dictionaries with the diffs and the ID, UUID, host, result hash and date of both scans.
+
+        Raises:
+            DatabaseExceptions.DScanPermissionDeniedError: If the database can not be read.
+        """
+        try:
+            _scan_ids = self._get_scans_with_optional_params(
+                Scans, None, host, limit, profile, from_date, to_date, [Scans.id])
+            New = Scans.alias()
+            Old = Scans.alias()
+            query = Diffs.select(
+                Diffs.diffs,
+                New.id.alias("id"),
+                New.uuid.alias("uuid"),
+                New.host.alias("host"),
+                New.result_hash.alias("result_hash"),
+                New.created_at.alias("created_at"),
+                Old.id.alias("previous_id"),
+                Old.uuid.alias("previous_uuid"),
+                Old.host.alias("previous_host"),
+                Old.result_hash.alias("previous_result_hash"),
+                Old.created_at.alias("previous_created_at"),
+                Profiles.profile_name,
+                Profiles.arguments
+            ).join(New, on=(Diffs.scan == New.id)).switch(Diffs).join(Old, on=(Diffs.previous == Old.id)).join(
+                Profiles, on=(Old.profile == Profiles.id)
+            ).where(
+                (Diffs.changed == True) & (Diffs.scan << _scan_ids) & (Diffs.previous << _scan_ids)  # noqa: E712
+            ).order_by(New.created_at.desc(), New.id.desc())
+            if n_diffs is not None:
+                query = query.limit(n_diffs)
+            return list(query.dicts())
+        except OperationalError as e:
+            self.logger.error("Operation not permitted: get diffs")
+            raise DatabaseExceptions.DScanPermissionDeniedError(f"Permission error: {str(e)}")
+
     def create_profile(self, name, arguments):
         """
         Create a new profile with the given name and arguments.
@@ -240,6 +1004,7 @@ class RDBMS:
                 Scans.results,
                 Scans.result_hash,
                 Scans.created_at,
+                Scans.projection,
                 Profiles.profile_name,
                 Profiles.arguments
             ]
@@ -14,7 +14,22 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
-from deltascan.core.scanner import Scanner
+from deltascan.core.scanner import (Scanner, AsyncScanner)
+from deltascan.core.sharding import ShardedScanner
+from deltascan.core.checkpoints import exclude_arguments
+from deltascan.core.rate import (RateController, with_max_rate, show_allocation)
+from deltascan.core.nmap.log_capture import LogCapture
+from deltascan.core.nmap.spool import (NmapSpool, clean_spool_dir)
+from deltascan.core.nmap.libnmap_wrapper import update_scan_ui
+from deltascan.core.planner import ScanPlanner
+from deltascan.core.batching import ScanBatcher
+from deltascan.core.scan_queue import ScanQueue
+from deltascan.core.watchdog import ScanWatchdog
+from deltascan.core.scheduler import (ScanScheduler, CronExpression)
+from deltascan.core.distributed import (ScanCoordinator, ScanWorker)
+from deltascan.core.pipeline import Pipeline
+from deltascan.core.projection import FieldProjection
+from deltascan.core.nmap.grepable import (GREPABLE_FORMAT, is_port_only)
 import deltascan.core.store as store
 from deltascan.core.config import (
     CONFIG_FILE_PATH,
@@ -25,7 +40,17 @@ from deltascan.core.config import (
     CHANGED,
     REMOVED,
     ERROR_LOG,
-    LOG_CONF)
+    LOG_CONF,
+    DEFAULT_SETTINGS,
+    ASYNCIO_ENGINE,
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_FINISHED,
+    JOB_TIMED_OUT,
+    JOB_RUNNING,
+    SCAN_QUEUED,
+    SCAN_PRIORITIES,
+    DEFAULT_PRIORITY)
 from deltascan.core.exceptions import (AppExceptions,
                                        ExporterExceptions,
                                        ImporterExceptions,
@@ -37,17 +62,18 @@ from deltascan.core.utils import (datetime_validation,
                                   validate_port_state_type,
                                   ThreadWithException)
 from deltascan.core.export import Exporter
-from deltascan.core.schemas import (DBScan, ConfigSchema, Scan)
+from deltascan.core.schemas import (DBScan, ConfigSchema, SettingsSchema, Scan)
 from deltascan.core.importer import Importer
 from deltascan.core.parser import Parser
+from deltascan.core.parse_pool import ParsePool
 from marshmallow import (ValidationError, INCLUDE)
 
-from threading import Event
+from threading import (Event, Lock, current_thread)
+from concurrent.futures import (Future, wait, FIRST_COMPLETED)
 import logging
 import yaml
 import json
 import copy
-import time
 from datetime import datetime
 
 from rich.progress import (
@@ -100,17 +126,47 @@ class DeltaScan:
                 "Review the permissions of the file or run with sudo.")
         self.logger = logging.getLogger(__name__)
 
-        if self._config.action == "scan":
+        if self._config.action in ["scan", "resume", "scheduler", "serve", "worker"]:
             try:
                 check_root_permissions()
             except PermissionError as e:
                 self.logger.error(f"{str(e)}")
                 raise AppExceptions.DScanAppError("Scan action requires root privileges. Run as sudo!")
 
+        self._settings = self._load_settings_from_file(self._config.conf_file)
+        if self._settings["spool_dir"] is not None and self._settings["scan_engine"] != ASYNCIO_ENGINE:
+            self.logger.warning(
+                "Spooled scans run with the asyncio engine, the thread engine keeps the whole nmap output in memory")
+        self._rate_controller = RateController(self._settings["max_rate"], self._settings["min_scan_rate"])
+        ParsePool.configure(self._settings["parse_workers"])
+        self._planner = ScanPlanner()
+        self._queue = ScanQueue(
+            self._settings["max_queued_scans"],
+            ScanBatcher(self._settings["batch_window"], self._settings["max_batch_size"]),
+            self._settings["priority_aging"])
+        self._watchdog = ScanWatchdog()
+        # The results of the finished scans go through these stages, away from the scan threads
+        self._pipeline = Pipeline([
+            ("parse", self._parse_results),
+            ("validate", self._validate_results),
+            ("hash", self._hash_results),
+            ("store", self._store_results),
+            ("diff", self._query_results),
+            ("export", self._export_results)],
+            self._settings["pipeline_workers"], self._settings["pipeline_queue_size"], logger=self.logger)
+
         self._result = result
-        self._scan_list = []
         self._scans_to_wait = {}
+        # Guards the running scans, which the workers and the shell change concurrently
+        self._scans_lock = Lock()
+        # Makes checking for a duplicate scan and queueing it a single step for concurrent submitters
+        self._submit_lock = Lock()
+        # The profiles of the configuration file, read once and kept until reload_profiles
+        self._file_profiles = None
+        self._profiles_lock = Lock()
         self._scans_history = []
+        # The outcome of the last run of every scan name
+        self._finished_scans = {}
         self.renderables = []
         self._cleaning_up = False
         self._is_running = False
@@ -123,6 +179,11 @@ class DeltaScan:
             self.store = store.Store(self._config.db_path, logger=self.logger)
         except StoreExceptions.DScanPermissionError as e:
             raise AppExceptions.DScanAppError(str(e))
+        self._scheduler = ScanScheduler(self.store, self._fire_schedule, logger=self.logger)
+        self._coordinator = ScanCoordinator(
+            self.store, self._settings["max_work_attempts"], logger=self.logger, projections=self._profile_projection)
+        self._worker = None
+        self._distributed_stop = Event()
 
         self.generic_scan_info = {
             "host": self._config.host,
@@ -155,37 +216,131 @@ class DeltaScan:
 
         return data["profiles"]
 
-    def add_scan(self, host=None, profile=None):
+    def _load_settings_from_file(self, path=None):
+        """
+        Load the application settings from the `settings` section of a YAML file.
+        Settings that are not given in the file keep their default values.
+
+        Args:
+            path (str, optional): The path to the YAML file. If not provided, the default path will be used.
+
+        Returns:
+            dict: A dictionary containing the loaded settings.
+
+        Raises:
+            AppExceptions.DScanSchemaException: If the settings are invalid.
+        """
+        yaml_file_path = CONFIG_FILE_PATH if path is None else path
+        settings = copy.deepcopy(DEFAULT_SETTINGS)
+
+        try:
+            with open(yaml_file_path, "r") as file:
+                data = yaml.safe_load(file)
+        except IOError as e:
+            self.logger.warning(f"Settings not loaded, using the default ones: {str(e)}")
+            return settings
+
+        if isinstance(data, dict) and isinstance(data.get("settings"), dict):
+            try:
+                settings.update({
+                    _k: _v for _k, _v in SettingsSchema().load(data["settings"]).items() if _v is not None})
+            except ValidationError as e:
+                self.logger.error(f"{str(e)}")
+                raise AppExceptions.DScanSchemaException(f"Invalid settings in {yaml_file_path}: {str(e)}")
+        return settings
+
+    def add_scan(self, host=None, profile=None, job=None, deadline=None, priority=None, submitter=None):
         """
         Add a scan to the DeltaScan instance.
 
+        The scan waits in the scan queue until a worker is free. If the queue is full, it waits up to
+        `queue_timeout` seconds for room and is rejected after that. Queued scans of a higher priority
+        start first, and scans of the same priority are shared fairly between submitters, or profiles
+        for the scans without a submitter, in proportion to the `weight` of their profile.
+
         Args:
             host (str): The host to scan.
             profile (str): The profile to use for the scan.
+            job (str, optional): The UUID of the scan job to resume. A new scan job is created if not given.
+            deadline (float, optional): The number of seconds the scan may run. The deadline of the profile,
+                or the `scan_deadline` setting, is used if not given.
+            priority (str, optional): The priority of the scan (high, normal or low). The priority of the
+                profile, or normal, is used if not given.
+            submitter (str, optional): Who added the scan. Scans without a submitter are shared by profile.
 
         Raises:
             AppExceptions.DScanProfileNotFoundException: If the profile is not found or the host is invalid.
             AppExceptions.DScanInputValidationException: If the scan name already exists.
+            AppExceptions.DScanQueueFullException: If the scan queue is full.
 
         Returns:
             bool: True if the scan was successfully added.
         """
-        _name = f"scan-{str(host)}-{str(profile)}"
-        if _name in self._scans_to_wait.keys():
-            raise AppExceptions.DScanInputValidationException("Scan is already running")
+        with self._submit_lock:
+            return self._add_scan(host, profile, job, deadline, priority, submitter)
+
+    def _add_scan(self, host, profile, job, deadline, priority, submitter):
+        _name = self.scan_name(host, profile)
+        with self._scans_lock:
+            if _name in self._scans_to_wait.keys():
+                raise AppExceptions.DScanInputValidationException("Scan is already running")
+        if _name in [_s["name"] for _s in self._queue.scans()]:
+            raise AppExceptions.DScanInputValidationException("Scan is already queued")
 
         if self._get_profile(profile) == (None, None):
             raise AppExceptions.DScanProfileNotFoundException(f"Profile {profile} not found anywhere.")
         if validate_host(host) is False:
             raise AppExceptions.DScanInputValidationException("Invalid host format")
 
-        self._scan_list.append({"host": host, "profile": profile, "name": _name})
+        if deadline is not None and deadline < 0:
+            raise AppExceptions.DScanInputValidationException("Invalid deadline, it can not be negative")
+        _priority = self._scan_priority(profile, priority)
+        if _priority not in SCAN_PRIORITIES:
+            raise AppExceptions.DScanInputValidationException(
+                f"Invalid priority {_priority}, use one of {', '.join(SCAN_PRIORITIES)}")
+        _weight = self._profile_option(profile, "weight")
+
+        # The progress bar must exist before a worker can start the scan
+        _renderable = self._add_scan_ui(host, profile, _name)
+        try:
+            self._queue.put({
+                "host": host,
+                "profile": profile,
+                "name": _name,
+                "job": job,
+                "deadline": deadline,
+                "priority": _priority,
+                "share": submitter,
+                "weight": _weight if isinstance(_weight, (int, float)) and _weight > 0 else None
+            }, self._settings["queue_timeout"])
+        except AppExceptions.DScanQueueFullException as e:
+            self.logger.warning(str(e))
+            if _renderable is not None:
+                self.renderables.remove(_renderable)
+                self.ui_context["ui_live"].update(Columns(self.renderables, equal=True))
+            raise
+        return True
+
+    def _add_scan_ui(self, host, profile, name):
+        """
+        Adds the progress bar and the nmap logs of a scan to the UI.
 
+        Args:
+            host (str): The host of the scan.
+            profile (str): The profile of the scan.
+            name (str): The name of the scan.
+
+        Returns:
+            Columns: The renderable of the scan, or None if there is no UI.
+        """
+        if self.ui_context is None:
+            return None
         _c = 0
         count = ""
-        for _s in self._scans_history:
-            if _s.startswith(_name):
-                _c = _c + 1
+        with self._scans_lock:
+            for _s in self._scans_history:
+                if _s.startswith(name):
+                    _c = _c + 1
         if _c > 0:
             count = f"- ({str(_c)})"
 
@@ -193,6 +348,7 @@ class DeltaScan:
             TextColumn(f"{'[bold light_slate_gray]Scanning: ' + host + ', ' + profile + ' ' + count:<20}", justify="right"),
             BarColumn(complete_style="green"),
             TextColumn("[progress.percentage][light_slate_gray]{task.percentage:>3.1f}%"),
+            TextColumn("[light_slate_gray]{task.description}"),
             SpinnerColumn("simpleDots"),)
 
         progress_bar_id = progress_bar.add_task("", total=100)
@@ -208,17 +364,17 @@ class DeltaScan:
         if "text" not in self.ui_context["ui_instances"]:
             self.ui_context["ui_instances"]["text"] = {}
 
-        if str(_name) not in self.ui_context["ui_instances"]["progress_bar"]:
-            self.ui_context["ui_instances"]["progress_bar"][str(_name)] = {}
+        if str(name) not in self.ui_context["ui_instances"]["progress_bar"]:
+            self.ui_context["ui_instances"]["progress_bar"][str(name)] = {}
 
-        if str(_name) not in self.ui_context["ui_instances"]["text"]:
-            self.ui_context["ui_instances"]["text"][str(_name)] = {}
+        if str(name) not in self.ui_context["ui_instances"]["text"]:
+            self.ui_context["ui_instances"]["text"][str(name)] = {}
         self.ui_context["ui_live"].update(col)
-        self.ui_context["ui_instances"]["progress_bar"][str(_name)]["instance"] = progress_bar
-        self.ui_context["ui_instances"]["progress_bar"][str(_name)]["id"] = progress_bar_id
-        self.ui_context["ui_instances"]["text"][str(_name)]["instance"] = text
+        self.ui_context["ui_instances"]["progress_bar"][str(name)]["instance"] = progress_bar
+        self.ui_context["ui_instances"]["progress_bar"][str(name)]["id"] = progress_bar_id
+        self.ui_context["ui_instances"]["text"][str(name)]["instance"] = text
 
-        return True
+        return _coltmp
 
     def scan(self):
         """
@@ -236,64 +392,66 @@ class DeltaScan:
 
     def _scan_orchestrator(self):
         """
-        Orchestrates the scanning process by starting individual port scans in separate threads.
-
-        This method continuously checks for finished scans and removes them from the scan list.
-        It then starts a new thread for each scan in the scan list and keeps track of the threads
-        using a dictionary. The method waits for all scans to finish before exiting.
+        Orchestrates the scanning process with a pool of `max_concurrent_scans` worker threads.
 
-        Note: This method assumes the existence of the following instance variables:
-        - _scan_list: A list of dictionaries representing the scans to be performed.
-        - _scans_to_wait: A dictionary that maps scan names to thread objects and cancel events.
-        - _is_running: A boolean flag indicating whether the orchestrator is running.
+        The workers take the scans from the scan queue as soon as they are added. Single host scans of the
+        same profile are collected in batches that a worker runs as a single nmap scan. The orchestrator
+        sleeps until the queue is empty and no scans are running, unless the shell is interactive or the
+        scheduler is running, or until the scans are cleaned up. It then stops the workers and waits for them to exit
+        and for the results pipeline to drain.
 
         Returns:
             None
         """
-        self._scans_to_wait = {}
-
+        self._queue.open()
         self._is_running = True
-        while True:
-            self._remove_finished_scan_from_list()
-            for _, _scan in enumerate(self._scan_list):
-                _evt = Event()
-                _thr = ThreadWithException(target=self._port_scan, args=(_scan["host"], _scan["profile"], _scan["name"], _evt,))
-                _thr.start()
-
-                for idx, _scan_s in enumerate(self._scan_list):
-                    if _scan["name"] == _scan_s["name"]:
-                        del self._scan_list[idx]
-                        break
-                self._scans_to_wait[str(_scan["name"])] = {"_thr": _thr, "_cancel_event": _evt}
-                self._scans_history.append(str(_scan["name"]))
-            time.sleep(0.1)
-
-            if self.scans_to_wait == 0:
-                time.sleep(0.2)
-
-                if (self.scans_to_wait == 0 and self._config.is_interactive is False) or self._cleaning_up:
-                    self._is_running = False
-                    break
+        _workers = [
+            ThreadWithException(target=self._scan_worker, name=f"deltascan-scan-worker-{_i}")
+            for _i in range(max(1, self._settings["max_concurrent_scans"]))]
+        for _w in _workers:
+            _w.start()
+
+        self._queue.wait_for(
+            lambda: self._cleaning_up or (
+                self._queue.idle and self._config.is_interactive is False and self._scheduler.running is False))
+
+        self._queue.close()
+        for _w in _workers:
+            _w.join()
+        # The reports of the last scans may still be exported
+        self._pipeline.join()
+        self._is_running = False
 
-    def _remove_finished_scan_from_list(self):
+    def _scan_worker(self):
         """
-        Removes the finished scans from the list of scans to wait for completion.
+        Runs the scans of the scan queue until the queue is closed.
 
-        This method iterates over the `_scans_to_wait` dictionary and checks if each thread is alive.
-        If a thread is not alive, it is removed from the dictionary.
-
-        Args:
-            None
-
-        Returns:
-            None
+        The scans of a batch share the cancel event of the batch.
         """
-        threads_to_remove = []
-        for _n, _th in self._scans_to_wait.items():
-            if _th["_thr"].is_alive() is False:
-                threads_to_remove.append(_n)
-        for _n in threads_to_remove:
-            del self._scans_to_wait[_n]
+        while True:
+            _scans = self._queue.get()
+            if _scans is None:
+                return
+            _evt = Event()
+            with self._scans_lock:
+                for _scan in _scans:
+                    self._scans_to_wait[str(_scan["name"])] = {"_thr": current_thread(), "_cancel_event": _evt}
+                    self._scans_history.append(str(_scan["name"]))
+            try:
+                if len(_scans) == 1:
+                    self._port_scan(
+                        _scans[0]["host"], _scans[0]["profile"], _scans[0]["name"], _evt, _scans[0].get("job"),
+                        _scans[0].get("deadline"))
+                else:
+                    self._batch_port_scan(
+                        [_s["host"] for _s in _scans], _scans[0]["profile"], [_s["name"] for _s in _scans], _evt)
+            except Exception as e:
+                self.logger.error(f"Scan {_scans[0]['name']} stopped: {str(e)}")
+            finally:
+                with self._scans_lock:
+                    for _scan in _scans:
+                        self._scans_to_wait.pop(str(_scan["name"]), None)
+                self._queue.task_done()
 
     def _get_profile(self, _profile):
         """
@@ -313,7 +471,7 @@ class DeltaScan:
             self.logger.error(f"Profile {_profile} not found in database")
 
         try:
-            profile_from_file = self._load_profiles_from_file(self._config.conf_file)[_profile]
+            profile_from_file = self._profiles()[_profile]
             self.store.save_profiles({_profile: profile_from_file})
             profile_arguments = profile_from_file["arguments"]
         except (KeyError, IOError) as e:
@@ -321,10 +479,151 @@ class DeltaScan:
             return (None, None)
         return (_profile, profile_arguments)
 
-    def _port_scan(self, __host=None, __profile=None, __name=None, __evt=None):
+    def _scan_deadline(self, profile, deadline=None):
+        """
+        Finds the number of seconds a scan may run.
+
+        Args:
+            profile (str): The name of the profile of the scan.
+            deadline (float, optional): The deadline given for the scan.
+
+        Returns:
+            float: The deadline of the scan, else the `deadline` of its profile in the configuration file,
+                else the `scan_deadline` setting. 0 means that the scan has no deadline.
+        """
+        if deadline is not None:
+            return deadline
+        _deadline = self._profile_option(profile, "deadline")
+        if isinstance(_deadline, (int, float)) and _deadline >= 0:
+            return _deadline
+        return self._settings["scan_deadline"]
+
+    def _scan_priority(self, profile, priority=None):
+        """
+        Finds the priority of a scan.
+
+        Args:
+            profile (str): The name of the profile of the scan.
+            priority (str, optional): The priority given for the scan.
+
+        Returns:
+            str: The priority of the scan, else the `priority` of its profile in the configuration file,
+                else the default priority.
+        """
+        if priority is not None:
+            return priority
+        _priority = self._profile_option(profile, "priority")
+        return _priority if _priority in SCAN_PRIORITIES else DEFAULT_PRIORITY
+
+    def _profile_option(self, profile, option):
+        """
+        Reads an option of a profile from the cached profiles of the configuration file.
+
+        Args:
+            profile (str): The name of the profile.
+            option (str): The name of the option.
+
+        Returns:
+            The value of the option or None if the profile or the option are not in the configuration file.
+        """
+        try:
+            return self._profiles()[profile].get(option)
+        except (KeyError, IOError, AttributeError, TypeError):
+            return None
+
+    def _profiles(self):
+        """
+        Returns the profiles of the configuration file, reading the file only the first time.
+
+        Returns:
+            dict: The profiles of the configuration file.
+
+        Raises:
+            IOError: If the configuration file cannot be read. Nothing is cached then.
+        """
+        with self._profiles_lock:
+            if self._file_profiles is None:
+                self._file_profiles = self._load_profiles_from_file(self._config.conf_file)
+            return self._file_profiles
+
+    def reload_profiles(self):
+        """
+        Reads the profiles of the configuration file again, after it has been changed.
+
+        Returns:
+            dict: The reloaded profiles.
+
+        Raises:
+            DScanAppError: If the configuration file cannot be read.
+        """
+        try:
+            _profiles = self._load_profiles_from_file(self._config.conf_file)
+        except (IOError, yaml.YAMLError, KeyError, TypeError) as e:
+            raise AppExceptions.DScanAppError(f"Could not reload the profiles: {str(e)}")
+        with self._profiles_lock:
+            self._file_profiles = _profiles
+        return _profiles
+
+    def _profile_projection(self, profile, arguments=None):
+        """
+        Reads the fields of the results that a profile keeps from the configuration file.
+
+        The results of port only scans are taken from the grepable output when `grepable_output` is set.
+        They have fewer fields than the results of the XML output, so the output is recorded with the projection.
+
+        Args:
+            profile (str): The name of the profile.
+            arguments (str, optional): The nmap arguments of the local scans of the profile. The results of
+                the scans without arguments, like the scans of the workers, are taken from the XML output.
+
+        Returns:
+            FieldProjection: The projection of the `fields` option of the profile, or None if the results keep all
+                fields of the XML output.
+
+        Raises:
+            AppExceptions.DScanInputValidationException: If the `fields` option of the profile is invalid.
+        """
+        _grepable = arguments is not None and self._settings["grepable_output"] is True and is_port_only(arguments)
+        return FieldProjection.from_config(self._profile_option(profile, "fields"), GREPABLE_FORMAT if _grepable else None)
+
+    @staticmethod
+    def _stopped_job_status(cancel_evt, watched=None):
+        """
+        Finds the status of a scan job that stopped before finishing.
+
+        Args:
+            cancel_evt (Event): The cancel event of the scan.
+            watched (WatchedScan, optional): The scan as watched by the watchdog.
+
+        Returns:
+            str: JOB_TIMED_OUT if the scan ran past its deadline, JOB_CANCELLED if it was cancelled, else JOB_FAILED.
+        """
+        if watched is not None and watched.timed_out is True:
+            return JOB_TIMED_OUT
+        if cancel_evt is not None and cancel_evt.is_set():
+            return JOB_CANCELLED
+        return JOB_FAILED
+
+    def _port_scan(self, __host=None, __profile=None, __name=None, __evt=None, __job=None, __deadline=None):
         """
         Perform a port scan using the specified profile and host.
 
+        Every host is saved as soon as nmap reports it, so the results of the first hosts of a long scan
+        can be queried and diffed while the scan is still running. The hosts that were not saved during
+        the scan are saved when it finishes.
+
+        Every scan runs as a scan job, whose saved hosts are recorded as checkpoints. A resumed job skips
+        the hosts that have already been saved and its results include the hosts of the previous runs.
+
+        Parts of the target that running or pending scans of the same profile already cover are not scanned
+        again. The scans that cover them pass on the hosts they find, which are saved as results of this scan.
+
+        A scan that runs past its deadline is stopped by the watchdog. The hosts saved until then are kept,
+        the job is marked as timed out and can be resumed.
+
+        The results that are left when the scan finishes go through the results pipeline. The scan waits until
+        they are saved and queried back, but not for their report to be exported.
+
         Returns:
             A list of the last n scans performed.
 
@@ -337,41 +636,126 @@ class DeltaScan:
         _name = __name if __name is not None else f"scan-{_host}-{_profile}"
 
         _profile, _profile_arguments = self._get_profile(_profile)
+        _job = None
+        _job_status = JOB_FAILED
+        _rate_acquired = False
+        _plan = None
+        __evt = __evt if __evt is not None else Event()
+        _watch = None
 
         try:
             if validate_host(_host) is False:
                 raise AppExceptions.DScanInputValidationException("Invalid host format")
+            _projection = self._profile_projection(_profile, _profile_arguments)
 
             if self.ui_context is not None:
                 self.ui_context["show_nmap_logs"] = self._config.is_interactive is False
 
-            results = Scanner.scan(_host, _profile_arguments, self.ui_context, logger=self.logger, name=_name, _cancel_evt=__evt)
+            if __job is None:
+                _job = {"uuid": self.store.create_scan_job(_host, _profile), "hosts": []}
+            else:
+                _job = self.store.get_scan_job(__job)
+            _watch = self._watchdog.watch(_name, self._scan_deadline(_profile, __deadline), __evt, _profile)
+
+            _saved_uuids = {}
+            _saved_lock = Lock()
+
+            def _save_host(host_result):
+                _saved = self.store.save_scans(_profile, _host, [host_result], job_uuid=_job["uuid"], projection=_projection)
+                self._record_diffs(_saved)
+                with _saved_lock:
+                    _saved_uuids[host_result.get("host")] = [_s.uuid for _s in _saved]
+
+            # The parts of the target that other scans of the profile already cover are not scanned again.
+            # Those scans pass on the hosts they find there
+            _plan = self._planner.plan(_name, _profile, _host, _save_host, lambda: self._saved_host_results(_job["uuid"]))
+
+            def _scan_host(host_result):
+                _save_host(host_result)
+                self._planner.publish(_plan, [host_result])
+
+            _exclude = exclude_arguments(_host, [_h["host"] for _h in _job["hosts"]], _plan.covered_networks())
+            if _exclude != "" and _profile_arguments is not None:
+                _profile_arguments = f"{_profile_arguments} {_exclude}"
+            if _plan.coalesced:
+                show_allocation(self.ui_context, _name, f"following {', '.join([_l.name for _l in _plan.leaders])}")
+
+            results = {"results": []}
+            if _plan.has_remainder:
+                # Wait for a share of the packet rate budget
+                if self._rate_controller.enabled:
+                    show_allocation(self.ui_context, _name, "waiting for rate budget")
+                _rate = self._rate_controller.acquire(_name, __evt)
+                _rate_acquired = True
+                if _rate == -1:
+                    _job_status = self._stopped_job_status(__evt, _watch)
+                    return None
+                if _rate is not None:
+                    show_allocation(self.ui_context, _name, f"{_rate} pps")
+                    _profile_arguments = with_max_rate(_profile_arguments, _rate)
+
+                # Large subnets are split in shards that run in parallel. Other targets run as a single scan
+                _log = LogCapture.for_scan(_name, self._settings["log_tail_size"], self._settings["log_spill_dir"])
+                _spool = self._scan_spool(_name)
+                try:
+                    results = ShardedScanner.scan(
+                        _host, _profile_arguments, self.ui_context, logger=self.logger, name=_name, _cancel_evt=__evt,
+                        scanner=self._scanner(_spool),
+                        shard_size=self._settings["shard_size"],
+                        max_parallel_shards=self._settings["max_parallel_shards"],
+                        progress_rate=self._settings["progress_rate"],
+                        progress_queue_size=self._settings["progress_queue_size"],
+                        host_callback=_scan_host,
+                        log_capture=_log,
+                        progress_callback=lambda p: self._rate_controller.report_progress(_name, p),
+                        spool=_spool,
+                        grepable=self._settings["grepable_output"])
+                finally:
+                    _log.close()
+                    self._finish_spool(_spool)
+                    # Do not hold a share of the budget while waiting for the scans that are followed
+                    self._rate_controller.release(_name)
+                    _rate_acquired = False
 
             if results is None:
+                _job_status = self._stopped_job_status(__evt, _watch)
+                if _job_status == JOB_TIMED_OUT:
+                    self._append_partial_result(
+                        _host, _profile, _job["uuid"],
+                        [_h["scan_uuid"] for _h in _job["hosts"]] + [_u for _uuids in _saved_uuids.values() for _u in _uuids])
                 return None
 
-            _new_scans = self.store.save_scans(
-                _profile,
-                _host,  # Subnet
-                results["results"]
-            )
+            _remaining = [_r for _r in results["results"] if _r.get("host") not in _saved_uuids]
+            # The remaining hosts are saved later, so no scan can start following this one once they are published
+            self._planner.retire(_plan)
+            self._planner.publish(_plan, _remaining)
 
-            _new_scan_uuids = [_s.uuid for _s in list(_new_scans)]
-            last_n_scans = self.store.get_filtered_scans(
-                    _new_scan_uuids,
-                    last_n=len(_new_scan_uuids))
+            if _plan.coalesced and self._planner.wait(_plan, __evt) is False:
+                _job_status = self._stopped_job_status(__evt, _watch)
+                self.logger.error(f"Scan {_name} is incomplete, a scan that covers part of its target did not finish")
+                # The hosts of the scan are still saved, so that the job can be resumed
+                self._process_results(_profile, _host, _remaining, _job["uuid"], report=False, projection=_projection)
+                return None
 
             # getting the current date and time in order not to override existing files
             _now = datetime.now().strftime(FILE_DATE_FORMAT)
-            # Create the report only if output_file is configured and has never got interactive mode
-            if self._config.output_file is not None and (self._config.is_interactive is False):
-                self._report_scans(last_n_scans, f"scans_{_host}_{_profile}_{_now}_{self._config.output_file}")
+            # The results of a resumed job are stitched with the results of its previous runs
+            last_n_scans = self._process_results(
+                _profile,
+                _host,  # Subnet
+                _remaining,
+                _job["uuid"],
+                [_h["scan_uuid"] for _h in _job["hosts"]] + [_u for _uuids in _saved_uuids.values() for _u in _uuids],
+                output_file=self._scans_report_file(_host, _profile, _now),
+                projection=_projection)
+            _job_status = JOB_FINISHED
 
             self._result.append({
                 "scans": last_n_scans,
                 "date": _now,
                 "host": _host,
                 "profile": _profile,
+                "job": _job["uuid"],
                 "finished": True
             })
 
@@ -384,6 +768,784 @@ class DeltaScan:
                 ValueError) as e:
             self.logger.error(f"{str(e)}")
             raise AppExceptions.DScanAppError(f"An error occurred during the scan: {str(e)}")
+        finally:
+            self._watchdog.unwatch(_watch)
+            if _rate_acquired is True:
+                self._rate_controller.release(_name)
+            if _plan is not None:
+                self._planner.finish(_plan, _job_status == JOB_FINISHED)
+            if _job is not None:
+                self._set_scan_job_status(_job["uuid"], _job_status)
+            self._record_scan_outcome(_name, _job["uuid"] if _job is not None else None, _job_status)
+
+    def _batch_port_scan(self, __hosts, __profile, __names, __evt=None):
+        """
+        Perform a single port scan of several hosts that were added as separate scans with the same profile.
+
+        Nmap scans the hosts in parallel in one process. Every host still has its own scan job, progress bar
+        and results: the results of every host are saved under its own job as soon as nmap reports them.
+        Hosts that running scans of the same profile already cover are not scanned again, as in `_port_scan`.
+
+        Args:
+            __hosts (list): The IP addresses of the hosts.
+            __profile (str): The profile of the scans.
+            __names (list): The names of the scans, in the order of the hosts.
+            __evt (Event, optional): The event that cancels all the scans of the batch.
+
+        Returns:
+            dict: The last scans of every host, or None if the batch was cancelled or failed.
+
+        Raises:
+            AppExceptions.DScanAppError: If an error occurs during the scan.
+        """
+        _profile, _profile_arguments = self._get_profile(__profile)
+        _projection = self._profile_projection(_profile, _profile_arguments)
+        _batch_name = f"batch-{__names[0]}-{len(__hosts)}"
+        _names = dict(zip(__hosts, __names))
+        _jobs = {}
+        _plans = {}
+        _saved_uuids = {_h: [] for _h in __hosts}
+        _saved_hosts = set()
+        _saved_lock = Lock()
+        _job_status = JOB_FAILED
+        _rate_acquired = False
+        __evt = __evt if __evt is not None else Event()
+        # The batch runs for all of its hosts, so it has the deadline of its profile
+        _watch = self._watchdog.watch(_batch_name, self._scan_deadline(_profile), __evt, _profile)
+
+        def _save_host(host_result):
+            _h = host_result.get("host")
+            if _h not in _jobs:
+                self.logger.warning(f"Batch {_batch_name} reported the unexpected host {_h}")
+                return
+            _saved = self.store.save_scans(_profile, _h, [host_result], job_uuid=_jobs[_h], projection=_projection)
+            self._record_diffs(_saved)
+            with _saved_lock:
+                _saved_uuids[_h].extend([_s.uuid for _s in _saved])
+                _saved_hosts.add(_h)
+            update_scan_ui(self.ui_context, _names[_h], 100)
+
+        def _scan_host(host_result):
+            _save_host(host_result)
+            if host_result.get("host") in _plans:
+                self._planner.publish(_plans[host_result.get("host")], [host_result])
+
+        def _report_progress(progress):
+            # Every host of the batch shows the progress of the batch until its results arrive
+            for _h, _n in _names.items():
+                if _h not in _saved_hosts:
+                    update_scan_ui(self.ui_context, _n, progress)
+            self._rate_controller.report_progress(_batch_name, progress)
+
+        try:
+            for _h in __hosts:
+                _jobs[_h] = self.store.create_scan_job(_h, _profile)
+                _plans[_h] = self._planner.plan(
+                    _names[_h], _profile, _h, _save_host, lambda _job_uuid=_jobs[_h]: self._saved_host_results(_job_uuid))
+            _targets = [_h for _h in __hosts if _plans[_h].has_remainder]
+
+            results = {"results": []}
+            if len(_targets) > 0:
+                _rate = self._rate_controller.acquire(_batch_name, __evt)
+                _rate_acquired = True
+                if _rate == -1:
+                    _job_status = self._stopped_job_status(__evt, _watch)
+                    return None
+                _profile_arguments = with_max_rate(_profile_arguments, _rate)
+
+                _log = LogCapture.for_scan(_batch_name, self._settings["log_tail_size"], self._settings["log_spill_dir"])
+                _spool = self._scan_spool(_batch_name)
+                try:
+                    results = ShardedScanner.scan(
+                        ",".join(_targets), _profile_arguments, None, logger=self.logger, name=_batch_name,
+                        _cancel_evt=__evt,
+                        scanner=self._scanner(_spool),
+                        progress_rate=self._settings["progress_rate"],
+                        progress_queue_size=self._settings["progress_queue_size"],
+                        host_callback=_scan_host,
+                        log_capture=_log,
+                        progress_callback=_report_progress,
+                        spool=_spool,
+                        grepable=self._settings["grepable_output"])
+                finally:
+                    _log.close()
+                    self._finish_spool(_spool)
+                    self._rate_controller.release(_batch_name)
+                    _rate_acquired = False
+
+            if results is None:
+                _job_status = self._stopped_job_status(__evt, _watch)
+                if _job_status == JOB_TIMED_OUT:
+                    for _h in __hosts:
+                        self._append_partial_result(_h, _profile, _jobs[_h], _saved_uuids[_h])
+                return None
+
+            for _r in results["results"]:
+                if _r.get("host") in _jobs and _r.get("host") not in _saved_hosts:
+                    _scan_host(_r)
+
+            _incomplete = [_h for _h in __hosts if _plans[_h].coalesced and self._planner.wait(_plans[_h], __evt) is False]
+            if len(_incomplete) > 0:
+                _job_status = self._stopped_job_status(__evt, _watch)
+                self.logger.error(f"Scans of {', '.join(_incomplete)} are incomplete, a scan that covers them did not finish")
+                return None
+            _job_status = JOB_FINISHED
+
+            _now = datetime.now().strftime(FILE_DATE_FORMAT)
+            _last_n_scans = {}
+            for _h in __hosts:
+                # The hosts are already saved. Only their query and their report go through the pipeline
+                _last_n_scans[_h] = self._process_results(
+                    _profile, _h, [], _jobs[_h], _saved_uuids[_h], output_file=self._scans_report_file(_h, _profile, _now))
+                update_scan_ui(self.ui_context, _names[_h], 100, None, True)
+                self._result.append({
+                    "scans": _last_n_scans[_h],
+                    "date": _now,
+                    "host": _h,
+                    "profile": _profile,
+                    "job": _jobs[_h],
+                    "finished": True
+                })
+            return _last_n_scans
+        except (AppExceptions.DScanExportError,
+                AppExceptions.DScanScannerError,
+                StoreExceptions.DScanStoreSException,
+                AppExceptions.DScanResultsSchemaException,
+                ExporterExceptions.DScanExporterErrorProcessingData,
+                ValueError) as e:
+            self.logger.error(f"{str(e)}")
+            raise AppExceptions.DScanAppError(f"An error occurred during the scan: {str(e)}")
+        finally:
+            self._watchdog.unwatch(_watch)
+            if _rate_acquired is True:
+                self._rate_controller.release(_batch_name)
+            for _plan in _plans.values():
+                self._planner.finish(_plan, _job_status == JOB_FINISHED)
+            for _job in _jobs.values():
+                self._set_scan_job_status(_job, _job_status)
+            for _h in __hosts:
+                self._record_scan_outcome(_names[_h], _jobs.get(_h), _job_status)
+
+    def _scans_report_file(self, host, profile, now):
+        """
+        Returns the report file of the scans of a finished scan.
+
+        Args:
+            host (str): The target of the scan.
+            profile (str): The profile of the scan.
+            now (str): The date of the report.
+
+        Returns:
+            str: The report file, or None if no report is created.
+        """
+        # Create the report only if output_file is configured and has never got interactive mode
+        if self._config.output_file is None or self._config.is_interactive is True:
+            return None
+        return f"scans_{host}_{profile}_{now}_{self._config.output_file}"
+
+    def _process_results(self, profile, host, results, job_uuid, scan_uuids=None, output_file=None, report=True, projection=None):
+        """
+        Passes the results of a scan through the results pipeline.
+
+        Blocks until the results are saved and, if `report` is set, queried back together with the
+        already saved scans of the job. The report is exported afterwards by the export stage.
+
+        Args:
+            profile (str): The profile of the scan.
+            host (str): The target of the scan.
+            results: The results of the hosts, or the nmap XML output of the scan.
+            job_uuid (str): The scan job of the results.
+            scan_uuids (list, optional): The UUIDs of the scans of the job that are already saved.
+            output_file (str, optional): The report file of the scans. No report is created if not given.
+            report (bool, optional): Whether the scans of the job are queried and reported.
+            projection (FieldProjection, optional): The fields of the results that the profile of the scan keeps.
+
+        Returns:
+            list: The scans of the job, or None if `report` is not set.
+
+        Raises:
+            StoreExceptions.DScanStoreSException: If the results can not be validated or saved.
+        """
+        _scans = Future()
+        _done = self._pipeline.submit({
+            "profile": profile,
+            "host": host,
+            "results": results,
+            "job": job_uuid,
+            "scan_uuids": scan_uuids if scan_uuids is not None else [],
+            "output_file": output_file if report is True else None,
+            "report": report,
+            "projection": projection,
+            "scans": _scans,
+        })
+        wait([_scans, _done], return_when=FIRST_COMPLETED)
+        if _scans.done():
+            return _scans.result()
+        # The item failed before the scans were queried
+        return _done.result()
+
+    @staticmethod
+    def _parse_results(item):
+        """
+        The parse stage of the results pipeline: parses the results that are still nmap XML and projects
+        the results to the fields that the profile of the scan keeps.
+
+        Args:
+            item (dict): The pipeline item.
+
+        Returns:
+            dict: The pipeline item.
+        """
+        _projection = item.get("projection")
+        if isinstance(item["results"], str):
+            item["results"] = ParsePool.parse(item["results"], _projection)["results"]
+        elif _projection is not None:
+            item["results"] = [_projection.apply(_r) for _r in item["results"]]
+        return item
+
+    def _validate_results(self, item):
+        """
+        The validate stage of the results pipeline: validates the results against the scan schema.
+
+        Args:
+            item (dict): The pipeline item.
+
+        Returns:
+            dict: The pipeline item.
+        """
+        self.store.validate_scans(item["results"])
+        return item
+
+    def _hash_results(self, item):
+        """
+        The hash stage of the results pipeline: serializes and hashes the results of every host.
+
+        Args:
+            item (dict): The pipeline item.
+
+        Returns:
+            dict: The pipeline item.
+        """
+        item["hashed"] = self.store.hash_scans(item["results"])
+        return item
+
+    def _store_results(self, item):
+        """
+        The store stage of the results pipeline: saves the hashed results under their scan job.
+
+        Args:
+            item (dict): The pipeline item.
+
+        Returns:
+            dict: The pipeline item.
+        """
+        item["new_scans"] = self.store.save_hashed_scans(
+            item["profile"], item["host"], item["hashed"], job_uuid=item["job"], projection=item.get("projection"))
+        item["scan_uuids"] = item["scan_uuids"] + [_s.uuid for _s in item["new_scans"]]
+        return item
+
+    def _query_results(self, item):
+        """
+        The diff stage of the results pipeline: saves the diffs of the new scans against the previous scans
+        of their hosts, queries back the saved scans of the job and hands them to the scan that waits for them.
+
+        Args:
+            item (dict): The pipeline item.
+
+        Returns:
+            dict: The pipeline item.
+        """
+        self._record_diffs(item["new_scans"])
+        if item["report"] is False:
+            item["scans"].set_result(None)
+            return item
+        _uuids = item["scan_uuids"]
+        item["last_n_scans"] = self.store.get_filtered_scans(_uuids, last_n=len(_uuids))
+        item["scans"].set_result(item["last_n_scans"])
+        return item
+
+    def _export_results(self, item):
+        """
+        The export stage of the results pipeline: exports the report of the scans, if the item has a report file.
+
+        Args:
+            item (dict): The pipeline item.
+
+        Returns:
+            dict: The pipeline item.
+        """
+        if item["output_file"] is not None:
+            self._report_scans(item["last_n_scans"], item["output_file"])
+        return item
+
+    def _record_diffs(self, new_scans):
+        """
+        Computes and saves the diffs of newly saved scans against the previous scan of their host with the same profile.
+        Scans whose results were projected to different fields are not compared.
+
+        A scan that is saved before the next scan of its host, e.g. imported older results, also replaces the
+        diff of that next scan. A diff that can not be computed is logged and does not fail the scan.
+
+        Args:
+            new_scans (list): The newly saved scans.
+        """
+        for _scan in new_scans if new_scans is not None else []:
+            try:
+                _previous, _next = self.store.get_adjacent_scans(_scan.id)
+                if _previous is None and _next is None:
+                    continue
+                _new = {"id": _scan.id, "results": json.loads(_scan.results), "result_hash": _scan.result_hash}
+                if _previous is not None:
+                    self._save_diff(_new, _previous)
+                if _next is not None:
+                    self._save_diff(_next, _new)
+            except (AppExceptions.DScanResultsSchemaException, StoreExceptions.DScanStoreSException) as e:
+                self.logger.error(f"Could not save the diff of scan {_scan.uuid}: {str(e)}")
+
+    def _saved_host_results(self, job_uuid):
+        """
+        Returns the results of the hosts that a scan job has saved so far.
+
+        Args:
+            job_uuid (str): The UUID of the scan job.
+
+        Returns:
+            list: The results of the saved hosts.
+        """
+        _uuids = [_h["scan_uuid"] for _h in self.store.get_scan_job(job_uuid)["hosts"]]
+        if len(_uuids) == 0:
+            return []
+        return [_s["results"] for _s in self.store.get_filtered_scans(_uuids, last_n=len(_uuids))]
+
+    def _backfill_diffs(self, host=None, n_scans=None, profile=None, from_date=None, to_date=None):
+        """
+        Computes and saves the missing diffs of the scans that match the given filters against their previous scan.
+
+        The diffs of the scans of a database that was created before the diffs were saved along with the scans
+        are saved the first time that they are requested. A diff that can not be computed is logged and skipped.
+
+        Args:
+            host (str, optional): The host or subnet of the scans.
+            n_scans (int, optional): The number of latest scans.
+            profile (str, optional): The profile of the scans.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+        """
+        for _scan in self.store.get_scans_without_diff(host, n_scans, profile, from_date, to_date):
+            try:
+                _previous, _ = self.store.get_adjacent_scans(_scan["id"])
+                if _previous is not None:
+                    self._save_diff(_scan, _previous)
+            except (AppExceptions.DScanResultsSchemaException, StoreExceptions.DScanStoreSException) as e:
+                self.logger.error(f"Could not save the diff of scan {_scan['uuid']}: {str(e)}")
+
+    def _save_diff(self, scan, previous):
+        """
+        Computes and saves the diff of a scan against its previous scan. Scans with the same results hash are not compared.
+
+        Args:
+            scan (dict): The ID, results and results hash of the newer scan.
+            previous (dict): The ID, results and results hash of the previous scan.
+        """
+        _changed = scan["result_hash"] != previous["result_hash"]
+        _diffs = self._diffs_between_dicts(
+            self._results_to_port_dict(scan["results"]),
+            self._results_to_port_dict(previous["results"])) if _changed else {ADDED: {}, REMOVED: {}, CHANGED: {}}
+        self.store.save_diff(scan["id"], previous["id"], _diffs, _changed)
+
+    def pipeline_stats(self):
+        """
+        Returns the statistics of the results pipeline.
+
+        Returns:
+            dict: The items in the pipeline and the throughput, queue depth and service time of every stage.
+        """
+        return self._pipeline.stats()
+
+    def _append_partial_result(self, host, profile, job_uuid, scan_uuids):
+        """
+        Adds the hosts that a timed out scan saved before it was stopped to the results, marked as unfinished.
+
+        Args:
+            host (str): The target of the scan.
+            profile (str): The profile of the scan.
+            job_uuid (str): The UUID of the scan job.
+            scan_uuids (list): The UUIDs of the saved hosts.
+        """
+        try:
+            _scans = self.store.get_filtered_scans(scan_uuids, last_n=len(scan_uuids)) if len(scan_uuids) > 0 else []
+        except StoreExceptions.DScanStoreSException as e:
+            self.logger.error(f"Could not retrieve the partial results of job {job_uuid}: {str(e)}")
+            _scans = []
+        self._result.append({
+            "scans": _scans,
+            "date": datetime.now().strftime(FILE_DATE_FORMAT),
+            "host": host,
+            "profile": profile,
+            "job": job_uuid,
+            "finished": False
+        })
+
+    def _scan_spool(self, name):
+        """
+        Creates the spool file of a scan, if spooling is enabled.
+
+        Args:
+            name (str): The name of the scan.
+
+        Returns:
+            NmapSpool: The spool of the scan or None if the nmap output is kept in memory.
+        """
+        return NmapSpool.for_scan(name, self._settings["spool_dir"], keep=self._settings["spool_retention"] > 0)
+
+    def _scanner(self, spool=None):
+        """
+        Selects the scanner of the configured scan engine.
+
+        Spooled scans always run with the asyncio engine, since the thread engine keeps the nmap output in memory.
+
+        Args:
+            spool (NmapSpool, optional): The spool of the scan.
+
+        Returns:
+            type: The scanner class.
+        """
+        if spool is not None or self._settings["scan_engine"] == ASYNCIO_ENGINE:
+            return AsyncScanner
+        return Scanner
+
+    def _finish_spool(self, spool):
+        """
+        Removes the spool file of a finished scan, unless spool files are retained, and the expired spool files.
+
+        Args:
+            spool (NmapSpool): The spool of the scan or None.
+        """
+        if spool is None:
+            return
+        try:
+            spool.finish()
+            clean_spool_dir(self._settings["spool_dir"], self._settings["spool_retention"])
+        except OSError as e:
+            self.logger.error(f"Could not clean up spool file {spool.path}: {str(e)}")
+
+    def _set_scan_job_status(self, job_uuid, status):
+        """
+        Records the status of a scan job. A failure is only logged, so that it does not hide the result of the scan.
+
+        Args:
+            job_uuid (str): The UUID of the scan job.
+            status (str): The new status.
+        """
+        try:
+            self.store.update_scan_job(job_uuid, status)
+        except StoreExceptions.DScanStoreSException as e:
+            self.logger.error(f"Could not update scan job {job_uuid}: {str(e)}")
+
+    def _record_scan_outcome(self, name, job_uuid, status):
+        """
+        Records how the last run of a scan ended, for `scan_status`.
+
+        Args:
+            name (str): The name of the scan.
+            job_uuid (str): The UUID of the scan job, or None if the scan failed before its job was created.
+            status (str): The final status of the scan job.
+        """
+        with self._scans_lock:
+            self._finished_scans[name] = {"job": job_uuid, "status": status, "finished_at": datetime.now()}
+
+    def scan_status(self, name):
+        """
+        Finds whether a scan is queued, running or how its last run ended.
+
+        Args:
+            name (str): The name of the scan, as returned by `scan_name`.
+
+        Returns:
+            dict: The name and status of the scan and, for an ended scan, its job and end time.
+                None if the scan is unknown.
+        """
+        with self._scans_lock:
+            if name in self._scans_to_wait:
+                return {"name": name, "status": JOB_RUNNING}
+            _finished = self._finished_scans.get(name)
+        for _scan in self._queue.scans():
+            if _scan["name"] == name:
+                return {"name": name, "status": SCAN_QUEUED, "priority": _scan["priority"], "job": _scan.get("job")}
+        if _finished is None:
+            return None
+        return {"name": name, **_finished}
+
+    @staticmethod
+    def scan_name(host, profile):
+        """
+        Returns the name of the scans of a host and profile. Only one of them can be queued or running.
+
+        Args:
+            host (str): The host of the scan.
+            profile (str): The profile of the scan.
+
+        Returns:
+            str: The scan name.
+        """
+        return f"scan-{str(host)}-{str(profile)}"
+
+    def resume(self, job_uuid=None):
+        """
+        Resumes an unfinished scan job. Only the hosts that have not been saved yet are scanned.
+
+        Args:
+            job_uuid (str, optional): The UUID of the scan job. If not provided, the latest unfinished scan job is resumed.
+
+        Returns:
+            dict: The resumed scan job.
+
+        Raises:
+            AppExceptions.DScanEntryNotFound: If the scan job does not exist.
+            AppExceptions.DScanInputValidationException: If the scan job has finished or is already running.
+        """
+        try:
+            _job = self.store.get_scan_job(job_uuid)
+        except StoreExceptions.DScanEntryNotFound as e:
+            raise AppExceptions.DScanEntryNotFound(str(e))
+
+        if _job["status"] == JOB_FINISHED:
+            raise AppExceptions.DScanInputValidationException(f"Scan job {_job['uuid']} has already finished")
+        if any([_s.get("job") == _job["uuid"] for _s in self._queue.scans()]):
+            raise AppExceptions.DScanInputValidationException(f"Scan job {_job['uuid']} is already queued")
+        if _job["pending"] == 0:
+            self._set_scan_job_status(_job["uuid"], JOB_FINISHED)
+            raise AppExceptions.DScanInputValidationException(f"Scan job {_job['uuid']} has no pending hosts")
+
+        self.add_scan(_job["target"], _job["profile_name"], job=_job["uuid"])
+        return _job
+
+    def stats(self):
+        """
+        Returns the packet rate budget, the deadlines of the running scans and the scan queue statistics.
+
+        Returns:
+            dict: The budget, the number of scans allowed to run at the same time, the allocation of every running scan,
+                under `watchdog` the remaining time of the scans with a deadline and the scans that timed out and,
+                under `queue`, the queued, running and rejected scans and their enqueue to start latency and, under
+                `pipeline`, the statistics of the stages of the results pipeline.
+        """
+        _stats = self._rate_controller.stats()
+        _stats["watchdog"] = self._watchdog.stats()
+        _stats["queue"] = self._queue.stats()
+        _stats["pipeline"] = self._pipeline.stats()
+        return _stats
+
+    def scan_jobs(self):
+        """
+        Retrieves the latest scan jobs with their saved and pending hosts.
+
+        Returns:
+            list: The scan jobs, newest first.
+        """
+        try:
+            return self.store.get_scan_jobs(last_n=self._config.n_scans)
+        except StoreExceptions.DScanStoreSException as e:
+            raise AppExceptions.DScanEntryNotFound(str(e))
+
+# ----------------------------------------------------------- SCHEDULES ----------------------------------------------------------- #
+
+    def add_schedule(self, name, target, profile, cron=None, interval=None, jitter=0, priority=None, deadline=None):
+        """
+        Stores a schedule that scans a target with a profile repeatedly.
+
+        The schedule runs either at the times of a cron expression or every `interval` seconds. Every run is
+        delayed by up to `jitter` seconds, so that schedules that are due at the same time do not all start
+        at once. The schedules are run by the scheduler (see `start_scheduler`).
+
+        Args:
+            name (str): The name of the schedule.
+            target (str): The host or subnet to scan.
+            profile (str): The profile of the scans.
+            cron (str, optional): The cron expression of the run times.
+            interval (int, optional): The seconds between two runs.
+            jitter (int, optional): The maximum number of seconds a run is delayed.
+            priority (str, optional): The priority of the scans.
+            deadline (float, optional): The number of seconds a scan may run.
+
+        Returns:
+            dict: The stored schedule.
+
+        Raises:
+            AppExceptions.DScanInputValidationException: If the schedule is invalid or already exists.
+            AppExceptions.DScanProfileNotFoundException: If the profile is not found.
+        """
+        if (cron is None) == (interval is None):
+            raise AppExceptions.DScanInputValidationException("A schedule needs either a cron expression or an interval")
+        if cron is not None:
+            try:
+                _next_run = CronExpression(cron).next(datetime.now())
+            except ValueError as e:
+                raise AppExceptions.DScanInputValidationException(str(e))
+        else:
+            if interval <= 0:
+                raise AppExceptions.DScanInputValidationException("Invalid interval, it must be positive")
+            _next_run = datetime.now().replace(microsecond=0)
+        if jitter is None or jitter < 0:
+            raise AppExceptions.DScanInputValidationException("Invalid jitter, it can not be negative")
+        if deadline is not None and deadline < 0:
+            raise AppExceptions.DScanInputValidationException("Invalid deadline, it can not be negative")
+        if priority is not None and priority not in SCAN_PRIORITIES:
+            raise AppExceptions.DScanInputValidationException(
+                f"Invalid priority {priority}, use one of {', '.join(SCAN_PRIORITIES)}")
+        if validate_host(target) is False:
+            raise AppExceptions.DScanInputValidationException("Invalid host format")
+        _profile, _ = self._get_profile(profile)
+        if _profile is None:
+            raise AppExceptions.DScanProfileNotFoundException(f"Profile {profile} not found anywhere.")
+
+        try:
+            _schedule = self.store.create_schedule(
+                name, target, profile, _next_run, cron=cron, interval=interval, jitter=jitter, priority=priority,
+                deadline=deadline)
+        except StoreExceptions.DScanStoreSException as e:
+            raise AppExceptions.DScanInputValidationException(f"Could not store schedule {name}: {str(e)}")
+        self._scheduler.notify()
+        return _schedule
+
+    def remove_schedule(self, name):
+        """
+        Removes a schedule. Its running scans are not stopped.
+
+        Args:
+            name (str): The name of the schedule.
+
+        Raises:
+            AppExceptions.DScanEntryNotFound: If the schedule does not exist.
+        """
+        try:
+            self.store.delete_schedule(name)
+        except StoreExceptions.DScanStoreSException as e:
+            raise AppExceptions.DScanEntryNotFound(str(e))
+        self._scheduler.notify()
+
+    def schedules(self):
+        """
+        Retrieves the stored schedules.
+
+        Returns:
+            list: The schedules, the next due first.
+        """
+        try:
+            return self.store.get_schedules()
+        except StoreExceptions.DScanStoreSException as e:
+            raise AppExceptions.DScanEntryNotFound(str(e))
+
+    def start_scheduler(self):
+        """
+        Starts running the stored schedules. The scan orchestrator keeps running while the scheduler runs.
+        """
+        self._scheduler.start()
+
+    def stop_scheduler(self):
+        """
+        Stops running the stored schedules. The queued and running scans are not stopped.
+        """
+        self._scheduler.stop()
+        self._queue.notify()
+
+    def _fire_schedule(self, schedule):
+        """
+        Queues a scan of a due schedule.
+
+        Args:
+            schedule (dict): The schedule.
+
+        Returns:
+            bool: False if the previous scan of the schedule is still queued or running, True if the scan was queued.
+        """
+        try:
+            self.add_scan(
+                schedule["target"], schedule["profile_name"], deadline=schedule["deadline"],
+                priority=schedule["priority"], submitter=f"schedule:{schedule['name']}")
+        except AppExceptions.DScanInputValidationException as e:
+            if str(e) in ["Scan is already running", "Scan is already queued"]:
+                return False
+            raise
+        return True
+
+# ---------------------------------------------------------- DISTRIBUTED ---------------------------------------------------------- #
+
+    def distribute_scan(self, host, profile):
+        """
+        Adds a scan for the distributed workers that share the database. Large subnets are split in
+        `shard_size` shards that different workers run.
+
+        Args:
+            host (str): The host or subnet to scan.
+            profile (str): The profile of the scan.
+
+        Returns:
+            str: The UUID of the scan job.
+
+        Raises:
+            AppExceptions.DScanProfileNotFoundException: If the profile is not found.
+            AppExceptions.DScanInputValidationException: If the host is invalid.
+        """
+        if validate_host(host) is False:
+            raise AppExceptions.DScanInputValidationException("Invalid host format")
+        _profile, _profile_arguments = self._get_profile(profile)
+        if _profile is None:
+            raise AppExceptions.DScanProfileNotFoundException(f"Profile {profile} not found anywhere.")
+        try:
+            return self._coordinator.dispatch(host, _profile, _profile_arguments, self._settings["shard_size"])
+        except StoreExceptions.DScanStoreSException as e:
+            raise AppExceptions.DScanAppError(f"Could not add distributed scan: {str(e)}")
+
+    def wait_distributed_scans(self, job_uuids, timeout=None):
+        """
+        Ingests the results that the workers report until the given scan jobs end.
+
+        The results of the finished scan jobs are added to the results, as the results of local scans.
+
+        Args:
+            job_uuids (list): The UUIDs of the scan jobs.
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            dict: The final status of every scan job, None for the scan jobs that have not ended.
+        """
+        _statuses = self._coordinator.wait(job_uuids, timeout=timeout, stop_evt=self._distributed_stop)
+        _now = datetime.now().strftime(FILE_DATE_FORMAT)
+        for _uuid, _status in _statuses.items():
+            if _status is None:
+                continue
+            _job = self.store.get_scan_job(_uuid)
+            _scan_uuids = [_h["scan_uuid"] for _h in _job["hosts"]]
+            self._result.append({
+                "scans": self.store.get_filtered_scans(_scan_uuids, last_n=len(_scan_uuids)) if len(_scan_uuids) > 0 else [],
+                "date": _now,
+                "host": _job["target"],
+                "profile": _job["profile_name"],
+                "job": _uuid,
+                "finished": _status == JOB_FINISHED
+            })
+        return _statuses
+
+    def run_worker(self, name=None, max_jobs=None, until_idle=False):
+        """
+        Runs the scans of the distributed scan jobs as a worker, until `cleanup` is called.
+
+        Args:
+            name (str, optional): The name of the worker. Defaults to the host name and process id.
+            max_jobs (int, optional): Stop after running this many jobs.
+            until_idle (bool, optional): Stop when there are no jobs to run.
+
+        Returns:
+            int: The number of jobs that were run.
+        """
+        self._worker = ScanWorker(
+            self.store, name,
+            scanner=self._scanner(),
+            lease_duration=self._settings["lease_duration"],
+            max_attempts=self._settings["max_work_attempts"],
+            logger=self.logger)
+        return self._worker.run(max_jobs=max_jobs, until_idle=until_idle)
 
 # ------------------------------------------------------------- DIFFS ------------------------------------------------------------- #
 
@@ -399,22 +1561,14 @@ class DeltaScan:
             AppExceptions.DScanSchemaException: If the scan results schema is invalid.
             AppExceptions.DScanEntryNotFound: If no scan results are found for the specified host.
         """
+        diffs = self.filter_diffs(
+            uuids=uuids,
+            host=self._config.host,
+            profile=self._config.profile,
+            n_scans=self._config.n_scans,
+            from_date=self._config.fdate,
+            to_date=self._config.tdate)
         try:
-            if datetime_validation(self._config.fdate) is False and uuids is None:
-                raise AppExceptions.DScanInputValidationException(f"Invalid date format: {self._config.fdate}. Use format {APP_DATE_FORMAT}")
-
-            scans = self.store.get_filtered_scans(
-                uuid=uuids,
-                host=self._config.host,
-                last_n=self._config.n_scans,
-                profile=self._config.profile,
-                from_date=self._config.fdate,
-                to_date=self._config.tdate
-            )
-
-            _split_scans_in_hosts = self.__split_scans_in_hosts([_s for _s in scans])
-
-            diffs = self._list_scans_with_diffs([_s for _scans in _split_scans_in_hosts.values() for _s in _scans])
             if self._config.output_file is not None and self._config.is_interactive is False:
                 self._report_diffs(diffs, output_file=f"diffs_{self._config.output_file}")
             # getting the current date and time in order not to override existing files
@@ -426,15 +1580,68 @@ class DeltaScan:
             })
 
             return diffs
+        except AppExceptions.DScanExportError as e:
+            self.logger.error(f"{str(e)}")
+            raise AppExceptions.DScanAppError(f"Error exporting diffs: {str(e)}")
+
+    def filter_diffs(self, uuids=None, host=None, profile=None, n_scans=None, from_date=None, to_date=None):
+        """
+        Returns the differences between the consecutive scans of every host that match the given filters.
+
+        The diffs of the consecutive scans of a host with the same profile are saved when the scans are saved,
+        so they are looked up. The diffs of the scans that were saved before that are computed and saved first.
+        Only the scans of the given UUIDs, which may be any scans, are compared here.
+
+        It does not depend on the configuration other than `n_diffs`, so it can be called concurrently.
+
+        Args:
+            uuids (list, optional): The UUIDs of the scans to compare.
+            host (str, optional): The host or subnet of the scans.
+            profile (str, optional): The profile of the scans.
+            n_scans (int, optional): The number of latest scans to compare.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+
+        Returns:
+            list: A list of scan differences.
+
+        Raises:
+            AppExceptions.DScanInputValidationException: If the date format is invalid.
+            AppExceptions.DScanSchemaException: If the scan results schema is invalid.
+            AppExceptions.DScanEntryNotFound: If no scan results are found for the specified host.
+        """
+        try:
+            if datetime_validation(from_date) is False and uuids is None:
+                raise AppExceptions.DScanInputValidationException(f"Invalid date format: {from_date}. Use format {APP_DATE_FORMAT}")
+
+            if uuids is None:
+                self._backfill_diffs(host, n_scans, profile, from_date, to_date)
+                return self.store.get_diffs(
+                    host=host,
+                    last_n=n_scans,
+                    profile=profile,
+                    from_date=from_date,
+                    to_date=to_date,
+                    n_diffs=self._config.n_diffs)
+
+            scans = self.store.get_filtered_scans(
+                uuid=uuids,
+                host=host,
+                last_n=n_scans,
+                profile=profile,
+                from_date=from_date,
+                to_date=to_date
+            )
+
+            _split_scans_in_hosts = self.__split_scans_in_hosts([_s for _s in scans])
+
+            return self._list_scans_with_diffs([_s for _scans in _split_scans_in_hosts.values() for _s in _scans])
         except StoreExceptions.DScanEntryNotFound as e:
             self.logger.error(f"{str(e)}")
             raise AppExceptions.DScanEntryNotFound(F"Entry not found: {str(e)}")
         except AppExceptions.DScanResultsSchemaException as e:
             self.logger.error(f"{str(e)}")
             raise AppExceptions.DScanSchemaException(f"Invalid scan results schema: {str(e)}")
-        except AppExceptions.DScanExportError as e:
-            self.logger.error(f"{str(e)}")
-            raise AppExceptions.DScanAppError(f"Error exporting diffs: {str(e)}")
 
     @staticmethod
     def __split_scans_in_hosts(scans):
@@ -497,7 +1704,7 @@ class DeltaScan:
                 _importer.filename = _f
                 _r = _importer.load_results_from_file()
 
-            _parsed = Parser.extract_port_scan_dict_results(_r)
+            _parsed = ParsePool.parse(_r)
             _host = _parsed["args"].split(" ")[-1]
             if "/" in _host:
                 raise AppExceptions.DScanInputValidationException("Subnet is not supported for this operation")
@@ -550,6 +1757,9 @@ class DeltaScan:
         """
         Returns a list of scans with differences between consecutive scans.
 
+        Scans whose results were projected to different fields are not compared, since every field that
+        one of them dropped would be reported as removed.
+
         Args:
             scans (list): A list of scan dictionaries.
 
@@ -563,6 +1773,9 @@ class DeltaScan:
         for i, _ in enumerate(scans, 1):
             if i == len(scans) or len(scan_list_diffs) == self._config.n_diffs:
                 break
+            if scans[i-1].get("projection") != scans[i].get("projection"):
+                self.logger.warning(f"Scans {scans[i-1]['uuid']} and {scans[i]['uuid']} have different fields and are not compared")
+                continue
             if scans[i-1]["result_hash"] != scans[i]["result_hash"] and scans[i-1]["results"]["host"] == scans[i]["results"]["host"]:
                 try:
                     scan_list_diffs.append(
@@ -749,28 +1962,57 @@ class DeltaScan:
             AppExceptions.DScanInputValidationException: If the provided date format or port status type is invalid.
             AppExceptions.DScanEntryNotFound: If no scan results are found for the specified host.
         """
-        try:
-            if self._config.fdate is not None and datetime_validation(self._config.fdate) is False:
-                raise AppExceptions.DScanInputValidationException(f"Invalid date format: {self._config.fdate}. Use format {APP_DATE_FORMAT}")
+        scans = self.filter_scans(
+            host=self._config.host,
+            profile=self._config.profile,
+            n_scans=self._config.n_scans,
+            from_date=self._config.fdate,
+            to_date=self._config.tdate,
+            port_type=self._config.port_type)
 
-            if self._config.port_type is not None and validate_port_state_type(self._config.port_type.split(",")) is False:
-                raise AppExceptions.DScanInputValidationException(f"Invalid port status type: {self._config.port_type}")
+        if self._config.output_file is not None:
+            self._report_scans(scans, output_file=f"scans_{self._config.output_file}")
 
-            scans = self.store.get_filtered_scans(
-                    host=self._config.host,
-                    last_n=self._config.n_scans,
-                    profile=self._config.profile,
-                    to_date=self._config.tdate,
-                    from_date=self._config.fdate,
-                    pstate=self._config.port_type)
+        return scans
+
+    def filter_scans(self, host=None, profile=None, n_scans=None, from_date=None, to_date=None, port_type=None):
+        """
+        Retrieves the stored scans that match the given filters.
+
+        Unlike `view`, it does not depend on the configuration, so it can be called concurrently.
+
+        Args:
+            host (str, optional): The host or subnet of the scans.
+            profile (str, optional): The profile of the scans.
+            n_scans (int, optional): The number of latest scans.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+            port_type (str, optional): The comma separated port states to keep.
 
-            if self._config.output_file is not None:
-                self._report_scans(scans, output_file=f"scans_{self._config.output_file}")
+        Returns:
+            list: A list of filtered scans.
 
-            return scans
+        Raises:
+            AppExceptions.DScanInputValidationException: If the provided date format or port status type is invalid.
+            AppExceptions.DScanEntryNotFound: If no scan results are found for the specified host.
+        """
+        try:
+            if from_date is not None and datetime_validation(from_date) is False:
+                raise AppExceptions.DScanInputValidationException(f"Invalid date format: {from_date}. Use format {APP_DATE_FORMAT}")
+
+            if port_type is not None and validate_port_state_type(port_type.split(",")) is False:
+                raise AppExceptions.DScanInputValidationException(f"Invalid port status type: {port_type}")
+
+            return self.store.get_filtered_scans(
+                    host=host,
+                    last_n=n_scans,
+                    profile=profile,
+                    to_date=to_date,
+                    from_date=from_date,
+                    pstate=port_type)
         except StoreExceptions.DScanEntryNotFound as e:
             self.logger.error(f"{str(e)}")
-            raise AppExceptions.DScanEntryNotFound(f"No scan results found for host {self._config.host}")
+            raise AppExceptions.DScanEntryNotFound(f"No scan results found for host {host}")
 
     def import_data(self, __filename=None):
         """
@@ -784,14 +2026,14 @@ class DeltaScan:
         """
         _filename = __filename if __filename is not None else self._config.import_file
         try:
-            _importer = Importer(self.store, _filename, logger=self.logger)
+            _importer = Importer(self.store, _filename, logger=self.logger, on_saved=self._record_diffs)
 
             return _importer.import_data()
         except (ImporterExceptions.DScanImportError, FileNotFoundError, NotImplementedError) as e:
             self.logger.error(f"{str(e)}")
             raise AppExceptions.DScanImportError(f"Error opening {_filename}: {str(e)}")
 
-    def _report_diffs(self, diffs, output_file=None):
+    def _report_diffs(self, diffs, output_file=None, directory=None):
         """
         Generate a diff report based on the provided diffs.
 
@@ -799,6 +2041,7 @@ class DeltaScan:
             diffs (list): A list of diffs to be included in the report.
             output_file (str, optional): The output file path for the report. If not provided,
                 the default output file specified in the configuration will be used.
+            directory (str, optional): The directory of the report. Defaults to the working directory.
 
         Raises:
             AppExceptions.DScanSchemaException: If the diffs schema is invalid.
@@ -829,6 +2072,7 @@ class DeltaScan:
                     self._config.template_file,
                     single=self._config.single,
                     logger=self.logger,
+                    directory=directory
                 )
                 reporter.export()
             except (ExporterExceptions.DScanExporterFileExtensionNotSpecified,
@@ -839,13 +2083,14 @@ class DeltaScan:
             self.logger.error("File not provided. Diff report was not generated")
             raise AppExceptions.DScanExportError("File not provided. Diff report was not generated")
 
-    def _report_scans(self, scans, output_file=None):
+    def _report_scans(self, scans, output_file=None, directory=None):
         """
         Generate a scan report based on the provided scans.
 
         Args:
             scans (list): A list of scan results.
             output_file (str, optional): The output file path for the scan report. Defaults to None.
+            directory (str, optional): The directory of the scan report. Defaults to the working directory.
 
         Raises:
             AppExceptions.DScanResultsSchemaException: If the scan results schema is invalid.
@@ -867,7 +2112,8 @@ class DeltaScan:
                     self._config.output_file if output_file is None else output_file,
                     self._config.template_file,
                     single=self._config.single,
-                    logger=self.logger
+                    logger=self.logger,
+                    directory=directory
                 )
 
                 reporter.export()
@@ -878,6 +2124,26 @@ class DeltaScan:
         else:
             raise AppExceptions.DScanExportError("File not provided. Scan report was not generated")
 
+    def export_report(self, data, output_file, diffs=False, directory=None):
+        """
+        Writes a report of scans or diffs to a file.
+
+        Args:
+            data (list): The scans, as returned by `filter_scans`, or the diffs, as returned by `filter_diffs`.
+            output_file (str): The report file. Its extension (csv, json, html or pdf) sets its format.
+            diffs (bool, optional): Whether the data are diffs.
+            directory (str, optional): The directory of the report. Defaults to the working directory.
+
+        Raises:
+            AppExceptions.DScanResultsSchemaException: If the scan results schema is invalid.
+            AppExceptions.DScanSchemaException: If the diffs schema is invalid.
+            AppExceptions.DScanExportError: If the report can not be written.
+        """
+        if diffs is True:
+            self._report_diffs(data, output_file=output_file, directory=directory)
+        else:
+            self._report_scans(data, output_file=output_file, directory=directory)
+
     def report_result(self):
         """
         Generates a report for the scans if they are finished and available.
@@ -993,6 +2259,8 @@ class DeltaScan:
     @is_interactive.setter
     def is_interactive(self, value):
         self._config.is_interactive = value
+        # The orchestrator may stop once the shell is not interactive
+        self._queue.notify()
 
     @property
     def verbose(self):
@@ -1026,17 +2294,22 @@ class DeltaScan:
     def result(self, value):
         self._result = value
 
+    @property
+    def settings(self):
+        return self._settings
+
     @property
     def is_running(self):
         return self._is_running
 
     @property
     def scans_to_wait(self):
-        return len(self._scans_to_wait.keys())
+        with self._scans_lock:
+            return len(self._scans_to_wait.keys())
 
     @property
     def scans_to_execute(self):
-        return len(self._scan_list)
+        return self._queue.queued
 
     @property
     def cleaning_up(self):
@@ -1044,6 +2317,13 @@ class DeltaScan:
 
     def cleanup(self):
         self._cleaning_up = True
-        for _, _th in self._scans_to_wait.items():
-            if _th["_thr"].is_alive() is True:
-                _th["_cancel_event"].set()
+        self._scheduler.stop()
+        self._distributed_stop.set()
+        if self._worker is not None:
+            self._worker.stop()
+        self._queue.clear()
+        with self._scans_lock:
+            _running = list(self._scans_to_wait.values())
+        for _th in _running:
+            _th["_cancel_event"].set()
+        self._queue.notify()
@@ -0,0 +1,291 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.scanner import Scanner
+from deltascan.core.sharding import plan_shards
+from deltascan.core.exceptions import (AppExceptions, StoreExceptions, DatabaseExceptions)
+from deltascan.core.config import (
+    SHARD_SIZE,
+    LEASE_DURATION,
+    MAX_WORK_ATTEMPTS,
+    WORKER_POLL_INTERVAL,
+    WORK_LEASED,
+    WORK_DONE,
+    WORK_INGESTED,
+    WORK_FAILED,
+    JOB_FINISHED,
+    JOB_FAILED)
+from datetime import datetime
+from threading import (Event, Thread)
+import json
+import logging
+import os
+import socket
+import time
+
+
+class ScanCoordinator:
+    """
+    Splits scans into jobs for the distributed workers and ingests the results that the workers report.
+
+    The jobs are rows of the worker jobs table of the database that the coordinator and the workers share.
+    A worker leases a job while it runs it. The job of a worker that dies is leased again by another worker
+    when the lease expires, until it has been tried `max_attempts` times.
+    """
+    def __init__(self, store, max_attempts=MAX_WORK_ATTEMPTS, logger=None, projections=None):
+        """
+        Initializes a new instance of the ScanCoordinator class.
+
+        Args:
+            store (Store): The store shared with the workers.
+            max_attempts (int, optional): The number of times a job is tried before it is failed.
+            logger (Logger, optional): The logger.
+            projections (callable, optional): Returns the FieldProjection of a profile name, or None if the
+                results of the profile keep all fields.
+        """
+        self.store = store
+        self.max_attempts = max_attempts
+        self.projections = projections
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def dispatch(self, target, profile_name, arguments, shard_size=SHARD_SIZE):
+        """
+        Creates a scan job and its worker jobs. Large subnets are split in shards that different workers run.
+
+        Args:
+            target (str): The host or subnet to scan.
+            profile_name (str): The profile of the scan.
+            arguments (str): The nmap arguments of the profile.
+            shard_size (int, optional): The maximum number of hosts of a worker job. 0 or None disables sharding.
+
+        Returns:
+            str: The UUID of the scan job.
+        """
+        _job_uuid = self.store.create_scan_job(target, profile_name)
+        for _shard in plan_shards(target, shard_size):
+            self.store.create_worker_job(_job_uuid, _shard, arguments)
+        return _job_uuid
+
+    def poll(self, job_uuid, now=None):
+        """
+        Ingests the reported results of a scan job and fails the worker jobs whose workers died too many times.
+
+        Args:
+            job_uuid (str): The UUID of the scan job.
+            now (datetime, optional): The current time.
+
+        Returns:
+            str: The final status of the scan job, or None if some of its worker jobs have not ended.
+        """
+        _now = now if now is not None else datetime.now()
+        _statuses = []
+        for _job in self.store.get_worker_jobs(job_uuid=job_uuid):
+            _status = _job["status"]
+            if _status == WORK_DONE:
+                _status = self._ingest(_job)
+            elif _status == WORK_LEASED and _job["attempts"] >= self.max_attempts and \
+                    _job["lease_expires"] is not None and _job["lease_expires"] < _now:
+                if self.store.update_worker_job_status(
+                        _job["uuid"], WORK_FAILED, WORK_LEASED, error="lease expired", lease_expires_before=_now):
+                    self.logger.error(f"Worker job {_job['uuid']} of {_job['target']} failed, its workers died")
+                    _status = WORK_FAILED
+            _statuses.append(_status)
+
+        if any([_s not in [WORK_INGESTED, WORK_FAILED] for _s in _statuses]):
+            return None
+        _job_status = JOB_FINISHED if all([_s == WORK_INGESTED for _s in _statuses]) else JOB_FAILED
+        self.store.update_scan_job(job_uuid, _job_status)
+        return _job_status
+
+    def _ingest(self, job):
+        """
+        Saves the results of a worker job under its scan job. A job is ingested once, even by several coordinators.
+
+        The job is marked ingested, and its results are cleared, in the same transaction that saves the results,
+        so the results are kept in the job until they are saved. A job whose results could not be saved, e.g.
+        because the database was busy or the coordinator died, is still done and is ingested by the next poll.
+        Results that can never be saved fail the job and are kept in it.
+
+        Args:
+            job (dict): The worker job.
+
+        Returns:
+            str: The new status of the worker job, or its old one if another coordinator ingests it or the
+                results could not be saved.
+        """
+        try:
+            with self.store.transaction():
+                if self.store.update_worker_job_status(job["uuid"], WORK_INGESTED, WORK_DONE, results=None) is False:
+                    return WORK_DONE
+                _projection = self.projections(job["profile_name"]) if self.projections is not None else None
+                self.store.save_scans(
+                    job["profile_name"], job["job_target"], json.loads(job["results"]),
+                    job_uuid=job["job_uuid"], projection=_projection)
+            return WORK_INGESTED
+        except (StoreExceptions.DScanInputSchemaError, AppExceptions.DScanInputValidationException, ValueError) as e:
+            self.logger.error(f"Could not ingest the results of worker job {job['uuid']}: {str(e)}")
+            self.store.update_worker_job_status(job["uuid"], WORK_FAILED, WORK_DONE, error=str(e))
+            return WORK_FAILED
+        except (StoreExceptions.DScanStoreSException, DatabaseExceptions.DScanRDBMSException) as e:
+            self.logger.error(f"Could not save the results of worker job {job['uuid']}, they are kept: {str(e)}")
+            return WORK_DONE
+
+    def wait(self, job_uuids, interval=WORKER_POLL_INTERVAL, timeout=None, stop_evt=None):
+        """
+        Polls scan jobs until all of them have ended.
+
+        Args:
+            job_uuids (list): The UUIDs of the scan jobs.
+            interval (float, optional): The seconds between two polls.
+            timeout (float, optional): The maximum number of seconds to wait.
+            stop_evt (Event, optional): Stops waiting when it is set.
+
+        Returns:
+            dict: The final status of every scan job, None for the scan jobs that have not ended.
+        """
+        _statuses = {_j: None for _j in job_uuids}
+        _stop_evt = stop_evt if stop_evt is not None else Event()
+        _deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            for _j in [_j for _j, _s in _statuses.items() if _s is None]:
+                _statuses[_j] = self.poll(_j)
+            if all([_s is not None for _s in _statuses.values()]) or \
+                    (_deadline is not None and time.monotonic() >= _deadline) or _stop_evt.wait(interval):
+                return _statuses
+
+
+class ScanWorker:
+    """
+    Runs the jobs of the worker jobs table, one at a time, and reports their results.
+
+    Several workers, in the same or other processes or machines that share the database, can run at the
+    same time. While a job runs, its lease is renewed every third of `lease_duration`. If the lease is lost,
+    because it could not be renewed in time and another worker claimed the job, the scan is stopped.
+    """
+    def __init__(self, store, name=None, scanner=Scanner, lease_duration=LEASE_DURATION, max_attempts=MAX_WORK_ATTEMPTS,
+                 poll_interval=WORKER_POLL_INTERVAL, logger=None):
+        """
+        Initializes a new instance of the ScanWorker class.
+
+        Args:
+            store (Store): The store shared with the coordinator.
+            name (str, optional): The name of the worker. Defaults to the host name and process id.
+            scanner (class, optional): The scanner class that runs the jobs.
+            lease_duration (float, optional): The seconds a job is leased without renewing the lease.
+            max_attempts (int, optional): The number of times a job is tried before it is failed.
+            poll_interval (float, optional): The seconds an idle worker waits before it looks for jobs again.
+            logger (Logger, optional): The logger.
+        """
+        self.store = store
+        self.name = name if name is not None else f"{socket.gethostname()}-{os.getpid()}"
+        self.scanner = scanner
+        self.lease_duration = lease_duration
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self._stop = Event()
+        self._cancel_evt = None
+
+    def run(self, max_jobs=None, until_idle=False):
+        """
+        Runs jobs until the worker is stopped.
+
+        Args:
+            max_jobs (int, optional): Stop after running this many jobs.
+            until_idle (bool, optional): Stop when there are no jobs to run.
+
+        Returns:
+            int: The number of jobs that were run.
+        """
+        _n = 0
+        self._stop.clear()
+        while self._stop.is_set() is False and (max_jobs is None or _n < max_jobs):
+            if self.run_once() is True:
+                _n += 1
+            elif until_idle is True or self._stop.wait(self.poll_interval):
+                break
+        return _n
+
+    def stop(self):
+        """
+        Stops the worker. The running scan is stopped and its job is left for another worker.
+        """
+        self._stop.set()
+        if self._cancel_evt is not None:
+            self._cancel_evt.set()
+
+    def run_once(self):
+        """
+        Claims a job, runs its scan and reports the results.
+
+        Returns:
+            bool: False if there was no job to run.
+        """
+        _job = self.store.claim_worker_job(self.name, self.lease_duration, self.max_attempts)
+        if _job is None:
+            return False
+        self.logger.info(f"Worker {self.name} runs job {_job['uuid']} ({_job['target']}), attempt {_job['attempts']}")
+
+        self._cancel_evt = Event()
+        _lease_lost = Event()
+        _heartbeat = Thread(target=self._renew_lease, args=(_job["lease"], _lease_lost), daemon=True)
+        _heartbeat.start()
+        _result = None
+        _error = None
+        try:
+            _result = self.scanner.scan(
+                _job["target"], _job["arguments"], None, logger=self.logger, name=f"worker-{_job['uuid']}",
+                _cancel_evt=self._cancel_evt)
+        except Exception as e:
+            _error = str(e)
+            self.logger.error(f"Job {_job['uuid']} failed: {_error}")
+        finally:
+            # Stops the heartbeat as well
+            _stopped = self._cancel_evt.is_set()
+            self._cancel_evt.set()
+            _heartbeat.join()
+            self._cancel_evt = None
+
+        if _lease_lost.is_set():
+            self.logger.warning(f"Worker {self.name} lost the lease of job {_job['uuid']}, its results are discarded")
+        elif _result is None:
+            self.store.release_worker_job(
+                _job["lease"], _error if _error is not None else "worker stopped" if _stopped else "scan failed",
+                self.max_attempts)
+        elif self.store.finish_worker_job(_job["lease"], _result["results"]) is False:
+            self.logger.warning(f"Worker {self.name} lost the lease of job {_job['uuid']}, its results are discarded")
+        return True
+
+    def _renew_lease(self, lease, lease_lost):
+        """
+        Renews the lease of the running job until the job ends. Stops the scan if the lease is lost.
+
+        Args:
+            lease (str): The lease token.
+            lease_lost (Event): Set if the lease is lost.
+        """
+        _cancel_evt = self._cancel_evt
+        while _cancel_evt.wait(self.lease_duration / 3) is False:
+            try:
+                _renewed = self.store.renew_worker_lease(lease, self.lease_duration)
+            except StoreExceptions.DScanStoreSException as e:
+                self.logger.error(f"Could not renew lease {lease}: {str(e)}")
+                continue
+            if _renewed is False:
+                lease_lost.set()
+                _cancel_evt.set()
+                return
@@ -27,6 +27,10 @@ class DScanException(Exception):
     def __str__(self) -> str:
         return self.message
 
+    def __reduce__(self):
+        # Keep the message when the exception is sent back from a worker process
+        return (self.__class__, (self.message, *self.args))
+
     def log(self) -> None:
         self._log.error(self.message, *self.args)
 
@@ -74,6 +78,9 @@ class AppExceptions:
     class DScanScannerError(DScanAppError):
         pass
 
+    class DScanQueueFullException(DScanAppError):
+        pass
+
 # ------------------------------------ Nmap scanner exceptions ------------------------------------ #
 
 
@@ -30,7 +30,7 @@ import os
 
 
 class Exporter(Output):
-    def __init__(self, data, filename, template=None, single=False, logger=None):
+    def __init__(self, data, filename, template=None, single=False, logger=None, directory=None):
         """
         Initialize the Exporter object.
 
@@ -40,6 +40,7 @@ class Exporter(Output):
             template (str, optional): The path to the template file. Defaults to None.
             single (bool, optional): Whether to export as a single diff/scan or multiple. Defaults to False.
             logger (Logger, optional): The logger object. Defaults to None.
+            directory (str, optional): The directory of the export files. Defaults to the working directory.
 
         Raises:
             DScanExporterFileExtensionNotSpecified: If the file extension is not specified or invalid.
@@ -52,6 +53,7 @@ class Exporter(Output):
             self.filename = filename[:-1*len(self.file_extension)-1].replace('/', '_')
         else:
             raise ExporterExceptions.DScanExporterFileExtensionNotSpecified("Please specify a valid file extension for the export file.")
+        self.directory = directory
 
         _valid_data = False
 
@@ -116,7 +118,7 @@ class Exporter(Output):
             None
         """
         _json_dumped = json.dumps(self.data, indent=4)
-        with open(f"{self.filename}.{self.file_extension}", 'w') as file:
+        with open(self._path(f"{self.filename}.{self.file_extension}"), 'w') as file:
             print(_json_dumped, file=file)
 
     def _diffs_to_csv(self):
@@ -132,7 +134,7 @@ class Exporter(Output):
         field_names = self._field_names_for_diff_results()
         field_names.insert(0, "date_to")
         field_names.insert(0, "date_from")
-        with open(f"{self.filename}.{self.file_extension}", 'w', newline='') as csvfile:
+        with open(self._path(f"{self.filename}.{self.file_extension}"), 'w', newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=field_names)
             writer.writeheader()
 
@@ -156,7 +158,8 @@ class Exporter(Output):
         field_names.insert(0, "date_from")
         for row in self.data:
             lines = self._construct_exported_diff_data(row, field_names)
-            with open(f"{row['generic']['host']}_{row['uuids'][1]}_{row['uuids'][0]}_{self.filename}.{self.file_extension}", 'w', newline='') as csvfile:
+            _name = f"{row['generic']['host']}_{row['uuids'][1]}_{row['uuids'][0]}_{self.filename}.{self.file_extension}"
+            with open(self._path(_name), 'w', newline='') as csvfile:
                 writer = csv.DictWriter(csvfile, fieldnames=field_names)
                 writer.writeheader()
                 for r in lines:
@@ -172,7 +175,7 @@ class Exporter(Output):
             None
         """
         _json_dumped = json.dumps(self.data, indent=4)
-        with open(f"{self.filename}.{self.file_extension}", 'w') as file:
+        with open(self._path(f"{self.filename}.{self.file_extension}"), 'w') as file:
             print(_json_dumped, file=file)
 
     def _scans_to_csv(self):
@@ -186,7 +189,7 @@ class Exporter(Output):
             None
         """
         field_names = list(self.data[0].keys())
-        with open(f"{self.filename}.{self.file_extension}", 'w', newline='') as csvfile:
+        with open(self._path(f"{self.filename}.{self.file_extension}"), 'w', newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=field_names)
             writer.writeheader()
             for row in self.data:
@@ -205,7 +208,7 @@ class Exporter(Output):
         """
         for _scan in self.data:
             field_names = list(_scan.keys())
-            with open(f"{_scan['host']}_{_scan['uuid']}_{self.filename}.{self.file_extension}", 'w', newline='') as csvfile:
+            with open(self._path(f"{_scan['host']}_{_scan['uuid']}_{self.filename}.{self.file_extension}"), 'w', newline='') as csvfile:
                 writer = csv.DictWriter(csvfile, fieldnames=field_names)
                 writer.writeheader()
                 _scan["results"] = json.dumps(_scan["results"])
@@ -319,7 +322,7 @@ class Exporter(Output):
         """
         _html_str = self._diffs_report_to_html_string()
         try:
-            pdfkit.from_string(_html_str, f"{self.filename}.{self.file_extension}")
+            pdfkit.from_string(_html_str, self._path(f"{self.filename}.{self.file_extension}"))
         except Exception as e:
             raise ExporterExceptions.DScanExporterPdfLibraryError(f"{str(e)}")
 
@@ -329,10 +332,22 @@ class Exporter(Output):
         """
         _html_str = self._scans_report_to_html_string()
         try:
-            pdfkit.from_string(_html_str, f"{self.filename}.{self.file_extension}")
+            pdfkit.from_string(_html_str, self._path(f"{self.filename}.{self.file_extension}"))
         except Exception as e:
             raise ExporterExceptions.DScanExporterPdfLibraryError(f"{str(e)}")
 
+    def _path(self, name):
+        """
+        Returns the path of an export file in the export directory.
+
+        Args:
+            name (str): The name of the export file.
+
+        Returns:
+            str: The path of the export file.
+        """
+        return name if self.directory is None else os.path.join(self.directory, name)
+
     def __write_to_file(self, report, prefix=""):
         """
         Writes the given data to a file with the specified filename and file extension.
@@ -344,7 +359,7 @@ class Exporter(Output):
             None
         """
         # TODO: Set prefix much earlier. Create a dedicated method to construct file names
-        with open(f"{self.filename}.{self.file_extension}", 'w') as file:
+        with open(self._path(f"{self.filename}.{self.file_extension}"), 'w') as file:
             file.write(report)
 
     def _dict_diff_fields_to_list(self, diff_dict):
@@ -19,7 +19,7 @@ from deltascan.core.exceptions import (
 from deltascan.core.utils import (
     nmap_arguments_to_list)
 from libnmap.parser import NmapParserException
-from deltascan.core.parser import Parser
+from deltascan.core.parse_pool import ParsePool
 from deltascan.core.config import (APP_DATE_FORMAT, LOG_CONF, XML, CSV)
 import csv
 from datetime import datetime
@@ -28,13 +28,14 @@ import logging
 
 
 class Importer:
-    def __init__(self, store, filename, logger=None):
+    def __init__(self, store, filename, logger=None, on_saved=None):
         """
         Initialize the Importer object.
 
         Args:
             filename (str): The name of the import file.
             logger (Logger, optional): The logger object for logging import-related messages. Defaults to None.
+            on_saved (callable, optional): Called with the newly saved scans right after they are saved.
 
         Raises:
             DScanImportFileExtensionError: If the file extension is not valid.
@@ -45,6 +46,7 @@ class Importer:
         self.logger = logger if logger is not None else logging.basicConfig(**LOG_CONF)
         self._filename = filename
         self.store = store
+        self.on_saved = on_saved
         if filename.split(".")[-1] in [CSV, XML]:
             self._file_extension = filename.split(".")[-1]
             self._filename = filename[:-1*len(self._file_extension)-1]
@@ -88,6 +90,7 @@ class Importer:
                         _row["host"],  # Subnet
                         [json.loads(_row["results"])],
                         created_at=_row["created_at"])
+                    self._saved(_newly_imported_scans)
 
                 _new_uuids_list = [_s.uuid for _s in list(_newly_imported_scans)]
                 last_n_scans = self.store.get_filtered_scans(
@@ -108,9 +111,7 @@ class Importer:
             DScanImportDataError: If the XML data fails to parse.
         """
         try:
-            _r = self.load_results_from_file()
-
-            _parsed = Parser.extract_port_scan_dict_results(_r)
+            _parsed = ParsePool.parse_file(self._full_name)
             _host = _parsed["args"].split(" ")[-1]
 
             _profile_name, _ = \
@@ -124,6 +125,7 @@ class Importer:
                 created_at=datetime.fromtimestamp(int(
                     _parsed["runstats"]["finished"]["time"])).strftime(
                         APP_DATE_FORMAT) if "finished" in _parsed["runstats"] else None)
+            self._saved(_newly_imported_scans)
 
             _new_uuids_list = [_s.uuid for _s in list(_newly_imported_scans)]
 
@@ -135,6 +137,16 @@ class Importer:
             self.logger.error(f"Failed parsing XML data: {str(e)}")
             raise ImporterExceptions.DScanImportDataError(f"{str(e)}")
 
+    def _saved(self, scans):
+        """
+        Passes the newly saved scans to the `on_saved` callback, if there is one.
+
+        Args:
+            scans (list): The newly saved scans.
+        """
+        if self.on_saved is not None:
+            self.on_saved(scans)
+
     def load_results_from_file(self):
         """
         Load results from a file and parse them using NmapParser.
@@ -0,0 +1,331 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from deltascan.core.nmap.libnmap_wrapper import update_scan_ui
+from deltascan.core.nmap.host_stream import NmapHostStream
+from deltascan.core.nmap.log_capture import LogCapture
+from deltascan.core.config import (
+    LOG_CONF,
+    PROGRESS_RATE)
+from threading import Thread, Lock, Event
+import asyncio
+import logging
+import os
+import re
+import shlex
+import shutil
+import signal
+import time
+
+# Same fixed options that libnmap uses, so both engines produce the same XML stream
+NMAP_FIXED_OPTIONS = ["-oX", "-", "-vvv", "--stats-every", "1s"]
+# Maximum size of a single line of nmap output
+NMAP_STREAM_LIMIT = 2 ** 24
+
+TASK_BEGIN_RE = re.compile(r"<taskbegin\b")
+TASK_PROGRESS_RE = re.compile(r"<taskprogress\b[^>]*\bpercent=\"([0-9.]+)\"")
+TASK_END_RE = re.compile(r"<taskend\b")
+
+
+class AsyncScanEngine:
+    """
+    A single asyncio event loop, running in a daemon thread, shared by all the asynchronous scans.
+    """
+    _loop = None
+    _thread = None
+    _lock = Lock()
+
+    @classmethod
+    def loop(cls):
+        """
+        Returns the shared event loop. The loop is started the first time it is requested.
+
+        Returns:
+            asyncio.AbstractEventLoop: The running event loop.
+        """
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed():
+                cls._loop = asyncio.new_event_loop()
+                cls._thread = Thread(target=cls._loop.run_forever, name="deltascan-async-engine", daemon=True)
+                cls._thread.start()
+            return cls._loop
+
+    @classmethod
+    def submit(cls, coro):
+        """
+        Schedules a coroutine on the shared event loop.
+
+        Args:
+            coro (coroutine): The coroutine to schedule.
+
+        Returns:
+            concurrent.futures.Future: The future of the coroutine result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, cls.loop())
+
+    @classmethod
+    def run(cls, coro):
+        """
+        Runs a coroutine on the shared event loop and blocks until it returns.
+
+        Args:
+            coro (coroutine): The coroutine to run.
+
+        Returns:
+            The result of the coroutine.
+        """
+        return cls.submit(coro).result()
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Stops the shared event loop and waits for its thread to exit.
+        """
+        with cls._lock:
+            if cls._loop is None:
+                return
+            cls._loop.call_soon_threadsafe(cls._loop.stop)
+            cls._thread.join()
+            cls._loop.close()
+            cls._loop = None
+            cls._thread = None
+
+
+class AsyncNmapProcess:
+    """
+    Runs nmap as an asyncio subprocess and streams its XML output.
+
+    The output is read line by line as nmap produces it, the progress is taken from the
+    `taskprogress` elements and the UI is refreshed at most `progress_rate` times per second.
+    Setting the cancel event, or cancelling the coroutine, kills the nmap process group.
+    """
+
+    def __init__(self, target: str, scan_args: str, ui_context=None, logger=None, name=None, _cancel_evt=None,
+                 progress_rate=PROGRESS_RATE, progress_callback=None, host_xml_callback=None,
+                 log_capture=None, spool=None):
+        """
+        Initializes a new instance of the AsyncNmapProcess class.
+
+        Args:
+            target (str): The target to scan.
+            scan_args (str): The arguments to pass to the Nmap scanner.
+            ui_context (optional): The UI context for the scan.
+            logger: The logger instance for logging scan errors.
+            name (str, optional): The name of the scan in the UI context.
+            _cancel_evt (Event, optional): The event that cancels the scan.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_callback (callable, optional): Called with the scan progress percentage on every progress update.
+            host_xml_callback (callable, optional): Called with the XML of every host as soon as nmap reports it.
+                It runs in the default executor of the event loop, so it may block.
+            log_capture (LogCapture, optional): The capture of the nmap output. A new one is created if not given.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to, instead of keeping it in memory.
+        """
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.target = target
+        self.scan_args = scan_args
+        self.ui_context = ui_context
+        self.name = name
+        self.cancel_evt = _cancel_evt if _cancel_evt is not None else Event()
+        self.progress_interval = 1 / progress_rate if progress_rate is not None and progress_rate > 0 else 1 / PROGRESS_RATE
+        self.progress_callback = progress_callback
+        self.host_xml_callback = host_xml_callback
+        self.log = log_capture if log_capture is not None else LogCapture()
+        self.spool = spool
+        self.progress = 0
+        self.rc = None
+        self.stderr = ""
+
+    @classmethod
+    async def scan(cls, target: str, scan_args: str, ui_context=None, logger=None, name=None, _cancel_evt=None,
+                   progress_rate=PROGRESS_RATE, progress_callback=None, host_xml_callback=None,
+                   log_capture=None, spool=None):
+        """
+        Perform a scan using Nmap.
+
+        Args:
+            target (str): The target to scan.
+            scan_args (str): The arguments to pass to Nmap.
+            ui_context (Optional): The UI context.
+            logger (Optional): The logger to use for logging.
+            name (str, optional): The name of the scan in the UI context.
+            _cancel_evt (Event, optional): The event that cancels the scan.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_callback (callable, optional): Called with the scan progress percentage on every progress update.
+            host_xml_callback (callable, optional): Called with the XML of every host as soon as nmap reports it.
+            log_capture (LogCapture, optional): The capture of the nmap output. A new one is created if not given.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to, instead of keeping it in memory.
+
+        Returns:
+            str: The nmap XML output, or the path of the closed spool file if `spool` is given. None if the scan
+                failed or was cancelled.
+        """
+        logger = logger if logger is not None else logging.basicConfig(**LOG_CONF)
+        instance = cls(target, scan_args, ui_context, logger=logger, name=name, _cancel_evt=_cancel_evt,
+                       progress_rate=progress_rate, progress_callback=progress_callback,
+                       host_xml_callback=host_xml_callback, log_capture=log_capture, spool=spool)
+        try:
+            return await instance._run()
+        except Exception as e:
+            instance.logger.error(f"An error occurred: {str(e)}")
+            raise e
+
+    def command(self):
+        """
+        Builds the nmap command line.
+
+        Returns:
+            list: The nmap executable followed by its arguments.
+
+        Raises:
+            EnvironmentError: If nmap cannot be found in the system path.
+        """
+        _nmap = shutil.which("nmap")
+        if _nmap is None:
+            raise EnvironmentError(1, "nmap is not installed or could not be found in system path")
+        _targets = [_t for _t in self.target.replace(" ", "").split(",") if _t != ""]
+        return [_nmap] + NMAP_FIXED_OPTIONS + shlex.split(self.scan_args) + _targets
+
+    async def _run(self):
+        """
+        Starts nmap, streams its output until it exits and returns the collected XML.
+
+        Returns:
+            str: The nmap XML output, or the spool file path, or None if the scan failed or was cancelled.
+        """
+        _proc = await asyncio.create_subprocess_exec(
+            *self.command(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=NMAP_STREAM_LIMIT,
+            start_new_session=True)
+
+        _stderr_task = asyncio.ensure_future(_proc.stderr.read())
+        _cancel_task = asyncio.ensure_future(self._watch_cancel_event(_proc))
+        _chunks = []
+        _last_update = 0
+        _host_stream = NmapHostStream()
+
+        try:
+            while True:
+                _line = await _proc.stdout.readline()
+                if not _line:
+                    break
+                _line = _line.decode("utf-8", errors="replace")
+                if self.spool is not None:
+                    self.spool.write(_line)
+                else:
+                    _chunks.append(_line)
+                self._update_progress(_line)
+                self.log.append(_line)
+                if self.host_xml_callback is not None:
+                    await self._handle_hosts(_host_stream.feed(_line))
+
+                if time.monotonic() - _last_update >= self.progress_interval:
+                    _last_update = time.monotonic()
+                    self._report_progress(self.progress)
+                    update_scan_ui(self.ui_context, self.name, self.progress, self.log.tail() if self.ui_context is not None else None)
+
+            self.rc = await _proc.wait()
+            self.stderr = (await _stderr_task).decode("utf-8", errors="replace")
+        except asyncio.CancelledError:
+            self._kill(_proc)
+            await _proc.wait()
+            raise
+        finally:
+            _cancel_task.cancel()
+            if not _stderr_task.done():
+                _stderr_task.cancel()
+            if self.spool is not None:
+                self.spool.close()
+
+        _cancelled = self.cancel_evt.is_set()
+        if _cancelled is False:
+            self._report_progress(100)
+        update_scan_ui(self.ui_context, self.name, 100 if _cancelled is False else self.progress, None, True)
+
+        if self.rc != 0 or _cancelled is True:
+            if _cancelled is False:
+                self.logger.error(f"Nmap exited with code {self.rc}: {self.stderr.strip()}")
+            return None
+        return "".join(_chunks) if self.spool is None else self.spool.path
+
+    async def _handle_hosts(self, hosts: list):
+        """
+        Passes the completed hosts to the host callback without blocking the event loop.
+
+        A failing callback is logged and does not stop the scan, since the hosts are also part of the final results.
+
+        Args:
+            hosts (list): The XML of the completed hosts.
+        """
+        for _host in hosts:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.host_xml_callback, _host)
+            except Exception as e:
+                self.logger.error(f"Could not handle host result: {str(e)}")
+
+    def _report_progress(self, progress):
+        """
+        Passes the scan progress to the progress callback, if there is one.
+
+        Args:
+            progress (int): The scan progress percentage.
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
+
+    def _update_progress(self, line: str):
+        """
+        Updates the progress of the current nmap task from a line of nmap output.
+
+        Args:
+            line (str): The line of nmap output.
+        """
+        if TASK_BEGIN_RE.search(line):
+            self.progress = 0
+        _match = TASK_PROGRESS_RE.search(line)
+        if _match is not None:
+            self.progress = int(float(_match.group(1)))
+        if TASK_END_RE.search(line):
+            self.progress = 100
+
+    async def _watch_cancel_event(self, proc):
+        """
+        Kills the nmap process as soon as the cancel event is set.
+
+        Args:
+            proc (asyncio.subprocess.Process): The nmap process.
+        """
+        while proc.returncode is None:
+            if self.cancel_evt.is_set():
+                self._kill(proc)
+                return
+            await asyncio.sleep(self.progress_interval)
+
+    @staticmethod
+    def _kill(proc):
+        """
+        Kills the nmap process group.
+
+        Args:
+            proc (asyncio.subprocess.Process): The nmap process.
+        """
+        if proc.returncode is not None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            proc.kill()
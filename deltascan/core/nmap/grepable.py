@@ -0,0 +1,260 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.exceptions import (AppExceptions)
+import os
+import re
+import shlex
+import tempfile
+import time
+
+GREPABLE_EXTENSION = ".gnmap"
+# The output format that is recorded with the results taken from the grepable output
+GREPABLE_FORMAT = "grepable"
+# Options whose results are only reported in the XML output (services, OS, scripts and traces)
+XML_ONLY_OPTIONS_RE = re.compile(r"(?:^|\s)(?:-sV|-sC|-sR|-A|-O|--script\S*|--traceroute|--version-\S+|--osscan-\S+)(?=\s|$)")
+GREPABLE_DATE_FORMAT = "%a %b %d %H:%M:%S %Y"
+HEADER_RE = re.compile(r"^# Nmap \S+ scan initiated (.+?) as: (.*)$")
+PORTS_SCANNED_RE = re.compile(r"(TCP|UDP|SCTP|PROTOCOLS)\((\d+);([^)]*)\)")
+FOOTER_RE = re.compile(
+    r"^# Nmap done at (.+?) -- (\d+) IP addresses? \((\d+) hosts? up\) scanned in ([0-9.]+) seconds")
+HOST_RE = re.compile(r"^Host: (\S+) \(([^)]*)\)$")
+# port/state/protocol/owner/service/rpc info/version/
+PORT_RE = re.compile(r"(\d+)/([^/]*)/([^/]*)/([^/]*)/([^/]*)/([^/]*)/([^/]*)/")
+
+
+def is_port_only(scan_args: str) -> bool:
+    """
+    Checks whether the results of a scan need only the hosts, their status and their ports, so that
+    they can be taken from the grepable output instead of the XML output.
+
+    Args:
+        scan_args (str): The nmap arguments.
+
+    Returns:
+        bool: False if the arguments ask for service, OS, script or trace results.
+    """
+    return scan_args is not None and XML_ONLY_OPTIONS_RE.search(scan_args) is None
+
+
+def _grepable_time(date: str) -> str:
+    """
+    Converts a date of the grepable output to a timestamp, as the XML output reports it.
+
+    Args:
+        date (str): The local date, such as 'Mon Jun 10 08:53:20 2024'.
+
+    Returns:
+        str: The UNIX timestamp or the date as it is if it can not be converted.
+    """
+    try:
+        return str(int(time.mktime(time.strptime(date.strip(), GREPABLE_DATE_FORMAT))))
+    except (ValueError, OverflowError):
+        return date
+
+
+class GrepableOutput:
+    """
+    The file that nmap writes its grepable output to, next to its XML output.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Creates an empty grepable output file.
+
+        Args:
+            directory (str, optional): The directory of the file. The temporary directory of the system if not set.
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        _fd, self.path = tempfile.mkstemp(suffix=GREPABLE_EXTENSION, prefix="deltascan_", dir=directory)
+        os.close(_fd)
+
+    def arguments(self, scan_args: str) -> str:
+        """
+        Adds the grepable output option to the nmap arguments.
+
+        Args:
+            scan_args (str): The nmap arguments.
+
+        Returns:
+            str: The nmap arguments that also write the grepable output to the file.
+        """
+        return f"{scan_args} -oG {shlex.quote(self.path)}"
+
+    def parse(self) -> dict:
+        """
+        Parses the grepable output file.
+
+        Returns:
+            dict: The scan results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the file can not be read or has no hosts.
+        """
+        return GrepableParser.extract_port_scan_file_results(self.path)
+
+    def remove(self):
+        """
+        Removes the grepable output file.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class GrepableParser:
+    """
+    Parses the nmap grepable output (-oG) to the same scan results as the XML parser, for the hosts,
+    their status and their ports.
+
+    The grepable output does not have the reasons of the port states, nor services, OS and traces, so the
+    port states have only the state, and the OS, OS fingerprint, hops and last boot fields are unknown.
+    """
+
+    @classmethod
+    def extract_port_scan_results(cls, lines) -> dict:
+        """
+        Extracts the port scan results of the grepable output.
+
+        Args:
+            lines (str or iterable): The grepable output or its lines.
+
+        Returns:
+            dict: The scan results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the output has no hosts.
+        """
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        _results = {
+            "results": [],
+            "args": {},
+            "scaninfo": {},
+            "start": {},
+            "runstats": {},
+        }
+        _hosts = {}
+        for _line in lines:
+            _line = _line.rstrip("\r\n")
+            if _line.startswith("#"):
+                cls._extract_comment(_line, _results)
+                continue
+            _fields = _line.split("\t")
+            _match = HOST_RE.match(_fields[0])
+            if _match is None:
+                continue
+            _host = _hosts.get(_match.group(1))
+            if _host is None:
+                _host = cls._new_host(_match.group(1))
+                _hosts[_match.group(1)] = _host
+                _results["results"].append(_host)
+            for _field in _fields[1:]:
+                _name, _, _value = _field.partition(": ")
+                if _name == "Status":
+                    _host["status"] = _value.strip().lower()
+                elif _name == "Ports":
+                    _host["ports"].extend([cls._extract_port(_p) for _p in PORT_RE.findall(_value)])
+
+        if len(_results["results"]) == 0:
+            raise AppExceptions.DScanResultsParsingError("No hosts found in the nmap grepable output")
+        return _results
+
+    @classmethod
+    def extract_port_scan_file_results(cls, path: str) -> dict:
+        """
+        Extracts the port scan results of a grepable output file, one line at a time.
+
+        Args:
+            path (str): The path of the grepable output file.
+
+        Returns:
+            dict: The scan results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the file can not be read or has no hosts.
+        """
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as _f:
+                return cls.extract_port_scan_results(_f)
+        except OSError as e:
+            raise AppExceptions.DScanResultsParsingError(f"Could not read {path}: {str(e)}")
+
+    @staticmethod
+    def _new_host(address: str) -> dict:
+        return {
+            "host": address,
+            "status": "unknown",
+            "ports": [],
+            "os": ["unknown"],
+            "osfingerprint": "none",
+            "hops": ["unknown"],
+            "last_boot": "none",
+        }
+
+    @staticmethod
+    def _extract_port(port: tuple) -> dict:
+        """
+        Converts a port of the grepable output to a port of the scan results.
+
+        Args:
+            port (tuple): The port id, state, protocol, owner, service, RPC info and version of the port.
+
+        Returns:
+            dict: The port results.
+        """
+        _portid, _state, _protocol, _owner, _service, _, _version = port
+        return {
+            "protocol": _protocol,
+            "portid": _portid,
+            "state": {"state": _state},
+            # nmap writes the slashes of the service names and versions as pipes
+            "service_name": _service.replace("|", "/"),
+            "servicefp": "",
+            "service_product": _version.replace("|", "/"),
+        }
+
+    @staticmethod
+    def _extract_comment(line: str, results: dict):
+        """
+        Extracts the scan information of a comment line of the grepable output.
+
+        Args:
+            line (str): The comment line.
+            results (dict): The scan results that the information is added to.
+        """
+        _match = HEADER_RE.match(line)
+        if _match is not None:
+            results["start"] = _grepable_time(_match.group(1))
+            results["args"] = _match.group(2)
+            return
+        if line.startswith("# Ports scanned:"):
+            _scaninfo = [{"protocol": _p.lower(), "numservices": _n, "services": _s}
+                         for _p, _n, _s in PORTS_SCANNED_RE.findall(line) if _n != "0"]
+            if len(_scaninfo) > 0:
+                results["scaninfo"] = _scaninfo[0] if len(_scaninfo) == 1 else _scaninfo
+            return
+        _match = FOOTER_RE.match(line)
+        if _match is not None:
+            results["runstats"] = {
+                "finished": {"time": _grepable_time(_match.group(1)), "elapsed": _match.group(4)},
+                "hosts": {
+                    "up": _match.group(3),
+                    "down": str(int(_match.group(2)) - int(_match.group(3))),
+                    "total": _match.group(2)}}
@@ -0,0 +1,69 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import re
+
+# Matches <host> and <host ...> but not <hostnames>, <hosthint> etc.
+HOST_START_RE = re.compile(r"<host[\s>]")
+HOST_END = "</host>"
+
+
+class NmapHostStream:
+    """
+    Finds the complete `<host>` elements in the nmap XML output while the output is still being produced.
+
+    The output is fed in chunks of any size. Only the part of the output that may still contain an
+    unfinished `<host>` element is kept, so the memory used does not grow with the size of the output.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_host = False
+        # Position of the buffer from where the end tag search continues
+        self._search_from = 0
+
+    def feed(self, chunk: str) -> list:
+        """
+        Adds a chunk of nmap output to the stream.
+
+        Args:
+            chunk (str): The next chunk of the nmap XML output.
+
+        Returns:
+            list: The `<host>` elements that were completed by this chunk.
+        """
+        self._buffer += chunk
+        _hosts = []
+        while True:
+            if self._in_host is False:
+                _match = HOST_START_RE.search(self._buffer)
+                if _match is None:
+                    # Keep just enough characters to find a start tag that is split between chunks
+                    self._buffer = self._buffer[-len("<host "):]
+                    break
+                self._buffer = self._buffer[_match.start():]
+                self._in_host = True
+                self._search_from = 0
+
+            _end = self._buffer.find(HOST_END, self._search_from)
+            if _end < 0:
+                self._search_from = max(0, len(self._buffer) - len(HOST_END) + 1)
+                break
+            _end += len(HOST_END)
+            _hosts.append(self._buffer[:_end])
+            self._buffer = self._buffer[_end:]
+            self._in_host = False
+        return _hosts
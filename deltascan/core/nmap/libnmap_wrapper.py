@@ -15,12 +15,17 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
 from libnmap.process import NmapProcess
-from queue import Queue
+from queue import Queue, Full, Empty
 from threading import Thread, Event
 from enum import Enum
-from contextlib import nullcontext
-from deltascan.core.config import LOG_CONF
+from deltascan.core.nmap.host_stream import NmapHostStream
+from deltascan.core.nmap.log_capture import LogCapture
+from deltascan.core.config import (
+    LOG_CONF,
+    PROGRESS_RATE,
+    PROGRESS_QUEUE_SIZE)
 import logging
+import os
 
 
 class QueueMsg(Enum):
@@ -34,6 +39,44 @@ QMESSAGE_HOST = "host"
 QMESSAGE_MSG = "msg"
 
 
+def update_scan_ui(ui_context, name, progress, stdout=None, finished=False):
+    """
+    Updates the progress bar and the nmap logs of a scan in the UI context, if the UI is live.
+
+    If the UI context has a status registry, the status is published to it and the UI is updated by
+    the render loop on its next frame, instead of by the calling scan thread.
+
+    Args:
+        ui_context (dict): The UI context.
+        name (str): The name of the scan.
+        progress (int): The scan progress percentage.
+        stdout (str, optional): The nmap output tail to display. None leaves the displayed logs unchanged.
+        finished (bool, optional): Whether the scan has finished. The displayed logs are cleared if so.
+
+    Returns:
+        None
+    """
+    if ui_context is None:
+        return
+    if ui_context.get("ui_status") is not None:
+        ui_context["ui_status"].publish(name, progress, stdout, finished)
+        return
+    if ui_context["ui_live"].is_started is False:
+        return
+
+    ui_context["ui_instances"]["progress_bar"][str(name)]["instance"].update(
+        ui_context["ui_instances"]["progress_bar"][str(name)]["id"],
+        completed=progress
+    )
+
+    if (stdout is not None and finished is False) and \
+       ("show_nmap_logs" in ui_context and ui_context["show_nmap_logs"] is True):
+        ui_context["ui_instances"]["text"][str(name)]["instance"].truncate(0)
+        ui_context["ui_instances"]["text"][str(name)]["instance"].append(stdout)
+    elif finished is True:
+        ui_context["ui_instances"]["text"][str(name)]["instance"].truncate(0)
+
+
 class LibNmapWrapper:
     """
     A wrapper class for performing Nmap scans.
@@ -46,13 +89,20 @@ class LibNmapWrapper:
         scan_args (str): The arguments to pass to the Nmap scanner.
         ui_context (optional): The UI context for the scan.
         logger: The logger instance for logging scan errors.
+        progress_rate (float): The maximum number of progress updates per second.
+        progress_queue_size (int): The maximum number of pending progress messages.
+        progress_callback (callable): Called with the scan progress percentage every time it changes.
+        host_xml_callback (callable): Called with the XML of every host as soon as nmap reports it.
+        log (LogCapture): The capture of the nmap output, whose tail is displayed in the UI context.
 
     """
 
     target: str
     scan_args: str
 
-    def __init__(self, target: str, scan_args: str, ui_context=None, logger=None, name=None, _cancel_evt=None):
+    def __init__(self, target: str, scan_args: str, ui_context=None, logger=None, name=None, _cancel_evt=None,
+                 progress_rate=PROGRESS_RATE, progress_queue_size=PROGRESS_QUEUE_SIZE, progress_callback=None,
+                 host_xml_callback=None, log_capture=None, spool=None):
         """
         Initializes a new instance of the LibNmapWrapper class.
 
@@ -61,16 +111,30 @@ class LibNmapWrapper:
             scan_args (str): The arguments to pass to the Nmap scanner.
             ui_context (optional): The UI context for the scan.
             logger: The logger instance for logging scan errors.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_queue_size (int, optional): The maximum number of pending progress messages.
+            progress_callback (callable, optional): Called with the scan progress percentage every time it changes.
+            host_xml_callback (callable, optional): Called with the XML of every host as soon as nmap reports it.
+            log_capture (LogCapture, optional): The capture of the nmap output. A new one is created if not given.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to, instead of returning it.
 
         """
         self.target = target
         self.scan_args = scan_args
         self.ui_context = ui_context
         self.name = name
-        self.cancel_evt = _cancel_evt
+        self.cancel_evt = _cancel_evt if _cancel_evt is not None else Event()
+        self.progress_interval = 1 / progress_rate if progress_rate is not None and progress_rate > 0 else 1 / PROGRESS_RATE
+        self.progress_queue_size = progress_queue_size if progress_queue_size is not None else PROGRESS_QUEUE_SIZE
+        self.progress_callback = progress_callback
+        self.host_xml_callback = host_xml_callback
+        self.log = log_capture if log_capture is not None else LogCapture()
+        self.spool = spool
 
     @classmethod
-    def scan(cls, target: str, scan_args: str, ui_context=None, logger=None, name=None, _cancel_evt=None):
+    def scan(cls, target: str, scan_args: str, ui_context=None, logger=None, name=None, _cancel_evt=None,
+             progress_rate=PROGRESS_RATE, progress_queue_size=PROGRESS_QUEUE_SIZE, progress_callback=None,
+             host_xml_callback=None, log_capture=None, spool=None):
         """
         Perform a scan using Nmap.
 
@@ -79,15 +143,25 @@ class LibNmapWrapper:
             scan_args (str): The arguments to pass to Nmap.
             ui_context (Optional): The UI context.
             logger (Optional): The logger to use for logging.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_queue_size (int, optional): The maximum number of pending progress messages.
+            progress_callback (callable, optional): Called with the scan progress percentage every time it changes.
+            host_xml_callback (callable, optional): Called with the XML of every host as soon as nmap reports it.
+            log_capture (LogCapture, optional): The capture of the nmap output. A new one is created if not given.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to, instead of returning it.
 
         Returns:
-            The result of the scan.
+            The nmap XML output, or the path of the closed spool file if `spool` is given. None if the scan
+            failed or was cancelled.
 
         Raises:
             Exception: If an error occurs during the scan.
         """
         cls.logger = logger if logger is not None else logging.basicConfig(**LOG_CONF)
-        instance = cls(target, scan_args, ui_context, logger=cls.logger, name=name, _cancel_evt=_cancel_evt)
+        instance = cls(target, scan_args, ui_context, logger=cls.logger, name=name, _cancel_evt=_cancel_evt,
+                       progress_rate=progress_rate, progress_queue_size=progress_queue_size,
+                       progress_callback=progress_callback, host_xml_callback=host_xml_callback,
+                       log_capture=log_capture, spool=spool)
         try:
             return instance._scan()
         except Exception as e:
@@ -98,93 +172,171 @@ class LibNmapWrapper:
         """
         Perform the scan.
 
-        This method starts a new thread to run the scan and continuously listens for incoming messages from the scan thread.
-        It updates the progress bar and displays the stdout output in the UI context if available.
+        This method starts a new thread to run the scan and listens for incoming messages from the scan thread.
+        Progress messages carry only the nmap output produced since the previous message. It is appended to
+        the log capture, whose tail is displayed in the UI context if available. The same output is passed through
+        a host stream, so that every host is handed to the host callback as soon as nmap reports it, and
+        written to the spool file, if there is one. The status of the scan is published to the UI context and
+        the live display itself is refreshed by the render loop of the UI, not by this thread.
 
         Returns:
-            list: The scan results.
+            str: The nmap XML output or the path of the spool file. None if the scan failed, was cancelled or
+            its thread stopped without reporting its exit.
         """
-        _q = Queue()
+        _q = Queue(maxsize=self.progress_queue_size)
         _e = Event()
         _t = Thread(target=self._run, args=(_q, _e,))
         _t.start()
         _d = None
         _scan_finished = False
+        _host_stream = NmapHostStream()
+
+        _current_progress = 0
+        _reported_progress = None
+        _stdout_changed = False
+        while True:
+            if self.cancel_evt.is_set():
+                # Set event to cancel the whole scan Process
+                _e.set()
+            try:
+                _incoming_msg = _q.get(timeout=self.progress_interval)
+            except Empty:
+                if _t.is_alive() or not _q.empty():
+                    # Nothing new from nmap. Loop again in order to re-check the cancel event
+                    continue
+                # The scan thread ended without an exit message, e.g. because nmap could not be started
+                logging.getLogger(__name__).error(f"The scan of {self.target} stopped unexpectedly")
+                update_scan_ui(self.ui_context, self.name, _current_progress, None, True)
+                _d = None
+                break
 
-        with self.ui_context["ui_live"] if self.ui_context is not None and self.ui_context["ui_live"].is_started else nullcontext() as _:
-            _current_progress = 0
-            _current_stdout = None
             _stdout_changed = False
-            while True:
-                if self.cancel_evt.is_set():
-                    # Set event to cancel the whole scan Process
-                    _e.set()
-                _incoming_msg = _q.get()
-                if _incoming_msg[QMESSAGE_TYPE] == QueueMsg.DATA:
-                    _d = _incoming_msg[QMESSAGE_MSG]
-                elif _incoming_msg[QMESSAGE_TYPE] == QueueMsg.EXIT:
-                    _scan_finished = True
-                    # Set progress to 100 if scan is finished and cancel event is not set
-                    _current_progress = 100 if self.cancel_evt.is_set() is False else _current_progress
-                elif _incoming_msg[QMESSAGE_TYPE] == QueueMsg.PROGRESS:
-                    _current_progress = _incoming_msg[QMESSAGE_MSG]["progress"]
-                    if _current_stdout != _incoming_msg[QMESSAGE_MSG]["stdout"]:
-                        _stdout_changed = True
-                        _current_stdout = _incoming_msg[QMESSAGE_MSG]["stdout"]
-                else:
-                    _stdout_changed = False
-                    _d = None
-
-                if self.ui_context is not None or self.ui_context["ui_live"].is_started is True:
-                    self.ui_context["ui_instances"]["progress_bar"][str(self.name)]["instance"].update(
-                                        self.ui_context["ui_instances"]["progress_bar"][str(self.name)]["id"],
-                                        completed=_current_progress
-                                    )
-
-                    self.ui_context["ui_instances"]["text"][str(self.name)]["instance"].truncate(0)
-                    if (_stdout_changed is True and _scan_finished is False) and \
-                       ("show_nmap_logs" in self.ui_context and self.ui_context["show_nmap_logs"] is True):
-                        self.ui_context["ui_instances"]["text"][str(self.name)]["instance"].append(_current_stdout[-300:])
-
-                if _scan_finished is True:
-                    break
+            if _incoming_msg[QMESSAGE_TYPE] == QueueMsg.DATA:
+                _d = _incoming_msg[QMESSAGE_MSG]
+            elif _incoming_msg[QMESSAGE_TYPE] == QueueMsg.EXIT:
+                _scan_finished = True
+                # Set progress to 100 if scan is finished and cancel event is not set
+                _current_progress = 100 if self.cancel_evt.is_set() is False else _current_progress
+            elif _incoming_msg[QMESSAGE_TYPE] == QueueMsg.PROGRESS:
+                _current_progress = _incoming_msg[QMESSAGE_MSG]["progress"]
+                if _incoming_msg[QMESSAGE_MSG]["stdout"] != "":
+                    _stdout_changed = True
+                    self.log.append(_incoming_msg[QMESSAGE_MSG]["stdout"])
+                    if self.spool is not None:
+                        self.spool.write(_incoming_msg[QMESSAGE_MSG]["stdout"])
+                    if self.host_xml_callback is not None:
+                        self._handle_hosts(_host_stream.feed(_incoming_msg[QMESSAGE_MSG]["stdout"]))
+            else:
+                _d = None
+
+            if self.progress_callback is not None and _current_progress != _reported_progress:
+                _reported_progress = _current_progress
+                self.progress_callback(_current_progress)
+
+            update_scan_ui(
+                self.ui_context,
+                self.name,
+                _current_progress,
+                self.log.tail() if _stdout_changed is True and self.ui_context is not None else None,
+                _scan_finished)
+
+            if _scan_finished is True:
+                break
 
         _t.join()
+        if self.spool is not None:
+            self.spool.close()
         return _d
 
+    def _handle_hosts(self, hosts: list):
+        """
+        Passes the completed hosts to the host callback.
+
+        A failing callback is logged and does not stop the scan, since the hosts are also part of the final results.
+
+        Args:
+            hosts (list): The XML of the completed hosts.
+        """
+        for _host in hosts:
+            try:
+                self.host_xml_callback(_host)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Could not handle host result: {str(e)}")
+
     def _run(self, queue: Queue, event: Event):
         """
         Runs the Nmap scan process and sends progress, data, and exit messages to the queue.
 
+        The nmap process is sampled at most `progress_rate` times per second. Every progress message
+        carries the current progress and only the output produced since the previous message. When the
+        queue is full, the output is coalesced into the next progress message instead of blocking the loop.
+
         Args:
-            queue (Queue): The queue to send the messages to.
+            queue (Queue): The bounded queue to send the messages to.
+            event (Event): The event that cancels the nmap process.
 
         Returns:
             None
         """
         np = NmapProcess(targets=self.target, options=self.scan_args)
-        np.sudo_run_background()
+        if os.getuid() == 0:
+            # Without sudo in between, stopping the process kills nmap itself and not just sudo
+            np.run_background()
+        else:
+            np.sudo_run_background()
         _cancelled = False
+        _stdout_offset = 0
+        _pending_stdout = ""
+        _last_progress = None
 
-        while np.is_running() or np.is_successful() is False or np.rc != 0:
-            if event.is_set():
+        while not np.has_terminated():
+            # Sleep until the next progress slot. A cancellation wakes the loop up immediately
+            if event.wait(self.progress_interval):
                 np.stop()
                 _cancelled = True
                 break
-            queue.put(self._create_queue_message(
-                QueueMsg.PROGRESS, self.target, {
-                    "progress": int(float(np.progress)),
-                    "stdout": np.stdout
-                }
-            ))
+
+            _progress = int(float(np.progress))
+            _stdout = np.stdout
+            if len(_stdout) > _stdout_offset:
+                _pending_stdout += _stdout[_stdout_offset:]
+                _stdout_offset = len(_stdout)
+
+            if _pending_stdout == "" and _progress == _last_progress:
+                continue
+
+            try:
+                queue.put_nowait(self._create_queue_message(
+                    QueueMsg.PROGRESS, self.target, {
+                        "progress": _progress,
+                        "stdout": _pending_stdout
+                    }
+                ))
+                _pending_stdout = ""
+                _last_progress = _progress
+            except Full:
+                # The consumer is behind. Keep the output and send it along with the next update
+                pass
+
+        if _cancelled is False:
+            # Flush the output that was produced after the last progress message
+            _pending_stdout += np.stdout[_stdout_offset:]
+            if _pending_stdout != "":
+                queue.put(self._create_queue_message(
+                    QueueMsg.PROGRESS, self.target, {
+                        "progress": int(float(np.progress)),
+                        "stdout": _pending_stdout
+                    }
+                ))
 
         if np.rc != 0 or _cancelled is True:
             queue.put(self._create_queue_message(
                 QueueMsg.EXIT, self.target, np.rc
             ))
         else:
+            # The spool has all the output by the time the data message is read, since it follows the last progress message
             queue.put(self._create_queue_message(
-                QueueMsg.DATA, self.target, np.stdout
+                QueueMsg.DATA, self.target, np.stdout if self.spool is None else self.spool.path
             ))
             queue.put(self._create_queue_message(
                 QueueMsg.EXIT, self.target, 1
@@ -0,0 +1,121 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from deltascan.core.config import NMAP_LOG_TAIL
+from collections import deque
+from threading import Lock
+import os
+import re
+import time
+
+
+class LogCapture:
+    """
+    Keeps the last characters of the nmap output of a scan and optionally writes the whole output to a file.
+
+    The output is kept as a queue of chunks. An append adds the chunk and drops the chunks that are no longer
+    part of the tail, so appends take constant time and the memory used is bounded by the tail size, no matter
+    how much output nmap produces. The instance is shared by the scan, which appends to it, and the UI, which
+    reads its tail, so all the operations are thread safe.
+    """
+
+    def __init__(self, tail_size=NMAP_LOG_TAIL, spill_file=None):
+        """
+        Initializes a new instance of the LogCapture class.
+
+        Args:
+            tail_size (int, optional): The number of output characters to keep.
+            spill_file (str, optional): The file to write the whole output to. None keeps only the tail.
+        """
+        self.tail_size = tail_size if tail_size is not None and tail_size > 0 else NMAP_LOG_TAIL
+        self.spill_file = spill_file
+        self._chunks = deque()
+        self._length = 0
+        self._version = 0
+        self._lock = Lock()
+        self._spill = None
+        if spill_file is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(spill_file)), exist_ok=True)
+            self._spill = open(spill_file, "a", encoding="utf-8")
+
+    @classmethod
+    def for_scan(cls, name, tail_size=NMAP_LOG_TAIL, spill_dir=None):
+        """
+        Creates the log capture of a scan. The whole log is written to a new file in `spill_dir`, if it is set.
+
+        Args:
+            name (str): The name of the scan.
+            tail_size (int, optional): The number of output characters to keep.
+            spill_dir (str, optional): The directory of the log files. None keeps only the tail.
+
+        Returns:
+            LogCapture: The log capture of the scan.
+        """
+        if spill_dir is None:
+            return cls(tail_size)
+        _file = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', str(name))}_{time.strftime('%Y%m%d%H%M%S')}.log"
+        return cls(tail_size, os.path.join(spill_dir, _file))
+
+    def append(self, chunk: str):
+        """
+        Appends a chunk of output.
+
+        Args:
+            chunk (str): The chunk of output.
+        """
+        if chunk == "":
+            return
+        with self._lock:
+            if self._spill is not None:
+                self._spill.write(chunk)
+            # A chunk longer than the tail is cut, so that the queue never holds more than a tail worth of output
+            chunk = chunk[-self.tail_size:]
+            self._chunks.append(chunk)
+            self._length += len(chunk)
+            while self._length - len(self._chunks[0]) >= self.tail_size:
+                self._length -= len(self._chunks.popleft())
+            self._version += 1
+
+    def tail(self) -> str:
+        """
+        Returns:
+            str: The last `tail_size` characters of the output.
+        """
+        with self._lock:
+            return "".join(self._chunks)[-self.tail_size:]
+
+    @property
+    def version(self) -> int:
+        """
+        Returns:
+            int: A number that changes every time output is appended, so that readers can tell whether the tail changed.
+        """
+        return self._version
+
+    def close(self):
+        """
+        Closes the spill file, if there is one. Output appended after closing is kept only in the tail.
+        """
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,141 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import glob
+import os
+import re
+import time
+
+SPOOL_EXTENSION = ".xml"
+
+
+class NmapSpool:
+    """
+    A file that the nmap XML output of a scan is written to while nmap produces it, so that the
+    output does not have to be kept in memory until it is parsed.
+    """
+
+    def __init__(self, path, keep=False):
+        """
+        Initializes a new instance of the NmapSpool class. The file is created on the first write.
+
+        Args:
+            path (str): The path of the spool file.
+            keep (bool, optional): Keep the file when the scan finishes. Otherwise it is removed.
+        """
+        self.path = path
+        self.keep = keep
+        self._file = None
+
+    @classmethod
+    def for_scan(cls, name, spool_dir=None, keep=False):
+        """
+        Creates the spool file of a scan in `spool_dir`.
+
+        Args:
+            name (str): The name of the scan.
+            spool_dir (str, optional): The directory of the spool files. None keeps the output in memory.
+            keep (bool, optional): Keep the file when the scan finishes.
+
+        Returns:
+            NmapSpool: The spool of the scan, or None if `spool_dir` is not set.
+        """
+        if spool_dir is None:
+            return None
+        _file = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', str(name))}_{time.strftime('%Y%m%d%H%M%S')}{SPOOL_EXTENSION}"
+        return cls(os.path.join(spool_dir, _file), keep)
+
+    def shard(self, idx):
+        """
+        Creates the spool of a shard of the scan, next to the spool of the scan.
+
+        Args:
+            idx (int): The index of the shard.
+
+        Returns:
+            NmapSpool: The spool of the shard.
+        """
+        return NmapSpool(f"{self.path[:-len(SPOOL_EXTENSION)]}.{idx}{SPOOL_EXTENSION}", self.keep)
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8")
+        return self._file
+
+    def write(self, chunk: str):
+        """
+        Appends a chunk of nmap output to the file.
+
+        Args:
+            chunk (str): The chunk of output.
+        """
+        self._open().write(chunk)
+
+    def close(self):
+        """
+        Flushes and closes the file. The spool can be parsed after it is closed.
+        """
+        if self._file is None and not os.path.exists(self.path):
+            # Nmap produced no output. The file is created anyway, so that the parser reports the empty output
+            self._open()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """
+        Closes the file and removes it, unless it is kept.
+        """
+        self.close()
+        if self.keep is False:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish()
+
+
+def clean_spool_dir(spool_dir, retention):
+    """
+    Removes the spool files that are older than the retention period.
+
+    Args:
+        spool_dir (str): The directory of the spool files.
+        retention (float): The number of hours that spool files are kept. With 0 or None nothing is removed here,
+            since the spool files are not kept after their scan finishes.
+
+    Returns:
+        int: The number of removed files.
+    """
+    if spool_dir is None or retention is None or retention <= 0:
+        return 0
+    _removed = 0
+    _oldest = time.time() - retention * 3600
+    for _f in glob.glob(os.path.join(spool_dir, f"*{SPOOL_EXTENSION}")):
+        try:
+            if os.path.getmtime(_f) < _oldest:
+                os.remove(_f)
+                _removed += 1
+        except OSError:
+            continue
+    return _removed
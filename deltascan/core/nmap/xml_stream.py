@@ -0,0 +1,175 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import xml.etree.ElementTree as ET
+
+# Size of the chunks that strings and files are fed to the parser in
+NMAP_XML_CHUNK_SIZE = 2 ** 16
+# Elements of `nmaprun` that are reported for every task or host and are not kept
+NMAP_PROGRESS_TAGS = ("taskbegin", "taskprogress", "taskend", "hosthint")
+
+
+def _push_value(item: dict, key: str, value):
+    """
+    Adds the value of a child element to a dictionary, turning the key into a list if it is repeated.
+
+    Args:
+        item (dict): The dictionary of the parent element.
+        key (str): The name of the child element.
+        value: The converted child element.
+    """
+    if key not in item:
+        item[key] = value
+    elif isinstance(item[key], list):
+        item[key].append(value)
+    else:
+        item[key] = [item[key], value]
+
+
+def element_to_dict(element):
+    """
+    Converts an XML element to the structure that xmltodict produces, without the '@' attribute key prefix.
+
+    Attributes and child elements become keys and repeated child elements become lists. The text of an
+    element without attributes and children is its value as is, even if it is only whitespace. Otherwise the
+    whitespace-stripped text becomes its '#text' key. An empty element without attributes is None. An attribute
+    takes precedence over a child element with the same name.
+
+    Args:
+        element (xml.etree.ElementTree.Element): The element to convert.
+
+    Returns:
+        dict, str or None: The converted element.
+    """
+    _item = dict(element.attrib) if element.attrib else None
+    _data = [element.text] if element.text else []
+    for _child in element:
+        if _child.tail:
+            _data.append(_child.tail)
+        if _item is None:
+            _item = {}
+        elif _child.tag in element.attrib:
+            continue
+        _push_value(_item, _child.tag, element_to_dict(_child))
+
+    if _item is None:
+        return "".join(_data) or None
+    _data = "".join(_data).strip() or None
+    if _data is not None:
+        _item["#text"] = _data
+    return _item
+
+
+class NmapXMLStream:
+    """
+    Parses the nmap XML output incrementally and returns every `<host>` element, converted to a dictionary
+    as soon as it ends.
+
+    The converted hosts are removed from the document tree, so the memory used does not grow with the number
+    of hosts. The rest of the `nmaprun` element, apart from the task progress elements, is kept in `nmaprun`.
+    A document whose root is a single `<host>` element is also accepted.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+        self.nmaprun = None
+
+    def feed(self, chunk) -> list:
+        """
+        Adds a chunk of nmap XML output to the stream.
+
+        Args:
+            chunk (str or bytes): The next chunk of the nmap XML output.
+
+        Returns:
+            list: The `<host>` elements, as dictionaries, that were completed by this chunk.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the output is not well-formed XML.
+        """
+        self._parser.feed(chunk)
+        return self._read_events()
+
+    def close(self) -> list:
+        """
+        Ends the stream.
+
+        Returns:
+            list: The `<host>` elements that were completed by the end of the output.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the output is not complete.
+        """
+        self._parser.close()
+        return self._read_events()
+
+    def read(self, source, chunk_size=NMAP_XML_CHUNK_SIZE):
+        """
+        Feeds a whole nmap XML document to the stream in chunks.
+
+        Args:
+            source (str, bytes or file): The nmap XML document or a file object opened for reading.
+            chunk_size (int, optional): The size of the chunks that the document is fed in.
+
+        Yields:
+            dict: Every `<host>` element, as soon as it is parsed.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the document is not well-formed XML.
+        """
+        if isinstance(source, (str, bytes)):
+            for _i in range(0, len(source), chunk_size):
+                yield from self.feed(source[_i:_i + chunk_size])
+        else:
+            while True:
+                _chunk = source.read(chunk_size)
+                if not _chunk:
+                    break
+                yield from self.feed(_chunk)
+        yield from self.close()
+
+    def _read_events(self) -> list:
+        """
+        Handles the parser events of the last chunk.
+
+        Returns:
+            list: The `<host>` elements that ended.
+        """
+        _hosts = []
+        for _event, _element in self._parser.read_events():
+            if _event == "start":
+                if self._root is None:
+                    self._root = _element
+                    if _element.tag == "nmaprun":
+                        self.nmaprun = dict(_element.attrib)
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+            if self._depth == 0:
+                if _element.tag == "host":
+                    _hosts.append(element_to_dict(_element))
+            elif self._depth == 1 and self.nmaprun is not None:
+                if _element.tag == "host":
+                    _hosts.append(element_to_dict(_element))
+                elif _element.tag not in NMAP_PROGRESS_TAGS:
+                    _push_value(self.nmaprun, _element.tag, element_to_dict(_element))
+                # The children of `nmaprun` are not needed once they are converted
+                self._root.remove(_element)
+        return _hosts
@@ -0,0 +1,267 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.parser import Parser
+from deltascan.core.exceptions import AppExceptions
+from deltascan.core.nmap.host_stream import (HOST_START_RE, HOST_END)
+from deltascan.core.config import (
+    PARSE_WORKERS,
+    PARSE_SPLIT_SIZE)
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+import mmap
+import multiprocessing
+import re
+
+HOST_START_BYTES_RE = re.compile(HOST_START_RE.pattern.encode())
+HOST_END_BYTES = HOST_END.encode()
+# Number of hosts that a worker parses at a time
+PARSE_BATCH_SIZE = 32
+
+
+def host_spans(data, start_re=HOST_START_RE, end_tag=HOST_END):
+    """
+    Finds the `<host>` elements of an nmap XML document, without copying the document.
+
+    Args:
+        data (str, bytes or mmap): The nmap XML document.
+        start_re (re.Pattern, optional): The pattern of the host start tag, str or bytes like `data`.
+        end_tag (str or bytes, optional): The host end tag, str or bytes like `data`.
+
+    Yields:
+        tuple: The start and end position of every host.
+    """
+    _pos = 0
+    while True:
+        _match = start_re.search(data, _pos)
+        if _match is None:
+            return
+        _end = data.find(end_tag, _match.start())
+        if _end < 0:
+            # An unfinished host. Leave it to the parser to fail on it
+            return
+        _pos = _end + len(end_tag)
+        yield _match.start(), _pos
+
+
+def split_hosts(results: str):
+    """
+    Splits an nmap XML document in the document without its `<host>` elements and the `<host>` elements.
+
+    Args:
+        results (str): The nmap XML document.
+
+    Returns:
+        tuple: The document without the hosts (str) and the XML of every host (list).
+    """
+    _info = []
+    _hosts = []
+    _pos = 0
+    for _start, _end in host_spans(results):
+        _info.append(results[_pos:_start])
+        _hosts.append(results[_start:_end])
+        _pos = _end
+    _info.append(results[_pos:])
+    return "".join(_info), _hosts
+
+
+def _parse_hosts(hosts: list, projection=None) -> list:
+    """
+    Parses a batch of `<host>` elements. It runs in the worker processes.
+
+    Args:
+        hosts (list): The XML of the hosts.
+        projection (FieldProjection, optional): The fields of the host results to keep.
+
+    Returns:
+        list: The host results.
+    """
+    return [Parser.extract_host_results(_h, projection) for _h in hosts]
+
+
+class ParsePool:
+    """
+    Parses the nmap XML output in worker processes, so that parsing does not hold the GIL of the
+    scan threads and the UI.
+
+    Documents larger than `split_size` characters are split by `<host>` and the hosts are parsed by
+    all the workers. The results are the same as the results of `Parser.extract_port_scan_dict_results`.
+    With 0 workers the documents are parsed in the calling thread.
+    """
+    _executor = None
+    _workers = PARSE_WORKERS
+    _split_size = PARSE_SPLIT_SIZE
+    _lock = Lock()
+
+    @classmethod
+    def configure(cls, workers=PARSE_WORKERS, split_size=PARSE_SPLIT_SIZE):
+        """
+        Sets the number of worker processes. The running workers are stopped if the number changes.
+
+        Args:
+            workers (int, optional): The number of worker processes. 0 parses in the calling thread.
+            split_size (int, optional): Documents larger than this number of characters are split by host.
+        """
+        with cls._lock:
+            cls._split_size = split_size
+            if workers == cls._workers:
+                return
+            cls._workers = workers
+        cls.shutdown()
+
+    @classmethod
+    def executor(cls):
+        """
+        Returns the pool of worker processes. The pool is started the first time it is requested.
+
+        Returns:
+            ProcessPoolExecutor: The worker pool or None if parsing runs in the calling thread.
+        """
+        with cls._lock:
+            if cls._workers is None or cls._workers <= 0:
+                return None
+            if cls._executor is None:
+                # Forking a process that runs scan and UI threads may copy locks that are held
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=cls._workers, mp_context=multiprocessing.get_context("spawn"))
+            return cls._executor
+
+    @classmethod
+    def parse(cls, results: str, projection=None) -> dict:
+        """
+        Parses an nmap XML document.
+
+        Args:
+            results (str): The nmap XML document.
+            projection (FieldProjection, optional): The fields of the host results to keep.
+
+        Returns:
+            dict: The scan results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the document can not be parsed.
+        """
+        _executor = cls.executor()
+        if _executor is None:
+            return Parser.extract_port_scan_dict_results(results, projection)
+        if len(results) <= cls._split_size:
+            return _executor.submit(Parser.extract_port_scan_dict_results, results, projection).result()
+
+        _info, _hosts = split_hosts(results)
+        if len(_hosts) == 0:
+            return _executor.submit(Parser.extract_port_scan_dict_results, results, projection).result()
+        _scan_results = Parser.extract_scan_info(_info)
+        _scan_results["results"] = cls._parse_hosts(_hosts, projection)
+        return _scan_results
+
+    @classmethod
+    def parse_file(cls, path: str, projection=None) -> dict:
+        """
+        Parses an nmap XML file, such as a scan spool file, one host at a time.
+
+        Without workers the file is parsed as a stream. Otherwise it is memory mapped and only the hosts
+        that are being parsed are copied out of it. Either way the memory used does not depend on the size
+        of the file but on the size of the results.
+
+        Args:
+            path (str): The path of the nmap XML file.
+            projection (FieldProjection, optional): The fields of the host results to keep.
+
+        Returns:
+            dict: The scan results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the file can not be read or parsed.
+        """
+        if cls.executor() is None:
+            return Parser.extract_port_scan_file_results(path, projection)
+
+        _info = []
+        try:
+            with open(path, "rb") as _f:
+                if _f.seek(0, 2) == 0:
+                    raise AppExceptions.DScanResultsParsingError(f"No nmap output in {path}")
+                with mmap.mmap(_f.fileno(), 0, access=mmap.ACCESS_READ) as _m:
+                    _pos = 0
+
+                    def _hosts():
+                        nonlocal _pos
+                        for _start, _end in host_spans(_m, HOST_START_BYTES_RE, HOST_END_BYTES):
+                            _info.append(_m[_pos:_start])
+                            _pos = _end
+                            yield _m[_start:_end].decode("utf-8", errors="replace")
+
+                    _results = cls._parse_hosts(_hosts(), projection)
+                    _info.append(_m[_pos:])
+        except OSError as e:
+            raise AppExceptions.DScanResultsParsingError(f"Could not read {path}: {str(e)}")
+
+        _info = b"".join(_info).decode("utf-8", errors="replace")
+        if len(_results) == 0:
+            # Let the parser report the missing hosts
+            return Parser.extract_port_scan_dict_results(_info)
+        _scan_results = Parser.extract_scan_info(_info)
+        _scan_results["results"] = _results
+        return _scan_results
+
+    @classmethod
+    def _parse_hosts(cls, hosts, projection=None) -> list:
+        """
+        Parses `<host>` elements in the worker processes, or in the calling thread if there are no workers.
+
+        Only a few batches per worker are submitted at a time, so that a long iterator of hosts is not
+        read into memory all at once.
+
+        Args:
+            hosts (iterable): The XML of the hosts.
+            projection (FieldProjection, optional): The fields of the host results to keep.
+
+        Returns:
+            list: The host results, in the order of the hosts.
+        """
+        _executor = cls.executor()
+        if _executor is None:
+            return [Parser.extract_host_results(_h, projection) for _h in hosts]
+
+        _results = []
+        _pending = deque()
+        _batch = []
+        for _h in hosts:
+            _batch.append(_h)
+            if len(_batch) < PARSE_BATCH_SIZE:
+                continue
+            _pending.append(_executor.submit(_parse_hosts, _batch, projection))
+            _batch = []
+            if len(_pending) >= cls._workers * 2:
+                _results.extend(_pending.popleft().result())
+        if len(_batch) > 0:
+            _pending.append(_executor.submit(_parse_hosts, _batch, projection))
+        while len(_pending) > 0:
+            _results.extend(_pending.popleft().result())
+        return _results
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Stops the worker processes.
+        """
+        with cls._lock:
+            _executor = cls._executor
+            cls._executor = None
+        if _executor is not None:
+            _executor.shutdown(wait=True)
@@ -15,13 +15,12 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
 from deltascan.core.exceptions import (AppExceptions)
-from deltascan.core.utils import replace_nested_keys
+from deltascan.core.nmap.xml_stream import NmapXMLStream
 from deltascan.core.config import (
     ADDED,
     CHANGED,
     REMOVED)
 import copy
-import xmltodict
 from deltascan.core.schemas import Diffs
 from marshmallow import ValidationError
 
@@ -94,155 +93,286 @@ class Parser:
         return handled_diff
 
     @classmethod
-    def extract_port_scan_dict_results(cls, results):
+    def extract_port_scan_dict_results(cls, results, projection=None):
         """
         Extracts the port scan results from the provided `results` object and returns a list of dictionaries.
 
         Args:
-            results (object): The scan results object.
+            results (str, bytes or file): The nmap XML document or a file object opened for reading.
+            projection (FieldProjection, optional): The fields of the host results to keep.
 
         Returns:
             list: A list of dictionaries containing the extracted scan results.
 
         Raises:
-            Exception: If an error occurs during the scan parser.
+            AppExceptions.DScanResultsParsingError: If the document can not be parsed or has no hosts.
 
         """
-        results = replace_nested_keys(xmltodict.parse(results))["nmaprun"]
+        _scan_info = {}
+        _hosts = list(cls.iter_port_scan_results(results, _scan_info, projection))
+        if len(_hosts) == 0:
+            raise AppExceptions.DScanResultsParsingError("No hosts found in the nmap output")
+        _scan_info["results"] = _hosts
+        return _scan_info
+
+    @classmethod
+    def extract_port_scan_file_results(cls, path: str, projection=None):
+        """
+        Extracts the port scan results of an nmap XML file, reading it in chunks.
+
+        Args:
+            path (str): The path of the nmap XML file.
+            projection (FieldProjection, optional): The fields of the host results to keep.
+
+        Returns:
+            dict: The scan results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the file can not be read or parsed or has no hosts.
+        """
         try:
-            try:
-                args = results["args"]
-            except KeyError:
-                args = {}
+            with open(path, "rb") as _f:
+                return cls.extract_port_scan_dict_results(_f, projection)
+        except OSError as e:
+            raise AppExceptions.DScanResultsParsingError(f"Could not read {path}: {str(e)}")
+
+    @classmethod
+    def iter_port_scan_results(cls, results, scan_info=None, projection=None):
+        """
+        Extracts the host results of an nmap XML document one at a time, while the document is being parsed.
+
+        Every host is parsed and converted as soon as its element ends and is then dropped from the
+        document, so consuming the results one by one needs the same memory regardless of the size of the document.
+
+        Args:
+            results (str, bytes or file): The nmap XML document or a file object opened for reading.
+            scan_info (dict, optional): Updated with the scan results without any host results, once the
+                document has been parsed.
+            projection (FieldProjection, optional): The fields of the host results to keep. The host results
+                are projected as soon as they are converted, so the dropped fields are never stored or hashed.
+
+        Yields:
+            dict: The results of every host.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the document can not be parsed.
+        """
+        _stream = NmapXMLStream()
+        try:
+            for _host in _stream.read(results):
+                yield cls._extract_host(_host) if projection is None else projection.apply(cls._extract_host(_host))
+            if _stream.nmaprun is None:
+                raise AppExceptions.DScanResultsParsingError("No nmaprun element found in the nmap output")
+        except AppExceptions.DScanResultsParsingError:
+            raise
+        except Exception as e:
+            raise AppExceptions.DScanResultsParsingError(f"{str(e)}")
+        if scan_info is not None:
+            scan_info.update(cls._extract_scan_info(_stream.nmaprun))
+
+    @classmethod
+    def extract_scan_info(cls, results):
+        """
+        Extracts the scan information (arguments, scan info, start time and run stats) of an nmap XML document.
+
+        It is meant for documents that have the `<host>` elements removed, the host results are dropped.
+
+        Args:
+            results (str): The nmap XML document.
+
+        Returns:
+            dict: The scan results without any host results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the document can not be parsed.
+        """
+        _stream = NmapXMLStream()
+        try:
+            for _ in _stream.read(results):
+                pass
+        except Exception as e:
+            raise AppExceptions.DScanResultsParsingError(f"{str(e)}")
+        if _stream.nmaprun is None:
+            raise AppExceptions.DScanResultsParsingError("No nmaprun element found in the nmap output")
+        return cls._extract_scan_info(_stream.nmaprun)
+
+    @classmethod
+    def _extract_scan_info(cls, results):
+        """
+        Builds the scan results, without any host results, from a parsed `nmaprun` element.
+
+        Args:
+            results (dict): The `nmaprun` element, as converted by `element_to_dict`.
+
+        Returns:
+            dict: The scan results with an empty list of host results.
+        """
+        try:
+            args = results["args"]
+        except KeyError:
+            args = {}
 
+        try:
+            scaninfo = results["scaninfo"]
+        except KeyError:
+            scaninfo = {}
+
+        try:
+            start = results["start"]
+        except KeyError:
+            start = {}
+
+        try:
+            runstats = results["runstats"]
+        except KeyError:
+            runstats = {}
+
+        return {
+            "results": [],
+            "args": args,
+            "scaninfo": scaninfo,
+            "start": start,
+            "runstats": runstats,
+        }
+
+    @classmethod
+    def extract_host_results(cls, host_xml, projection=None):
+        """
+        Extracts the results of a single host from a `<host>` element of the nmap XML output.
+
+        Args:
+            host_xml (str): The `<host>` element.
+            projection (FieldProjection, optional): The fields of the host results to keep.
+
+        Returns:
+            dict: The host results, in the same format as the entries of `extract_port_scan_dict_results` results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the host element can not be parsed.
+        """
+        try:
+            _hosts = list(NmapXMLStream().read(host_xml))
+            if len(_hosts) != 1:
+                raise AppExceptions.DScanResultsParsingError("The host results must have a single host element")
+            _host = cls._extract_host(_hosts[0])
+            return _host if projection is None else projection.apply(_host)
+        except AppExceptions.DScanResultsParsingError:
+            raise
+        except Exception as e:
+            raise AppExceptions.DScanResultsParsingError(f"{str(e)}")
+
+    @classmethod
+    def _extract_host(cls, host):
+        """
+        Converts a parsed nmap host to the host results format. The host is converted in place.
+
+        Args:
+            host (dict): The host, as converted by `element_to_dict`.
+
+        Returns:
+            dict: The host results.
+
+        Raises:
+            AppExceptions.DScanResultsParsingError: If the host address can not be found.
+        """
+        _h = host
+
+        try:
+            if isinstance(host["address"], list):
+                for addr in host["address"]:
+                    if addr["addrtype"] == "ipv4":
+                        _h["host"] = addr["addr"]
+                        break
+            else:
+                _h["host"] = host["address"]["addr"]
+        except (KeyError, IndexError, TypeError):
+            raise AppExceptions.DScanResultsParsingError("Could parse given host address")
+
+        _h["status"] = host["status"]["state"]
+
+        if "os" in host:
+            _os = host["os"]
             try:
-                scaninfo = results["scaninfo"]
-            except KeyError:
-                scaninfo = {}
+                _h["os"] = []
+                if isinstance(_os["osmatch"], list):
+                    for _, _match in enumerate(_os["osmatch"][:3]):
+                        # print(_match["name"])
+                        _h["os"].append(_match["name"])
+                else:
+                    _h["os"].append(_os["osmatch"]["name"])
+
+            except (KeyError, IndexError, TypeError):
+                if len(_h["os"]) == 0:
+                    _h["os"] = ["unknown"]
+                else:
+                    pass
+
+            if "osfingerprint" in _os:
+                try:
+                    _h["osfingerprint"] = _os["osfingerprint"]["fingerprint"]
+                except (KeyError, IndexError, TypeError):
+                    _h["osfingerprint"] = "none"
+            else:
+                _h["osfingerprint"] = "none"
 
+        else:
+            _h["os"] = ["unknown"]
+            _h["osfingerprint"] = "none"
+
+        if "trace" in host:
             try:
-                start = results["start"]
-            except KeyError:
-                start = {}
+                _h["hops"] = []
+                if isinstance(host["trace"]["hop"], list):
+                    for _, _hop in enumerate(host["trace"]["hop"]):
+                        _h["hops"].append(_hop["ipaddr"])
+                else:
+                    _h["hops"].append(host["trace"]["hop"]["ipaddr"])
+            except (KeyError, IndexError, TypeError):
+                if len(_h["hops"]) == 0:
+                    _h["hops"] = ["unknown"]
+                else:
+                    pass
+        else:
+            _h["hops"] = ["unknown"]
 
+        if "uptime" in host:
             try:
-                runstats = results["runstats"]
-            except KeyError:
-                runstats = {}
-
-            scan_results = {
-                "results": [],
-                "args": args,
-                "scaninfo": scaninfo,
-                "start": start,
-                "runstats": runstats,
-            }
-
-            if isinstance(results["host"], dict):
-                results["host"] = [results["host"]]
-
-            if isinstance(results["host"], list):
-                for host in results["host"]:
-                    _h = copy.deepcopy(host)
-
-                    try:
-                        if isinstance(host["address"], list):
-                            for addr in host["address"]:
-                                if addr["addrtype"] == "ipv4":
-                                    _h["host"] = addr["addr"]
-                                    break
-                        else:
-                            _h["host"] = host["address"]["addr"]
-                    except (KeyError, IndexError, TypeError):
-                        raise AppExceptions.DScanResultsParsingError("Could parse given host address")
-
-                    _h["status"] = host["status"]["state"]
-
-                    if "os" in host:
-                        try:
-                            _h["os"] = []
-                            if isinstance(host["os"]["osmatch"], list):
-                                for _, _match in enumerate(host["os"]["osmatch"][:3]):
-                                    # print(_match["name"])
-                                    _h["os"].append(_match["name"])
-                            else:
-                                _h["os"].append(host["os"]["osmatch"]["name"])
-
-                        except (KeyError, IndexError, TypeError):
-                            if len(_h["os"]) == 0:
-                                _h["os"] = ["unknown"]
-                            else:
-                                pass
-
-                        if "osfingerprint" in host["os"]:
-                            try:
-                                _h["osfingerprint"] = host["os"]["osfingerprint"]["fingerprint"]
-                            except (KeyError, IndexError, TypeError):
-                                _h["osfingerprint"] = "none"
-                        else:
-                            _h["osfingerprint"] = "none"
-
-                    else:
-                        _h["os"] = ["unknown"]
-                        _h["osfingerprint"] = "none"
-
-                    if "trace" in host:
-                        try:
-                            _h["hops"] = []
-                            if isinstance(host["trace"]["hop"], list):
-                                for _, _hop in enumerate(host["trace"]["hop"]):
-                                    _h["hops"].append(_hop["ipaddr"])
-                            else:
-                                _h["hops"].append(host["trace"]["hop"]["ipaddr"])
-                        except (KeyError, IndexError, TypeError):
-                            if len(_h["hops"]) == 0:
-                                _h["hops"] = ["unknown"]
-                            else:
-                                pass
-                    else:
-                        _h["hops"] = ["unknown"]
-
-                    if "uptime" in host:
-                        try:
-                            _h["last_boot"] = host["uptime"]["lastboot"]
-                        except (KeyError, IndexError, TypeError):
-                            _h["last_boot"] = "none"
-                    else:
-                        _h["last_boot"] = "none"
-
-                    # Remove all the fields that are not needed
-                    _h.pop("starttime", None)
-                    _h.pop("endtime", None)
-                    _h.pop("times", None)
-
-                    try:
-                        if "port" in host["ports"] and isinstance(host["ports"]["port"], list):
-                            try:
-                                _ptmp = []
-
-                                for p in _h["ports"]["port"]:
-                                    p["servicefp"] = p["service"]["servicefp"] if "service" in p and "servicefp" in p["service"] else ""
-                                    p["service_product"] = p["service"]["product"] if "service" in p and "product" in p["service"] else ""
-                                    p["service_name"] = p["service"]["name"] if "service" in p and "name" in p["service"] else ""
-                                    _ptmp.append(p)
-                                _h["ports"] = _ptmp
-                            except (KeyError, IndexError, TypeError):
-                                _h["ports"] = []
-                        elif "port" in host["ports"] and isinstance(host["ports"]["port"], dict):
-                            try:
-                                _ptmp = []
-                                p = host["ports"]["port"]
-                                p["servicefp"] = p["service"]["servicefp"] if "service" in p and "servicefp" in p["service"] else ""
-                                p["service_product"] = p["service"]["product"] if "service" in p and "product" in p["service"] else ""
-                                p["service_name"] = p["service"]["name"] if "service" in p and "name" in p["service"] else ""
-                                _ptmp.append(p)
-                                _h["ports"] = _ptmp
-                            except (KeyError, IndexError, TypeError):
-                                _h["ports"] = []
-                    except KeyError:
-                        _h["ports"] = []
-
-                    scan_results["results"].append(_h)
-            return scan_results
-        except Exception as e:
-            raise AppExceptions.DScanResultsParsingError(f"{str(e)}")
+                _h["last_boot"] = host["uptime"]["lastboot"]
+            except (KeyError, IndexError, TypeError):
+                _h["last_boot"] = "none"
+        else:
+            _h["last_boot"] = "none"
+
+        # Remove all the fields that are not needed
+        _h.pop("starttime", None)
+        _h.pop("endtime", None)
+        _h.pop("times", None)
+
+        try:
+            if "port" in host["ports"] and isinstance(host["ports"]["port"], list):
+                try:
+                    _ptmp = []
+
+                    for p in _h["ports"]["port"]:
+                        p["servicefp"] = p["service"]["servicefp"] if "service" in p and "servicefp" in p["service"] else ""
+                        p["service_product"] = p["service"]["product"] if "service" in p and "product" in p["service"] else ""
+                        p["service_name"] = p["service"]["name"] if "service" in p and "name" in p["service"] else ""
+                        _ptmp.append(p)
+                    _h["ports"] = _ptmp
+                except (KeyError, IndexError, TypeError):
+                    _h["ports"] = []
+            elif "port" in host["ports"] and isinstance(host["ports"]["port"], dict):
+                try:
+                    _ptmp = []
+                    p = host["ports"]["port"]
+                    p["servicefp"] = p["service"]["servicefp"] if "service" in p and "servicefp" in p["service"] else ""
+                    p["service_product"] = p["service"]["product"] if "service" in p and "product" in p["service"] else ""
+                    p["service_name"] = p["service"]["name"] if "service" in p and "name" in p["service"] else ""
+                    _ptmp.append(p)
+                    _h["ports"] = _ptmp
+                except (KeyError, IndexError, TypeError):
+                    _h["ports"] = []
+        except KeyError:
+            _h["ports"] = []
+
+        return _h
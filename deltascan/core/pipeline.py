@@ -0,0 +1,287 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.config import (
+    PIPELINE_QUEUE_SIZE)
+from deltascan.core.scan_queue import latency_summary
+from concurrent.futures import Future
+from collections import deque
+from queue import Queue
+from threading import Thread, Lock, Condition
+import logging
+import time
+
+# Number of service times of every stage kept in the pipeline statistics
+SERVICE_TIME_HISTORY = 1000
+
+
+class PipelineStage:
+    """
+    A stage of a pipeline: a bounded queue of items and the workers that process them.
+
+    Every worker takes an item from the queue, passes it to the function of the stage and puts the
+    returned item in the queue of the next stage. A worker blocks while the next queue is full, so a
+    slow stage holds back the stages before it instead of letting the items pile up in memory.
+    """
+    def __init__(self, name, func, workers=1, queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        Initializes a new instance of the PipelineStage class.
+
+        Args:
+            name (str): The name of the stage.
+            func (callable): Called with the data of every item. Returns the data passed to the next stage.
+            workers (int, optional): The number of threads that run the stage.
+            queue_size (int, optional): The maximum number of items that wait for the stage.
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = Queue(maxsize=max(1, queue_size))
+        self._lock = Lock()
+        self._processed = 0
+        self._failed = 0
+        self._busy = 0
+        self._max_depth = 0
+        self._busy_time = 0.0
+        self._service_times = deque(maxlen=SERVICE_TIME_HISTORY)
+
+    def put(self, item):
+        """
+        Adds an item to the queue of the stage, blocking while the queue is full.
+
+        Args:
+            item (tuple): The data and the future of the item.
+        """
+        self.queue.put(item)
+        with self._lock:
+            self._max_depth = max(self._max_depth, self.queue.qsize())
+
+    def process(self, data):
+        """
+        Runs the function of the stage and records its service time.
+
+        Args:
+            data: The data of the item.
+
+        Returns:
+            The data of the item for the next stage.
+        """
+        with self._lock:
+            self._busy += 1
+        _start = time.monotonic()
+        try:
+            _data = self.func(data)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            _elapsed = time.monotonic() - _start
+            with self._lock:
+                self._busy -= 1
+                self._busy_time += _elapsed
+                self._service_times.append(_elapsed)
+        with self._lock:
+            self._processed += 1
+        return _data
+
+    def stats(self, elapsed) -> dict:
+        """
+        Returns the statistics of the stage.
+
+        Args:
+            elapsed (float): The seconds since the pipeline started.
+
+        Returns:
+            dict: The workers, the busy workers, the current and maximum queue depth, the queue size, the
+                processed and failed items, the processed items per second and the service time in seconds.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self._max_depth,
+                "queue_size": self.queue.maxsize,
+                "processed": self._processed,
+                "failed": self._failed,
+                "throughput": round(self._processed / elapsed, 2) if elapsed > 0 else 0.0,
+                "utilization": round(self._busy_time / (elapsed * self.workers), 2) if elapsed > 0 else 0.0,
+                "service_time": latency_summary(self._service_times),
+            }
+
+
+class Pipeline:
+    """
+    Processes items through a sequence of stages that run concurrently.
+
+    Every stage has its own bounded queue and its own workers, so different items are in different stages at
+    the same time and a slow stage only delays the items behind it. An item that fails in a stage is not passed
+    to the next ones: its future gets the exception instead of the result.
+    """
+    def __init__(self, stages, workers=None, queue_size=PIPELINE_QUEUE_SIZE, logger=None):
+        """
+        Initializes a new instance of the Pipeline class.
+
+        Args:
+            stages (list): The name and the function of every stage, in order.
+            workers (dict, optional): The number of workers of every stage by name. Stages that are not given have one.
+            queue_size (int, optional): The maximum number of items that wait for every stage.
+            logger (optional): The logger to use for logging.
+        """
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        _workers = workers if workers is not None else {}
+        self.stages = [PipelineStage(_n, _f, _workers.get(_n, 1), queue_size) for _n, _f in stages]
+        self._threads = []
+        self._started_at = None
+        self._cond = Condition()
+        self._in_flight = 0
+
+    @property
+    def running(self):
+        return len(self._threads) > 0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def start(self):
+        """
+        Starts the workers of every stage.
+        """
+        if self.running:
+            return
+        self._started_at = time.monotonic()
+        for _i, _stage in enumerate(self.stages):
+            for _w in range(_stage.workers):
+                _t = Thread(target=self._run_stage, args=(_i,), name=f"deltascan-pipeline-{_stage.name}-{_w}", daemon=True)
+                _t.start()
+                self._threads.append(_t)
+
+    def stop(self):
+        """
+        Stops the workers after the items that were submitted have gone through the pipeline.
+        """
+        if not self.running:
+            return
+        for _stage in self.stages:
+            for _ in range(_stage.workers):
+                _stage.put(None)
+            # The workers of a stage exit after the items before them, so the next stage gets all its items first
+            for _t in [_t for _t in self._threads if _t.name.startswith(f"deltascan-pipeline-{_stage.name}-")]:
+                _t.join()
+        self._threads = []
+
+    def submit(self, data) -> Future:
+        """
+        Adds an item to the pipeline. Blocks while the queue of the first stage is full.
+
+        Args:
+            data: The data of the item, passed to the function of the first stage.
+
+        Returns:
+            Future: The result of the last stage, or the exception of the stage that failed.
+        """
+        self.start()
+        _future = Future()
+        with self._cond:
+            self._in_flight += 1
+        self.stages[0].put((data, _future))
+        return _future
+
+    def process(self, data):
+        """
+        Adds an item to the pipeline and waits until it has gone through it.
+
+        Args:
+            data: The data of the item.
+
+        Returns:
+            The result of the last stage.
+
+        Raises:
+            Exception: The exception of the stage that failed.
+        """
+        return self.submit(data).result()
+
+    def join(self, timeout=None) -> bool:
+        """
+        Waits until all the submitted items have gone through the pipeline.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: False if the timeout expired before the pipeline was drained.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def stats(self) -> dict:
+        """
+        Returns the statistics of every stage.
+
+        Returns:
+            dict: The items in the pipeline and, under `stages`, the statistics of every stage by name, in order.
+        """
+        _elapsed = time.monotonic() - self._started_at if self._started_at is not None else 0
+        return {
+            "in_flight": self._in_flight,
+            "stages": {_s.name: _s.stats(_elapsed) for _s in self.stages},
+        }
+
+    def _run_stage(self, idx):
+        """
+        Processes the items of a stage until the stage is stopped.
+
+        Args:
+            idx (int): The index of the stage.
+        """
+        _stage = self.stages[idx]
+        _next = self.stages[idx + 1] if idx + 1 < len(self.stages) else None
+        while True:
+            _item = _stage.queue.get()
+            if _item is None:
+                return
+            _data, _future = _item
+            try:
+                _data = _stage.process(_data)
+            except Exception as e:
+                self.logger.error(f"Pipeline stage {_stage.name} failed: {str(e)}")
+                self._finish(_future, exception=e)
+                continue
+            if _next is not None:
+                _next.put((_data, _future))
+            else:
+                self._finish(_future, result=_data)
+
+    def _finish(self, future, result=None, exception=None):
+        """
+        Completes the future of an item that left the pipeline.
+
+        Args:
+            future (Future): The future of the item.
+            result (optional): The result of the last stage.
+            exception (Exception, optional): The exception of the stage that failed.
+        """
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
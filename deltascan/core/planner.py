@@ -0,0 +1,424 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from threading import (Event, Lock)
+import ipaddress
+import logging
+import random
+
+
+def address_range(target: str):
+    """
+    Returns the range of addresses of an IP host or subnet target.
+
+    Args:
+        target (str): The target host or subnet.
+
+    Returns:
+        tuple: The IP version, the first and the last address as integers, or None if the target is a hostname.
+    """
+    try:
+        _network = ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return None
+    return (_network.version, int(_network.network_address), int(_network.broadcast_address))
+
+
+class _Node:
+    __slots__ = ("start", "end", "value", "max_end", "priority", "left", "right")
+
+    def __init__(self, start, end, value):
+        self.start = start
+        self.end = end
+        self.value = value
+        self.max_end = end
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+
+    def update(self):
+        self.max_end = max(
+            self.end,
+            self.left.max_end if self.left is not None else self.end,
+            self.right.max_end if self.right is not None else self.end)
+
+
+class IntervalTree:
+    """
+    An interval tree of closed integer intervals, kept balanced as a treap.
+
+    Every node keeps the largest end of its subtree, so the intervals that overlap a range are found
+    without visiting the subtrees that end before it.
+    """
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, start: int, end: int, value):
+        """
+        Adds an interval.
+
+        Args:
+            start (int): The first value of the interval.
+            end (int): The last value of the interval.
+            value: The value stored with the interval.
+        """
+        self._root = self._insert(self._root, _Node(start, end, value))
+        self._size += 1
+
+    def remove(self, start: int, end: int, value) -> bool:
+        """
+        Removes an interval.
+
+        Args:
+            start (int): The first value of the interval.
+            end (int): The last value of the interval.
+            value: The value stored with the interval.
+
+        Returns:
+            bool: True if the interval was found and removed.
+        """
+        _size = self._size
+        self._root = self._remove(self._root, start, end, value)
+        return self._size < _size
+
+    def overlap(self, start: int, end: int) -> list:
+        """
+        Finds the intervals that overlap a range.
+
+        Args:
+            start (int): The first value of the range.
+            end (int): The last value of the range.
+
+        Returns:
+            list: The (start, end, value) tuples of the overlapping intervals, ordered by start.
+        """
+        _found = []
+        self._overlap(self._root, start, end, _found)
+        return _found
+
+    @classmethod
+    def _insert(cls, node, new):
+        if node is None:
+            return new
+        if new.start < node.start:
+            node.left = cls._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = cls._rotate_right(node)
+        else:
+            node.right = cls._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = cls._rotate_left(node)
+        node.update()
+        return node
+
+    def _remove(self, node, start, end, value):
+        if node is None:
+            return None
+        if start < node.start:
+            node.left = self._remove(node.left, start, end, value)
+        elif start == node.start and end == node.end and node.value is value:
+            self._size -= 1
+            return self._merge(node.left, node.right)
+        elif start > node.start:
+            node.right = self._remove(node.right, start, end, value)
+        else:
+            # Rotations may move intervals with an equal start to either side
+            _size = self._size
+            node.left = self._remove(node.left, start, end, value)
+            if self._size == _size:
+                node.right = self._remove(node.right, start, end, value)
+        node.update()
+        return node
+
+    @classmethod
+    def _merge(cls, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = cls._merge(left.right, right)
+            left.update()
+            return left
+        right.left = cls._merge(left, right.left)
+        right.update()
+        return right
+
+    @classmethod
+    def _overlap(cls, node, start, end, found):
+        if node is None or node.max_end < start:
+            return
+        cls._overlap(node.left, start, end, found)
+        if node.start <= end and node.end >= start:
+            found.append((node.start, node.end, node.value))
+        if node.start <= end:
+            cls._overlap(node.right, start, end, found)
+
+    @staticmethod
+    def _rotate_right(node):
+        _left = node.left
+        node.left = _left.right
+        node.update()
+        _left.right = node
+        _left.update()
+        return _left
+
+    @staticmethod
+    def _rotate_left(node):
+        _right = node.right
+        node.right = _right.left
+        node.update()
+        _right.left = node
+        _right.update()
+        return _right
+
+
+class PlannedScan:
+    """
+    A scan known to the planner. It scans the `remainder` ranges of its target and follows the scans
+    that already cover the `covered` ranges, which pass it the hosts they find in those ranges.
+    """
+    def __init__(self, name, profile, target, host_callback=None, saved_hosts=None):
+        """
+        Initializes a new instance of the PlannedScan class.
+
+        Args:
+            name (str): The name of the scan.
+            profile (str): The profile of the scan.
+            target (str): The target host or subnet.
+            host_callback (callable, optional): Called with the results of every host found by the followed scans.
+            saved_hosts (callable, optional): Returns the results of the hosts that the scan has saved so far.
+                They are passed to the scans that start following it after it found them.
+        """
+        self.name = name
+        self.profile = profile
+        self.target = target
+        self.host_callback = host_callback
+        self.saved_hosts = saved_hosts
+        _range = address_range(target)
+        self.version = _range[0] if _range is not None else None
+        # Address ranges this scan probes itself. None for hostnames, which are not coalesced
+        self.remainder = [_range[1:]] if _range is not None else None
+        self.covered = []
+        self.leaders = []
+        self.followers = []
+        # The addresses of the hosts passed to the host callback, which may be both saved and published by a leader
+        self._delivered = set()
+        self._delivered_lock = Lock()
+        self.done = Event()
+        self.success = None
+
+    @property
+    def coalesced(self):
+        return len(self.covered) > 0
+
+    @property
+    def has_remainder(self):
+        return self.remainder is None or len(self.remainder) > 0
+
+    def covered_networks(self) -> list:
+        """
+        Returns:
+            list: The networks of the target that are scanned by other scans.
+        """
+        _networks = []
+        for _first, _last in self.covered:
+            _networks.extend(ipaddress.summarize_address_range(
+                ipaddress.ip_address(_first), ipaddress.ip_address(_last)))
+        return _networks
+
+    def deliver(self, host_result):
+        """
+        Passes the results of a host found by a followed scan to the host callback, once for every host.
+        A failing callback is logged, so that it does not stop the followed scan.
+
+        Args:
+            host_result (dict): The host results.
+        """
+        if self.host_callback is None:
+            return
+        with self._delivered_lock:
+            if host_result.get("host") in self._delivered:
+                return
+            self._delivered.add(host_result.get("host"))
+        try:
+            self.host_callback(host_result)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Could not handle host result of {self.name}: {str(e)}")
+
+
+class ScanPlanner:
+    """
+    Coalesces scans of the same profile whose targets overlap.
+
+    The address ranges of the pending and running scans are kept in an interval tree per profile.
+    A new scan probes only the parts of its target that no other scan covers. The scans that cover
+    the rest pass it every host they find there, so it still stores complete results.
+
+    The host results are not kept by the planner. The hosts that a scan found before another scan started
+    following it are read back from the hosts that it saved.
+    """
+    def __init__(self):
+        self._trees = {}
+        self._lock = Lock()
+
+    def plan(self, name, profile, target, host_callback=None, saved_hosts=None) -> PlannedScan:
+        """
+        Plans a new scan. Its target is split in the ranges that running or pending scans of the same profile
+        already cover and the ranges that it has to scan itself. The hosts that the covering scans have
+        already saved are passed to `host_callback` before returning.
+
+        Args:
+            name (str): The name of the scan.
+            profile (str): The profile of the scan.
+            target (str): The target host or subnet.
+            host_callback (callable, optional): Called with the results of every host found by the covering scans.
+            saved_hosts (callable, optional): Returns the results of the hosts that the scan has saved so far.
+
+        Returns:
+            PlannedScan: The planned scan. `finish` must be called when it ends.
+        """
+        _scan = PlannedScan(name, profile, target, host_callback, saved_hosts)
+        if _scan.remainder is None:
+            return _scan
+
+        _first, _last = _scan.remainder[0]
+        _followed = []
+        with self._lock:
+            _tree = self._trees.setdefault((profile, _scan.version), IntervalTree())
+            _remainder = []
+            _cursor = _first
+            # The intervals of a tree never overlap, so every covered range has a single leader
+            for _start, _end, _leader in _tree.overlap(_first, _last):
+                if _start > _cursor:
+                    _remainder.append((_cursor, _start - 1))
+                _covered = (max(_start, _first), min(_end, _last))
+                _scan.covered.append(_covered)
+                if _leader not in _scan.leaders:
+                    _scan.leaders.append(_leader)
+                _leader.followers.append((_covered, _scan))
+                _followed.append((_leader, _covered))
+                _cursor = _covered[1] + 1
+            if _cursor <= _last:
+                _remainder.append((_cursor, _last))
+            _scan.remainder = _remainder
+            for _start, _end in _remainder:
+                _tree.insert(_start, _end, _scan)
+
+        # While it runs, a leader saves every host before it publishes it. Once the scan follows the leader,
+        # the hosts that the leader has not saved yet are published to the scan, so reading them back misses none
+        for _leader, _covered in _followed:
+            if _leader.saved_hosts is None:
+                continue
+            try:
+                _saved = _leader.saved_hosts()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Could not read the hosts that {_leader.name} saved: {str(e)}")
+                continue
+            for _r in _saved:
+                if self._in_range(_r, _covered):
+                    _scan.deliver(_r)
+        return _scan
+
+    def publish(self, scan: PlannedScan, host_results: list):
+        """
+        Passes the hosts found by a scan to the scans that follow it.
+
+        Args:
+            scan (PlannedScan): The scan that found the hosts.
+            host_results (list): The results of the hosts.
+        """
+        if scan.remainder is None:
+            return
+        with self._lock:
+            if scan.done.is_set():
+                return
+            _deliveries = [(_f, _r) for _r in host_results for _range, _f in scan.followers if self._in_range(_r, _range)]
+        for _follower, _r in _deliveries:
+            _follower.deliver(_r)
+
+    def retire(self, scan: PlannedScan):
+        """
+        Stops new scans from following a scan whose own nmap scan has ended. It is called before the last hosts
+        of the scan are published, which are not saved first, so a scan that started following it afterwards
+        would miss them. The scans that already follow it are not affected.
+
+        Args:
+            scan (PlannedScan): The scan.
+        """
+        with self._lock:
+            self._remove(scan)
+
+    def finish(self, scan: PlannedScan, success: bool):
+        """
+        Removes a scan from the planner and wakes up the scans that follow it.
+
+        Args:
+            scan (PlannedScan): The scan.
+            success (bool): True if the scan finished with complete results.
+        """
+        with self._lock:
+            self._remove(scan)
+            scan.success = success
+            scan.followers = []
+            scan.done.set()
+
+    def _remove(self, scan: PlannedScan):
+        """
+        Removes the ranges of a scan from the interval tree of its profile. It must be called with the lock held.
+
+        Args:
+            scan (PlannedScan): The scan.
+        """
+        _tree = self._trees.get((scan.profile, scan.version))
+        if scan.remainder is not None and _tree is not None:
+            for _start, _end in scan.remainder:
+                _tree.remove(_start, _end, scan)
+            if len(_tree) == 0:
+                del self._trees[(scan.profile, scan.version)]
+
+    @staticmethod
+    def wait(scan: PlannedScan, cancel_evt=None, interval=0.2) -> bool:
+        """
+        Waits until the scans that a scan follows have finished.
+
+        Args:
+            scan (PlannedScan): The following scan.
+            cancel_evt (Event, optional): The event that stops waiting.
+            interval (float, optional): The number of seconds between two checks of the cancel event.
+
+        Returns:
+            bool: True if all the followed scans finished with complete results, False if any of them did not
+                or if waiting was cancelled.
+        """
+        for _leader in scan.leaders:
+            while not _leader.done.wait(interval):
+                if cancel_evt is not None and cancel_evt.is_set():
+                    return False
+        return all([_leader.success is True for _leader in scan.leaders])
+
+    @staticmethod
+    def _in_range(host_result, address_range) -> bool:
+        try:
+            _address = int(ipaddress.ip_address(host_result.get("host")))
+        except (ValueError, TypeError):
+            return False
+        return address_range[0] <= _address <= address_range[1]
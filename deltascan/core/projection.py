@@ -0,0 +1,209 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from deltascan.core.exceptions import (AppExceptions)
+import copy
+import json
+
+# Fields that identify a host or a port. They are always kept and can not be dropped
+HOST_KEYS = ("host", "status", "ports")
+PORT_KEYS = ("protocol", "portid", "state")
+# Fields that every host and port result must have. Dropping one of them resets it to the value that
+# the parser gives when nmap does not report it, so that projected results still pass the scan schema
+HOST_DEFAULTS = {"os": ["unknown"], "osfingerprint": "none", "hops": ["unknown"], "last_boot": "none"}
+PORT_DEFAULTS = {"servicefp": "", "service_product": "", "service_name": ""}
+
+
+def _path_tree(paths: list) -> dict:
+    """
+    Builds a tree of field names from dotted field paths, e.g. `ports.service.cpe`.
+
+    Args:
+        paths (list): The field paths.
+
+    Returns:
+        dict: The fields of every level. A field without children selects the whole field.
+
+    Raises:
+        AppExceptions.DScanInputValidationException: If a path is not a dotted field path.
+    """
+    _tree = {}
+    for _path in paths:
+        if not isinstance(_path, str) or any([_f == "" for _f in _path.split(".")]):
+            raise AppExceptions.DScanInputValidationException(f"Invalid field path: {_path}")
+        _node = _tree
+        for _field in _path.split("."):
+            _node = _node.setdefault(_field, {})
+    return _tree
+
+
+def _level(field, level):
+    """
+    Returns the level of the fields under a field of the results: `port` under the ports of a host, else None.
+    """
+    if level == "host" and field == "ports":
+        return "port"
+    return None
+
+
+class FieldProjection:
+    """
+    The fields of the host results that a profile keeps.
+
+    The fields are dotted paths into a host result, e.g. `osfingerprint`, `ports.servicefp` or
+    `ports.service.cpe`, where a list, like the ports, stands for every one of its items. If fields to keep
+    are given, every other field of their level is removed, except the fields that identify a host or a port
+    and the fields that the scan schema requires. The fields to drop are removed afterwards, and required
+    fields are reset to the value that the parser gives when nmap does not report them.
+
+    Projecting results twice gives the same results as projecting them once.
+
+    The nmap output format that the results are taken from is part of the projection when it is not the XML
+    output, since the other formats report fewer fields. Results of different formats are then never compared.
+    """
+
+    def __init__(self, keep=None, drop=None, output=None):
+        """
+        Initializes a new instance of the FieldProjection class.
+
+        Args:
+            keep (list, optional): The field paths to keep.
+            drop (list, optional): The field paths to drop.
+            output (str, optional): The nmap output format that the results are taken from, None for the XML output.
+
+        Raises:
+            AppExceptions.DScanInputValidationException: If a path is invalid or drops a field that identifies
+                a host or a port.
+        """
+        self.keep = sorted(set(keep if keep is not None else []))
+        self.drop = sorted(set(drop if drop is not None else []))
+        self.output = output
+        self._keep_tree = _path_tree(self.keep)
+        self._drop_tree = _path_tree(self.drop)
+        for _path in self.drop:
+            if _path in HOST_KEYS or (_path.startswith("ports.") and _path[len("ports."):] in PORT_KEYS):
+                raise AppExceptions.DScanInputValidationException(f"The field {_path} can not be dropped")
+
+    @classmethod
+    def from_config(cls, fields, output=None):
+        """
+        Creates the projection of the `fields` option of a profile.
+
+        Args:
+            fields (dict): The `keep` and `drop` lists of field paths, or None.
+            output (str, optional): The nmap output format that the results are taken from, None for the XML output.
+
+        Returns:
+            FieldProjection: The projection, or None if the option does not project any field and the results
+                are taken from the XML output.
+
+        Raises:
+            AppExceptions.DScanInputValidationException: If the option is invalid.
+        """
+        if fields is None:
+            return cls(output=output) if output is not None else None
+        if not isinstance(fields, dict) or any([_k not in ["keep", "drop"] for _k in fields]) or \
+                any([not isinstance(_v, list) for _v in fields.values() if _v is not None]):
+            raise AppExceptions.DScanInputValidationException(f"Invalid fields option: {fields}")
+        _projection = cls(fields.get("keep"), fields.get("drop"), output)
+        return _projection if _projection.spec is not None else None
+
+    @property
+    def spec(self):
+        """
+        The canonical JSON of the projection, recorded with every scan that it is applied to.
+
+        Returns:
+            str: The kept and dropped field paths and the output format if it is not the XML output, or None
+                if the projection does not project any field of the XML output.
+        """
+        if len(self.keep) == 0 and len(self.drop) == 0 and self.output is None:
+            return None
+        _spec = {"keep": self.keep, "drop": self.drop}
+        if self.output is not None:
+            _spec["output"] = self.output
+        return json.dumps(_spec, sort_keys=True)
+
+    def apply(self, host: dict) -> dict:
+        """
+        Projects the results of a host. The results are projected in place.
+
+        Args:
+            host (dict): The host results.
+
+        Returns:
+            dict: The projected host results.
+        """
+        if len(self._keep_tree) > 0:
+            self._keep(host, self._keep_tree, "host")
+        if len(self._drop_tree) > 0:
+            self._drop(host, self._drop_tree, "host")
+        return host
+
+    @classmethod
+    def _keep(cls, node, tree, level=None):
+        """
+        Removes the fields of a node that are not in the tree, except the fields that its level requires.
+
+        Args:
+            node: The node of the results.
+            tree (dict): The fields to keep of the node.
+            level (str, optional): The level of the node, `host` or `port`.
+        """
+        if isinstance(node, list):
+            for _item in node:
+                cls._keep(_item, tree, level)
+            return
+        if not isinstance(node, dict):
+            return
+        _required = ()
+        if level == "host":
+            _required = HOST_KEYS + tuple(HOST_DEFAULTS)
+        elif level == "port":
+            _required = PORT_KEYS + tuple(PORT_DEFAULTS)
+        for _field in list(node):
+            if _field in tree:
+                if len(tree[_field]) > 0:
+                    cls._keep(node[_field], tree[_field], _level(_field, level))
+            elif _field not in _required:
+                del node[_field]
+
+    @classmethod
+    def _drop(cls, node, tree, level=None):
+        """
+        Removes the fields of a node that are leaves of the tree, or resets them if their level requires them.
+
+        Args:
+            node: The node of the results.
+            tree (dict): The fields to drop of the node.
+            level (str, optional): The level of the node, `host` or `port`.
+        """
+        if isinstance(node, list):
+            for _item in node:
+                cls._drop(_item, tree, level)
+            return
+        if not isinstance(node, dict):
+            return
+        _defaults = HOST_DEFAULTS if level == "host" else PORT_DEFAULTS if level == "port" else {}
+        for _field, _subtree in tree.items():
+            if _field not in node:
+                continue
+            if len(_subtree) > 0:
+                cls._drop(node[_field], _subtree, _level(_field, level))
+            elif _field in _defaults:
+                node[_field] = copy.copy(_defaults[_field])
+            else:
+                del node[_field]
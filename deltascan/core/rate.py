@@ -0,0 +1,270 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from deltascan.core.config import (
+    MAX_RATE,
+    MIN_SCAN_RATE,
+    RATE_CONTROL_INTERVAL)
+from threading import Condition
+import re
+import time
+
+MAX_RATE_RE = re.compile(r"--max-rate[ =](\d+(?:\.\d+)?)")
+# Weight of the newest progress rate sample in the moving average of a scan
+PROGRESS_RATE_WEIGHT = 0.3
+# A scan is stalled when its progress rate falls below this fraction of its best progress rate
+STALL_RATIO = 0.5
+
+
+def with_max_rate(scan_args: str, rate) -> str:
+    """
+    Limits the packet rate of nmap arguments. An existing, lower `--max-rate` is kept.
+
+    Args:
+        scan_args (str): The nmap arguments.
+        rate (int): The maximum packets per second. None leaves the arguments unchanged.
+
+    Returns:
+        str: The nmap arguments with the packet rate limit.
+    """
+    if rate is None or scan_args is None:
+        return scan_args
+    _match = MAX_RATE_RE.search(scan_args)
+    if _match is None:
+        return f"{scan_args} --max-rate {int(rate)}"
+    if float(_match.group(1)) <= rate:
+        return scan_args
+    return scan_args[:_match.start()] + f"--max-rate {int(rate)}" + scan_args[_match.end():]
+
+
+def split_max_rate(scan_args: str, parts: int) -> str:
+    """
+    Splits the `--max-rate` of nmap arguments between scans that run at the same time.
+
+    Args:
+        scan_args (str): The nmap arguments.
+        parts (int): The number of concurrent scans.
+
+    Returns:
+        str: The nmap arguments with the packet rate of a single scan.
+    """
+    _match = MAX_RATE_RE.search(scan_args) if scan_args is not None else None
+    if _match is None or parts <= 1:
+        return scan_args
+    _rate = max(1, int(float(_match.group(1)) / parts))
+    return scan_args[:_match.start()] + f"--max-rate {_rate}" + scan_args[_match.end():]
+
+
+def show_allocation(ui_context, name, allocation: str):
+    """
+    Shows the packet rate allocation of a scan next to its progress bar, if the UI is available.
+
+    Args:
+        ui_context (dict): The UI context.
+        name (str): The name of the scan.
+        allocation (str): The allocation to show.
+    """
+    if ui_context is None:
+        return
+    if ui_context.get("ui_status") is not None:
+        ui_context["ui_status"].publish(name, description=allocation)
+        return
+    if "ui_instances" not in ui_context:
+        return
+    try:
+        _bar = ui_context["ui_instances"]["progress_bar"][str(name)]
+        _bar["instance"].update(_bar["id"], description=allocation)
+    except KeyError:
+        return
+
+
+class RateController:
+    """
+    Splits a global packet rate budget between the scans that run at the same time.
+
+    Every scan acquires a share of the budget before it starts and passes it to nmap as `--max-rate`.
+    Nmap can not change its rate while it runs, so the controller adapts the number of scans that may
+    run at the same time instead (additive increase, multiplicative decrease):
+
+    - When most of the running scans progress at less than half of their best observed rate, the
+      network is considered saturated and the number of concurrent scans is halved.
+    - When the running scans progress normally and scans are waiting, one more scan is allowed.
+
+    A scan that starts when the limit is lower gets a larger share, so fewer scans do not leave the
+    budget unused. A budget of 0 disables rate limiting, but the scans are still tracked for the stats.
+    """
+
+    def __init__(self, max_rate=MAX_RATE, min_scan_rate=MIN_SCAN_RATE, interval=RATE_CONTROL_INTERVAL, initial_limit=None):
+        """
+        Initializes a new instance of the RateController class.
+
+        Args:
+            max_rate (int, optional): The packets per second shared by all the scans. 0 disables the controller.
+            min_scan_rate (int, optional): The minimum packets per second of a single scan.
+            interval (float, optional): The minimum number of seconds between two concurrency adjustments.
+            initial_limit (int, optional): The initial number of concurrent scans. Defaults to the maximum.
+        """
+        self.max_rate = max_rate if max_rate is not None else 0
+        self.min_scan_rate = max(1, min_scan_rate if min_scan_rate is not None else MIN_SCAN_RATE)
+        self.interval = interval
+        self._max_limit = max(1, int(self.max_rate // self.min_scan_rate))
+        self._limit = self._max_limit if initial_limit is None else max(1, min(initial_limit, self._max_limit))
+        self._scans = {}
+        self._waiting = []
+        self._last_adjustment = time.monotonic()
+        self._adjustments = {"increased": 0, "decreased": 0}
+        self._condition = Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    def acquire(self, name, cancel_evt=None):
+        """
+        Waits until the scan can start and allocates its packet rate.
+
+        Args:
+            name (str): The name of the scan.
+            cancel_evt (Event, optional): The cancel event of the scan, which stops the waiting.
+
+        Returns:
+            int: The packets per second of the scan, None if rate limiting is disabled or -1 if the scan was cancelled.
+        """
+        with self._condition:
+            if self.enabled is False:
+                self._scans[name] = self._new_scan(None)
+                return None
+
+            self._waiting.append(name)
+            try:
+                while True:
+                    if cancel_evt is not None and cancel_evt.is_set():
+                        return -1
+                    _rate = self._available_rate()
+                    if self._waiting[0] == name and len(self._scans) < self._limit and _rate >= self.min_scan_rate:
+                        break
+                    self._condition.wait(0.5)
+            finally:
+                self._waiting.remove(name)
+                self._condition.notify_all()
+
+            self._scans[name] = self._new_scan(_rate)
+            return _rate
+
+    def release(self, name):
+        """
+        Releases the packet rate of a finished scan.
+
+        Args:
+            name (str): The name of the scan.
+        """
+        with self._condition:
+            self._scans.pop(name, None)
+            self._condition.notify_all()
+
+    def report_progress(self, name, progress):
+        """
+        Records the progress of a scan and adjusts the number of concurrent scans.
+
+        Args:
+            name (str): The name of the scan.
+            progress (int): The progress percentage of the current nmap task.
+        """
+        with self._condition:
+            _scan = self._scans.get(name)
+            if _scan is None:
+                return
+            _now = time.monotonic()
+            if progress > _scan["progress"] and _now > _scan["updated_at"]:
+                _rate = (progress - _scan["progress"]) / (_now - _scan["updated_at"])
+                _scan["progress_rate"] = _rate if _scan["progress_rate"] is None else \
+                    PROGRESS_RATE_WEIGHT * _rate + (1 - PROGRESS_RATE_WEIGHT) * _scan["progress_rate"]
+                _scan["best_progress_rate"] = max(_scan["best_progress_rate"], _scan["progress_rate"])
+            # A new nmap task starts from 0, so its rate is measured from its first report
+            _scan["progress"] = progress
+            _scan["updated_at"] = _now
+            self._adjust(_now)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The budget, the concurrency limit and the allocation of every running scan.
+        """
+        with self._condition:
+            return {
+                "max_rate": self.max_rate,
+                "allocated_rate": sum([_s["rate"] for _s in self._scans.values() if _s["rate"] is not None]),
+                "limit": self._limit if self.enabled else None,
+                "active": len(self._scans),
+                "waiting": list(self._waiting),
+                "adjustments": dict(self._adjustments),
+                "scans": {
+                    _n: {
+                        "rate": _s["rate"],
+                        "progress": _s["progress"],
+                        "progress_rate": round(_s["progress_rate"], 3) if _s["progress_rate"] is not None else None,
+                        "stalled": self._is_stalled(_s),
+                    } for _n, _s in self._scans.items()
+                },
+            }
+
+    def _new_scan(self, rate):
+        return {
+            "rate": rate,
+            "progress": 0,
+            "progress_rate": None,
+            "best_progress_rate": 0,
+            "updated_at": time.monotonic(),
+        }
+
+    def _available_rate(self):
+        """
+        Returns:
+            int: The packet rate a new scan would get: an equal share of the budget for the current limit,
+                reduced to what the running scans leave unused.
+        """
+        _allocated = sum([_s["rate"] for _s in self._scans.values() if _s["rate"] is not None])
+        return int(min(self.max_rate / self._limit, self.max_rate - _allocated))
+
+    @staticmethod
+    def _is_stalled(scan):
+        return scan["progress_rate"] is not None and scan["progress_rate"] < STALL_RATIO * scan["best_progress_rate"]
+
+    def _adjust(self, now):
+        """
+        Adapts the number of concurrent scans to the observed progress of the running scans.
+
+        Args:
+            now (float): The current monotonic time.
+        """
+        if self.enabled is False or now - self._last_adjustment < self.interval:
+            return
+        _measured = [_s for _s in self._scans.values() if _s["progress_rate"] is not None]
+        if len(_measured) == 0:
+            return
+        self._last_adjustment = now
+
+        _stalled = len([_s for _s in _measured if self._is_stalled(_s)])
+        if _stalled * 2 > len(_measured) and self._limit > 1:
+            self._limit = max(1, self._limit // 2)
+            self._adjustments["decreased"] += 1
+            # Measure again from the new state
+            for _s in self._scans.values():
+                _s["best_progress_rate"] = _s["progress_rate"] if _s["progress_rate"] is not None else 0
+        elif _stalled == 0 and len(self._waiting) > 0 and self._limit < self._max_limit:
+            self._limit += 1
+            self._adjustments["increased"] += 1
+            self._condition.notify_all()
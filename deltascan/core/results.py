@@ -0,0 +1,245 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.exceptions import (AppExceptions)
+import json
+import sys
+
+# The key orders of the converted dictionaries. Results of the same scan share a few orders
+_KEY_ORDERS = {}
+
+
+def intern_value(value):
+    """
+    Interns a string, so that all the equal values share one object.
+
+    Args:
+        value: The value to intern.
+
+    Returns:
+        The interned string, or the value as it is if it is not a string.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _key_order(keys) -> tuple:
+    """
+    Returns the shared tuple of a sequence of keys.
+
+    Args:
+        keys (iterable): The keys of a dictionary.
+
+    Returns:
+        tuple: The keys, shared by all the dictionaries with the same keys in the same order.
+    """
+    _keys = tuple(keys)
+    return _KEY_ORDERS.setdefault(_keys, _keys)
+
+
+class _ResultModel:
+    """
+    The base of the typed results. The known fields are slots and any other key of the result is kept
+    as it is in `extra`. The order of the keys is kept, so the conversion back to a dictionary is lossless.
+    """
+    __slots__ = ("extra", "_keys")
+    FIELDS = ()
+    INTERNED = ()
+
+    def __init__(self, extra=None, **values):
+        for _field in self.FIELDS:
+            _value = values.pop(_field, None)
+            setattr(self, _field, intern_value(_value) if _field in self.INTERNED else _value)
+        if len(values) > 0:
+            raise TypeError(f"{type(self).__name__} got unexpected fields: {', '.join(values)}")
+        self.extra = extra if extra is not None else {}
+        self._keys = None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Creates the typed result of a result dictionary. The values of the unknown keys are not copied.
+
+        Args:
+            data (dict): The result dictionary.
+
+        Returns:
+            The typed result.
+
+        Raises:
+            AppExceptions.DScanResultsSchemaException: If the result is not a dictionary.
+        """
+        if not isinstance(data, dict):
+            raise AppExceptions.DScanResultsSchemaException(f"Invalid {cls.__name__} results: {data!r}")
+        _values = {}
+        _extra = {}
+        for _key, _value in data.items():
+            if _key in cls.FIELDS:
+                _values[_key] = _value
+            else:
+                _extra[_key] = _value
+        _result = cls(extra=_extra, **_values)
+        _result._keys = _key_order(data.keys())
+        return _result
+
+    def to_dict(self) -> dict:
+        """
+        Converts the typed result to the result dictionary that it was created from.
+
+        Returns:
+            dict: The result dictionary.
+        """
+        _keys = self._keys
+        if _keys is None:
+            _keys = [_f for _f in self.FIELDS if getattr(self, _f) is not None] + list(self.extra)
+        return {_key: self._dump(_key, getattr(self, _key)) if _key in self.FIELDS else self.extra[_key] for _key in _keys}
+
+    @classmethod
+    def from_json(cls, data: str):
+        """
+        Creates the typed result of a JSON result.
+
+        Args:
+            data (str): The JSON result.
+
+        Returns:
+            The typed result.
+        """
+        return cls.from_dict(json.loads(data))
+
+    def to_json(self) -> str:
+        """
+        Serializes the result as the store does, with sorted keys.
+
+        Returns:
+            str: The JSON result.
+        """
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def _dump(self, key, value):
+        return value
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ServiceInfo(_ResultModel):
+    """
+    The service of a port, as detected by nmap.
+    """
+    __slots__ = ("name", "product", "version", "extrainfo", "method", "conf", "servicefp")
+    FIELDS = __slots__
+    INTERNED = ("name", "product", "version", "extrainfo", "method", "conf")
+
+
+class PortResult(_ResultModel):
+    """
+    The results of a port. The `state` dictionary of the port is flattened to `state`, `reason`,
+    `reason_ttl` and `reason_ip`.
+    """
+    __slots__ = ("protocol", "portid", "state", "reason", "reason_ttl", "reason_ip", "service",
+                 "service_name", "servicefp", "service_product", "_state_keys")
+    FIELDS = ("protocol", "portid", "state", "service", "service_name", "servicefp", "service_product")
+    STATE_FIELDS = ("state", "reason", "reason_ttl", "reason_ip")
+    INTERNED = ("protocol", "portid", "service_name", "service_product")
+
+    def __init__(self, extra=None, reason=None, reason_ttl=None, reason_ip=None, **values):
+        super().__init__(extra, **values)
+        self.reason = intern_value(reason)
+        self.reason_ttl = intern_value(reason_ttl)
+        self.reason_ip = reason_ip
+        self._state_keys = None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Creates the typed result of a port result dictionary. The values of the unknown keys are not copied.
+
+        Args:
+            data (dict): The port result dictionary.
+
+        Returns:
+            PortResult: The typed port result.
+
+        Raises:
+            AppExceptions.DScanResultsSchemaException: If the port or its state are not dictionaries or
+                the state has unknown keys.
+        """
+        _state = data.get("state") if isinstance(data, dict) else None
+        if _state is not None and (not isinstance(_state, dict) or any([_k not in cls.STATE_FIELDS for _k in _state])):
+            raise AppExceptions.DScanResultsSchemaException(f"Invalid port state: {_state!r}")
+        if isinstance(data, dict) and data.get("service") is not None:
+            data = dict(data, service=ServiceInfo.from_dict(data["service"]))
+        _result = super().from_dict(data)
+        if _state is not None:
+            for _key in cls.STATE_FIELDS:
+                setattr(_result, _key, intern_value(_state.get(_key)))
+            _result._state_keys = _key_order(_state.keys())
+        return _result
+
+    def _dump(self, key, value):
+        if key == "state":
+            _keys = self._state_keys
+            if _keys is None:
+                _keys = [_f for _f in self.STATE_FIELDS if getattr(self, _f) is not None]
+            return {_k: getattr(self, _k) for _k in _keys}
+        if key == "service" and value is not None:
+            return value.to_dict()
+        return value
+
+
+class HostResult(_ResultModel):
+    """
+    The results of a host, as the parser extracts them and the store saves them.
+    """
+    __slots__ = ("host", "status", "ports", "os", "hops", "osfingerprint", "last_boot")
+    FIELDS = __slots__
+    INTERNED = ("status",)
+
+    def __init__(self, extra=None, **values):
+        super().__init__(extra, **values)
+        if self.os is not None:
+            self.os = [intern_value(_os) for _os in self.os]
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Creates the typed result of a host result dictionary. The values of the unknown keys are not copied.
+
+        Args:
+            data (dict): The host result dictionary.
+
+        Returns:
+            HostResult: The typed host result.
+
+        Raises:
+            AppExceptions.DScanResultsSchemaException: If the host is not a dictionary or its ports are not a list.
+        """
+        if isinstance(data, dict) and "ports" in data:
+            if not isinstance(data["ports"], list):
+                raise AppExceptions.DScanResultsSchemaException(f"Invalid host ports: {data['ports']!r}")
+            data = dict(data, ports=[PortResult.from_dict(_p) for _p in data["ports"]])
+        return super().from_dict(data)
+
+    def _dump(self, key, value):
+        if key == "ports" and value is not None:
+            return [_p.to_dict() for _p in value]
+        return value
@@ -0,0 +1,319 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from deltascan.core.batching import (ScanBatcher, is_batchable)
+from deltascan.core.exceptions import AppExceptions
+from deltascan.core.config import (
+    MAX_QUEUED_SCANS,
+    SCAN_PRIORITIES,
+    DEFAULT_PRIORITY,
+    PRIORITY_AGING)
+from collections import deque
+from threading import Condition
+import time
+
+# Number of enqueue to start latencies kept in the queue statistics
+LATENCY_HISTORY = 1000
+
+
+class ScanQueue:
+    """
+    The scans that wait for a worker to run them.
+
+    Scans of a higher priority start first. A scan that has waited `aging` seconds is treated as one
+    priority higher for every `aging` seconds it waits, so that a long queue of urgent scans can not
+    starve the rest. Scans of the same priority are shared fairly between their shares (the submitter
+    of the scan or else its profile): the share that has started the fewest scans, relative to its
+    weight, goes next, and the scans of a share start in the order they were added.
+
+    Single host scans that can be batched wait in the batcher until their batch is ready. Workers block
+    on the condition of the queue until a scan or a batch is ready, or the queue is closed, so that no
+    thread polls for work.
+    """
+    def __init__(self, max_size=MAX_QUEUED_SCANS, batcher=None, aging=PRIORITY_AGING):
+        """
+        Initializes a new instance of the ScanQueue class.
+
+        Args:
+            max_size (int, optional): The maximum number of queued scans. 0 does not limit the queue.
+            batcher (ScanBatcher, optional): Groups the single host scans of the same profile. Scans are not
+                batched if not given.
+            aging (float, optional): The seconds after which a queued scan is treated as one priority higher.
+                0 disables it.
+        """
+        self.max_size = max_size
+        self.batcher = batcher if batcher is not None else ScanBatcher(max_batch_size=1)
+        self.aging = aging
+        self.cond = Condition()
+        # The queued scans of every priority and share. Every entry is a list of scans that run together
+        self._levels = {_p: {} for _p in SCAN_PRIORITIES}
+        # The virtual time of every share: the scans it has started, divided by its weight
+        self._passes = {_p: {} for _p in SCAN_PRIORITIES}
+        self._running = 0
+        self._closed = False
+        self._started = 0
+        self._rejected = 0
+        self._promoted = 0
+        self._latencies = deque(maxlen=LATENCY_HISTORY)
+        self._latencies_by_priority = {_p: deque(maxlen=LATENCY_HISTORY) for _p in SCAN_PRIORITIES}
+
+    @property
+    def queued(self):
+        return len(self._queued_scans()) + self.batcher.pending
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def idle(self):
+        return self.queued == 0 and self._running == 0
+
+    def _queued_scans(self) -> list:
+        return [_s for _shares in self._levels.values() for _q in _shares.values() for _scans in _q for _s in _scans]
+
+    def scans(self) -> list:
+        """
+        Returns the queued scans.
+
+        Returns:
+            list: The scans that have not started yet, in the order they were added.
+        """
+        with self.cond:
+            _scans = self._queued_scans() + self.batcher.scans
+        return sorted(_scans, key=lambda _s: _s["queued_at"])
+
+    def put(self, scan: dict, timeout=0):
+        """
+        Adds a scan to the queue. If the queue is full, waits for a queued scan to start.
+
+        Args:
+            scan (dict): The scan, with its host, profile, name, job and deadline and optionally its priority,
+                share and weight.
+            timeout (float, optional): The seconds to wait for room in a full queue.
+
+        Raises:
+            AppExceptions.DScanInputValidationException: If the priority of the scan is unknown.
+            AppExceptions.DScanQueueFullException: If the queue is still full after `timeout` seconds.
+        """
+        scan["priority"] = scan.get("priority") if scan.get("priority") is not None else DEFAULT_PRIORITY
+        if scan["priority"] not in SCAN_PRIORITIES:
+            raise AppExceptions.DScanInputValidationException(
+                f"Invalid priority {scan['priority']}, use one of {', '.join(SCAN_PRIORITIES)}")
+        scan["share"] = scan.get("share") if scan.get("share") is not None else scan["profile"]
+        scan["weight"] = scan.get("weight") if scan.get("weight") is not None else 1
+
+        _until = time.monotonic() + (timeout if timeout is not None else 0)
+        with self.cond:
+            while self.max_size is not None and self.max_size > 0 and self.queued >= self.max_size:
+                _left = _until - time.monotonic()
+                if _left <= 0:
+                    self._rejected += 1
+                    raise AppExceptions.DScanQueueFullException(
+                        f"Scan queue is full ({self.max_size} scans), scan {scan['name']} was not added")
+                self.cond.wait(_left)
+            scan["queued_at"] = time.monotonic()
+            if self.batcher.enabled and is_batchable(scan):
+                self.batcher.add(scan, scan["queued_at"])
+            else:
+                self._push([scan])
+            self.cond.notify_all()
+
+    def _push(self, scans: list):
+        """
+        Adds a list of scans that run together to the queue of their priority and share.
+
+        Args:
+            scans (list): The scans, all of the same priority and share.
+        """
+        _priority = scans[0]["priority"]
+        _share = scans[0]["share"]
+        _shares = self._levels[_priority]
+        if _share not in _shares:
+            # A share that becomes active starts from the least virtual time of the active shares,
+            # so that it can not save up the time it was idle and then hold the workers
+            _active = [self._passes[_priority].get(_s, 0) for _s in _shares.keys()]
+            self._passes[_priority][_share] = max(
+                self._passes[_priority].get(_share, 0), min(_active) if len(_active) > 0 else 0)
+            _shares[_share] = deque()
+        _shares[_share].append(scans)
+
+    def _pop(self, now: float):
+        """
+        Takes the next scans to run: the highest priority after aging and, in that priority, the share with
+        the least virtual time.
+
+        Args:
+            now (float): The current monotonic time in seconds.
+
+        Returns:
+            list: The scans to run together or None if the queue is empty.
+        """
+        _levels = [(_i, _p) for _i, _p in enumerate(SCAN_PRIORITIES) if len(self._levels[_p]) > 0]
+        if len(_levels) == 0:
+            return None
+
+        _best = None
+        for _i, _p in _levels:
+            _oldest = min([_q[0][0]["queued_at"] for _q in self._levels[_p].values()])
+            _aged = _i - (int((now - _oldest) / self.aging) if self.aging is not None and self.aging > 0 else 0)
+            # Between the same aged priorities, the one that has waited the longest goes first
+            if _best is None or (_aged, _oldest) < _best[:2]:
+                _best = (_aged, _oldest, _i, _p)
+        _, _, _i, _priority = _best
+        if _i != _levels[0][0]:
+            # Scans of a higher priority are waiting, but this priority has waited long enough
+            self._promoted += 1
+
+        _shares = self._levels[_priority]
+        _share = min(_shares.keys(), key=lambda _s: (self._passes[_priority][_s], _shares[_s][0][0]["queued_at"]))
+        _scans = _shares[_share].popleft()
+        self._passes[_priority][_share] += 1 / max(_scans[0]["weight"], 1e-6)
+        if len(_shares[_share]) == 0:
+            del _shares[_share]
+        return _scans
+
+    def get(self):
+        """
+        Takes the next scan, or batch of scans, to run. Blocks until one is ready or the queue is closed.
+
+        Every call that returns scans must be followed by a call of `task_done` when they have finished.
+
+        Returns:
+            list: The scans to run together, or None if the queue was closed.
+        """
+        with self.cond:
+            while True:
+                if self._closed is True:
+                    return None
+                for _batch in self.batcher.ready():
+                    self._push(_batch)
+                _now = time.monotonic()
+                _scans = self._pop(_now)
+                if _scans is not None:
+                    for _s in _scans:
+                        self._latencies.append(_now - _s["queued_at"])
+                        self._latencies_by_priority[_s["priority"]].append(_now - _s["queued_at"])
+                    self._started += len(_scans)
+                    self._running += 1
+                    # There is room for more scans
+                    self.cond.notify_all()
+                    return _scans
+                # Wake up when the window of the next batch passes, or when scans are added
+                self.cond.wait(self.batcher.next_ready())
+
+    def task_done(self):
+        """
+        Records that the scans taken with `get` have finished.
+        """
+        with self.cond:
+            self._running -= 1
+            self.cond.notify_all()
+
+    def clear(self) -> list:
+        """
+        Removes all the queued scans.
+
+        Returns:
+            list: The removed scans.
+        """
+        with self.cond:
+            _scans = self._queued_scans() + [_s for _batch in self.batcher.ready(flush=True) for _s in _batch]
+            for _shares in self._levels.values():
+                _shares.clear()
+            self.cond.notify_all()
+        return _scans
+
+    def open(self):
+        """
+        Lets the workers take scans from the queue again.
+        """
+        with self.cond:
+            self._closed = False
+
+    def close(self):
+        """
+        Wakes up the workers and makes them exit. Queued scans are kept until the queue is opened again.
+        """
+        with self.cond:
+            self._closed = True
+            self.cond.notify_all()
+
+    def notify(self):
+        """
+        Wakes up the threads that wait on the queue, so that they check again what they wait for.
+        """
+        with self.cond:
+            self.cond.notify_all()
+
+    def wait_for(self, predicate, timeout=None):
+        """
+        Blocks until the predicate is true. It is checked whenever the queue changes or `notify` is called.
+
+        Args:
+            predicate (callable): The condition to wait for.
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: The last value of the predicate.
+        """
+        with self.cond:
+            return self.cond.wait_for(predicate, timeout)
+
+    def stats(self) -> dict:
+        """
+        Returns the queue statistics.
+
+        Returns:
+            dict: The number of queued and running scans, the queue size, the started, rejected and promoted
+                scans, the queued scans of every priority and the enqueue to start latency in seconds over the
+                latest scans, in total and for every priority.
+        """
+        with self.cond:
+            _depth = {_p: 0 for _p in SCAN_PRIORITIES}
+            for _s in self._queued_scans() + self.batcher.scans:
+                _depth[_s["priority"]] += 1
+            return {
+                "queued": self.queued,
+                "running": self._running,
+                "max_size": self.max_size,
+                "started": self._started,
+                "rejected": self._rejected,
+                "promoted": self._promoted,
+                "depth": _depth,
+                "latency": latency_summary(self._latencies),
+                "latency_by_priority": {_p: latency_summary(_l) for _p, _l in self._latencies_by_priority.items()},
+            }
+
+
+def latency_summary(latencies) -> dict:
+    """
+    Summarizes a list of latencies.
+
+    Args:
+        latencies (iterable): The latencies in seconds.
+
+    Returns:
+        dict: The mean, the 95th percentile and the maximum latency, or None if there are no latencies.
+    """
+    _latencies = sorted(latencies)
+    if len(_latencies) == 0:
+        return None
+    return {
+        "mean": round(sum(_latencies) / len(_latencies), 3),
+        "p95": round(_latencies[min(len(_latencies) - 1, int(len(_latencies) * 0.95))], 3),
+        "max": round(_latencies[-1], 3),
+    }
@@ -15,10 +15,50 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
 from deltascan.core.nmap.libnmap_wrapper import LibNmapWrapper
+from deltascan.core.nmap.async_nmap import (AsyncNmapProcess, AsyncScanEngine)
+from deltascan.core.nmap.grepable import (GrepableOutput, is_port_only)
 from deltascan.core.exceptions import (AppExceptions)
-from deltascan.core.config import LOG_CONF
+from deltascan.core.config import (
+    LOG_CONF,
+    PROGRESS_RATE,
+    PROGRESS_QUEUE_SIZE)
 from deltascan.core.parser import Parser
+from deltascan.core.parse_pool import ParsePool
+import asyncio
 import logging
+import os
+
+
+def host_xml_callback(host_callback):
+    """
+    Wraps a callback of parsed host results into a callback of host XML elements.
+
+    Args:
+        host_callback (callable): Called with the parsed results of a single host.
+
+    Returns:
+        callable: The callback that parses the XML of a host and passes it to `host_callback`, or None.
+    """
+    if host_callback is None:
+        return None
+    return lambda host_xml: host_callback(Parser.extract_host_results(host_xml))
+
+
+def grepable_output(scan_args, grepable=False, spool=None):
+    """
+    Creates the grepable output file of a scan, if the results of the scan can be taken from it.
+
+    Args:
+        scan_args (str): The nmap arguments.
+        grepable (bool, optional): Whether port only scans take their results from the grepable output.
+        spool (NmapSpool, optional): The spool of the scan. The grepable output is written next to it.
+
+    Returns:
+        GrepableOutput: The grepable output file or None if the results are parsed from the XML output.
+    """
+    if grepable is False or is_port_only(scan_args) is False:
+        return None
+    return GrepableOutput(os.path.dirname(os.path.abspath(spool.path)) if spool is not None else None)
 
 
 class Scanner:
@@ -26,7 +66,9 @@ class Scanner:
     The Scanner class is responsible for performing scans on specified targets using provided scan arguments.
     """
     @classmethod
-    def scan(cls, target=None, scan_args=None, ui_context=None, logger=None, name=None, _cancel_evt=None):
+    def scan(cls, target=None, scan_args=None, ui_context=None, logger=None, name=None, _cancel_evt=None,
+             progress_rate=PROGRESS_RATE, progress_queue_size=PROGRESS_QUEUE_SIZE, progress_callback=None,
+             host_callback=None, log_capture=None, spool=None, grepable=False):
         """
         Perform a scan on the specified target using the provided scan arguments.
 
@@ -35,9 +77,17 @@ class Scanner:
             scan_args (str): The arguments to pass to the scan.
             ui_context: The UI context.
             logger: The logger to use for logging.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_queue_size (int, optional): The maximum number of pending progress messages.
+            progress_callback (callable, optional): Called with the scan progress percentage when it changes.
+            host_callback (callable, optional): Called with the parsed results of every host as soon as nmap reports it.
+            log_capture (LogCapture, optional): The capture of the nmap output.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to and parsed from.
+            grepable (bool, optional): Take the results of port only scans from the nmap grepable output, which
+                is cheaper to parse than the XML output. The hosts are then not reported until the scan finishes.
 
         Returns:
-            dict: The scan results.
+            dict: The scan results or None if the scan was cancelled or failed.
 
         Raises:
             ValueError: If target or scan_args are not provided.
@@ -50,9 +100,21 @@ class Scanner:
         if "-vv" not in scan_args:
             scan_args = "-vv " + scan_args
 
+        _gnmap = grepable_output(scan_args, grepable, spool)
         try:
-            scan_results = LibNmapWrapper.scan(target, scan_args, ui_context, logger=cls.logger, name=name, _cancel_evt=_cancel_evt)
-            scan_results = Parser.extract_port_scan_dict_results(scan_results)
+            scan_results = LibNmapWrapper.scan(
+                target, scan_args if _gnmap is None else _gnmap.arguments(scan_args), ui_context, logger=cls.logger,
+                name=name, _cancel_evt=_cancel_evt, progress_rate=progress_rate, progress_queue_size=progress_queue_size,
+                progress_callback=progress_callback,
+                host_xml_callback=host_xml_callback(host_callback) if _gnmap is None else None,
+                log_capture=log_capture, spool=spool)
+            if scan_results is None:
+                # The scan was cancelled or nmap failed
+                return None
+            if _gnmap is not None:
+                scan_results = _gnmap.parse()
+            else:
+                scan_results = ParsePool.parse(scan_results) if spool is None else ParsePool.parse_file(scan_results)
 
             if scan_results is None:
                 raise ValueError("Failed to parse scan results")
@@ -61,3 +123,100 @@ class Scanner:
         except AppExceptions.DScanResultsParsingError as e:
             cls.logger.error(f"An error ocurred with nmap: {str(e)}")
             raise AppExceptions.DScanScannerError(str(e))
+        finally:
+            if _gnmap is not None:
+                _gnmap.remove()
+
+
+class AsyncScanner:
+    """
+    The AsyncScanner class performs scans like the Scanner class, but drives nmap from a single
+    event loop that is shared by all the running scans instead of using threads for every scan.
+    """
+    @classmethod
+    def scan(cls, target=None, scan_args=None, ui_context=None, logger=None, name=None, _cancel_evt=None,
+             progress_rate=PROGRESS_RATE, progress_queue_size=PROGRESS_QUEUE_SIZE, progress_callback=None,
+             host_callback=None, log_capture=None, spool=None, grepable=False):
+        """
+        Perform a scan on the specified target using the provided scan arguments and
+        block until the scan has finished.
+
+        Args:
+            target (str): The target to scan.
+            scan_args (str): The arguments to pass to the scan.
+            ui_context: The UI context.
+            logger: The logger to use for logging.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_queue_size (int, optional): Not used. Kept for compatibility with the Scanner class.
+            progress_callback (callable, optional): Called with the scan progress percentage when it changes.
+            host_callback (callable, optional): Called with the parsed results of every host as soon as nmap reports it.
+            log_capture (LogCapture, optional): The capture of the nmap output.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to and parsed from.
+            grepable (bool, optional): Take the results of port only scans from the nmap grepable output.
+
+        Returns:
+            dict: The scan results or None if the scan was cancelled or failed.
+
+        Raises:
+            ValueError: If target or scan_args are not provided.
+            AppExceptions.DScanScannerError: If failed to parse scan results.
+        """
+        return AsyncScanEngine.run(cls.scan_async(
+            target, scan_args, ui_context, logger=logger, name=name, _cancel_evt=_cancel_evt,
+            progress_rate=progress_rate, progress_callback=progress_callback, host_callback=host_callback,
+            log_capture=log_capture, spool=spool, grepable=grepable))
+
+    @classmethod
+    async def scan_async(cls, target=None, scan_args=None, ui_context=None, logger=None, name=None, _cancel_evt=None,
+                         progress_rate=PROGRESS_RATE, progress_callback=None, host_callback=None,
+                         log_capture=None, spool=None, grepable=False):
+        """
+        Perform a scan on the specified target using the provided scan arguments.
+
+        Args:
+            target (str): The target to scan.
+            scan_args (str): The arguments to pass to the scan.
+            ui_context: The UI context.
+            logger: The logger to use for logging.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_callback (callable, optional): Called with the scan progress percentage when it changes.
+            host_callback (callable, optional): Called with the parsed results of every host as soon as nmap reports it.
+            log_capture (LogCapture, optional): The capture of the nmap output.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to and parsed from.
+            grepable (bool, optional): Take the results of port only scans from the nmap grepable output.
+
+        Returns:
+            dict: The scan results or None if the scan was cancelled or failed.
+
+        Raises:
+            ValueError: If target or scan_args are not provided.
+            AppExceptions.DScanScannerError: If failed to parse scan results.
+        """
+        cls.logger = logger if logger is not None else logging.basicConfig(**LOG_CONF)
+        if target is None or scan_args is None:
+            raise ValueError("Target and scan arguments must be provided")
+
+        if "-vv" not in scan_args:
+            scan_args = "-vv " + scan_args
+
+        _gnmap = grepable_output(scan_args, grepable, spool)
+        try:
+            scan_results = await AsyncNmapProcess.scan(
+                target, scan_args if _gnmap is None else _gnmap.arguments(scan_args), ui_context, logger=cls.logger,
+                name=name, _cancel_evt=_cancel_evt, progress_rate=progress_rate, progress_callback=progress_callback,
+                host_xml_callback=host_xml_callback(host_callback) if _gnmap is None else None,
+                log_capture=log_capture, spool=spool)
+            if scan_results is None:
+                return None
+
+            # Parsing is CPU bound. Keep it off the event loop so that the other scans keep streaming
+            if _gnmap is not None:
+                return await asyncio.get_running_loop().run_in_executor(None, _gnmap.parse)
+            return await asyncio.get_running_loop().run_in_executor(
+                None, ParsePool.parse if spool is None else ParsePool.parse_file, scan_results)
+        except AppExceptions.DScanResultsParsingError as e:
+            cls.logger.error(f"An error ocurred with nmap: {str(e)}")
+            raise AppExceptions.DScanScannerError(str(e))
+        finally:
+            if _gnmap is not None:
+                _gnmap.remove()
@@ -0,0 +1,292 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.exceptions import StoreExceptions
+from deltascan.core.config import SCHEDULER_INTERVAL
+from datetime import (datetime, timedelta)
+from threading import (Event, Thread)
+import logging
+import math
+import zlib
+
+# Outcomes of a schedule run
+SCHEDULE_STARTED = "started"
+SCHEDULE_SKIPPED = "skipped"
+SCHEDULE_FAILED = "failed"
+
+# Minimum and maximum values of the minute, hour, day of month, month and day of week fields of a cron expression
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+# Number of days searched for the next time of a cron expression
+CRON_SEARCH_DAYS = 366 * 5
+
+
+def parse_cron_field(field: str, low: int, high: int) -> set:
+    """
+    Parses a field of a cron expression.
+
+    The field is a comma separated list of `*`, a value, or a range `a-b`, each optionally with a step `/n`.
+
+    Args:
+        field (str): The field.
+        low (int): The minimum value of the field.
+        high (int): The maximum value of the field.
+
+    Returns:
+        set: The values of the field.
+
+    Raises:
+        ValueError: If the field is invalid.
+    """
+    _values = set()
+    for _part in field.split(","):
+        _range, _, _step = _part.partition("/")
+        _step = int(_step) if _step != "" else 1
+        if _range == "*":
+            _start, _end = low, high
+        elif "-" in _range:
+            _start, _end = [int(_v) for _v in _range.split("-", 1)]
+        else:
+            _start = int(_range)
+            _end = high if _step > 1 else _start
+        if _step < 1 or _start < low or _end > high or _start > _end:
+            raise ValueError(f"Invalid cron field {field}")
+        _values.update(range(_start, _end + 1, _step))
+    return _values
+
+
+class CronExpression:
+    """
+    A cron expression of five fields: minute, hour, day of month, month and day of week (0 or 7 is Sunday).
+
+    As in cron, when both the day of month and the day of week are restricted, a day matches if either does.
+    """
+    def __init__(self, expression: str):
+        """
+        Initializes a new instance of the CronExpression class.
+
+        Args:
+            expression (str): The cron expression.
+
+        Raises:
+            ValueError: If the expression is invalid.
+        """
+        _fields = expression.split()
+        if len(_fields) != 5:
+            raise ValueError(f"Invalid cron expression {expression}, it must have 5 fields")
+        self.expression = expression
+        # Day of week 7 is Sunday, as 0
+        _fields[4] = ",".join(["0" if _f == "7" else _f for _f in _fields[4].split(",")])
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            parse_cron_field(_f, _low, _high) for _f, (_low, _high) in zip(_fields, CRON_FIELDS)]
+        self._any_day = _fields[2] == "*"
+        self._any_weekday = _fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        _day = day.day in self.days
+        # Python weeks start on Monday, cron weeks on Sunday
+        _weekday = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return _day and _weekday
+        return _day or _weekday
+
+    def next(self, after: datetime) -> datetime:
+        """
+        Finds the first time of the expression after the given time.
+
+        Args:
+            after (datetime): The time to search from.
+
+        Returns:
+            datetime: The next time, on a whole minute.
+
+        Raises:
+            ValueError: If the expression never matches (e.g. February 30).
+        """
+        _day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+        _after = after.replace(second=0, microsecond=0)
+        for _ in range(CRON_SEARCH_DAYS):
+            if _day.month in self.months and self._day_matches(_day):
+                for _hour in sorted(self.hours):
+                    for _minute in sorted(self.minutes):
+                        _time = _day.replace(hour=_hour, minute=_minute)
+                        if _time > _after:
+                            return _time
+            _day += timedelta(days=1)
+        raise ValueError(f"Cron expression {self.expression} never matches")
+
+
+def next_run_time(schedule: dict, after: datetime) -> datetime:
+    """
+    Finds the next run time of a schedule.
+
+    Interval schedules keep their phase: the next run is a whole number of intervals after the current one.
+    Runs that were missed while DeltaScan was not running are not made up.
+
+    Args:
+        schedule (dict): The schedule, with its cron expression or interval and its current next run time.
+        after (datetime): The time to search from.
+
+    Returns:
+        datetime: The next run time, before the jitter.
+    """
+    if schedule.get("cron") is not None:
+        return CronExpression(schedule["cron"]).next(after)
+    _interval = timedelta(seconds=schedule["interval"])
+    _runs = max(1, math.floor((after - schedule["next_run"]) / _interval) + 1)
+    return schedule["next_run"] + _runs * _interval
+
+
+def jitter_offset(name: str, run: datetime, jitter: int) -> float:
+    """
+    Finds how long a run of a schedule is delayed.
+
+    The delay looks random, so that schedules that are due at the same time start at different times,
+    but it only depends on the schedule and the run, so that it survives restarts.
+
+    Args:
+        name (str): The name of the schedule.
+        run (datetime): The run time, before the jitter.
+        jitter (int): The maximum delay in seconds.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if jitter is None or jitter <= 0:
+        return 0
+    return zlib.crc32(f"{name}-{run.isoformat()}".encode()) % (jitter * 1000) / 1000
+
+
+class ScanScheduler:
+    """
+    A thread that starts the scans of the stored schedules when they are due.
+
+    The schedules are read from the database, so that they survive restarts. A run is started by the
+    `fire` callback. If the previous run of a schedule is still queued or running, the run is skipped.
+    The thread sleeps until the next schedule is due, for at most `interval` seconds, so that schedules
+    added by other processes are also found.
+    """
+    def __init__(self, store, fire, interval=SCHEDULER_INTERVAL, logger=None):
+        """
+        Initializes a new instance of the ScanScheduler class.
+
+        Args:
+            store (Store): The store of the schedules.
+            fire (callable): Called with a due schedule. Returns False if the previous run is still going.
+            interval (float, optional): The maximum number of seconds between two checks of the schedules.
+            logger (Logger, optional): The logger.
+        """
+        self.store = store
+        self.fire = fire
+        self.interval = interval
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self._wake = Event()
+        self._stop = Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Starts the scheduler thread, if it is not running.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="deltascan-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the scheduler thread and waits for it to exit.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def notify(self):
+        """
+        Wakes up the scheduler, so that it reads the schedules again.
+        """
+        self._wake.set()
+
+    def run_pending(self, now=None):
+        """
+        Starts the runs of the schedules that are due.
+
+        Args:
+            now (datetime, optional): The current time.
+
+        Returns:
+            float: The seconds until the next schedule is due, or None if there are no enabled schedules.
+        """
+        _now = now if now is not None else datetime.now()
+        _next_due = None
+        for _schedule in self.store.get_schedules(enabled=True):
+            _due = _schedule["next_run"] + timedelta(
+                seconds=jitter_offset(_schedule["name"], _schedule["next_run"], _schedule["jitter"]))
+            if _due <= _now:
+                _next_run = self._run_schedule(_schedule, _now)
+                _due = _next_run + timedelta(seconds=jitter_offset(_schedule["name"], _next_run, _schedule["jitter"]))
+            _wait = max(0, (_due - _now).total_seconds())
+            _next_due = _wait if _next_due is None else min(_next_due, _wait)
+        return _next_due
+
+    def _run_schedule(self, schedule: dict, now: datetime) -> datetime:
+        """
+        Starts a run of a schedule and records its outcome and next run time.
+
+        Args:
+            schedule (dict): The due schedule.
+            now (datetime): The current time.
+
+        Returns:
+            datetime: The next run time of the schedule, before the jitter.
+        """
+        _fields = {"last_run": now}
+        try:
+            if self.fire(schedule) is False:
+                self.logger.warning(f"Schedule {schedule['name']} skipped, its previous run has not finished")
+                _fields.update({"last_status": SCHEDULE_SKIPPED, "skipped": schedule["skipped"] + 1})
+            else:
+                _fields.update({"last_status": SCHEDULE_STARTED, "runs": schedule["runs"] + 1})
+        except Exception as e:
+            self.logger.error(f"Schedule {schedule['name']} failed to start: {str(e)}")
+            _fields["last_status"] = SCHEDULE_FAILED
+        _fields["next_run"] = next_run_time(schedule, now)
+        try:
+            self.store.update_schedule(schedule["name"], **_fields)
+        except StoreExceptions.DScanStoreSException as e:
+            self.logger.error(f"Could not update schedule {schedule['name']}: {str(e)}")
+        return _fields["next_run"]
+
+    def _run(self):
+        """
+        Starts the due schedules until the scheduler is stopped.
+        """
+        while self._stop.is_set() is False:
+            try:
+                _next_due = self.run_pending()
+            except Exception as e:
+                self.logger.error(f"Could not read the schedules: {str(e)}")
+                _next_due = None
+            _wait = self.interval if _next_due is None else min(self.interval, _next_due)
+            self._wake.wait(_wait)
+            self._wake.clear()
@@ -14,7 +14,8 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
-from marshmallow import Schema, INCLUDE, fields, pre_load, post_load
+from marshmallow import Schema, INCLUDE, fields, validate, pre_load, post_load
+from deltascan.core.config import (THREAD_ENGINE, ASYNCIO_ENGINE, PIPELINE_STAGES)
 
 
 class UiContext(Schema):  # TODOL remove this schema or properly implement it
@@ -41,6 +42,38 @@ class ConfigSchema(Schema):
     db_path = fields.Str(allow_none=True)
 
 
+class SettingsSchema(Schema):
+    class Meta:
+        unknown = INCLUDE
+    scan_engine = fields.Str(allow_none=True, validate=validate.OneOf([THREAD_ENGINE, ASYNCIO_ENGINE]))
+    progress_rate = fields.Float(allow_none=True)
+    progress_queue_size = fields.Int(allow_none=True)
+    shard_size = fields.Int(allow_none=True, validate=validate.Range(min=0))
+    max_parallel_shards = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    log_tail_size = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    log_spill_dir = fields.Str(allow_none=True)
+    max_rate = fields.Int(allow_none=True, validate=validate.Range(min=0))
+    min_scan_rate = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    parse_workers = fields.Int(allow_none=True, validate=validate.Range(min=0))
+    batch_window = fields.Int(allow_none=True, validate=validate.Range(min=0))
+    max_batch_size = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    spool_dir = fields.Str(allow_none=True)
+    spool_retention = fields.Float(allow_none=True, validate=validate.Range(min=0))
+    grepable_output = fields.Bool(allow_none=True)
+    scan_deadline = fields.Float(allow_none=True, validate=validate.Range(min=0))
+    max_concurrent_scans = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    max_queued_scans = fields.Int(allow_none=True, validate=validate.Range(min=0))
+    queue_timeout = fields.Float(allow_none=True, validate=validate.Range(min=0))
+    priority_aging = fields.Float(allow_none=True, validate=validate.Range(min=0))
+    lease_duration = fields.Float(allow_none=True, validate=validate.Range(min=1))
+    max_work_attempts = fields.Int(allow_none=True, validate=validate.Range(min=1))
+    pipeline_workers = fields.Dict(
+        keys=fields.Str(validate=validate.OneOf(PIPELINE_STAGES)),
+        values=fields.Int(validate=validate.Range(min=1)),
+        allow_none=True)
+    pipeline_queue_size = fields.Int(allow_none=True, validate=validate.Range(min=1))
+
+
 class ScanPorts(Schema):
     class Meta:
         unknown = INCLUDE
@@ -74,6 +107,7 @@ class DBScan(Schema):  # TODO: rename DBScan to ScanFromDB
     results = fields.Nested(Scan, required=True)
     result_hash = fields.Str(required=True)
     created_at = fields.Str(required=True)
+    projection = fields.Str(allow_none=True)
 
     @pre_load
     def pre_load(self, data, **kwargs):
@@ -92,6 +126,7 @@ class ReportScanFromDB(Schema):
     results = fields.Nested(Scan, required=True)
     result_hash = fields.Str(required=True)
     created_at = fields.Str(required=True)
+    projection = fields.Str(allow_none=True)
 
     @pre_load
     def pre_load(self, data, **kwargs):
@@ -103,6 +138,8 @@ class ReportScanFromDB(Schema):
     def post_load(self, data, **kwargs):
         if isinstance(data, dict) and "id" in data:
             del data["id"]
+        # The fields that the results were projected to are not part of the report
+        data.pop("projection", None)
         return data
 
 
@@ -0,0 +1,316 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.exceptions import (AppExceptions, ExporterExceptions)
+from deltascan.core.config import (
+    SERVE_HOST,
+    SERVE_PORT)
+from deltascan.core.utils import ThreadWithException
+from http.server import (BaseHTTPRequestHandler, ThreadingHTTPServer)
+from socketserver import ThreadingUnixStreamServer
+from urllib.parse import (urlsplit, parse_qs, unquote)
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+# Maximum size of a request body
+MAX_REQUEST_SIZE = 2 ** 16
+
+EXPORT_CONTENT_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "html": "text/html",
+    "pdf": "application/pdf",
+}
+
+
+class ApiError(Exception):
+    """
+    An error that is returned to the client with its HTTP status.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """
+    Maps the HTTP requests to the methods of the DeltaScan instance of the server and returns JSON.
+
+    Every request runs in its own thread. The DeltaScan methods that it calls do not depend on the
+    configuration of the instance, so that concurrent requests do not interfere.
+    """
+    protocol_version = "HTTP/1.1"
+    # (method, path pattern, handler method)
+    routes = [
+        ("GET", r"/status", "_status"),
+        ("GET", r"/scans", "_list_scans"),
+        ("POST", r"/scans", "_submit_scan"),
+        ("GET", r"/scans/(?P<name>[^/]+)", "_scan_status"),
+        ("GET", r"/jobs", "_list_jobs"),
+        ("GET", r"/diffs", "_list_diffs"),
+        ("GET", r"/export/(?P<kind>scans|diffs)\.(?P<fmt>json|csv|html|pdf)", "_export"),
+        ("GET", r"/profiles", "_list_profiles"),
+        ("POST", r"/profiles/reload", "_reload_profiles"),
+        ("GET", r"/schedules", "_list_schedules"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        """
+        Runs the handler of the request path and sends its result, or the error, as JSON.
+
+        Args:
+            method (str): The HTTP method of the request.
+        """
+        _url = urlsplit(self.path)
+        self.query = {_k: _v[-1] for _k, _v in parse_qs(_url.query).items()}
+        try:
+            _allowed = False
+            for _method, _pattern, _handler in self.routes:
+                _match = re.fullmatch(_pattern, _url.path)
+                if _match is None:
+                    continue
+                _allowed = True
+                if _method == method:
+                    _status, _body = getattr(self, _handler)(**{_k: unquote(_v) for _k, _v in _match.groupdict().items()})
+                    if isinstance(_body, tuple):
+                        return self._send(_status, _body[1], _body[0])
+                    return self._send_json(_status, _body)
+            if _allowed:
+                raise ApiError(405, f"Method {method} not allowed")
+            raise ApiError(404, f"Unknown path {_url.path}")
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except (AppExceptions.DScanInputValidationException,
+                AppExceptions.DScanSchemaException,
+                AppExceptions.DScanResultsSchemaException) as e:
+            self._send_json(400, {"error": str(e)})
+        except (AppExceptions.DScanEntryNotFound, AppExceptions.DScanProfileNotFoundException) as e:
+            self._send_json(404, {"error": str(e)})
+        except AppExceptions.DScanQueueFullException as e:
+            self._send_json(503, {"error": str(e)})
+        except Exception as e:
+            self.server.logger.error(f"API request {method} {self.path} failed: {str(e)}")
+            self._send_json(500, {"error": str(e)})
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body, default=str).encode(), "application/json")
+
+    def _send(self, status, body: bytes, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json_body(self):
+        """
+        Reads the JSON object of the request body.
+
+        Returns:
+            dict: The request body.
+
+        Raises:
+            ApiError: If the body is too large or not a JSON object.
+        """
+        _length = int(self.headers.get("Content-Length") or 0)
+        if _length > MAX_REQUEST_SIZE:
+            raise ApiError(413, "Request body too large")
+        try:
+            _body = json.loads(self.rfile.read(_length) or b"{}")
+        except ValueError as e:
+            raise ApiError(400, f"Invalid JSON body: {str(e)}")
+        if not isinstance(_body, dict):
+            raise ApiError(400, "The request body must be a JSON object")
+        return _body
+
+    def _int_query(self, name):
+        if self.query.get(name) is None:
+            return None
+        try:
+            return int(self.query[name])
+        except ValueError:
+            raise ApiError(400, f"Invalid {name}, it must be an integer")
+
+    def _filters(self):
+        """
+        Returns:
+            dict: The scan filters of the query string.
+        """
+        return {
+            "host": self.query.get("host"),
+            "profile": self.query.get("profile"),
+            "n_scans": self._int_query("n"),
+            "from_date": self.query.get("from"),
+            "to_date": self.query.get("to"),
+        }
+
+    def _status(self):
+        _app = self.server.app
+        return 200, {"queued": _app.scans_to_execute, "stats": _app.stats()}
+
+    def _list_scans(self):
+        return 200, self.server.app.filter_scans(port_type=self.query.get("port_type"), **self._filters())
+
+    def _submit_scan(self):
+        _body = self._json_body()
+        if not isinstance(_body.get("host"), str) or not isinstance(_body.get("profile"), str):
+            raise ApiError(400, "A host and a profile are required")
+        _deadline = _body.get("deadline")
+        if _deadline is not None and not isinstance(_deadline, (int, float)):
+            raise ApiError(400, "Invalid deadline, it must be a number of seconds")
+        self.server.app.add_scan(
+            _body["host"], _body["profile"], deadline=_deadline, priority=_body.get("priority"),
+            submitter=_body.get("submitter"))
+        return 202, self.server.app.scan_status(self.server.app.scan_name(_body["host"], _body["profile"]))
+
+    def _scan_status(self, name):
+        _status = self.server.app.scan_status(name)
+        if _status is None:
+            raise ApiError(404, f"Scan {name} not found")
+        return 200, _status
+
+    def _list_jobs(self):
+        return 200, self.server.app.scan_jobs()
+
+    def _list_diffs(self):
+        _uuids = self.query["uuids"].split(",") if self.query.get("uuids") is not None else None
+        return 200, self.server.app.filter_diffs(uuids=_uuids, **self._filters())
+
+    def _export(self, kind, fmt):
+        """
+        Writes a report of the filtered scans or diffs and returns its contents.
+        """
+        _app = self.server.app
+        if kind == "diffs":
+            _uuids = self.query["uuids"].split(",") if self.query.get("uuids") is not None else None
+            _data = _app.filter_diffs(uuids=_uuids, **self._filters())
+        else:
+            _data = _app.filter_scans(port_type=self.query.get("port_type"), **self._filters())
+        # Every request exports to its own temporary directory, away from the working directory of the daemon
+        _dir = tempfile.mkdtemp(prefix="dscan_api_")
+        _file = f"{kind}.{fmt}"
+        try:
+            _app.export_report(_data, _file, diffs=kind == "diffs", directory=_dir)
+            with open(os.path.join(_dir, _file), "rb") as _f:
+                return 200, (EXPORT_CONTENT_TYPES[fmt], _f.read())
+        except (AppExceptions.DScanExportError, ExporterExceptions.DScanExporterError, OSError) as e:
+            raise ApiError(500, f"Could not export {kind}: {str(e)}")
+        finally:
+            shutil.rmtree(_dir, ignore_errors=True)
+
+    def _list_profiles(self):
+        return 200, list(self.server.app.list_profiles())
+
+    def _reload_profiles(self):
+        return 200, list(self.server.app.reload_profiles())
+
+    def _list_schedules(self):
+        return 200, self.server.app.schedules()
+
+    def log_message(self, format, *args):
+        self.server.logger.info(f"API {self.command} {self.path}: {format % args}")
+
+
+class ApiHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class ApiUnixServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class DeltaScanServer:
+    """
+    Serves the HTTP/JSON API of a DeltaScan instance, on a TCP port or a Unix socket.
+
+    The instance, its store and profiles stay loaded between requests. Its scan orchestrator and
+    scheduler run for as long as the server, so submitted and scheduled scans start immediately.
+    """
+    def __init__(self, app, host=SERVE_HOST, port=SERVE_PORT, socket_path=None, logger=None):
+        """
+        Initializes a new instance of the DeltaScanServer class.
+
+        Args:
+            app (DeltaScan): The DeltaScan instance, created without a UI context.
+            host (str, optional): The address to listen on.
+            port (int, optional): The port to listen on. 0 picks a free port.
+            socket_path (str, optional): The Unix socket to listen on, instead of the address and port.
+            logger (Logger, optional): The logger.
+        """
+        self.app = app
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.socket_path = socket_path
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self._httpd = ApiUnixServer(socket_path, ApiRequestHandler)
+        else:
+            self._httpd = ApiHTTPServer((host, port), ApiRequestHandler)
+        self._httpd.app = app
+        self._httpd.logger = self.logger
+        self._http_thread = None
+        self._scan_thread = None
+
+    @property
+    def address(self):
+        if self.socket_path is not None:
+            return self.socket_path
+        _host, _port = self._httpd.server_address[:2]
+        return f"http://{_host}:{_port}"
+
+    def start(self):
+        """
+        Starts the scheduler, the scan orchestrator and the HTTP server in background threads.
+        """
+        self.app.start_scheduler()
+        self._scan_thread = ThreadWithException(target=self.app.scan, name="deltascan-serve-scans", daemon=True)
+        self._scan_thread.start()
+        self._http_thread = ThreadWithException(target=self._httpd.serve_forever, name="deltascan-serve-http", daemon=True)
+        self._http_thread.start()
+
+    def serve(self):
+        """
+        Starts the server and blocks until it is stopped.
+        """
+        self.start()
+        self._http_thread.join()
+
+    def stop(self):
+        """
+        Stops the HTTP server, cancels the queued and running scans and waits for the scans to stop.
+        A stopped server can not be started again.
+        """
+        if self._http_thread is None:
+            return
+        self._http_thread = None
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.app.cleanup()
+        if self._scan_thread is not None:
+            self._scan_thread.join()
@@ -0,0 +1,306 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from deltascan.core.scanner import Scanner
+from deltascan.core.nmap.libnmap_wrapper import update_scan_ui
+from deltascan.core.nmap.log_capture import LogCapture
+from deltascan.core.rate import split_max_rate
+from deltascan.core.utils import n_hosts_on_subnet
+from deltascan.core.config import (
+    LOG_CONF,
+    PROGRESS_RATE,
+    PROGRESS_QUEUE_SIZE,
+    SHARD_SIZE,
+    MAX_PARALLEL_SHARDS)
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor, wait)
+from threading import Event, Lock
+import ipaddress
+import logging
+import math
+
+
+def _shard_prefix(target: str, shard_size):
+    """
+    Returns the network of a subnet target and the prefix length of its shards.
+
+    Args:
+        target (str): The target host or subnet.
+        shard_size (int): The maximum number of hosts of a shard. 0 or None disables sharding.
+
+    Returns:
+        tuple: The network and the prefix length of its shards or None if the target is not split.
+    """
+    if shard_size is None or shard_size <= 0 or n_hosts_on_subnet(target) <= shard_size:
+        return None
+
+    try:
+        _network = ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return None
+
+    # Round the shard size down to a power of two, so that every shard is a subnet
+    _new_prefix = _network.max_prefixlen - int(math.log2(shard_size))
+    if _new_prefix <= _network.prefixlen:
+        return None
+    return _network, _new_prefix
+
+
+def plan_shards(target: str, shard_size=SHARD_SIZE):
+    """
+    Splits a subnet target into smaller subnets of at most `shard_size` hosts.
+
+    Targets that are not subnets, or that are not larger than a single shard, are returned as they are.
+    The shards are generated as they are consumed, so that a large subnet is never held as a list of shards.
+
+    Args:
+        target (str): The target host or subnet (e.g. 10.0.0.0/16).
+        shard_size (int, optional): The maximum number of hosts of a shard. 0 or None disables sharding.
+
+    Yields:
+        str: The shard targets.
+    """
+    _prefix = _shard_prefix(target, shard_size)
+    if _prefix is None:
+        yield target
+        return
+    _network, _new_prefix = _prefix
+    for _s in _network.subnets(new_prefix=_new_prefix):
+        yield str(_s)
+
+
+def count_shards(target: str, shard_size=SHARD_SIZE) -> int:
+    """
+    Counts the shards of a target without generating them.
+
+    Args:
+        target (str): The target host or subnet (e.g. 10.0.0.0/16).
+        shard_size (int, optional): The maximum number of hosts of a shard. 0 or None disables sharding.
+
+    Returns:
+        int: The number of shards that `plan_shards` generates.
+    """
+    _prefix = _shard_prefix(target, shard_size)
+    if _prefix is None:
+        return 1
+    _network, _new_prefix = _prefix
+    return 2 ** (_new_prefix - _network.prefixlen)
+
+
+def merge_scan_results(target: str, shard_results: list) -> dict:
+    """
+    Merges the results of the shards of a target into the result of a single scan.
+
+    Args:
+        target (str): The target that was split in shards.
+        shard_results (list): The parsed results of the shards.
+
+    Returns:
+        dict: The merged scan results.
+    """
+    _merged = {
+        "results": [],
+        "args": "",
+        "scaninfo": {},
+        "start": {},
+        "runstats": {},
+    }
+    for _r in shard_results:
+        _merged["results"].extend(_r["results"])
+    if len(shard_results) > 0:
+        _first = shard_results[0]
+        _merged["args"] = " ".join(_first["args"].split(" ")[:-1] + [target]) if isinstance(_first["args"], str) else _first["args"]
+        _merged["scaninfo"] = _first["scaninfo"]
+        _merged["start"] = _first["start"]
+        _merged["runstats"] = shard_results[-1]["runstats"]
+    return _merged
+
+
+class ShardedScanner:
+    """
+    The ShardedScanner class scans large subnets as several smaller subnets (shards) that run concurrently.
+
+    The shards report their progress to a single progress bar and their results are merged into one result set.
+    """
+
+    @classmethod
+    def scan(cls, target=None, scan_args=None, ui_context=None, logger=None, name=None, _cancel_evt=None,
+             scanner=Scanner, shard_size=SHARD_SIZE, max_parallel_shards=MAX_PARALLEL_SHARDS,
+             progress_rate=PROGRESS_RATE, progress_queue_size=PROGRESS_QUEUE_SIZE, host_callback=None,
+             log_capture=None, progress_callback=None, spool=None, grepable=False):
+        """
+        Perform a scan on the specified target, splitting it in shards if it is a large subnet.
+
+        Args:
+            target (str): The target to scan.
+            scan_args (str): The arguments to pass to the scan.
+            ui_context: The UI context.
+            logger: The logger to use for logging.
+            name (str, optional): The name of the scan in the UI context.
+            _cancel_evt (Event, optional): The event that cancels the scan and all its shards.
+            scanner (class, optional): The scanner class that runs every shard (Scanner or AsyncScanner).
+            shard_size (int, optional): The maximum number of hosts of a shard. 0 or None disables sharding.
+            max_parallel_shards (int, optional): The maximum number of shards that run at the same time.
+            progress_rate (float, optional): The maximum number of progress updates per second.
+            progress_queue_size (int, optional): The maximum number of pending progress messages.
+            host_callback (callable, optional): Called with the parsed results of every host as soon as a shard reports it.
+                The shards run concurrently, so it must be thread safe.
+            log_capture (LogCapture, optional): The capture of the nmap output. When the target is split, every
+                shard has its own capture and, if `log_capture` spills to a file, its own spill file next to it.
+            progress_callback (callable, optional): Called with the progress percentage of the whole scan.
+            spool (NmapSpool, optional): The file that the nmap XML output is written to and parsed from. When the
+                target is split, every shard has its own spool file next to it, removed when the shard ends unless
+                the spool is kept.
+            grepable (bool, optional): Take the results of port only scans from the nmap grepable output.
+
+        Returns:
+            dict: The merged scan results or None if the scan was cancelled or a shard failed.
+
+        Raises:
+            ValueError: If target or scan_args are not provided.
+        """
+        cls.logger = logger if logger is not None else logging.basicConfig(**LOG_CONF)
+        _n_shards = count_shards(target, shard_size)
+        if _n_shards == 1:
+            return scanner.scan(
+                target, scan_args, ui_context, logger=logger, name=name, _cancel_evt=_cancel_evt,
+                progress_rate=progress_rate, progress_queue_size=progress_queue_size, host_callback=host_callback,
+                log_capture=log_capture, progress_callback=progress_callback, spool=spool, grepable=grepable)
+
+        _cancel_evt = _cancel_evt if _cancel_evt is not None else Event()
+        _parallel = max(1, max_parallel_shards)
+        _progress = ShardsProgress(ui_context, name, n_hosts_on_subnet(target), progress_callback)
+        # The packet rate of the scan is shared by the shards that run at the same time
+        scan_args = split_max_rate(scan_args, min(_n_shards, _parallel))
+
+        def _scan_shard(idx, shard):
+            _progress.start(idx, n_hosts_on_subnet(shard))
+            # The output of concurrent shards can not be interleaved in a single log
+            _log = None
+            if log_capture is not None and log_capture.spill_file is not None:
+                _log = LogCapture(log_capture.tail_size, f"{log_capture.spill_file}.{idx}")
+            _spool = spool.shard(idx) if spool is not None else None
+            try:
+                return scanner.scan(
+                    shard, scan_args, None, logger=logger, name=f"{name}-{shard}", _cancel_evt=_cancel_evt,
+                    progress_rate=progress_rate, progress_queue_size=progress_queue_size,
+                    progress_callback=lambda p: _progress.update(idx, p), host_callback=host_callback,
+                    log_capture=_log, spool=_spool, grepable=grepable)
+            except Exception:
+                # Stop the rest of the shards. The scan can not be completed
+                _cancel_evt.set()
+                raise
+            finally:
+                if _log is not None:
+                    _log.close()
+                if _spool is not None:
+                    _spool.finish()
+                _progress.done(idx)
+
+        _shard_results = {}
+        # The shards are submitted as the running ones end, so only `max_parallel_shards` of them exist at a time
+        with ThreadPoolExecutor(max_workers=_parallel) as _executor:
+            _running = {}
+            for _i, _s in enumerate(plan_shards(target, shard_size)):
+                while len(_running) >= _parallel:
+                    _done, _ = wait(_running, return_when=FIRST_COMPLETED)
+                    for _f in _done:
+                        _shard_results[_running.pop(_f)] = _f.result()
+                if _cancel_evt.is_set() or None in _shard_results.values():
+                    # The scan can not be completed. Do not start the rest of the shards
+                    break
+                _running[_executor.submit(_scan_shard, _i, _s)] = _i
+            for _f in wait(_running)[0]:
+                _shard_results[_running[_f]] = _f.result()
+
+        if _cancel_evt.is_set() or len(_shard_results) < _n_shards or None in _shard_results.values():
+            return None
+
+        _progress.update(None, 100)
+        return merge_scan_results(target, [_shard_results[_i] for _i in range(_n_shards)])
+
+
+class ShardsProgress:
+    """
+    Merges the progress of the shards of a scan into one progress value, weighted by the hosts of every shard.
+
+    Only the shards that run are tracked. The shards that ended count as the hosts they completed.
+    """
+    def __init__(self, ui_context, name, total_hosts, progress_callback=None):
+        """
+        Initializes a new instance of the ShardsProgress class.
+
+        Args:
+            ui_context (dict): The UI context.
+            name (str): The name of the scan in the UI context.
+            total_hosts (int): The number of hosts of all the shards.
+            progress_callback (callable, optional): Called with the merged progress on every update.
+        """
+        self.ui_context = ui_context
+        self.name = name
+        self._total_hosts = total_hosts
+        # The (progress, hosts) of the running shards by index
+        self._shard_progress = {}
+        # The sum of the progress of the ended shards, weighted by their hosts
+        self._done_progress = 0
+        self._lock = Lock()
+        self.progress_callback = progress_callback
+
+    def start(self, idx, hosts):
+        """
+        Starts tracking the progress of a shard.
+
+        Args:
+            idx (int): The index of the shard.
+            hosts (int): The number of hosts of the shard.
+        """
+        with self._lock:
+            self._shard_progress[idx] = (0, hosts)
+
+    def done(self, idx):
+        """
+        Stops tracking a shard that ended, keeping the progress it made.
+
+        Args:
+            idx (int): The index of the shard.
+        """
+        with self._lock:
+            _p, _h = self._shard_progress.pop(idx, (0, 0))
+            self._done_progress += _p * _h
+
+    def update(self, idx, progress):
+        """
+        Updates the progress of a shard and the progress bar of the scan.
+
+        Args:
+            idx (int): The index of the shard or None to set the progress of all the shards.
+            progress (int): The progress percentage.
+        """
+        with self._lock:
+            if idx is None:
+                self._shard_progress = {}
+                self._done_progress = progress * self._total_hosts
+            elif idx in self._shard_progress:
+                self._shard_progress[idx] = (progress, self._shard_progress[idx][1])
+            else:
+                # The shard has ended
+                return
+            update_scan_ui(self.ui_context, self.name, self.progress)
+            if self.progress_callback is not None:
+                self.progress_callback(self.progress)
+
+    @property
+    def progress(self):
+        return int((self._done_progress + sum([_p * _h for _p, _h in self._shard_progress.values()])) / self._total_hosts)
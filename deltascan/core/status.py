@@ -0,0 +1,199 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.config import (
+    UI_FRAME_RATE)
+from threading import Thread, Lock, Event
+import logging
+
+
+class ScanStatusRegistry:
+    """
+    A thread safe registry of the latest status of every scan shown in the UI.
+
+    The scan threads publish their progress, their nmap output tail and their packet rate allocation to the
+    registry instead of updating the UI. Consecutive updates of a scan are coalesced, so only the latest
+    status of every scan that changed is collected by the render loop on its next frame.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._statuses = {}
+        self._changed = {}
+
+    def publish(self, name, progress=None, stdout=None, finished=False, description=None):
+        """
+        Publishes the status of a scan.
+
+        Args:
+            name (str): The name of the scan.
+            progress (int, optional): The scan progress percentage. None leaves it unchanged.
+            stdout (str, optional): The nmap output tail to display. None leaves the displayed logs unchanged.
+            finished (bool, optional): Whether the scan has finished. The displayed logs are cleared if so.
+            description (str, optional): The text shown next to the progress bar. None leaves it unchanged.
+        """
+        _update = {}
+        if progress is not None:
+            _update["progress"] = progress
+        if finished is True:
+            _update["stdout"] = ""
+        elif stdout is not None:
+            _update["stdout"] = stdout
+        if description is not None:
+            _update["description"] = description
+        if len(_update) == 0:
+            return
+
+        with self._lock:
+            self._statuses.setdefault(str(name), {}).update(_update)
+            self._changed.setdefault(str(name), {}).update(_update)
+
+    def status(self, name) -> dict:
+        """
+        Returns the latest published status of a scan.
+
+        Args:
+            name (str): The name of the scan.
+
+        Returns:
+            dict: The latest status fields of the scan, empty if nothing was published.
+        """
+        with self._lock:
+            return dict(self._statuses.get(str(name), {}))
+
+    def collect(self) -> dict:
+        """
+        Returns the status changes published since the previous call.
+
+        Returns:
+            dict: The changed status fields of every scan that changed, by scan name.
+        """
+        with self._lock:
+            _changed = self._changed
+            self._changed = {}
+        return _changed
+
+    def remove(self, name):
+        """
+        Removes a scan from the registry.
+
+        Args:
+            name (str): The name of the scan.
+        """
+        with self._lock:
+            self._statuses.pop(str(name), None)
+            self._changed.pop(str(name), None)
+
+
+class UIRenderLoop:
+    """
+    Refreshes the live display of the scans at a fixed frame rate from a single thread.
+
+    Every frame applies the status changes collected from the registry to the progress bars and
+    the nmap logs of the scans and then refreshes the display once. The cost of a frame depends on
+    the number of scans that changed and not on the number of updates they published.
+    """
+    def __init__(self, ui_context, registry=None, frame_rate=UI_FRAME_RATE, logger=None):
+        """
+        Initializes a new instance of the UIRenderLoop class.
+
+        Args:
+            ui_context (dict): The UI context, with the live display and the UI instances of the scans.
+            registry (ScanStatusRegistry, optional): The registry the scans publish to. The one of the UI
+                context is used if not given.
+            frame_rate (float, optional): The number of frames per second.
+            logger (optional): The logger to use for logging.
+        """
+        self.ui_context = ui_context
+        self.registry = registry if registry is not None else ui_context["ui_status"]
+        self.frame_interval = 1 / frame_rate if frame_rate is not None and frame_rate > 0 else 1 / UI_FRAME_RATE
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self._stop_evt = Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Starts the render thread.
+        """
+        if self.running:
+            return
+        self._stop_evt.clear()
+        self._thread = Thread(target=self._run, name="deltascan-ui-render", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the render thread after rendering the last status changes.
+        """
+        self._stop_evt.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_evt.wait(self.frame_interval):
+            self._safe_render()
+        self._safe_render()
+
+    def _safe_render(self):
+        try:
+            self.render()
+        except Exception as e:
+            # A broken frame must not stop the rendering of the next ones
+            self.logger.error(f"Could not render the UI: {str(e)}")
+
+    def render(self):
+        """
+        Renders a single frame.
+
+        The changes are applied even while the live display is stopped (e.g. while the interactive shell
+        is open), so that the display is up to date when it starts again.
+        """
+        _live = self.ui_context["ui_live"]
+        for _name, _status in self.registry.collect().items():
+            self._apply(_name, _status)
+        if _live.is_started is True:
+            _live.refresh()
+
+    def _apply(self, name, status):
+        """
+        Applies the status changes of a scan to its progress bar and nmap logs.
+
+        Args:
+            name (str): The name of the scan.
+            status (dict): The changed status fields of the scan.
+        """
+        _instances = self.ui_context.get("ui_instances", {})
+        _bar = _instances.get("progress_bar", {}).get(name)
+        if _bar is not None:
+            _fields = {}
+            if "progress" in status:
+                _fields["completed"] = status["progress"]
+            if "description" in status:
+                _fields["description"] = status["description"]
+            if len(_fields) > 0:
+                _bar["instance"].update(_bar["id"], **_fields)
+
+        _text = _instances.get("text", {}).get(name)
+        if _text is not None and "stdout" in status:
+            # The logs are only cleared when they are not shown
+            if status["stdout"] == "" or self.ui_context.get("show_nmap_logs") is True:
+                _text["instance"].truncate(0)
+                _text["instance"].append(status["stdout"])
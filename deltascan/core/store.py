@@ -20,9 +20,21 @@ import json
 import logging
 import uuid
 import os
+from datetime import (datetime, timedelta)
 from deltascan.core.exceptions import (StoreExceptions,
                                        DatabaseExceptions)
-from deltascan.core.config import (DATABASE)
+from deltascan.core.config import (
+    APP_DATE_FORMAT,
+    DATABASE,
+    JOB_RUNNING,
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_TIMED_OUT,
+    WORK_PENDING,
+    WORK_LEASED,
+    WORK_DONE,
+    WORK_FAILED)
+from deltascan.core.checkpoints import pending_hosts_count
 from deltascan.core.schemas import Scan
 from deltascan.core.config import LOG_CONF
 from marshmallow import ValidationError, INCLUDE
@@ -44,7 +56,7 @@ class Store:
 
         self.rdbms = RDBMS(self.db_path, logger=self.logger)
 
-    def save_scans(self, profile_name, host_with_subnet, scan_data, created_at=None):
+    def save_scans(self, profile_name, host_with_subnet, scan_data, created_at=None, job_uuid=None, projection=None):
         """
         Save the scan data to the database.
 
@@ -53,6 +65,9 @@ class Store:
             subnet (str): The subnet of the scan.
             scan_data (list): The list of scan data.
             created_at (datetime, optional): The creation timestamp. Defaults to None.
+            job_uuid (str, optional): The scan job of the scans. Every saved host is recorded as a checkpoint of the job.
+            projection (FieldProjection, optional): The fields of the scan data to keep. The scan data is projected
+                before it is validated and hashed.
 
         Returns:
             list: The list of newly created scans.
@@ -63,16 +78,69 @@ class Store:
         """
         if scan_data is []:
             return None
+        if projection is not None:
+            scan_data = [projection.apply(_s) for _s in scan_data]
+        self.validate_scans(scan_data)
+        return self.save_hashed_scans(profile_name, host_with_subnet, self.hash_scans(scan_data), created_at, job_uuid, projection)
+
+    @staticmethod
+    def validate_scans(scan_data):
+        """
+        Validates the scan data against the scan schema.
+
+        Args:
+            scan_data (list): The list of scan data.
+
+        Raises:
+            StoreExceptions.DScanInputSchemaError: If the scan data fails validation.
+        """
         try:
             Scan(many=True).load(scan_data, unknown=INCLUDE)
         except ValidationError as err:
             raise StoreExceptions.DScanInputSchemaError(str(err))
+
+    @staticmethod
+    def hash_scans(scan_data):
+        """
+        Serializes and hashes the scan data of every host.
+
+        Args:
+            scan_data (list): The list of validated scan data.
+
+        Returns:
+            list: The scan data, its JSON serialization and the hash of the serialization of every host.
+        """
+        _hashed = []
+        for single_host_scan in scan_data:
+            json_scan_data = json.dumps(single_host_scan, sort_keys=True)  # Very important to sort keys
+            _hashed.append((single_host_scan, json_scan_data, hash_string(json_scan_data)))
+        return _hashed
+
+    def save_hashed_scans(self, profile_name, host_with_subnet, hashed_scans, created_at=None, job_uuid=None, projection=None):
+        """
+        Save the validated and hashed scan data to the database.
+
+        Args:
+            profile_name (str): The name of the profile.
+            host_with_subnet (str): The subnet of the scan.
+            hashed_scans (list): The hashed scan data, as returned by `hash_scans`.
+            created_at (datetime, optional): The creation timestamp. Defaults to None.
+            job_uuid (str, optional): The scan job of the scans. Every saved host is recorded as a checkpoint of the job.
+            projection (FieldProjection, optional): The projection that the scan data was projected with, recorded
+                with every scan.
+
+        Returns:
+            list: The list of newly created scans.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the scan data fails to save.
+        """
         _new_scans = []
+        _projection = projection.spec if projection is not None else None
 
-        for idx, single_host_scan in enumerate(scan_data):
+        for idx, (single_host_scan, json_scan_data, result_hash) in enumerate(hashed_scans):
             try:
                 _uuid = uuid.uuid4()
-                json_scan_data = json.dumps(single_host_scan, sort_keys=True)  # Very important to sort keys
                 single_host_scan["os"] = ["unkown"] if len(
                     single_host_scan.get("os", ["unkown"])) == 0 else single_host_scan.get("os", ["unkown"])
 
@@ -83,11 +151,14 @@ class Store:
                     single_host_scan.get("os", ["unkown"])[0],
                     profile_name,
                     json_scan_data,
-                    hash_string(json_scan_data),
+                    result_hash,
                     None,
-                    created_at=created_at
+                    created_at=created_at,
+                    projection=_projection
                 )
                 _new_scans.append(_n)
+                if job_uuid is not None:
+                    self.rdbms.create_scan_job_host(job_uuid, single_host_scan.get("host", "unknown"), str(_uuid))
             except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
                 # TODO: Propagating the same exception until higher level until finding another way to handle it
                 self.logger.error("Error saving scan data: %s. "
@@ -95,6 +166,417 @@ class Store:
                 raise StoreExceptions.DScanErrorCreatingEntry(str(e))
         return _new_scans
 
+    def create_scan_job(self, target, profile_name):
+        """
+        Creates a new running scan job.
+
+        Args:
+            target (str): The target host or subnet of the scan job.
+            profile_name (str): The name of the profile.
+
+        Returns:
+            str: The UUID of the new scan job.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the scan job fails to save.
+        """
+        try:
+            _uuid = str(uuid.uuid4())
+            self.rdbms.create_scan_job(_uuid, target, profile_name, JOB_RUNNING)
+            return _uuid
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error saving scan job: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+
+    def update_scan_job(self, job_uuid, status):
+        """
+        Changes the status of a scan job.
+
+        Args:
+            job_uuid (str): The UUID of the scan job.
+            status (str): The new status.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the scan job fails to update.
+        """
+        try:
+            self.rdbms.update_scan_job_status(job_uuid, status)
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error updating scan job: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+
+    def get_scan_job(self, job_uuid=None):
+        """
+        Retrieves a scan job along with its checkpoints.
+
+        Args:
+            job_uuid (str, optional): The UUID of the scan job. If not provided, the latest unfinished scan job is returned.
+
+        Returns:
+            dict: The scan job, with the saved hosts in `hosts` and the number of hosts left to scan in `pending`.
+
+        Raises:
+            StoreExceptions.DScanEntryNotFound: If the scan job does not exist.
+        """
+        if job_uuid is None:
+            _jobs = self.rdbms.get_scan_jobs(status=[JOB_RUNNING, JOB_CANCELLED, JOB_FAILED, JOB_TIMED_OUT], limit=1)
+        else:
+            _jobs = self.rdbms.get_scan_jobs(uuid=job_uuid)
+        if len(_jobs) == 0:
+            raise StoreExceptions.DScanEntryNotFound(
+                "No unfinished scan job found" if job_uuid is None else f"Scan job {job_uuid} not found")
+        return self._scan_job_with_hosts(_jobs[0])
+
+    def get_scan_jobs(self, last_n=20):
+        """
+        Retrieves the latest scan jobs along with their checkpoints.
+
+        Args:
+            last_n (int, optional): The number of latest scan jobs to retrieve. Defaults to 20.
+
+        Returns:
+            list: The scan jobs, newest first.
+        """
+        return [self._scan_job_with_hosts(_j) for _j in self.rdbms.get_scan_jobs(limit=last_n)]
+
+    def _scan_job_with_hosts(self, job):
+        """
+        Adds the checkpoints of a scan job to the scan job dictionary.
+
+        Args:
+            job (dict): The scan job.
+
+        Returns:
+            dict: The scan job, with the saved hosts in `hosts` and the number of hosts left to scan in `pending`.
+        """
+        job["hosts"] = self.rdbms.get_scan_job_hosts(job["uuid"])
+        job["pending"] = pending_hosts_count(job["target"], [_h["host"] for _h in job["hosts"]])
+        return job
+
+    def create_schedule(self, name, target, profile_name, next_run, cron=None, interval=None, jitter=0,
+                        priority=None, deadline=None):
+        """
+        Saves a new schedule.
+
+        Args:
+            name (str): The unique name of the schedule.
+            target (str): The target host or subnet.
+            profile_name (str): The name of the profile.
+            next_run (datetime): The time of the first run.
+            cron (str, optional): The cron expression of the run times.
+            interval (int, optional): The seconds between two runs.
+            jitter (int, optional): The maximum seconds a run is delayed.
+            priority (str, optional): The priority of the scans.
+            deadline (float, optional): The seconds a scan may run.
+
+        Returns:
+            dict: The new schedule.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the schedule fails to save.
+        """
+        try:
+            self.rdbms.create_schedule(
+                name, target, profile_name, next_run.strftime(APP_DATE_FORMAT), cron=cron, interval=interval,
+                jitter=jitter, priority=priority, deadline=deadline)
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error saving schedule: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+        return self.get_schedules(name)[0]
+
+    def get_schedules(self, name=None, enabled=None):
+        """
+        Retrieves the schedules, the next to run first.
+
+        Args:
+            name (str, optional): The name of the schedule.
+            enabled (bool, optional): Retrieve only the enabled, or only the disabled, schedules.
+
+        Returns:
+            list: The schedules.
+        """
+        return self.rdbms.get_schedules(name=name, enabled=enabled)
+
+    def update_schedule(self, name, **fields):
+        """
+        Changes the fields of a schedule. Times are given as datetime objects.
+
+        Args:
+            name (str): The name of the schedule.
+            **fields: The new values of the fields.
+
+        Raises:
+            StoreExceptions.DScanEntryNotFound: If the schedule does not exist.
+            StoreExceptions.DScanErrorCreatingEntry: If the schedule fails to update.
+        """
+        _fields = {_k: _v.strftime(APP_DATE_FORMAT) if isinstance(_v, datetime) else _v for _k, _v in fields.items()}
+        try:
+            _updated = self.rdbms.update_schedule(name, **_fields)
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error updating schedule: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+        if _updated == 0:
+            raise StoreExceptions.DScanEntryNotFound(f"Schedule {name} not found")
+
+    def delete_schedule(self, name):
+        """
+        Deletes a schedule.
+
+        Args:
+            name (str): The name of the schedule.
+
+        Raises:
+            StoreExceptions.DScanEntryNotFound: If the schedule does not exist.
+        """
+        if self.rdbms.delete_schedule(name) == 0:
+            raise StoreExceptions.DScanEntryNotFound(f"Schedule {name} not found")
+
+    def create_worker_job(self, job_uuid, target, arguments):
+        """
+        Creates a job for the distributed workers.
+
+        Args:
+            job_uuid (str): The UUID of the scan job that the worker job is part of.
+            target (str): The host or subnet to scan.
+            arguments (str): The nmap arguments of the scan.
+
+        Returns:
+            str: The UUID of the new worker job.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the worker job fails to save.
+        """
+        try:
+            _uuid = str(uuid.uuid4())
+            self.rdbms.create_worker_job(_uuid, job_uuid, target, arguments, WORK_PENDING)
+            return _uuid
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error saving worker job: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+
+    def claim_worker_job(self, worker, lease_duration, max_attempts):
+        """
+        Leases the oldest waiting worker job, or one whose worker died, to a worker.
+
+        Args:
+            worker (str): The name of the worker.
+            lease_duration (float): The seconds the lease lasts unless it is renewed.
+            max_attempts (int): Jobs that have been claimed this many times are not claimed again.
+
+        Returns:
+            dict: The leased worker job, with its `lease` token, or None if there is no job to run.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the worker job fails to update.
+        """
+        _now = datetime.now()
+        _lease = str(uuid.uuid4())
+        try:
+            _claimed = self.rdbms.claim_worker_job(
+                worker, _lease, _now.strftime(APP_DATE_FORMAT),
+                (_now + timedelta(seconds=lease_duration)).strftime(APP_DATE_FORMAT),
+                [WORK_PENDING], WORK_LEASED, max_attempts)
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+        if _claimed == 0:
+            return None
+        return self.rdbms.get_worker_jobs(lease=_lease)[0]
+
+    def renew_worker_lease(self, lease, lease_duration):
+        """
+        Extends the lease of a running worker job.
+
+        Args:
+            lease (str): The lease token.
+            lease_duration (float): The seconds the lease lasts from now.
+
+        Returns:
+            bool: False if the lease was lost, because it expired and another worker claimed the job.
+        """
+        return self._update_leased_job(
+            lease, lease_expires=(datetime.now() + timedelta(seconds=lease_duration)).strftime(APP_DATE_FORMAT))
+
+    def finish_worker_job(self, lease, results):
+        """
+        Stores the results of a worker job, to be ingested by the coordinator.
+
+        Args:
+            lease (str): The lease token.
+            results (list): The parsed results of the hosts.
+
+        Returns:
+            bool: False if the lease was lost, in which case the results are discarded.
+        """
+        return self._update_leased_job(lease, status=WORK_DONE, results=json.dumps(results), error=None)
+
+    def release_worker_job(self, lease, error, max_attempts):
+        """
+        Gives up a worker job that could not be run. It is run again, unless it has been tried `max_attempts` times.
+
+        Args:
+            lease (str): The lease token.
+            error (str): Why the job could not be run.
+            max_attempts (int): The number of times a job is tried.
+
+        Returns:
+            bool: False if the lease was lost.
+        """
+        _jobs = self.rdbms.get_worker_jobs(lease=lease)
+        if len(_jobs) == 0:
+            return False
+        return self._update_leased_job(
+            lease, status=WORK_PENDING if _jobs[0]["attempts"] < max_attempts else WORK_FAILED, error=error)
+
+    def _update_leased_job(self, lease, **fields):
+        try:
+            return self.rdbms.update_worker_job({"lease": lease, "status": WORK_LEASED}, **fields) > 0
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error updating worker job: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+
+    def update_worker_job_status(self, worker_job_uuid, status, from_status, **fields):
+        """
+        Changes the status of a worker job, only if it still has the expected status.
+
+        Args:
+            worker_job_uuid (str): The UUID of the worker job.
+            status (str): The new status.
+            from_status (str): The expected current status.
+            **fields: Other fields to change. The `lease_expires_before` time, if given, is also expected.
+
+        Returns:
+            bool: False if the worker job did not have the expected status.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the worker job fails to update.
+        """
+        _where = {"uuid": worker_job_uuid, "status": from_status}
+        if "lease_expires_before" in fields:
+            _where["lease_expires_before"] = fields.pop("lease_expires_before").strftime(APP_DATE_FORMAT)
+        try:
+            return self.rdbms.update_worker_job(_where, status=status, **fields) > 0
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error updating worker job: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+
+    def get_worker_jobs(self, status=None, job_uuid=None):
+        """
+        Retrieves the worker jobs, oldest first.
+
+        Args:
+            status (list, optional): The statuses of the worker jobs.
+            job_uuid (str, optional): The UUID of the scan job of the worker jobs.
+
+        Returns:
+            list: The worker jobs, with the `job_uuid`, `job_target` and `profile_name` of their scan job.
+        """
+        return self.rdbms.get_worker_jobs(status=status, job_uuid=job_uuid)
+
+    def close(self):
+        """
+        Closes the database connection of the store.
+
+        Raises:
+            StoreExceptions.DScanStoreSException: If the connection can not be closed.
+        """
+        try:
+            self.rdbms.close()
+        except DatabaseExceptions.DScanRDBMSException as e:
+            raise StoreExceptions.DScanStoreSException(f"{str(e)}")
+
+    def transaction(self):
+        """
+        Returns a context manager that runs the store operations in it in a single database transaction.
+        The transaction is rolled back if an exception leaves the context.
+
+        Returns:
+            The transaction context manager.
+        """
+        return self.rdbms.atomic()
+
+    def get_adjacent_scans(self, scan_id):
+        """
+        Retrieves the previous and the next scan of the same host with the same profile and projection as a scan.
+
+        Args:
+            scan_id (int): The ID of the scan.
+
+        Returns:
+            tuple: The previous and the next scan, with their results as dictionaries. None if there is none.
+
+        Raises:
+            StoreExceptions.DScanEntryNotFound: If the scan does not exist.
+        """
+        try:
+            return tuple(
+                self._results_to_dict(_s) if _s is not None else None
+                for _s in [self.rdbms.get_adjacent_scan(scan_id, previous=True),
+                           self.rdbms.get_adjacent_scan(scan_id, previous=False)])
+        except DatabaseExceptions.DScanRDBMSEntryNotFound as e:
+            self.logger.error("Error retrieving adjacent scans: %s", str(e))
+            raise StoreExceptions.DScanEntryNotFound(str(e))
+
+    def get_scans_without_diff(self, host=None, last_n=20, profile=None, from_date=None, to_date=None):
+        """
+        Retrieves the scans that match the given filters and have a previous scan, but no saved diff against it.
+
+        Args:
+            host (str, optional): The host or subnet of the scans.
+            last_n (int, optional): The number of latest scans to select. Defaults to 20.
+            profile (str, optional): The profile of the scans.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+
+        Returns:
+            list: The ID, UUID, results and results hash of the scans, with their results as dictionaries, oldest first.
+        """
+        return [self._results_to_dict(_s) for _s in self.rdbms.get_scans_without_diff(host, last_n, profile, from_date, to_date)]
+
+    def save_diff(self, scan_id, previous_id, diffs, changed):
+        """
+        Saves the diff of a scan against its previous scan.
+
+        Args:
+            scan_id (int): The ID of the newer scan.
+            previous_id (int): The ID of the previous scan.
+            diffs (dict): The added, removed and changed fields of the scan.
+            changed (bool): Whether the results of the scans differ.
+
+        Raises:
+            StoreExceptions.DScanErrorCreatingEntry: If the diff fails to save.
+        """
+        try:
+            self.rdbms.create_diff(scan_id, previous_id, json.dumps(diffs), changed)
+        except DatabaseExceptions.DScanRDBMSErrorCreatingEntry as e:
+            self.logger.error("Error saving diff: %s", str(e))
+            raise StoreExceptions.DScanErrorCreatingEntry(str(e))
+
+    def get_diffs(self, host=None, last_n=20, profile=None, from_date=None, to_date=None, n_diffs=None):
+        """
+        Retrieves the saved diffs between the consecutive scans that match the given filters, newest first.
+
+        Args:
+            host (str, optional): The host or subnet of the scans.
+            last_n (int, optional): The number of latest scans whose diffs are retrieved. Defaults to 20.
+            profile (str, optional): The profile of the scans.
+            from_date (str, optional): The date of the oldest scan.
+            to_date (str, optional): The date of the newest scan.
+            n_diffs (int, optional): The maximum number of diffs to retrieve.
+
+        Returns:
+            list: The diffs, in the format of the scan differences of DeltaScan.
+        """
+        return [{
+            "ids": [_d["id"], _d["previous_id"]],
+            "uuids": [_d["uuid"], _d["previous_uuid"]],
+            "generic": [
+                {"host": _d["host"], "arguments": _d["arguments"], "profile_name": _d["profile_name"]},
+                {"host": _d["previous_host"], "arguments": _d["arguments"], "profile_name": _d["profile_name"]}],
+            "dates": [str(_d["created_at"]), str(_d["previous_created_at"])],
+            "diffs": json.loads(_d["diffs"]),
+            "result_hashes": [_d["result_hash"], _d["previous_result_hash"]]
+        } for _d in self.rdbms.get_diffs(host, last_n, profile, from_date, to_date, n_diffs)]
+
     def save_profiles(self, profiles):
         """
         Saves the profile to the database.
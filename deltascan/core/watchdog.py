@@ -0,0 +1,170 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+from deltascan.core.config import WATCHDOG_INTERVAL
+from collections import deque
+from threading import (Condition, Event, Thread)
+import logging
+import time
+
+# Number of timed out scans kept in the watchdog statistics
+TIMEOUT_HISTORY = 20
+
+
+class WatchedScan:
+    """
+    A scan with a deadline. The watchdog sets its cancel event, and marks it as timed out, when the deadline passes.
+    """
+    def __init__(self, name, deadline, cancel_evt, profile=None):
+        """
+        Initializes a new instance of the WatchedScan class.
+
+        Args:
+            name (str): The name of the scan.
+            deadline (float): The number of seconds the scan may run.
+            cancel_evt (Event): The event that cancels the scan and kills its nmap processes.
+            profile (str, optional): The profile of the scan, recorded in the timeout statistics.
+        """
+        self.name = name
+        self.deadline = deadline
+        self.cancel_evt = cancel_evt
+        self.profile = profile
+        self.started = time.monotonic()
+        self.expires = self.started + deadline
+        self.timed_out = False
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+class ScanWatchdog:
+    """
+    A thread that cancels the scans that run longer than their deadline.
+
+    Cancelling a scan kills its nmap process group. The scan keeps the hosts it has already saved and
+    records that it timed out. The thread is started with the first watched scan and checks the
+    deadlines every `interval` seconds.
+    """
+    def __init__(self, interval=WATCHDOG_INTERVAL):
+        """
+        Initializes a new instance of the ScanWatchdog class.
+
+        Args:
+            interval (float, optional): The number of seconds between two checks of the deadlines.
+        """
+        self.interval = interval
+        self._scans = []
+        self._cond = Condition()
+        self._thread = None
+        self._timeouts = 0
+        self._timeouts_by_profile = {}
+        self._history = deque(maxlen=TIMEOUT_HISTORY)
+        self.logger = logging.getLogger(__name__)
+
+    def watch(self, name, deadline, cancel_evt=None, profile=None):
+        """
+        Starts watching a scan.
+
+        Args:
+            name (str): The name of the scan.
+            deadline (float): The number of seconds the scan may run. None or 0 does not watch the scan.
+            cancel_evt (Event, optional): The cancel event of the scan. A new one is created if not given.
+            profile (str, optional): The profile of the scan.
+
+        Returns:
+            WatchedScan: The watched scan, or None if the scan has no deadline.
+        """
+        if deadline is None or deadline <= 0:
+            return None
+        _scan = WatchedScan(name, deadline, cancel_evt if cancel_evt is not None else Event(), profile)
+        with self._cond:
+            self._scans.append(_scan)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="deltascan-watchdog", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return _scan
+
+    def unwatch(self, scan):
+        """
+        Stops watching a scan.
+
+        Args:
+            scan (WatchedScan): The watched scan or None.
+        """
+        if scan is None:
+            return
+        with self._cond:
+            if scan in self._scans:
+                self._scans.remove(scan)
+
+    def check(self, now=None) -> list:
+        """
+        Cancels the scans whose deadline has passed.
+
+        Args:
+            now (float, optional): The current monotonic time in seconds.
+
+        Returns:
+            list: The scans that timed out.
+        """
+        _now = now if now is not None else time.monotonic()
+        with self._cond:
+            _expired = [_s for _s in self._scans if _s.expires <= _now]
+            for _s in _expired:
+                self._scans.remove(_s)
+                _s.timed_out = True
+                self._timeouts += 1
+                if _s.profile is not None:
+                    self._timeouts_by_profile[_s.profile] = self._timeouts_by_profile.get(_s.profile, 0) + 1
+                self._history.append({"name": _s.name, "profile": _s.profile, "deadline": _s.deadline,
+                                      "elapsed": round(_now - _s.started, 1), "time": time.time()})
+        for _s in _expired:
+            self.logger.warning(f"Scan {_s.name} timed out after {_s.deadline} seconds")
+            _s.cancel_evt.set()
+        return _expired
+
+    def _run(self):
+        """
+        Checks the deadlines until there are no watched scans left.
+        """
+        while True:
+            with self._cond:
+                if len(self._scans) == 0:
+                    self._thread = None
+                    return
+                _next = min([_s.expires for _s in self._scans])
+                self._cond.wait(max(0, min(self.interval, _next - time.monotonic())))
+            self.check()
+
+    def stats(self) -> dict:
+        """
+        Returns the timeout statistics.
+
+        Returns:
+            dict: The number of watched scans, the remaining seconds of each one, the number of timeouts in
+                total and per profile and the latest timed out scans.
+        """
+        _now = time.monotonic()
+        with self._cond:
+            return {
+                "watched": {_s.name: round(max(0, _s.expires - _now), 1) for _s in self._scans},
+                "timeouts": self._timeouts,
+                "timeouts_by_profile": dict(self._timeouts_by_profile),
+                "timed_out": list(self._history),
+            }
@@ -49,6 +49,85 @@ conf_module.LOG_CONF = {
 }
 conf_module.ERROR_LOG = "error.log"
 
+conf_module.THREAD_ENGINE = "thread"
+conf_module.ASYNCIO_ENGINE = "asyncio"
+conf_module.PROGRESS_RATE = 2
+conf_module.UI_FRAME_RATE = 10
+conf_module.PROGRESS_QUEUE_SIZE = 32
+conf_module.SHARD_SIZE = 256
+conf_module.MAX_PARALLEL_SHARDS = 4
+conf_module.NMAP_LOG_TAIL = 300
+conf_module.LOG_SPILL_DIR = None
+conf_module.MAX_RATE = 0
+conf_module.MIN_SCAN_RATE = 100
+conf_module.RATE_CONTROL_INTERVAL = 5
+conf_module.PARSE_WORKERS = 0
+conf_module.PARSE_SPLIT_SIZE = 2 ** 20
+conf_module.BATCH_WINDOW = 200
+conf_module.MAX_BATCH_SIZE = 64
+conf_module.SPOOL_DIR = None
+conf_module.SPOOL_RETENTION = 0
+conf_module.GREPABLE_OUTPUT = False
+conf_module.SCAN_DEADLINE = 0
+conf_module.WATCHDOG_INTERVAL = 1
+conf_module.MAX_CONCURRENT_SCANS = 8
+conf_module.MAX_QUEUED_SCANS = 256
+conf_module.QUEUE_TIMEOUT = 0
+conf_module.PRIORITY_HIGH = "high"
+conf_module.PRIORITY_NORMAL = "normal"
+conf_module.PRIORITY_LOW = "low"
+conf_module.SCAN_PRIORITIES = [conf_module.PRIORITY_HIGH, conf_module.PRIORITY_NORMAL, conf_module.PRIORITY_LOW]
+conf_module.DEFAULT_PRIORITY = conf_module.PRIORITY_NORMAL
+conf_module.PRIORITY_AGING = 600
+conf_module.SCHEDULER_INTERVAL = 60
+conf_module.JOB_RUNNING = "running"
+conf_module.JOB_CANCELLED = "cancelled"
+conf_module.JOB_FAILED = "failed"
+conf_module.JOB_TIMED_OUT = "timed_out"
+conf_module.JOB_FINISHED = "finished"
+conf_module.SCAN_QUEUED = "queued"
+conf_module.WORK_PENDING = "pending"
+conf_module.WORK_LEASED = "leased"
+conf_module.WORK_DONE = "done"
+conf_module.WORK_INGESTED = "ingested"
+conf_module.WORK_FAILED = "failed"
+conf_module.LEASE_DURATION = 60
+conf_module.MAX_WORK_ATTEMPTS = 3
+conf_module.WORKER_POLL_INTERVAL = 2
+conf_module.PIPELINE_STAGES = ["parse", "validate", "hash", "store", "diff", "export"]
+conf_module.PIPELINE_WORKERS = {_s: 1 for _s in conf_module.PIPELINE_STAGES}
+conf_module.PIPELINE_QUEUE_SIZE = 16
+conf_module.SERVE_HOST = "127.0.0.1"
+conf_module.SERVE_PORT = 8470
+conf_module.BANNER = "{} {} {} {} {} {} {}"
+conf_module.VERSION_STR = "Deltascan {}"
+conf_module.DEFAULT_SETTINGS = {
+    "scan_engine": conf_module.THREAD_ENGINE,
+    "progress_rate": conf_module.PROGRESS_RATE,
+    "progress_queue_size": conf_module.PROGRESS_QUEUE_SIZE,
+    "shard_size": conf_module.SHARD_SIZE,
+    "max_parallel_shards": conf_module.MAX_PARALLEL_SHARDS,
+    "log_tail_size": conf_module.NMAP_LOG_TAIL,
+    "log_spill_dir": conf_module.LOG_SPILL_DIR,
+    "max_rate": conf_module.MAX_RATE,
+    "min_scan_rate": conf_module.MIN_SCAN_RATE,
+    "parse_workers": conf_module.PARSE_WORKERS,
+    "batch_window": conf_module.BATCH_WINDOW,
+    "max_batch_size": conf_module.MAX_BATCH_SIZE,
+    "spool_dir": conf_module.SPOOL_DIR,
+    "spool_retention": conf_module.SPOOL_RETENTION,
+    "grepable_output": conf_module.GREPABLE_OUTPUT,
+    "scan_deadline": conf_module.SCAN_DEADLINE,
+    "max_concurrent_scans": conf_module.MAX_CONCURRENT_SCANS,
+    "max_queued_scans": conf_module.MAX_QUEUED_SCANS,
+    "queue_timeout": conf_module.QUEUE_TIMEOUT,
+    "priority_aging": conf_module.PRIORITY_AGING,
+    "lease_duration": conf_module.LEASE_DURATION,
+    "max_work_attempts": conf_module.MAX_WORK_ATTEMPTS,
+    "pipeline_workers": conf_module.PIPELINE_WORKERS,
+    "pipeline_queue_size": conf_module.PIPELINE_QUEUE_SIZE,
+}
+
 
 @dataclass
 class Config:
@@ -0,0 +1,110 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import os
+import tempfile
+import unittest
+import sys
+import time
+from threading import Event, Timer
+from unittest.mock import MagicMock, patch
+from deltascan.core.nmap.async_nmap import (AsyncNmapProcess, AsyncScanEngine)
+from deltascan.core.nmap.spool import NmapSpool
+from deltascan.core.scanner import AsyncScanner
+
+FAKE_NMAP = """
+import sys, time
+print('<?xml version="1.0"?>')
+print('<nmaprun args="nmap -vv 0.0.0.0">')
+print('<taskbegin task="SYN Stealth Scan" time="1"/>')
+print('<taskprogress task="SYN Stealth Scan" time="1" percent="42.50" remaining="1"/>')
+sys.stdout.flush()
+time.sleep(float(sys.argv[1]))
+print('</nmaprun>')
+sys.exit(int(sys.argv[2]))
+"""
+
+
+def _fake_command(sleep=0, rc=0):
+    return MagicMock(return_value=[sys.executable, "-c", FAKE_NMAP, str(sleep), str(rc)])
+
+
+class TestAsyncNmapProcess(unittest.TestCase):
+    def test_scan_streams_output(self):
+        _process = AsyncNmapProcess("0.0.0.0", "-vv")
+        with patch.object(_process, "command", _fake_command()):
+            _r = AsyncScanEngine.run(_process._run())
+        self.assertTrue(_r.startswith('<?xml version="1.0"?>'))
+        self.assertTrue(_r.strip().endswith("</nmaprun>"))
+        self.assertEqual(_process.progress, 42)
+        self.assertEqual(_process.rc, 0)
+
+    def test_scan_writes_output_to_spool(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            _spool = NmapSpool(os.path.join(_dir, "scan.xml"))
+            _process = AsyncNmapProcess("0.0.0.0", "-vv", spool=_spool)
+            with patch.object(_process, "command", _fake_command()):
+                self.assertEqual(AsyncScanEngine.run(_process._run()), _spool.path)
+            with open(_spool.path) as _f:
+                self.assertTrue(_f.read().strip().endswith("</nmaprun>"))
+
+    def test_scan_failed(self):
+        _process = AsyncNmapProcess("0.0.0.0", "-vv", logger=MagicMock())
+        with patch.object(_process, "command", _fake_command(rc=1)):
+            self.assertEqual(AsyncScanEngine.run(_process._run()), None)
+
+    def test_scan_cancelled(self):
+        _evt = Event()
+        _process = AsyncNmapProcess("0.0.0.0", "-vv", _cancel_evt=_evt, progress_rate=20)
+        Timer(0.3, _evt.set).start()
+        _start = time.monotonic()
+        with patch.object(_process, "command", _fake_command(sleep=30)):
+            self.assertEqual(AsyncScanEngine.run(_process._run()), None)
+        self.assertLess(time.monotonic() - _start, 10)
+
+    def test_concurrent_scans_share_one_loop(self):
+        _processes = [AsyncNmapProcess(f"10.0.0.{_i}", "-vv") for _i in range(10)]
+        _futures = []
+        for _p in _processes:
+            _p.command = _fake_command(sleep=0.2)
+            _futures.append(AsyncScanEngine.submit(_p._run()))
+        self.assertTrue(all([_f.result() is not None for _f in _futures]))
+
+    def test_command(self):
+        _process = AsyncNmapProcess("10.0.0.1, 10.0.0.2", "-sS -p 80")
+        with patch("deltascan.core.nmap.async_nmap.shutil.which", MagicMock(return_value="/usr/bin/nmap")):
+            self.assertEqual(_process.command(), [
+                "/usr/bin/nmap", "-oX", "-", "-vvv", "--stats-every", "1s", "-sS", "-p", "80", "10.0.0.1", "10.0.0.2"])
+
+
+class TestAsyncScanner(unittest.TestCase):
+    @patch("deltascan.core.scanner.Parser.extract_port_scan_dict_results", MagicMock(return_value={"results": []}))
+    def test_scan(self):
+        async def _fake_scan(*args, **kwargs):
+            return "<nmaprun/>"
+
+        with patch("deltascan.core.scanner.AsyncNmapProcess.scan", _fake_scan):
+            self.assertEqual(AsyncScanner.scan("0.0.0.0", "-sS"), {"results": []})
+
+    def test_scan_cancelled(self):
+        async def _fake_scan(*args, **kwargs):
+            return None
+
+        with patch("deltascan.core.scanner.AsyncNmapProcess.scan", _fake_scan):
+            self.assertEqual(AsyncScanner.scan("0.0.0.0", "-sS"), None)
+
+    def test_scan_no_target(self):
+        self.assertRaises(ValueError, AsyncScanner.scan, None, "-sS")
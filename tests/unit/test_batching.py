@@ -0,0 +1,57 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import unittest
+from deltascan.core.batching import (ScanBatcher, is_batchable)
+
+
+def _scan(host, profile="P"):
+    return {"host": host, "profile": profile, "name": f"scan-{host}-{profile}", "job": None}
+
+
+class TestBatching(unittest.TestCase):
+    def test_is_batchable(self):
+        self.assertTrue(is_batchable(_scan("10.0.0.1")))
+        self.assertTrue(is_batchable(_scan("fe80::1")))
+        self.assertFalse(is_batchable(_scan("10.0.0.0/24")))
+        self.assertFalse(is_batchable(_scan("scanme.nmap.org")))
+        self.assertFalse(is_batchable(dict(_scan("10.0.0.1"), job="job_uuid")))
+        self.assertFalse(is_batchable(dict(_scan("10.0.0.1"), deadline=60)))
+
+    def test_window(self):
+        _batcher = ScanBatcher(window=200, max_batch_size=10)
+        _batcher.add(_scan("10.0.0.1"), now=0)
+        _batcher.add(_scan("10.0.0.2"), now=0.1)
+        _batcher.add(_scan("10.0.0.2"), now=0.1)
+        _batcher.add(_scan("10.0.0.3", "Q"), now=0.15)
+        self.assertEqual(_batcher.pending, 3)
+
+        self.assertEqual(_batcher.ready(now=0.1), [])
+        self.assertEqual(_batcher.ready(now=0.2), [[_scan("10.0.0.1"), _scan("10.0.0.2")]])
+        self.assertEqual(_batcher.ready(now=0.3, flush=True), [[_scan("10.0.0.3", "Q")]])
+        self.assertEqual(_batcher.pending, 0)
+
+    def test_max_batch_size(self):
+        _batcher = ScanBatcher(window=200, max_batch_size=2)
+        self.assertTrue(_batcher.enabled)
+        for _i in range(5):
+            _batcher.add(_scan(f"10.0.0.{_i}"), now=0)
+        self.assertEqual([len(_b) for _b in _batcher.ready(now=0.1)], [2, 2])
+        # The rest waits for a new window
+        self.assertEqual(_batcher.ready(now=0.25), [])
+        self.assertEqual([len(_b) for _b in _batcher.ready(now=0.35)], [1])
+        self.assertFalse(ScanBatcher(max_batch_size=1).enabled)
@@ -0,0 +1,34 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import unittest
+from deltascan.core.checkpoints import (pending_hosts_count, exclude_arguments)
+
+
+class TestCheckpoints(unittest.TestCase):
+    def test_pending_hosts_count(self):
+        self.assertEqual(pending_hosts_count("10.0.0.0/24", []), 256)
+        self.assertEqual(pending_hosts_count("10.0.0.0/24", ["10.0.0.1", "10.0.0.2", "10.0.0.2", "10.0.1.1"]), 254)
+        self.assertEqual(pending_hosts_count("10.0.0.1", ["10.0.0.1"]), 0)
+        self.assertEqual(pending_hosts_count("scanme.nmap.org", []), 1)
+        self.assertEqual(pending_hosts_count("scanme.nmap.org", ["45.33.32.156"]), 0)
+
+    def test_exclude_arguments(self):
+        self.assertEqual(exclude_arguments("10.0.0.0/24", []), "")
+        self.assertEqual(exclude_arguments("scanme.nmap.org", ["45.33.32.156"]), "")
+        self.assertEqual(
+            exclude_arguments("10.0.0.0/24", ["10.0.0.0", "10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.9", "10.0.1.1", "unknown"]),
+            "--exclude 10.0.0.0/30,10.0.0.9/32")
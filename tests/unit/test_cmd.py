@@ -0,0 +1,37 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import unittest
+from unittest.mock import MagicMock, patch
+from deltascan.cli.cmd import run_shell
+
+
+class TestCmd(unittest.TestCase):
+    @patch("deltascan.cli.cmd.interactive_shell")
+    def test_run_shell_starts_render_loop(self, mock_shell):
+        _renderer = MagicMock()
+        _app = MagicMock()
+        _rendering = []
+        # The scans run while the render loop refreshes the display
+        _app.scan.side_effect = lambda: _rendering.append(_renderer.start.called and not _renderer.stop.called)
+        _ui = {}
+
+        run_shell(_app, _ui, _renderer, False)
+
+        self.assertEqual(_rendering, [True])
+        mock_shell.assert_called_once_with(_app, _ui, False, True)
+        _renderer.stop.assert_called_once()
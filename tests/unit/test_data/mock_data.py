@@ -432,3 +432,23 @@ SCAN_NMAP_RESULTS["nmaprun"]["host"] = [
             },
        }
 ]
+
+NMAP_XML_TWO_HOSTS = """<?xml version="1.0" encoding="UTF-8"?>
+<nmaprun scanner="nmap" args="nmap -oX - -vvv -sS 10.0.0.0/30" start="1718000000" version="7.94">
+<scaninfo type="syn" protocol="tcp" numservices="1" services="22"/>
+<taskbegin task="SYN Stealth Scan" time="1718000001"/>
+<host starttime="1718000001" endtime="1718000002"><status state="up" reason="arp-response" reason_ttl="0"/>
+<address addr="10.0.0.1" addrtype="ipv4"/>
+<hostnames><hostname name="gw.local" type="PTR"/></hostnames>
+<ports><port protocol="tcp" portid="22"><state state="open" reason="syn-ack" reason_ttl="64"/><service name="ssh" method="table" conf="3"/></port></ports>
+<os><osmatch name="Linux 5.X" accuracy="95" line="1"><osclass type="general purpose" vendor="Linux" osfamily="Linux" accuracy="95"/></osmatch></os>
+</host>
+<taskprogress task="SYN Stealth Scan" time="1718000002" percent="50.00" remaining="1"/>
+<host starttime="1718000001" endtime="1718000003"><status state="up" reason="arp-response" reason_ttl="0"/>
+<address addr="10.0.0.2" addrtype="ipv4"/>
+<hostnames/>
+<ports><port protocol="tcp" portid="22"><state state="closed" reason="reset" reason_ttl="64"/><service name="ssh" method="table" conf="3"/></port></ports>
+</host>
+<runstats><finished time="1718000004" elapsed="3.00" exit="success"/><hosts up="2" down="2" total="4"/></runstats>
+</nmaprun>
+"""
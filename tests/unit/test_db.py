@@ -15,6 +15,7 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
 from unittest import TestCase
+import datetime
 from deltascan.core.db.manager import RDBMS
 from deltascan.core.config import DATABASE
 
@@ -84,7 +85,8 @@ class TestSQLiteDatabase(TestCase):
              "arguments": "test_args",
              "results": '{"data": "test_data"}',
              "result_hash": "hash",
-             "created_at": None}
+             "created_at": None,
+             "projection": None}
         ])
 
         r2 = list(self.manager.get_scans(None, "0.0.0.0", 2, None))
@@ -101,7 +103,8 @@ class TestSQLiteDatabase(TestCase):
              "arguments": "test_args",
              "results": '{"data": "test_data"}',
              "result_hash": "hash",
-             "created_at": None},
+             "created_at": None,
+             "projection": None},
             {"id": 2,
              "uuid": "uuid_2",
              "host": "0.0.0.0",
@@ -110,7 +113,8 @@ class TestSQLiteDatabase(TestCase):
              "arguments": "test_args",
              "results": '{"data": "test_data"}',
              "result_hash": "hash",
-             "created_at": None}
+             "created_at": None,
+             "projection": None}
         ])
 
         r2 = list(self.manager.get_scans(None, "0.0.0.0", 2, "TEST_3"))
@@ -126,5 +130,95 @@ class TestSQLiteDatabase(TestCase):
              "arguments": "test_args",
              "results": '{"data": "test_data"}',
              "result_hash": "hash",
-             "created_at": None},
+             "created_at": None,
+             "projection": None},
         ])
+
+    def test_c_scan_jobs_create_and_get_database_success(self):
+        self.manager.create_profile("TEST_5", "test_args")
+        result = self.manager.create_scan_job("job_1", "10.0.0.0/30", "TEST_5", "running")
+        self.assertEqual(1, result.id)
+        self.manager.create_scan_job_host("job_1", "10.0.0.1", "uuid_1")
+        self.manager.create_scan_job_host("job_1", "10.0.0.2", "uuid_2")
+
+        self.assertEqual(1, self.manager.update_scan_job_status("job_1", "cancelled"))
+
+        r = self.manager.get_scan_jobs(status=["running", "cancelled"], limit=1)
+        self.assertEqual(1, len(r))
+        self.assertEqual(r[0]["uuid"], "job_1")
+        self.assertEqual(r[0]["target"], "10.0.0.0/30")
+        self.assertEqual(r[0]["profile_name"], "TEST_5")
+        self.assertEqual(r[0]["status"], "cancelled")
+        self.assertEqual(self.manager.get_scan_jobs(status=["finished"]), [])
+
+        self.assertEqual(self.manager.get_scan_job_hosts("job_1"), [
+            {"host": "10.0.0.1", "scan_uuid": "uuid_1"},
+            {"host": "10.0.0.2", "scan_uuid": "uuid_2"}])
+        self.assertEqual(self.manager.get_scan_job_hosts("job_2"), [])
+
+    def test_d_schedules_create_and_get_database_success(self):
+        self.manager.create_profile("TEST_6", "test_args")
+        result = self.manager.create_schedule("nightly", "10.0.0.0/30", "TEST_6", "2024-01-01 02:00:00", cron="0 2 * * *", jitter=60)
+        self.assertEqual(1, result.id)
+        self.manager.create_schedule("often", "10.0.0.1", "TEST_6", "2024-01-01 00:15:00", interval=900)
+
+        r = self.manager.get_schedules()
+        self.assertEqual([_s["name"] for _s in r], ["often", "nightly"])
+        self.assertEqual(r[0]["profile_name"], "TEST_6")
+        self.assertEqual(r[0]["interval"], 900)
+        self.assertEqual(r[0]["next_run"], datetime.datetime(2024, 1, 1, 0, 15))
+        self.assertEqual(r[1]["cron"], "0 2 * * *")
+        self.assertEqual(r[1]["jitter"], 60)
+        self.assertEqual(r[1]["runs"], 0)
+
+        self.assertEqual(1, self.manager.update_schedule("often", enabled=False, runs=1, last_status="started"))
+        self.assertEqual([_s["name"] for _s in self.manager.get_schedules(enabled=True)], ["nightly"])
+        r = self.manager.get_schedules(name="often")
+        self.assertEqual((r[0]["enabled"], r[0]["runs"], r[0]["last_status"]), (False, 1, "started"))
+
+        self.assertEqual(1, self.manager.delete_schedule("often"))
+        self.assertEqual(0, self.manager.delete_schedule("often"))
+        self.assertEqual(0, self.manager.update_schedule("often", runs=2))
+
+    def test_e_diffs_create_and_get_database_success(self):
+        self.manager.create_profile("TEST_7", "test_args")
+        _ids = [self.manager.create_port_scan(
+            f"diff_uuid_{_i}", "10.1.1.1", "10.1.1.1", "unknown", "TEST_7", "{}", f"hash_{_i}", None,
+            datetime.datetime(2024, 1, _i + 1)).id for _i in range(3)]
+
+        self.assertEqual(None, self.manager.get_adjacent_scan(_ids[0]))
+        self.assertEqual("diff_uuid_0", self.manager.get_adjacent_scan(_ids[1])["uuid"])
+        self.assertEqual("diff_uuid_2", self.manager.get_adjacent_scan(_ids[1], previous=False)["uuid"])
+        self.assertEqual(None, self.manager.get_adjacent_scan(_ids[2], previous=False))
+
+        # The scans saved without their diff, apart from the first scan of the host
+        self.assertEqual(["diff_uuid_1", "diff_uuid_2"], [_s["uuid"] for _s in self.manager.get_scans_without_diff(host="10.1.1.1")])
+
+        self.manager.create_diff(_ids[1], _ids[0], '{"changed": {}}', False)
+        self.assertEqual(["diff_uuid_2"], [_s["uuid"] for _s in self.manager.get_scans_without_diff(host="10.1.1.1")])
+        # The diff of a scan is replaced
+        self.manager.create_diff(_ids[1], _ids[0], '{"changed": {"a": 1}}', True)
+        self.manager.create_diff(_ids[2], _ids[1], '{"changed": {}}', False)
+        self.assertEqual([], self.manager.get_scans_without_diff(host="10.1.1.1"))
+
+        r = self.manager.get_diffs(host="10.1.1.1")
+        self.assertEqual(1, len(r))
+        self.assertEqual((r[0]["uuid"], r[0]["previous_uuid"], r[0]["diffs"]), ("diff_uuid_1", "diff_uuid_0", '{"changed": {"a": 1}}'))
+        self.assertEqual(r[0]["profile_name"], "TEST_7")
+
+        # Both scans of a diff must be selected
+        self.assertEqual([], self.manager.get_diffs(host="10.1.1.1", from_date="2024-01-02 00:00:00"))
+        self.assertEqual([], self.manager.get_diffs(host="10.1.1.1", n_diffs=0))
+        self.assertEqual([], self.manager.get_diffs(host="10.1.1.2"))
+
+    def test_f_adjacent_scans_with_projection(self):
+        self.manager.create_profile("TEST_8", "test_args")
+        _ids = [self.manager.create_port_scan(
+            f"projection_uuid_{_i}", "10.1.1.2", "10.1.1.2", "unknown", "TEST_8", "{}", f"hash_{_i}", None,
+            datetime.datetime(2024, 1, _i + 1), projection=_p).id for _i, _p in enumerate([None, "p", "p", None])]
+
+        # Only the scans that were projected to the same fields are adjacent
+        self.assertEqual(None, self.manager.get_adjacent_scan(_ids[1]))
+        self.assertEqual("projection_uuid_1", self.manager.get_adjacent_scan(_ids[2])["uuid"])
+        self.assertEqual("projection_uuid_0", self.manager.get_adjacent_scan(_ids[3])["uuid"])
+        self.assertEqual("projection_uuid_3", self.manager.get_adjacent_scan(_ids[0], previous=False)["uuid"])
@@ -16,9 +16,15 @@
 
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call
+from threading import (Event, Lock, Thread)
+import json
+import tempfile
+import time
 
 from deltascan.core.exceptions import (AppExceptions)
 from deltascan.core.deltascan import DeltaScan
+from deltascan.core.rate import RateController
+from deltascan.core.watchdog import ScanWatchdog
 from .test_data.mock_data import (
     mock_data_with_real_hash,
     SCANS_FROM_DB_TEST_V1,
@@ -56,6 +62,7 @@ class TestMain(TestCase):
         self.dscan.store = MagicMock()
         self.dscan.store.save_profiles.return_value = MagicMock()
         self.dscan.store.get_profile.return_value = MagicMock()
+        self.dscan.store.get_adjacent_scans.return_value = (None, None)
 
     @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
     @patch("deltascan.core.deltascan.Scanner", MagicMock())
@@ -99,7 +106,404 @@ class TestMain(TestCase):
         self.dscan._config.conf_file = CONFIG_FILE
         self.dscan._port_scan()
 
+        self.dscan.store.validate_scans.assert_called_once()
+        self.dscan.store.save_hashed_scans.assert_called_once_with(
+            "TEST_V1", "0.0.0.0", self.dscan.store.hash_scans.return_value, job_uuid=self.dscan.store.create_scan_job.return_value,
+            projection=None)
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    @patch("deltascan.core.deltascan.AsyncScanner")
+    def test_port_scan_with_asyncio_engine(self, mock_async_scanner, mock_scanner):
+        self.mock_store()
+        self.dscan._config.conf_file = CONFIG_FILE
+        self.dscan._settings["scan_engine"] = "asyncio"
+
+        self.dscan._port_scan()
+
+        mock_async_scanner.scan.assert_called_once()
+        mock_scanner.scan.assert_not_called()
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    @patch("deltascan.core.deltascan.AsyncScanner")
+    def test_port_scan_with_spool_uses_asyncio_engine(self, mock_async_scanner, mock_scanner):
+        self.mock_store()
+        self.dscan._config.conf_file = CONFIG_FILE
+        self.dscan._settings["scan_engine"] = "thread"
+        with tempfile.TemporaryDirectory() as _dir:
+            self.dscan._settings["spool_dir"] = _dir
+
+            self.dscan._port_scan()
+
+        # The thread engine keeps the whole nmap output in memory, the spooled scan does not
+        mock_scanner.scan.assert_not_called()
+        mock_async_scanner.scan.assert_called_once()
+        self.assertIsNotNone(mock_async_scanner.scan.call_args.kwargs["spool"])
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_saves_hosts_while_scanning(self, mock_scanner):
+        self.mock_store()
+        self.dscan.store.save_scans.side_effect = lambda profile, host, hosts, job_uuid, projection: [MagicMock(uuid=_h["host"]) for _h in hosts]
+        self.dscan.store.hash_scans.side_effect = lambda hosts: hosts
+        self.dscan.store.save_hashed_scans.side_effect = self.dscan.store.save_scans.side_effect
+        self.dscan.store.create_scan_job.return_value = "job_uuid"
+        self.dscan._config.conf_file = CONFIG_FILE
+
+        def _scan(*args, **kwargs):
+            kwargs["host_callback"]({"host": "10.0.0.1"})
+            # The host is saved before nmap exits
+            self.dscan.store.save_scans.assert_called_once_with("TEST_V1", "0.0.0.0", [{"host": "10.0.0.1"}], job_uuid="job_uuid", projection=None)
+            return {"results": [{"host": "10.0.0.1"}, {"host": "10.0.0.2"}]}
+        mock_scanner.scan.side_effect = _scan
+
+        self.dscan._port_scan()
+
         self.dscan.store.save_scans.assert_called_once()
+        # The rest of the hosts are saved by the results pipeline
+        self.dscan.store.validate_scans.assert_called_once_with([{"host": "10.0.0.2"}])
+        self.dscan.store.save_hashed_scans.assert_called_once_with(
+            "TEST_V1", "0.0.0.0", [{"host": "10.0.0.2"}], job_uuid="job_uuid", projection=None)
+        self.dscan.store.get_filtered_scans.assert_called_once_with(["10.0.0.1", "10.0.0.2"], last_n=2)
+        self.dscan.store.update_scan_job.assert_called_once_with("job_uuid", "finished")
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_does_not_wait_for_export(self, mock_scanner):
+        self.mock_store()
+        self.dscan._config.conf_file = CONFIG_FILE
+        self.dscan._config.output_file = "report.pdf"
+        self.dscan._config.is_interactive = False
+        mock_scanner.scan.return_value = {"results": [{"host": "10.0.0.1"}]}
+        _release = Event()
+        _exported = []
+        self.dscan._report_scans = lambda scans, output_file: _release.wait(5) and _exported.append(output_file)
+
+        self.assertEqual(self.dscan._port_scan(), self.dscan.store.get_filtered_scans.return_value)
+        # The scan has finished while its report is still being exported
+        self.assertEqual(_exported, [])
+        self.assertEqual(self.dscan.stats()["pipeline"]["in_flight"], 1)
+        _release.set()
+        self.assertTrue(self.dscan._pipeline.join(5))
+        self.assertEqual(len(_exported), 1)
+        self.assertTrue(_exported[0].startswith("scans_0.0.0.0_TEST_V1_"))
+        self.assertEqual(self.dscan.stats()["pipeline"]["stages"]["export"]["processed"], 1)
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_resumes_job(self, mock_scanner):
+        self.mock_store()
+        self.dscan.store.get_scan_job.return_value = {
+            "uuid": "job_uuid",
+            "hosts": [{"host": "10.0.0.1", "scan_uuid": "uuid_1"}]}
+        self.dscan.store.save_hashed_scans.return_value = [MagicMock(uuid="uuid_2")]
+        mock_scanner.scan.return_value = {"results": [{"host": "10.0.0.2"}]}
+
+        self.dscan._port_scan("10.0.0.0/30", "TEST_V1", None, None, "job_uuid")
+
+        self.assertTrue(mock_scanner.scan.call_args[0][1].endswith(" --exclude 10.0.0.1/32"))
+        self.dscan.store.create_scan_job.assert_not_called()
+        self.dscan.store.get_filtered_scans.assert_called_once_with(["uuid_1", "uuid_2"], last_n=2)
+        self.dscan.store.update_scan_job.assert_called_once_with("job_uuid", "finished")
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_cancelled_job(self, mock_scanner):
+        self.mock_store()
+        self.dscan.store.create_scan_job.return_value = "job_uuid"
+        mock_scanner.scan.return_value = None
+        _evt = Event()
+        _evt.set()
+
+        self.assertEqual(self.dscan._port_scan(None, None, None, _evt), None)
+        self.dscan.store.update_scan_job.assert_called_once_with("job_uuid", "cancelled")
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_timed_out_job(self, mock_scanner):
+        self.mock_store()
+        self.dscan.store.create_scan_job.return_value = "job_uuid"
+        self.dscan.store.save_scans.return_value = [MagicMock(uuid="scan_uuid")]
+        self.dscan.store.get_filtered_scans.return_value = ["partial_scan"]
+        self.dscan._watchdog = ScanWatchdog(interval=0.01)
+
+        def _hung_scan(*args, **kwargs):
+            kwargs["host_callback"]({"host": "0.0.0.0"})
+            # Nmap hangs until the watchdog kills it
+            kwargs["_cancel_evt"].wait(5)
+            return None
+        mock_scanner.scan.side_effect = _hung_scan
+
+        self.assertEqual(self.dscan._port_scan(None, None, None, None, None, 0.05), None)
+        self.dscan.store.update_scan_job.assert_called_once_with("job_uuid", "timed_out")
+        self.dscan.store.get_filtered_scans.assert_called_once_with(["scan_uuid"], last_n=1)
+        self.assertEqual(self.dscan.result[-1]["scans"], ["partial_scan"])
+        self.assertEqual(self.dscan.result[-1]["finished"], False)
+        self.assertEqual(self.dscan.stats()["watchdog"]["timeouts_by_profile"], {"TEST_V1": 1})
+
+    def test_scan_deadline(self):
+        self.dscan._load_profiles_from_file = MagicMock(return_value={"TEST_V1": {"arguments": "-sS", "deadline": 60}})
+        self.dscan._settings["scan_deadline"] = 300
+        self.assertEqual(self.dscan._scan_deadline("TEST_V1", 10), 10)
+        self.assertEqual(self.dscan._scan_deadline("TEST_V1"), 60)
+        self.assertEqual(self.dscan._scan_deadline("OTHER"), 300)
+
+    def test_profiles_cached(self):
+        self.dscan._load_profiles_from_file = MagicMock(return_value={"TEST_V1": {"arguments": "-sS", "deadline": 60}})
+        self.assertEqual(self.dscan._profile_option("TEST_V1", "deadline"), 60)
+        self.assertEqual(self.dscan._profile_option("TEST_V1", "priority"), None)
+        self.assertEqual(self.dscan._scan_deadline("TEST_V1"), 60)
+        self.dscan._load_profiles_from_file.assert_called_once()
+
+        # The file is read again only when the profiles are reloaded
+        self.dscan._load_profiles_from_file.return_value = {"TEST_V1": {"arguments": "-sS", "deadline": 30}}
+        self.assertEqual(self.dscan._profile_option("TEST_V1", "deadline"), 60)
+        self.dscan.reload_profiles()
+        self.assertEqual(self.dscan._profile_option("TEST_V1", "deadline"), 30)
+        self.assertEqual(self.dscan._load_profiles_from_file.call_count, 2)
+
+        self.dscan._load_profiles_from_file.side_effect = IOError("No such file")
+        self.assertRaises(AppExceptions.DScanAppError, self.dscan.reload_profiles)
+        self.assertEqual(self.dscan._profile_option("TEST_V1", "deadline"), 30)
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_projects_results(self, mock_scanner):
+        self.mock_store()
+        self.dscan._load_profiles_from_file = MagicMock(return_value={
+            "TEST_V1": {"arguments": "-sS", "fields": {"drop": ["ports.servicefp", "hostnames"]}}})
+        self.dscan.store.hash_scans.side_effect = lambda hosts: hosts
+        mock_scanner.scan.return_value = {"results": [
+            {"host": "10.0.0.1", "hostnames": {}, "ports": [{"portid": "22", "servicefp": "fp"}]}]}
+
+        self.dscan._port_scan()
+
+        _args, _kwargs = self.dscan.store.save_hashed_scans.call_args
+        self.assertEqual(_args[2], [{"host": "10.0.0.1", "ports": [{"portid": "22", "servicefp": ""}]}])
+        self.assertEqual(_kwargs["projection"].spec, json.dumps({"drop": ["hostnames", "ports.servicefp"], "keep": []}))
+
+    def test_profile_projection_of_grepable_output(self):
+        self.dscan._load_profiles_from_file = MagicMock(return_value={"TEST_V1": {"arguments": "-sS"}})
+        self.assertIsNone(self.dscan._profile_projection("TEST_V1", "-sS"))
+
+        self.dscan._settings["grepable_output"] = True
+        # Only port only scans take their results from the grepable output
+        self.assertEqual(json.loads(self.dscan._profile_projection("TEST_V1", "-sS").spec)["output"], "grepable")
+        self.assertIsNone(self.dscan._profile_projection("TEST_V1", "-sS -sV"))
+        # The scans of the workers are parsed from the XML output
+        self.assertIsNone(self.dscan._profile_projection("TEST_V1"))
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_with_rate_budget(self, mock_scanner):
+        self.mock_store()
+        self.dscan._rate_controller = RateController(1000, 100, initial_limit=2)
+
+        def _scan(*args, **kwargs):
+            kwargs["progress_callback"](10)
+            self.assertEqual(self.dscan.stats()["scans"]["scan-0.0.0.0-TEST_V1"]["rate"], 500)
+            return {"results": []}
+        mock_scanner.scan.side_effect = _scan
+
+        self.dscan._port_scan()
+
+        self.assertTrue(mock_scanner.scan.call_args[0][1].endswith(" --max-rate 500"))
+        self.assertEqual(self.dscan.stats()["active"], 0)
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_port_scan_follows_covering_scan(self, mock_scanner):
+        self.mock_store()
+        self.dscan._settings["shard_size"] = 0
+        self.dscan.store.create_scan_job.side_effect = ["large_job", "small_job"]
+        self.dscan.store.save_scans.side_effect = \
+            lambda profile, host, hosts, job_uuid, projection: [MagicMock(uuid=f"{job_uuid}-{_h['host']}") for _h in hosts]
+        _started = Event()
+        _planned = Event()
+
+        def _scan(*args, **kwargs):
+            _started.set()
+            _planned.wait(5)
+            kwargs["host_callback"]({"host": "10.0.5.1"})
+            return {"results": [{"host": "10.0.5.1"}, {"host": "10.0.5.2"}, {"host": "10.0.6.1"}]}
+        mock_scanner.scan.side_effect = _scan
+        _plan = self.dscan._planner.plan
+
+        def _plan_and_notify(name, *args):
+            _p = _plan(name, *args)
+            if name == "scan-10.0.5.0/24-TEST_V1":
+                _planned.set()
+            return _p
+        self.dscan._planner.plan = _plan_and_notify
+
+        _large = Thread(target=self.dscan._port_scan, args=("10.0.0.0/16", "TEST_V1"))
+        _large.start()
+        _started.wait(5)
+        _small = Thread(target=self.dscan._port_scan, args=("10.0.5.0/24", "TEST_V1"))
+        _small.start()
+        _large.join(5)
+        _small.join(5)
+
+        # The small target is covered by the large scan, so it is not scanned again
+        mock_scanner.scan.assert_called_once()
+        self.dscan.store.save_scans.assert_any_call("TEST_V1", "10.0.5.0/24", [{"host": "10.0.5.1"}], job_uuid="small_job", projection=None)
+        self.dscan.store.save_scans.assert_any_call("TEST_V1", "10.0.5.0/24", [{"host": "10.0.5.2"}], job_uuid="small_job", projection=None)
+        self.dscan.store.get_filtered_scans.assert_called_with(
+            ["small_job-10.0.5.1", "small_job-10.0.5.2"], last_n=2)
+        self.dscan.store.update_scan_job.assert_any_call("small_job", "finished")
+
+    def test_saved_host_results(self):
+        self.mock_store()
+        self.dscan.store.get_scan_job.return_value = {"uuid": "job", "hosts": [{"host": "10.0.5.1", "scan_uuid": "scan_1"}]}
+        self.dscan.store.get_filtered_scans.return_value = [{"uuid": "scan_1", "results": {"host": "10.0.5.1"}}]
+
+        self.assertEqual(self.dscan._saved_host_results("job"), [{"host": "10.0.5.1"}])
+        self.dscan.store.get_filtered_scans.assert_called_once_with(["scan_1"], last_n=1)
+
+    @patch("deltascan.core.deltascan.check_root_permissions", MagicMock())
+    @patch("deltascan.core.deltascan.Scanner")
+    def test_batch_port_scan(self, mock_scanner):
+        self.mock_store()
+        self.dscan.store.create_scan_job.side_effect = ["job_1", "job_2", "job_3"]
+        self.dscan.store.save_scans.side_effect = \
+            lambda profile, host, hosts, job_uuid, projection: [MagicMock(uuid=f"{job_uuid}-{_h['host']}") for _h in hosts]
+
+        def _scan(*args, **kwargs):
+            kwargs["host_callback"]({"host": "10.0.0.1"})
+            return {"results": [{"host": "10.0.0.1"}, {"host": "10.0.0.2"}]}
+        mock_scanner.scan.side_effect = _scan
+
+        _results = self.dscan._batch_port_scan(
+            ["10.0.0.1", "10.0.0.2", "10.0.0.3"], "TEST_V1", ["scan-1", "scan-2", "scan-3"])
+
+        # A single nmap scan for all the hosts
+        mock_scanner.scan.assert_called_once()
+        self.assertEqual(mock_scanner.scan.call_args[0][0], "10.0.0.1,10.0.0.2,10.0.0.3")
+        self.assertEqual(self.dscan.store.save_scans.call_args_list, [
+            call("TEST_V1", "10.0.0.1", [{"host": "10.0.0.1"}], job_uuid="job_1", projection=None),
+            call("TEST_V1", "10.0.0.2", [{"host": "10.0.0.2"}], job_uuid="job_2", projection=None)])
+        self.dscan.store.get_filtered_scans.assert_has_calls([
+            call(["job_1-10.0.0.1"], last_n=1), call(["job_2-10.0.0.2"], last_n=1), call([], last_n=0)])
+        self.assertEqual(sorted(_results.keys()), ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+        self.assertEqual([_r["job"] for _r in self.dscan.result[-3:]], ["job_1", "job_2", "job_3"])
+        self.dscan.store.update_scan_job.assert_has_calls(
+            [call("job_1", "finished"), call("job_2", "finished"), call("job_3", "finished")])
+
+    def test_scan_orchestrator_bounded_workers(self):
+        self.mock_store()
+        self.dscan.ui_context = {"ui_live": MagicMock(), "ui_instances": {}}
+        self.dscan._settings["max_concurrent_scans"] = 2
+        _lock = Lock()
+        _running = []
+        _max_running = []
+
+        def _port_scan(host, *args):
+            with _lock:
+                _running.append(host)
+                _max_running.append(len(_running))
+            time.sleep(0.05)
+            with _lock:
+                _running.remove(host)
+        self.dscan._port_scan = MagicMock(side_effect=_port_scan)
+
+        for _i in range(5):
+            self.dscan.add_scan(f"10.0.{_i}.0/24", "TEST_V1")
+        self.assertRaises(AppExceptions.DScanInputValidationException, self.dscan.add_scan, "10.0.0.0/24", "TEST_V1")
+        self.assertEqual(self.dscan.scans_to_execute, 5)
+
+        self.dscan.scan()
+
+        self.assertEqual(self.dscan._port_scan.call_count, 5)
+        self.assertEqual(max(_max_running), 2)
+        self.assertEqual((self.dscan.scans_to_execute, self.dscan.scans_to_wait, self.dscan.is_running), (0, 0, False))
+        self.assertEqual(self.dscan.stats()["queue"]["started"], 5)
+
+    def test_scan_priority(self):
+        self.dscan._load_profiles_from_file = MagicMock(return_value={
+            "TEST_V1": {"arguments": "-sS", "priority": "high"},
+            "TEST_V2": {"arguments": "-sS", "priority": "urgent"}})
+        self.assertEqual(self.dscan._scan_priority("TEST_V1", "low"), "low")
+        self.assertEqual(self.dscan._scan_priority("TEST_V1"), "high")
+        self.assertEqual(self.dscan._scan_priority("TEST_V2"), "normal")
+        self.assertEqual(self.dscan._scan_priority("OTHER"), "normal")
+
+    def test_add_scan_priority(self):
+        self.mock_store()
+        self.dscan.ui_context = {"ui_live": MagicMock(), "ui_instances": {}}
+        self.dscan.add_scan("10.0.0.0/24", "TEST_V1", priority="high", submitter="alice")
+        self.assertRaises(AppExceptions.DScanInputValidationException,
+                          self.dscan.add_scan, "10.0.1.0/24", "TEST_V1", priority="urgent")
+        _scan = self.dscan._queue.scans()[0]
+        self.assertEqual((_scan["priority"], _scan["share"], _scan["weight"]), ("high", "alice", 1))
+        self.assertEqual(self.dscan.stats()["queue"]["depth"], {"high": 1, "normal": 0, "low": 0})
+
+    def test_add_scan_queue_full(self):
+        self.mock_store()
+        self.dscan.ui_context = {"ui_live": MagicMock(), "ui_instances": {}}
+        self.dscan._queue.max_size = 1
+        self.dscan.add_scan("10.0.0.0/24", "TEST_V1")
+        self.assertRaises(AppExceptions.DScanQueueFullException, self.dscan.add_scan, "10.0.1.0/24", "TEST_V1")
+        self.assertEqual(len(self.dscan.renderables), 1)
+        self.assertEqual(self.dscan.stats()["queue"]["rejected"], 1)
+
+    def test_scan_status_headless(self):
+        self.mock_store()
+        self.dscan.ui_context = None
+        self.assertTrue(self.dscan.add_scan("10.0.0.0/24", "TEST_V1", priority="low"))
+        self.assertEqual(self.dscan.renderables, [])
+        _name = self.dscan.scan_name("10.0.0.0/24", "TEST_V1")
+        self.assertEqual(self.dscan.scan_status(_name), {"name": _name, "status": "queued", "priority": "low", "job": None})
+        self.assertEqual(self.dscan.scan_status("scan-10.0.0.1-TEST_V1"), None)
+
+        self.dscan._queue.clear()
+        self.dscan._record_scan_outcome(_name, "job_uuid", "finished")
+        _status = self.dscan.scan_status(_name)
+        self.assertEqual((_status["status"], _status["job"]), ("finished", "job_uuid"))
+
+    def test_add_schedule(self):
+        self.mock_store()
+        self.dscan.add_schedule("nightly", "10.0.0.0/24", "TEST_V1", cron="0 2 * * *", jitter=300, priority="low")
+        _args = self.dscan.store.create_schedule.call_args
+        self.assertEqual(_args.args[:3], ("nightly", "10.0.0.0/24", "TEST_V1"))
+        self.assertEqual((_args.args[3].hour, _args.args[3].minute), (2, 0))
+        self.assertEqual(_args.kwargs, {
+            "cron": "0 2 * * *", "interval": None, "jitter": 300, "priority": "low", "deadline": None})
+
+        for _kwargs in [{}, {"cron": "0 2 * * *", "interval": 60}, {"cron": "0 25 * * *"}, {"interval": 0},
+                        {"interval": 60, "jitter": -1}, {"interval": 60, "priority": "urgent"}]:
+            self.assertRaises(AppExceptions.DScanInputValidationException,
+                              self.dscan.add_schedule, "invalid", "10.0.0.0/24", "TEST_V1", **_kwargs)
+        self.assertRaises(AppExceptions.DScanProfileNotFoundException,
+                          self.dscan.add_schedule, "invalid", "10.0.0.0/24", "OTHER", interval=60)
+
+    def test_fire_schedule(self):
+        self.mock_store()
+        self.dscan.ui_context = {"ui_live": MagicMock(), "ui_instances": {}}
+        _schedule = {"name": "nightly", "target": "10.0.0.0/24", "profile_name": "TEST_V1", "deadline": None, "priority": "low"}
+        self.assertTrue(self.dscan._fire_schedule(_schedule))
+        # The previous run is still queued
+        self.assertFalse(self.dscan._fire_schedule(_schedule))
+        _scan = self.dscan._queue.scans()[0]
+        self.assertEqual((_scan["priority"], _scan["share"]), ("low", "schedule:nightly"))
+
+    def test_resume(self):
+        self.mock_store()
+        self.dscan.add_scan = MagicMock()
+        self.dscan.store.get_scan_job.return_value = {
+            "uuid": "job_uuid", "target": "10.0.0.0/30", "profile_name": "TEST_V1", "status": "cancelled", "pending": 3}
+
+        self.assertEqual(self.dscan.resume()["uuid"], "job_uuid")
+        self.dscan.store.get_scan_job.assert_called_once_with(None)
+        self.dscan.add_scan.assert_called_once_with("10.0.0.0/30", "TEST_V1", job="job_uuid")
+
+        self.dscan.store.get_scan_job.return_value["status"] = "finished"
+        self.assertRaises(AppExceptions.DScanInputValidationException, self.dscan.resume, "job_uuid")
+
+        self.dscan.store.get_scan_job.return_value["status"] = "running"
+        self.dscan.store.get_scan_job.return_value["pending"] = 0
+        self.assertRaises(AppExceptions.DScanInputValidationException, self.dscan.resume, "job_uuid")
+        self.dscan.store.update_scan_job.assert_called_once_with("job_uuid", "finished")
 
     @patch("deltascan.core.deltascan.Scanner", MagicMock())
     def test_diffs_date_validation_error(self):
@@ -113,23 +517,76 @@ class TestMain(TestCase):
     @patch("deltascan.core.deltascan.Scanner", MagicMock())
     def test_diffs_success(self):
         self.mock_store()
-        last_n_scan_results = mock_data_with_real_hash(SCANS_FROM_DB_TEST_V1)
         self.dscan._list_scans_with_diffs = MagicMock()
-        self.dscan.store.get_filtered_scans.return_value = last_n_scan_results
         self.dscan._config.fdate = "2021-01-01 12:00:00"
         self.dscan._config.tdate = "2021-01-21 12:00:00"
         self.dscan._config.n_scans = 4
         self.dscan._config.profile = "CUSTOM_PROFILE"
 
-        self.dscan.diffs()
+        self.assertEqual(self.dscan.diffs(), self.dscan.store.get_diffs.return_value)
+
+        # The saved diffs are looked up instead of comparing the scans
+        self.dscan.store.get_diffs.assert_called_once_with(
+            host="0.0.0.0", last_n=4, profile="CUSTOM_PROFILE", from_date="2021-01-01 12:00:00", to_date="2021-01-21 12:00:00",
+            n_diffs=1)
+        self.dscan.store.get_filtered_scans.assert_not_called()
+        self.dscan._list_scans_with_diffs.assert_not_called()
+
+    @patch("deltascan.core.deltascan.Scanner", MagicMock())
+    def test_diffs_backfilled(self):
+        self.mock_store()
+        _scans = mock_data_with_real_hash(SCANS_FROM_DB_TEST_V1)
+        # A scan saved before the diffs were saved along with the scans
+        self.dscan.store.get_scans_without_diff.return_value = [
+            {"id": 2, "uuid": "uuid_2", "results": _scans[1]["results"], "result_hash": _scans[1]["result_hash"]}]
+        self.dscan.store.get_adjacent_scans.return_value = (
+            {"id": 3, "results": _scans[2]["results"], "result_hash": _scans[2]["result_hash"]}, None)
+
+        self.assertEqual(
+            self.dscan.filter_diffs(host="0.0.0.0", n_scans=4, from_date="2021-01-01 12:00:00"), self.dscan.store.get_diffs.return_value)
+
+        self.dscan.store.get_scans_without_diff.assert_called_once_with("0.0.0.0", 4, None, "2021-01-01 12:00:00", None)
+        self.dscan.store.save_diff.assert_called_once_with(2, 3, self.dscan._diffs_between_dicts(
+            self.dscan._results_to_port_dict(_scans[1]["results"]), self.dscan._results_to_port_dict(_scans[2]["results"])), True)
+        self.dscan.store.get_diffs.assert_called_once()
+
+    @patch("deltascan.core.deltascan.Scanner", MagicMock())
+    def test_diffs_of_uuids(self):
+        self.mock_store()
+        last_n_scan_results = mock_data_with_real_hash(SCANS_FROM_DB_TEST_V1)
+        self.dscan._list_scans_with_diffs = MagicMock()
+        self.dscan.store.get_filtered_scans.return_value = last_n_scan_results
+
+        self.dscan.filter_diffs(uuids=["uuid_1", "uuid_3"], n_scans=4)
 
         self.dscan.store.get_filtered_scans.assert_called_once_with(
-            uuid=None, host="0.0.0.0", last_n=4, profile="CUSTOM_PROFILE", from_date="2021-01-01 12:00:00", to_date="2021-01-21 12:00:00"
-        )
+            uuid=["uuid_1", "uuid_3"], host=None, last_n=4, profile=None, from_date=None, to_date=None)
+        self.dscan._list_scans_with_diffs.assert_called_once_with(last_n_scan_results)
+        self.dscan.store.get_diffs.assert_not_called()
 
-        self.dscan._list_scans_with_diffs.assert_called_once_with(
-           last_n_scan_results,
-        )
+    @patch("deltascan.core.deltascan.Scanner", MagicMock())
+    def test_record_diffs(self):
+        self.mock_store()
+        _scans = mock_data_with_real_hash(SCANS_FROM_DB_TEST_V1)
+        _new = MagicMock(id=2, uuid="uuid_2", results=json.dumps(_scans[1]["results"]), result_hash=_scans[1]["result_hash"])
+        _previous = {"id": 3, "results": _scans[2]["results"], "result_hash": _scans[2]["result_hash"]}
+        _next = {"id": 1, "results": _scans[0]["results"], "result_hash": _scans[0]["result_hash"]}
+        self.dscan.store.get_adjacent_scans.return_value = (_previous, _next)
+
+        self.dscan._record_diffs([_new])
+
+        self.dscan.store.get_adjacent_scans.assert_called_once_with(2)
+        self.dscan.store.save_diff.assert_has_calls([
+            call(2, 3, self.dscan._diffs_between_dicts(
+                self.dscan._results_to_port_dict(_scans[1]["results"]), self.dscan._results_to_port_dict(_scans[2]["results"])), True),
+            call(1, 2, self.dscan._diffs_between_dicts(
+                self.dscan._results_to_port_dict(_scans[0]["results"]), self.dscan._results_to_port_dict(_scans[1]["results"])), True)])
+
+        # Scans with the same results are not compared
+        self.dscan.store.save_diff.reset_mock()
+        self.dscan.store.get_adjacent_scans.return_value = (dict(_previous, result_hash=_scans[1]["result_hash"]), None)
+        self.dscan._record_diffs([_new])
+        self.dscan.store.save_diff.assert_called_once_with(2, 3, {"added": {}, "removed": {}, "changed": {}}, False)
 
     @patch("deltascan.core.deltascan.Scanner", MagicMock())
     def test_list_scans_with_diffs_success(self):
@@ -190,6 +647,17 @@ class TestMain(TestCase):
                 "result_hashes": [results_to_find_diffs[1]["result_hash"], results_to_find_diffs[2]["result_hash"]]
             }])
 
+    @patch("deltascan.core.deltascan.Scanner", MagicMock())
+    def test_list_scans_with_diffs_of_different_projections(self):
+        self.mock_store()
+        _scans = [dict(_s) for _s in mock_data_with_real_hash(SCANS_FROM_DB_TEST_V1)]
+        self.dscan._config.n_diffs = 4
+        _scans[0]["projection"] = None
+        _scans[1]["projection"] = _scans[2]["projection"] = '{"drop": ["os"]}'
+
+        # The projected scans are compared with each other but not with the scan that has all the fields
+        self.assertEqual([_d["uuids"] for _d in self.dscan._list_scans_with_diffs(_scans)], [["uuid_2", "uuid_3"]])
+
     @patch("deltascan.core.deltascan.Scanner", MagicMock())
     def test_results_to_port_dict_success(self):
         _results_to_port_dict_results = SCANS_FROM_DB_TEST_V1_PORTS_KEYS[0]
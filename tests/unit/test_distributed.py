@@ -0,0 +1,190 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from deltascan.core.store import Store
+from deltascan.core.distributed import (ScanCoordinator, ScanWorker)
+from deltascan.core.exceptions import StoreExceptions
+
+DB_FILE = "deltascan.db"
+
+
+class FakeScanner:
+    """
+    Finds the first host of every target.
+    """
+    @classmethod
+    def scan(cls, target, scan_args, ui_context, logger=None, name=None, _cancel_evt=None):
+        if target.startswith("10.0.9."):
+            raise ValueError("nmap failed")
+        return {"results": [{
+            "host": target.split("/")[0], "status": "up", "ports": [], "os": ["unknown"], "hops": [],
+            "osfingerprint": "none", "last_boot": "none"}]}
+
+
+def run_worker(db_path, name, die=False):
+    _store = Store(db_path, logger=MagicMock())
+    if die:
+        # Dies while it holds the lease of a job
+        _store.claim_worker_job(name, 1, 3)
+        os._exit(0)
+    ScanWorker(_store, name, scanner=FakeScanner, lease_duration=1, poll_interval=0.1, logger=MagicMock()).run()
+
+
+@patch("deltascan.core.store.DATABASE", DB_FILE)
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db_path = f"{self.dir.name}/"
+        # The decorator of the class does not patch setUp
+        with patch("deltascan.core.store.DATABASE", DB_FILE):
+            self.store = Store(self.db_path, logger=MagicMock())
+        self.store.save_profiles({"TEST": {"arguments": "-sS"}})
+        self.coordinator = ScanCoordinator(self.store, max_attempts=2, logger=MagicMock())
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def test_claim_and_lease(self):
+        _job_uuid = self.coordinator.dispatch("10.0.0.0/24", "TEST", "-sS", shard_size=128)
+        _first = self.store.claim_worker_job("w1", 60, 2)
+        _second = self.store.claim_worker_job("w2", 60, 2)
+        self.assertEqual((_first["target"], _first["arguments"], _first["job_uuid"]), ("10.0.0.0/25", "-sS", _job_uuid))
+        self.assertEqual(_second["target"], "10.0.0.128/25")
+        self.assertEqual(self.store.claim_worker_job("w3", 60, 2), None)
+
+        self.assertTrue(self.store.renew_worker_lease(_first["lease"], 60))
+        self.assertTrue(self.store.finish_worker_job(_first["lease"], [{"host": "10.0.0.1"}]))
+        # A finished job can not be reported again
+        self.assertFalse(self.store.finish_worker_job(_first["lease"], []))
+
+        # The lease of a dead worker expires and another worker runs the job, the dead worker lost the lease
+        self.store.rdbms.update_worker_job(
+            {"lease": _second["lease"]}, lease_expires=(datetime.now() - timedelta(seconds=5)).strftime("%Y-%m-%d %H:%M:%S"))
+        _again = self.store.claim_worker_job("w3", 60, 2)
+        self.assertEqual((_again["target"], _again["worker"], _again["attempts"]), ("10.0.0.128/25", "w3", 2))
+        self.assertFalse(self.store.renew_worker_lease(_second["lease"], 60))
+        self.assertFalse(self.store.finish_worker_job(_second["lease"], []))
+
+        # The job has been tried twice, it fails
+        self.assertTrue(self.store.release_worker_job(_again["lease"], "nmap failed", 2))
+        self.assertEqual([_j["status"] for _j in self.store.get_worker_jobs(job_uuid=_job_uuid)], ["done", "failed"])
+
+    def test_poll(self):
+        _job_uuid = self.coordinator.dispatch("10.0.0.0/24", "TEST", "-sS", shard_size=128)
+        _worker = ScanWorker(self.store, "w1", scanner=FakeScanner, logger=MagicMock())
+        self.assertTrue(_worker.run_once())
+        self.assertEqual(self.coordinator.poll(_job_uuid), None)
+        self.assertEqual(_worker.run(until_idle=True), 1)
+        self.assertEqual(self.coordinator.poll(_job_uuid), "finished")
+
+        _job = self.store.get_scan_job(_job_uuid)
+        self.assertEqual((_job["status"], sorted([_h["host"] for _h in _job["hosts"]])), ("finished", ["10.0.0.0", "10.0.0.128"]))
+        self.assertEqual([_j["status"] for _j in self.store.get_worker_jobs(job_uuid=_job_uuid)], ["ingested", "ingested"])
+        # The results are ingested once
+        self.assertEqual(self.coordinator.poll(_job_uuid), "finished")
+        self.assertEqual(len(self.store.get_scan_job(_job_uuid)["hosts"]), 2)
+
+    def test_ingest_save_failed(self):
+        _job_uuid = self.coordinator.dispatch("10.0.0.1", "TEST", "-sS")
+        ScanWorker(self.store, "w1", scanner=FakeScanner, logger=MagicMock()).run(until_idle=True)
+
+        # The results are kept in the job until they are saved
+        with patch.object(self.store, "save_scans", side_effect=StoreExceptions.DScanErrorCreatingEntry("locked")):
+            self.assertEqual(self.coordinator.poll(_job_uuid), None)
+        _job = self.store.get_worker_jobs(job_uuid=_job_uuid)[0]
+        self.assertEqual(_job["status"], "done")
+        self.assertNotEqual(_job["results"], None)
+
+        self.assertEqual(self.coordinator.poll(_job_uuid), "finished")
+        self.assertEqual([_h["host"] for _h in self.store.get_scan_job(_job_uuid)["hosts"]], ["10.0.0.1"])
+        self.assertEqual(self.store.get_worker_jobs(job_uuid=_job_uuid)[0]["results"], None)
+
+    def test_ingest_while_other_store_is_closed(self):
+        _job_uuid = self.coordinator.dispatch("10.0.0.1", "TEST", "-sS")
+        ScanWorker(self.store, "w1", scanner=FakeScanner, logger=MagicMock()).run(until_idle=True)
+        _save_scans = self.store.save_scans
+
+        def _save_after_close(*args, **kwargs):
+            # Every store shares the database connection. Closing another store does not end the transaction
+            with patch("deltascan.core.store.DATABASE", DB_FILE):
+                Store(self.db_path, logger=MagicMock()).close()
+            return _save_scans(*args, **kwargs)
+        with patch.object(self.store, "save_scans", side_effect=_save_after_close):
+            self.assertEqual(self.coordinator.poll(_job_uuid), "finished")
+        self.assertEqual([_h["host"] for _h in self.store.get_scan_job(_job_uuid)["hosts"]], ["10.0.0.1"])
+
+    def test_ingest_invalid_results(self):
+        _job_uuid = self.coordinator.dispatch("10.0.0.1", "TEST", "-sS")
+        _lease = self.store.claim_worker_job("w1", 60, 2)["lease"]
+        self.store.finish_worker_job(_lease, [{"host": "10.0.0.1"}])
+
+        self.assertEqual(self.coordinator.poll(_job_uuid), "failed")
+        _job = self.store.get_worker_jobs(job_uuid=_job_uuid)[0]
+        # The results that can not be saved are kept with the failed job
+        self.assertEqual(json.loads(_job["results"]), [{"host": "10.0.0.1"}])
+        self.assertIn("status", _job["error"])
+
+    def test_poll_failed(self):
+        _job_uuid = self.coordinator.dispatch("10.0.9.1", "TEST", "-sS")
+        _worker = ScanWorker(self.store, "w1", scanner=FakeScanner, max_attempts=2, logger=MagicMock())
+        self.assertEqual(_worker.run(until_idle=True), 2)
+        self.assertEqual(self.coordinator.poll(_job_uuid), "failed")
+        self.assertEqual(self.store.get_worker_jobs(job_uuid=_job_uuid)[0]["error"], "nmap failed")
+
+    def test_poll_expired(self):
+        _job_uuid = self.coordinator.dispatch("10.0.0.1", "TEST", "-sS")
+        self.store.claim_worker_job("w1", 1, 2)
+        self.store.rdbms.update_worker_job({}, attempts=2)
+        self.assertEqual(self.coordinator.poll(_job_uuid), None)
+        self.assertEqual(self.coordinator.poll(_job_uuid, now=datetime.now() + timedelta(seconds=5)), "failed")
+
+    def test_local_worker_processes(self):
+        _job_uuids = [
+            self.coordinator.dispatch("10.0.0.0/24", "TEST", "-sS", shard_size=64),
+            self.coordinator.dispatch("10.0.1.1", "TEST", "-sS")]
+        _ctx = multiprocessing.get_context("fork")
+        _dead = _ctx.Process(target=run_worker, args=(self.db_path, "dead", True))
+        _dead.start()
+        _dead.join()
+        _workers = [_ctx.Process(target=run_worker, args=(self.db_path, f"w{_i}")) for _i in range(3)]
+        for _w in _workers:
+            _w.start()
+        try:
+            _start = time.monotonic()
+            _statuses = self.coordinator.wait(_job_uuids, interval=0.1, timeout=30)
+        finally:
+            for _w in _workers:
+                _w.terminate()
+                _w.join()
+
+        self.assertEqual(_statuses, {_job_uuids[0]: "finished", _job_uuids[1]: "finished"})
+        self.assertLess(time.monotonic() - _start, 30)
+        _hosts = sorted([_h["host"] for _h in self.store.get_scan_job(_job_uuids[0])["hosts"]])
+        self.assertEqual(_hosts, ["10.0.0.0", "10.0.0.128", "10.0.0.192", "10.0.0.64"])
+        _jobs = self.store.get_worker_jobs(job_uuid=_job_uuids[0])
+        # The job of the dead worker was run again by another worker
+        self.assertEqual(_jobs[0]["attempts"], 2)
+        self.assertNotEqual(_jobs[0]["worker"], "dead")
@@ -0,0 +1,109 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import os
+import shlex
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from deltascan.core.nmap.grepable import (GrepableOutput, GrepableParser, is_port_only)
+from deltascan.core.scanner import Scanner
+from deltascan.core.exceptions import AppExceptions
+
+NMAP_GREPABLE_TWO_HOSTS = """# Nmap 7.94 scan initiated Mon Jun 10 08:53:20 2024 as: nmap -oX - -vvv -sS -p 22,80 -oG out.gnmap 10.0.0.0/30
+# Ports scanned: TCP(2;22,80) UDP(0;) SCTP(0;) PROTOCOLS(0;)
+Host: 10.0.0.1 (gw.local)\tStatus: Up
+Host: 10.0.0.1 (gw.local)\tPorts: 22/open/tcp//ssh///, 80/filtered/tcp//http///\tIgnored State: closed (998)
+Host: 10.0.0.2 ()\tStatus: Up
+Host: 10.0.0.2 ()\tPorts: 22/closed/tcp//ssh///, 80/open/tcp//http|proxy//nginx 1.2|x/
+Host: 10.0.0.3 ()\tStatus: Down
+# Nmap done at Mon Jun 10 08:53:23 2024 -- 4 IP addresses (2 hosts up) scanned in 3.00 seconds
+"""
+
+
+class TestGrepable(unittest.TestCase):
+    def test_is_port_only(self):
+        self.assertTrue(is_port_only("-sS -n -Pn -vv -p 80"))
+        self.assertTrue(is_port_only("-vv -n -sn -PS21,22,80"))
+        self.assertTrue(is_port_only("-sS -vv --top-ports 1000 --reason --open -oA scan"))
+        self.assertFalse(is_port_only("-sS -n -Pn -vv -p 80 -O -sV"))
+        self.assertFalse(is_port_only("-sS -vv -A -p 80"))
+        self.assertFalse(is_port_only("-sS -p 80 --script=default,safe"))
+        self.assertFalse(is_port_only("-sS -p 80 --traceroute"))
+        self.assertFalse(is_port_only(None))
+
+    def test_extract_port_scan_results(self):
+        _results = GrepableParser.extract_port_scan_results(NMAP_GREPABLE_TWO_HOSTS)
+        self.assertEqual([_h["host"] for _h in _results["results"]], ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+        self.assertEqual(_results["results"][0], {
+            "host": "10.0.0.1",
+            "status": "up",
+            "ports": [
+                {"protocol": "tcp", "portid": "22", "state": {"state": "open"}, "service_name": "ssh", "servicefp": "", "service_product": ""},
+                {"protocol": "tcp", "portid": "80", "state": {"state": "filtered"}, "service_name": "http", "servicefp": "",
+                 "service_product": ""}],
+            "os": ["unknown"],
+            "osfingerprint": "none",
+            "hops": ["unknown"],
+            "last_boot": "none"})
+        self.assertEqual(_results["results"][1]["ports"][1]["service_name"], "http/proxy")
+        self.assertEqual(_results["results"][1]["ports"][1]["service_product"], "nginx 1.2/x")
+        self.assertEqual((_results["results"][2]["status"], _results["results"][2]["ports"]), ("down", []))
+
+        self.assertEqual(_results["args"], "nmap -oX - -vvv -sS -p 22,80 -oG out.gnmap 10.0.0.0/30")
+        self.assertEqual(_results["scaninfo"], {"protocol": "tcp", "numservices": "2", "services": "22,80"})
+        self.assertEqual(_results["start"], str(int(time.mktime((2024, 6, 10, 8, 53, 20, 0, 0, -1)))))
+        self.assertEqual(_results["runstats"]["finished"]["time"], str(int(time.mktime((2024, 6, 10, 8, 53, 23, 0, 0, -1)))))
+        self.assertEqual(_results["runstats"]["hosts"], {"up": "2", "down": "2", "total": "4"})
+
+    def test_extract_port_scan_results_error(self):
+        self.assertRaises(AppExceptions.DScanResultsParsingError, GrepableParser.extract_port_scan_results, "# Nmap done at\n")
+        self.assertRaises(AppExceptions.DScanResultsParsingError, GrepableParser.extract_port_scan_file_results, "/missing/scan.gnmap")
+
+    def test_grepable_output(self):
+        _output = GrepableOutput()
+        self.assertTrue(os.path.exists(_output.path))
+        self.assertEqual(shlex.split(_output.arguments("-sS -p 80"))[-2:], ["-oG", _output.path])
+        with open(_output.path, "w") as _f:
+            _f.write(NMAP_GREPABLE_TWO_HOSTS)
+        self.assertEqual(_output.parse(), GrepableParser.extract_port_scan_results(NMAP_GREPABLE_TWO_HOSTS))
+        _output.remove()
+        self.assertFalse(os.path.exists(_output.path))
+        _output.remove()
+
+    def test_scanner_grepable(self):
+        _args = []
+
+        def _nmap(target, scan_args, *args, **kwargs):
+            _args.append((scan_args, kwargs["host_xml_callback"]))
+            if "-oG" in scan_args:
+                with open(shlex.split(scan_args)[-1], "w") as _f:
+                    _f.write(NMAP_GREPABLE_TWO_HOSTS)
+            return "<nmaprun/>"
+
+        with patch("deltascan.core.scanner.LibNmapWrapper.scan", MagicMock(side_effect=_nmap)):
+            _results = Scanner.scan("10.0.0.0/30", "-sS -p 22,80", grepable=True, host_callback=MagicMock())
+            self.assertEqual(_results, GrepableParser.extract_port_scan_results(NMAP_GREPABLE_TWO_HOSTS))
+            # The hosts are not reported from the XML output
+            self.assertIsNone(_args[0][1])
+            # The grepable output file is removed
+            self.assertFalse(os.path.exists(shlex.split(_args[0][0])[-1]))
+
+            # Scans of services are parsed from the XML output
+            self.assertRaises(AppExceptions.DScanScannerError, Scanner.scan, "10.0.0.0/30", "-sS -sV -p 22,80",
+                              logger=MagicMock(), grepable=True)
+            self.assertNotIn("-oG", _args[1][0])
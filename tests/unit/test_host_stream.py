@@ -0,0 +1,49 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import unittest
+from deltascan.core.nmap.host_stream import NmapHostStream
+from .test_data.mock_data import NMAP_XML_TWO_HOSTS
+
+
+class TestNmapHostStream(unittest.TestCase):
+    def _feed_in_chunks(self, data, size):
+        _stream = NmapHostStream()
+        _hosts = []
+        for _i in range(0, len(data), size):
+            _hosts.extend(_stream.feed(data[_i:_i + size]))
+        return _hosts
+
+    def test_feed_whole_document(self):
+        _hosts = NmapHostStream().feed(NMAP_XML_TWO_HOSTS)
+        self.assertEqual(len(_hosts), 2)
+        self.assertTrue(_hosts[0].startswith('<host starttime="1718000001" endtime="1718000002">'))
+        self.assertTrue(_hosts[0].endswith("</host>"))
+        self.assertIn("10.0.0.2", _hosts[1])
+
+    def test_feed_in_chunks(self):
+        _expected = NmapHostStream().feed(NMAP_XML_TWO_HOSTS)
+        for _size in [1, 2, 5, 7, 64]:
+            self.assertEqual(self._feed_in_chunks(NMAP_XML_TWO_HOSTS, _size), _expected)
+
+    def test_host_is_returned_once_complete(self):
+        _stream = NmapHostStream()
+        self.assertEqual(_stream.feed("<nmaprun><host><address addr='10.0.0.1'/>"), [])
+        self.assertEqual(_stream.feed("<hostnames/></ho"), [])
+        self.assertEqual(_stream.feed("st><hosthint/>"), ["<host><address addr='10.0.0.1'/><hostnames/></host>"])
+
+    def test_ignores_similar_elements(self):
+        self.assertEqual(NmapHostStream().feed("<hosthint><status/></hosthint><hosts up='1'/>"), [])
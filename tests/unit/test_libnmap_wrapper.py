@@ -0,0 +1,194 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import os
+import tempfile
+import unittest
+from queue import Queue, Full
+from threading import Event
+from unittest.mock import patch
+from deltascan.core.nmap.libnmap_wrapper import (
+    LibNmapWrapper,
+    QueueMsg,
+    QMESSAGE_TYPE,
+    QMESSAGE_MSG)
+from deltascan.core.nmap.log_capture import LogCapture
+from deltascan.core.nmap.spool import NmapSpool
+
+
+class FakeNmapProcess:
+    """
+    Replays a list of (progress, stdout) steps, one step every time the process state is checked.
+    """
+    steps = []
+    rc_on_exit = 0
+
+    def __init__(self, targets=None, options=None, **kwargs):
+        self._steps = list(self.steps)
+        self._current = (0, "")
+        self._terminated = False
+        self.stopped = False
+        self.rc = None
+
+    def sudo_run_background(self):
+        pass
+
+    def run_background(self):
+        pass
+
+    def has_terminated(self):
+        if self._terminated:
+            return True
+        if len(self._steps) == 0:
+            self._terminated = True
+            self.rc = self.rc_on_exit
+            return True
+        self._current = self._steps.pop(0)
+        return False
+
+    def stop(self):
+        self.stopped = True
+        self._terminated = True
+
+    @property
+    def progress(self):
+        return self._current[0]
+
+    @property
+    def stdout(self):
+        return self._current[1]
+
+
+class BusyQueue(Queue):
+    """
+    Accepts the first message and then behaves as full for the given number of non-blocking puts.
+    """
+    def __init__(self, rejections=0):
+        super().__init__(maxsize=10)
+        self._rejections = rejections
+
+    def put_nowait(self, item):
+        if self.qsize() > 0 and self._rejections > 0:
+            self._rejections -= 1
+            raise Full
+        super().put_nowait(item)
+
+
+def _drain(queue):
+    _msgs = []
+    while not queue.empty():
+        _msgs.append(queue.get())
+    return _msgs
+
+
+class TestLibNmapWrapper(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = LibNmapWrapper("0.0.0.0", "-vv", progress_rate=1000, progress_queue_size=10)
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_run_sends_only_stdout_deltas(self):
+        FakeNmapProcess.steps = [(10, "<a>"), (10, "<a>"), (50, "<a><b>"), (90, "<a><b><c>")]
+        FakeNmapProcess.rc_on_exit = 0
+        _q = Queue(maxsize=10)
+        self.wrapper._run(_q, Event())
+
+        _msgs = _drain(_q)
+        _progress = [_m[QMESSAGE_MSG] for _m in _msgs if _m[QMESSAGE_TYPE] == QueueMsg.PROGRESS]
+        self.assertEqual(_progress, [
+            {"progress": 10, "stdout": "<a>"},
+            {"progress": 50, "stdout": "<b>"},
+            {"progress": 90, "stdout": "<c>"}])
+        self.assertEqual(_msgs[-2][QMESSAGE_TYPE], QueueMsg.DATA)
+        self.assertEqual(_msgs[-2][QMESSAGE_MSG], "<a><b><c>")
+        self.assertEqual(_msgs[-1][QMESSAGE_TYPE], QueueMsg.EXIT)
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_run_coalesces_stdout_when_queue_is_full(self):
+        FakeNmapProcess.steps = [(10, "1"), (20, "12"), (30, "123"), (40, "1234")]
+        FakeNmapProcess.rc_on_exit = 0
+        _q = BusyQueue(rejections=2)
+        self.wrapper._run(_q, Event())
+
+        _progress = [_m[QMESSAGE_MSG] for _m in _drain(_q) if _m[QMESSAGE_TYPE] == QueueMsg.PROGRESS]
+        self.assertEqual(_progress, [
+            {"progress": 10, "stdout": "1"},
+            {"progress": 40, "stdout": "234"}])
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_run_cancelled(self):
+        FakeNmapProcess.steps = [(10, "<a>"), (20, "<a><b>")]
+        _q = Queue(maxsize=10)
+        _e = Event()
+        _e.set()
+        self.wrapper._run(_q, _e)
+
+        _msgs = _drain(_q)
+        self.assertEqual(len(_msgs), 1)
+        self.assertEqual(_msgs[0][QMESSAGE_TYPE], QueueMsg.EXIT)
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_scan_returns_data(self):
+        FakeNmapProcess.steps = [(10, "<a>"), (100, "<a><b>")]
+        FakeNmapProcess.rc_on_exit = 0
+        self.assertEqual(self.wrapper._scan(), "<a><b>")
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_scan_reports_hosts_while_running(self):
+        FakeNmapProcess.steps = [
+            (10, "<nmaprun><host>1"),
+            (50, "<nmaprun><host>1</host><ho"),
+            (90, "<nmaprun><host>1</host><host>2</host>"),
+            (100, "<nmaprun><host>1</host><host>2</host></nmaprun>")]
+        FakeNmapProcess.rc_on_exit = 0
+        _hosts = []
+        self.wrapper.host_xml_callback = _hosts.append
+        self.wrapper._scan()
+        self.assertEqual(_hosts, ["<host>1</host>", "<host>2</host>"])
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_scan_appends_output_to_log_capture(self):
+        FakeNmapProcess.steps = [(10, "<a>"), (50, "<a><b>"), (100, "<a><b><c>")]
+        FakeNmapProcess.rc_on_exit = 0
+        _log = LogCapture(tail_size=4)
+        LibNmapWrapper("0.0.0.0", "-vv", progress_rate=1000, log_capture=_log)._scan()
+        self.assertEqual(_log.tail(), "><c>")
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_scan_writes_output_to_spool(self):
+        FakeNmapProcess.steps = [(10, "<a>"), (50, "<a><b>"), (100, "<a><b><c>")]
+        FakeNmapProcess.rc_on_exit = 0
+        with tempfile.TemporaryDirectory() as _dir:
+            _spool = NmapSpool(os.path.join(_dir, "scan.xml"))
+            self.assertEqual(LibNmapWrapper("0.0.0.0", "-vv", progress_rate=1000, spool=_spool)._scan(), _spool.path)
+            with open(_spool.path) as _f:
+                self.assertEqual(_f.read(), "<a><b><c>")
+
+    @patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", FakeNmapProcess)
+    def test_scan_failed(self):
+        FakeNmapProcess.steps = [(10, "<a>")]
+        FakeNmapProcess.rc_on_exit = 1
+        self.assertEqual(self.wrapper._scan(), None)
+
+    def test_scan_thread_failed(self):
+        class _BrokenNmapProcess(FakeNmapProcess):
+            def run_background(self):
+                raise AttributeError("run_background")
+            sudo_run_background = run_background
+
+        with patch("deltascan.core.nmap.libnmap_wrapper.NmapProcess", _BrokenNmapProcess), \
+                patch("threading.excepthook"):
+            # The scan fails instead of waiting for the exit message of the stopped thread
+            self.assertEqual(self.wrapper._scan(), None)
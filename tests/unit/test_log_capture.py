@@ -0,0 +1,73 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import os
+import tempfile
+import unittest
+from threading import Thread
+from deltascan.core.nmap.log_capture import LogCapture
+
+
+class TestLogCapture(unittest.TestCase):
+    def test_tail(self):
+        _log = LogCapture(tail_size=5)
+        self.assertEqual(_log.tail(), "")
+        _log.append("abc")
+        self.assertEqual(_log.tail(), "abc")
+        _log.append("defg")
+        self.assertEqual(_log.tail(), "cdefg")
+        _log.append("0123456789")
+        self.assertEqual(_log.tail(), "56789")
+
+    def test_memory_is_bounded(self):
+        _log = LogCapture(tail_size=10)
+        for _i in range(10000):
+            _log.append("x")
+        self.assertLessEqual(len(_log._chunks), 10)
+        self.assertEqual(_log._length, 10)
+        _log.append("y" * 1000)
+        self.assertEqual(len(_log._chunks), 1)
+        self.assertEqual(_log.tail(), "y" * 10)
+
+    def test_version(self):
+        _log = LogCapture(tail_size=5)
+        _version = _log.version
+        _log.append("")
+        self.assertEqual(_log.version, _version)
+        _log.append("a")
+        self.assertNotEqual(_log.version, _version)
+
+    def test_spill_file(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            with LogCapture.for_scan("scan-10.0.0.0/24-TEST", tail_size=3, spill_dir=_dir) as _log:
+                _log.append("<nmaprun>")
+                _log.append("</nmaprun>")
+                _file = _log.spill_file
+            self.assertEqual(os.path.dirname(_file), _dir)
+            self.assertTrue(os.path.basename(_file).startswith("scan-10.0.0.0_24-TEST_"))
+            with open(_file) as _f:
+                self.assertEqual(_f.read(), "<nmaprun></nmaprun>")
+            self.assertEqual(_log.tail(), "un>")
+
+    def test_concurrent_appends(self):
+        _log = LogCapture(tail_size=50)
+        _threads = [Thread(target=lambda: [_log.append("ab") for _ in range(1000)]) for _ in range(4)]
+        for _t in _threads:
+            _t.start()
+        for _t in _threads:
+            _t.join()
+        self.assertEqual(_log.tail(), "ab" * 25)
+        self.assertEqual(_log.version, 4000)
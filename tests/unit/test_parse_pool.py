@@ -0,0 +1,72 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import os
+import tempfile
+import unittest
+from deltascan.core.parse_pool import (ParsePool, split_hosts)
+from deltascan.core.parser import Parser
+from deltascan.core.exceptions import AppExceptions
+from .test_data.mock_data import NMAP_XML_TWO_HOSTS
+
+
+class TestParsePool(unittest.TestCase):
+    def tearDown(self):
+        ParsePool.configure(0)
+
+    def test_split_hosts(self):
+        _info, _hosts = split_hosts(NMAP_XML_TWO_HOSTS)
+        self.assertEqual(len(_hosts), 2)
+        self.assertTrue(all([_h.startswith("<host ") and _h.endswith("</host>") for _h in _hosts]))
+        self.assertNotIn("<host ", _info)
+        self.assertIn("<runstats>", _info)
+        self.assertEqual(Parser.extract_scan_info(_info),
+                         dict(Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS), results=[]))
+
+    def test_parse_inline(self):
+        ParsePool.configure(0)
+        self.assertIsNone(ParsePool.executor())
+        self.assertEqual(ParsePool.parse(NMAP_XML_TWO_HOSTS), Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS))
+
+    def test_parse_workers(self):
+        _expected = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)
+        ParsePool.configure(2)
+        self.assertEqual(ParsePool.parse(NMAP_XML_TWO_HOSTS), _expected)
+        # Split by host
+        ParsePool.configure(2, split_size=0)
+        self.assertEqual(ParsePool.parse(NMAP_XML_TWO_HOSTS), _expected)
+
+    def test_parse_file(self):
+        _expected = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)
+        with tempfile.TemporaryDirectory() as _dir:
+            _path = os.path.join(_dir, "scan.xml")
+            with open(_path, "w") as _f:
+                _f.write(NMAP_XML_TWO_HOSTS)
+            self.assertEqual(ParsePool.parse_file(_path), _expected)
+            ParsePool.configure(2)
+            self.assertEqual(ParsePool.parse_file(_path), _expected)
+
+            with open(_path, "w") as _f:
+                _f.write("")
+            self.assertRaises(AppExceptions.DScanResultsParsingError, ParsePool.parse_file, _path)
+            self.assertRaises(AppExceptions.DScanResultsParsingError, ParsePool.parse_file, os.path.join(_dir, "missing.xml"))
+
+    def test_parse_workers_error(self):
+        ParsePool.configure(1, split_size=0)
+        self.assertRaises(AppExceptions.DScanResultsParsingError, ParsePool.parse, "<nmaprun></nmaprun>")
+        self.assertRaises(AppExceptions.DScanResultsParsingError, ParsePool.parse,
+                          NMAP_XML_TWO_HOSTS.replace("<address ", "<addres ", 1))
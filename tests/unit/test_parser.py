@@ -14,9 +14,14 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>
 
+import io
+import os
+import tempfile
 import unittest
 from deltascan.core.parser import Parser
-from .test_data.mock_data import (DIFFS, ARTICULATED_DIFFS)
+from deltascan.core.nmap.host_stream import NmapHostStream
+from deltascan.core.exceptions import AppExceptions
+from .test_data.mock_data import (DIFFS, ARTICULATED_DIFFS, NMAP_XML_TWO_HOSTS)
 
 
 class TestParser(unittest.TestCase):
@@ -45,3 +50,38 @@ class TestParser(unittest.TestCase):
 
         results = Parser.diffs_to_output_format(DIFFS[1])
         self.assertEqual(results, ARTICULATED_DIFFS[1])
+
+    def test_extract_host_results(self):
+        _results = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)
+        _hosts = [Parser.extract_host_results(_h) for _h in NmapHostStream().feed(NMAP_XML_TWO_HOSTS)]
+        self.assertEqual(_hosts, _results["results"])
+        self.assertEqual([_h["host"] for _h in _hosts], ["10.0.0.1", "10.0.0.2"])
+
+    def test_extract_host_results_error(self):
+        self.assertRaises(AppExceptions.DScanResultsParsingError, Parser.extract_host_results, "<host><status state='up'/></host>")
+        self.assertRaises(AppExceptions.DScanResultsParsingError, Parser.extract_host_results, "<host>")
+
+    def test_iter_port_scan_results(self):
+        _expected = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)
+        _scan_info = {}
+        _hosts = Parser.iter_port_scan_results(io.BytesIO(NMAP_XML_TWO_HOSTS.encode()), _scan_info)
+        self.assertEqual(next(_hosts), _expected["results"][0])
+        # The scan info is read with the end of the document
+        self.assertEqual(_scan_info, {})
+        self.assertEqual(list(_hosts), _expected["results"][1:])
+        self.assertEqual(dict(_scan_info, results=_expected["results"]), _expected)
+        self.assertEqual(_scan_info["args"], "nmap -oX - -vvv -sS 10.0.0.0/30")
+        self.assertEqual(_scan_info["runstats"]["finished"]["time"], "1718000004")
+
+    def test_extract_port_scan_file_results(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            _path = os.path.join(_dir, "scan.xml")
+            with open(_path, "w") as _f:
+                _f.write(NMAP_XML_TWO_HOSTS)
+            self.assertEqual(Parser.extract_port_scan_file_results(_path), Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS))
+            self.assertRaises(AppExceptions.DScanResultsParsingError, Parser.extract_port_scan_file_results, os.path.join(_dir, "missing.xml"))
+
+    def test_extract_port_scan_dict_results_error(self):
+        self.assertRaises(AppExceptions.DScanResultsParsingError, Parser.extract_port_scan_dict_results, "<nmaprun></nmaprun>")
+        self.assertRaises(AppExceptions.DScanResultsParsingError, Parser.extract_port_scan_dict_results, "<nmaprun><host>")
+        self.assertRaises(AppExceptions.DScanResultsParsingError, Parser.extract_port_scan_dict_results, "<hosts></hosts>")
@@ -0,0 +1,105 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import unittest
+from threading import Event, Lock, Thread
+from deltascan.core.pipeline import Pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def test_process_in_order(self):
+        _pipeline = Pipeline([
+            ("double", lambda x: x * 2),
+            ("add", lambda x: x + 1),
+            ("str", str)])
+        self.assertEqual(_pipeline.process(3), "7")
+        self.assertEqual([_pipeline.submit(_i).result() for _i in range(3)], ["1", "3", "5"])
+
+        _stats = _pipeline.stats()
+        self.assertEqual(list(_stats["stages"].keys()), ["double", "add", "str"])
+        self.assertEqual(_stats["in_flight"], 0)
+        self.assertEqual(_stats["stages"]["add"]["processed"], 4)
+        self.assertEqual(_stats["stages"]["add"]["failed"], 0)
+        self.assertEqual(_stats["stages"]["add"]["queue_depth"], 0)
+        self.assertGreater(_stats["stages"]["add"]["throughput"], 0)
+        self.assertIsNotNone(_stats["stages"]["add"]["service_time"])
+        _pipeline.stop()
+        self.assertFalse(_pipeline.running)
+
+    def test_failed_stage(self):
+        _after = []
+
+        def _fail(x):
+            if x == 1:
+                raise ValueError("invalid")
+            return x
+
+        _pipeline = Pipeline([("validate", _fail), ("store", _after.append)])
+        _future = _pipeline.submit(1)
+        self.assertRaises(ValueError, _future.result)
+        _pipeline.process(2)
+        # A failed item does not reach the next stages
+        self.assertEqual(_after, [2])
+        self.assertEqual(_pipeline.stats()["stages"]["validate"]["failed"], 1)
+        _pipeline.stop()
+
+    def test_backpressure(self):
+        _release = Event()
+        _pipeline = Pipeline([("fast", lambda x: x), ("slow", lambda x: _release.wait() and x)], queue_size=1)
+        _futures = [_pipeline.submit(_i) for _i in range(3)]
+        _submitted = Event()
+        # The slow stage holds one item and one waits in its queue, so the fast stage and then the submitter block
+        _t = Thread(target=lambda: (_futures.append(_pipeline.submit(3)), _pipeline.submit(4), _submitted.set()))
+        _t.start()
+        self.assertFalse(_submitted.wait(0.3))
+        self.assertLessEqual(_pipeline.stats()["stages"]["slow"]["queue_depth"], 1)
+        _release.set()
+        _t.join()
+        self.assertTrue(_pipeline.join(5))
+        self.assertEqual([_f.result() for _f in _futures], [0, 1, 2, 3])
+        self.assertEqual(_pipeline.stats()["stages"]["slow"]["max_queue_depth"], 1)
+        _pipeline.stop()
+
+    def test_stage_workers(self):
+        _lock = Lock()
+        _running = []
+        _max_running = []
+        _release = Event()
+
+        def _export(x):
+            with _lock:
+                _running.append(x)
+                _max_running.append(len(_running))
+            _release.wait(0.2)
+            with _lock:
+                _running.remove(x)
+            return x
+
+        _pipeline = Pipeline([("store", lambda x: x), ("export", _export)], workers={"export": 3}, queue_size=8)
+        _futures = [_pipeline.submit(_i) for _i in range(6)]
+        self.assertEqual(sorted([_f.result() for _f in _futures]), list(range(6)))
+        self.assertEqual(max(_max_running), 3)
+        self.assertEqual(_pipeline.stats()["stages"]["export"]["workers"], 3)
+        _pipeline.stop()
+
+    def test_stop_drains(self):
+        _done = []
+        _pipeline = Pipeline([("a", lambda x: x), ("b", _done.append)])
+        for _i in range(5):
+            _pipeline.submit(_i)
+        _pipeline.stop()
+        self.assertEqual(_done, [0, 1, 2, 3, 4])
@@ -0,0 +1,134 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import ipaddress
+import random
+import unittest
+from threading import Event
+from deltascan.core.planner import (
+    address_range,
+    IntervalTree,
+    ScanPlanner)
+
+
+def _int(address):
+    return int(ipaddress.ip_address(address))
+
+
+class TestIntervalTree(unittest.TestCase):
+    def test_overlap(self):
+        _tree = IntervalTree()
+        _tree.insert(10, 20, "a")
+        _tree.insert(30, 40, "b")
+        _tree.insert(0, 5, "c")
+        self.assertEqual(len(_tree), 3)
+        self.assertEqual(_tree.overlap(15, 35), [(10, 20, "a"), (30, 40, "b")])
+        self.assertEqual(_tree.overlap(21, 29), [])
+        self.assertEqual(_tree.overlap(5, 5), [(0, 5, "c")])
+
+        self.assertTrue(_tree.remove(10, 20, "a"))
+        self.assertFalse(_tree.remove(10, 20, "a"))
+        self.assertEqual(_tree.overlap(0, 100), [(0, 5, "c"), (30, 40, "b")])
+
+    def test_overlap_random(self):
+        _random = random.Random(7)
+        _tree = IntervalTree()
+        _intervals = []
+        for _i in range(300):
+            _start = _random.randint(0, 1000)
+            _interval = (_start, _start + _random.randint(0, 50), _i)
+            _intervals.append(_interval)
+            _tree.insert(*_interval)
+        for _interval in _intervals[:100]:
+            _tree.remove(*_interval)
+        for _ in range(50):
+            _start = _random.randint(0, 1000)
+            _end = _start + _random.randint(0, 100)
+            self.assertEqual(
+                sorted(_tree.overlap(_start, _end), key=lambda _i: _i[2]),
+                [_i for _i in _intervals[100:] if _i[0] <= _end and _i[1] >= _start])
+
+
+class TestScanPlanner(unittest.TestCase):
+    def test_address_range(self):
+        self.assertEqual(address_range("10.0.0.0/30"), (4, _int("10.0.0.0"), _int("10.0.0.3")))
+        self.assertEqual(address_range("10.0.0.1"), (4, _int("10.0.0.1"), _int("10.0.0.1")))
+        self.assertEqual(address_range("scanme.nmap.org"), None)
+
+    def test_plan_subtracts_covered_ranges(self):
+        _planner = ScanPlanner()
+        _large = _planner.plan("large", "P", "10.0.0.0/16")
+        self.assertFalse(_large.coalesced)
+
+        _small = _planner.plan("small", "P", "10.0.5.0/24")
+        self.assertEqual(_small.leaders, [_large])
+        self.assertFalse(_small.has_remainder)
+
+        _wide = _planner.plan("wide", "P", "10.0.0.0/15")
+        self.assertEqual(_wide.covered_networks(), [ipaddress.ip_network("10.0.0.0/16")])
+        self.assertEqual(_wide.remainder, [(_int("10.1.0.0"), _int("10.1.255.255"))])
+
+        # Other profiles and hostnames are not coalesced
+        self.assertFalse(_planner.plan("other", "Q", "10.0.5.0/24").coalesced)
+        self.assertTrue(_planner.plan("name", "P", "scanme.nmap.org").has_remainder)
+
+        _planner.finish(_large, True)
+        self.assertFalse(_planner.plan("again", "P", "10.0.5.0/24").coalesced)
+
+    def test_publish_to_followers(self):
+        _planner = ScanPlanner()
+        _saved = []
+        _large = _planner.plan("large", "P", "10.0.0.0/16", saved_hosts=lambda: list(_saved))
+        _saved.extend([{"host": "10.0.5.1"}, {"host": "10.0.6.1"}])
+        _planner.publish(_large, [{"host": "10.0.5.1"}, {"host": "10.0.6.1"}])
+
+        _hosts = []
+        _small = _planner.plan("small", "P", "10.0.5.0/24", _hosts.append)
+        # Hosts saved before the plan are passed on as well
+        self.assertEqual(_hosts, [{"host": "10.0.5.1"}])
+
+        _saved.append({"host": "10.0.5.2"})
+        _planner.publish(_large, [{"host": "10.0.5.2"}, {"host": "10.0.7.1"}])
+        # A host that is both read back and published is passed on once
+        _planner.publish(_large, [{"host": "10.0.5.1"}])
+        self.assertEqual(_hosts, [{"host": "10.0.5.1"}, {"host": "10.0.5.2"}])
+
+        _planner.finish(_large, True)
+        self.assertTrue(ScanPlanner.wait(_small))
+
+    def test_retire(self):
+        _planner = ScanPlanner()
+        _large = _planner.plan("large", "P", "10.0.0.0/16")
+        _small = _planner.plan("small", "P", "10.0.5.0/24")
+        _planner.retire(_large)
+
+        # The scans that follow it keep following it, new scans do not
+        self.assertEqual(_small.leaders, [_large])
+        self.assertFalse(_planner.plan("late", "P", "10.0.6.0/24").coalesced)
+        _planner.finish(_large, True)
+        self.assertTrue(ScanPlanner.wait(_small))
+
+    def test_wait(self):
+        _planner = ScanPlanner()
+        _large = _planner.plan("large", "P", "10.0.0.0/16")
+        _small = _planner.plan("small", "P", "10.0.5.0/24")
+        _evt = Event()
+        _evt.set()
+        self.assertFalse(ScanPlanner.wait(_small, _evt, interval=0.01))
+
+        _planner.finish(_large, False)
+        self.assertFalse(ScanPlanner.wait(_small))
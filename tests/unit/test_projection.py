@@ -0,0 +1,67 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import json
+import unittest
+from deltascan.core.projection import FieldProjection
+from deltascan.core.parser import Parser
+from deltascan.core.schemas import Scan
+from deltascan.core.exceptions import AppExceptions
+from .test_data.mock_data import NMAP_XML_TWO_HOSTS
+
+
+class TestFieldProjection(unittest.TestCase):
+    def test_drop(self):
+        _projection = FieldProjection(drop=["ports.service", "ports.servicefp", "osfingerprint", "hostnames"])
+        _host = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS, _projection)["results"][0]
+        self.assertNotIn("hostnames", _host)
+        # Required fields are reset to the value of a field that nmap does not report
+        self.assertEqual(_host["osfingerprint"], "none")
+        self.assertEqual([("service" in _p, _p["servicefp"], _p["service_name"]) for _p in _host["ports"]][0], (False, "", "ssh"))
+        Scan().load(_host)
+
+    def test_keep(self):
+        _projection = FieldProjection(keep=["ports.service.name", "address"])
+        _host = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)["results"][0]
+        _projection.apply(_host)
+        self.assertEqual(sorted(_host), ["address", "hops", "host", "last_boot", "os", "osfingerprint", "ports", "status"])
+        self.assertEqual(sorted(_host["ports"][0]), ["portid", "protocol", "service", "service_name", "service_product", "servicefp", "state"])
+        self.assertEqual(_host["ports"][0]["service"], {"name": "ssh"})
+
+    def test_idempotent(self):
+        _projection = FieldProjection(keep=["ports.state", "os"], drop=["os"])
+        _host = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS, _projection)["results"][0]
+        _once = json.dumps(_host)
+        self.assertEqual(json.dumps(_projection.apply(_host)), _once)
+        self.assertEqual(_host["os"], ["unknown"])
+
+    def test_from_config(self):
+        self.assertIsNone(FieldProjection.from_config(None))
+        self.assertIsNone(FieldProjection.from_config({"keep": [], "drop": None}))
+        _projection = FieldProjection.from_config({"drop": ["ports.servicefp", "hostnames", "hostnames"]})
+        self.assertEqual(_projection.spec, json.dumps({"drop": ["hostnames", "ports.servicefp"], "keep": []}))
+        self.assertEqual(_projection.spec, FieldProjection(drop=["ports.servicefp", "hostnames"]).spec)
+
+        # The results of the grepable output are recorded as such, even if they keep all their fields
+        _grepable = FieldProjection.from_config(None, "grepable")
+        self.assertEqual(_grepable.spec, json.dumps({"drop": [], "keep": [], "output": "grepable"}))
+        self.assertEqual(_grepable.apply({"host": "10.0.0.1", "os": ["Linux"]}), {"host": "10.0.0.1", "os": ["Linux"]})
+        self.assertNotEqual(FieldProjection.from_config({"drop": ["hostnames"]}, "grepable").spec, FieldProjection(drop=["hostnames"]).spec)
+
+        for _fields in [["ports"], {"remove": ["os"]}, {"drop": "os"}, {"drop": ["ports..service"]}, {"drop": ["ports.portid"]}, {"drop": ["host"]}]:
+            with self.assertRaises(AppExceptions.DScanInputValidationException):
+                FieldProjection.from_config(_fields)
@@ -0,0 +1,110 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import unittest
+from threading import Event, Thread
+from unittest.mock import MagicMock, patch
+from deltascan.core.rate import (
+    RateController,
+    with_max_rate,
+    split_max_rate,
+    show_allocation)
+
+
+class TestRateArguments(unittest.TestCase):
+    def test_with_max_rate(self):
+        self.assertEqual(with_max_rate("-sS -p-", 500), "-sS -p- --max-rate 500")
+        self.assertEqual(with_max_rate("-sS --max-rate 100 -p-", 500), "-sS --max-rate 100 -p-")
+        self.assertEqual(with_max_rate("-sS --max-rate=1000 -p-", 500), "-sS --max-rate 500 -p-")
+        self.assertEqual(with_max_rate("-sS", None), "-sS")
+
+    def test_split_max_rate(self):
+        self.assertEqual(split_max_rate("-sS --max-rate 1000", 4), "-sS --max-rate 250")
+        self.assertEqual(split_max_rate("-sS --max-rate 1000", 1), "-sS --max-rate 1000")
+        self.assertEqual(split_max_rate("-sS", 4), "-sS")
+
+    def test_show_allocation(self):
+        _bar = MagicMock()
+        show_allocation({"ui_instances": {"progress_bar": {"scan": {"instance": _bar, "id": 3}}}}, "scan", "100 pps")
+        _bar.update.assert_called_once_with(3, description="100 pps")
+        show_allocation({"ui_instances": {}}, "scan", "100 pps")
+        show_allocation(None, "scan", "100 pps")
+
+
+class TestRateController(unittest.TestCase):
+    def test_disabled(self):
+        _controller = RateController(0)
+        self.assertFalse(_controller.enabled)
+        self.assertEqual(_controller.acquire("a"), None)
+        self.assertEqual(_controller.stats()["active"], 1)
+        _controller.release("a")
+        self.assertEqual(_controller.stats()["active"], 0)
+
+    def test_budget_is_split(self):
+        _controller = RateController(1000, 100, initial_limit=4)
+        self.assertEqual([_controller.acquire(_n) for _n in "abcd"], [250, 250, 250, 250])
+        _stats = _controller.stats()
+        self.assertEqual(_stats["allocated_rate"], 1000)
+        self.assertEqual(_stats["limit"], 4)
+
+    def test_acquire_waits_for_release(self):
+        _controller = RateController(1000, 100, initial_limit=2)
+        _controller.acquire("a")
+        _controller.acquire("b")
+        _rates = []
+        _t = Thread(target=lambda: _rates.append(_controller.acquire("c")))
+        _t.start()
+        _t.join(0.2)
+        self.assertTrue(_t.is_alive())
+        self.assertEqual(_controller.stats()["waiting"], ["c"])
+        _controller.release("a")
+        _t.join(2)
+        self.assertEqual(_rates, [500])
+
+    def test_acquire_cancelled(self):
+        _controller = RateController(100, 100)
+        _controller.acquire("a")
+        _evt = Event()
+        _evt.set()
+        self.assertEqual(_controller.acquire("b", _evt), -1)
+        self.assertEqual(_controller.stats()["waiting"], [])
+
+    def test_limit_is_halved_when_scans_stall(self):
+        _now = [0]
+        with patch("deltascan.core.rate.time.monotonic", lambda: _now[0]):
+            _controller = RateController(1000, 100, interval=0, initial_limit=4)
+            for _n in "ab":
+                _controller.acquire(_n)
+            for _t, _p in [(10, 50), (20, 51), (30, 52), (40, 53)]:
+                _now[0] = _t
+                for _n in "ab":
+                    _controller.report_progress(_n, _p)
+        _stats = _controller.stats()
+        self.assertEqual(_stats["limit"], 2)
+        self.assertEqual(_stats["adjustments"]["decreased"], 1)
+
+    def test_limit_grows_when_scans_wait(self):
+        _now = [0]
+        with patch("deltascan.core.rate.time.monotonic", lambda: _now[0]):
+            _controller = RateController(1000, 100, interval=0, initial_limit=1)
+            _controller.acquire("a")
+            # A scan waits for the budget
+            _controller._waiting.append("b")
+            for _t in [1, 2]:
+                _now[0] = _t
+                _controller.report_progress("a", _t * 10)
+        self.assertEqual(_controller.stats()["limit"], 3)
+        self.assertEqual(_controller.stats()["adjustments"]["increased"], 2)
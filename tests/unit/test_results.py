@@ -0,0 +1,69 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import json
+import unittest
+from deltascan.core.results import (HostResult, PortResult, ServiceInfo)
+from deltascan.core.parser import Parser
+from deltascan.core.exceptions import AppExceptions
+from .test_data.mock_data import (NMAP_XML_TWO_HOSTS, SCANS_FROM_DB_TEST_V1)
+
+
+class TestResults(unittest.TestCase):
+    def test_host_result_from_dict(self):
+        _host = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)["results"][0]
+        _result = HostResult.from_dict(_host)
+        self.assertEqual((_result.host, _result.status, _result.os, _result.hops), ("10.0.0.1", "up", ["Linux 5.X"], ["unknown"]))
+        self.assertEqual(_result.extra["hostnames"], {"hostname": {"name": "gw.local", "type": "PTR"}})
+
+        _port = _result.ports[0]
+        self.assertEqual((_port.protocol, _port.portid, _port.state, _port.reason, _port.reason_ttl), ("tcp", "22", "open", "syn-ack", "64"))
+        self.assertEqual((_port.service_name, _port.service.name, _port.service.method, _port.service.conf), ("ssh", "ssh", "table", "3"))
+
+    def test_lossless_conversion(self):
+        _hosts = Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)["results"] + \
+            [_s["results"] for _s in SCANS_FROM_DB_TEST_V1]
+        for _host in _hosts:
+            _result = HostResult.from_dict(_host)
+            # The order of the keys is kept too
+            self.assertEqual(json.dumps(_result.to_dict()), json.dumps(_host))
+            self.assertEqual(_result.to_json(), json.dumps(_host, sort_keys=True))
+            self.assertEqual(HostResult.from_json(_result.to_json()), _result)
+
+    def test_interned_values(self):
+        _hosts = [HostResult.from_json(json.dumps(_h)) for _h in Parser.extract_port_scan_dict_results(NMAP_XML_TWO_HOSTS)["results"]]
+        self.assertIs(_hosts[0].ports[0].protocol, _hosts[1].ports[0].protocol)
+        self.assertIs(_hosts[0].ports[0].service_name, _hosts[1].ports[0].service_name)
+        self.assertIs(_hosts[0].ports[0].service.method, _hosts[1].ports[0].service.method)
+        self.assertIs(_hosts[0].status, _hosts[1].status)
+        self.assertIs(_hosts[0].ports[0]._keys, _hosts[1].ports[0]._keys)
+
+    def test_new_results(self):
+        _port = PortResult(protocol="tcp", portid="80", state="open", reason="syn-ack",
+                           service=ServiceInfo(name="http"), service_name="http", servicefp="", service_product="")
+        self.assertEqual(_port.to_dict(), {
+            "protocol": "tcp", "portid": "80", "state": {"state": "open", "reason": "syn-ack"},
+            "service": {"name": "http"}, "service_name": "http", "servicefp": "", "service_product": ""})
+        self.assertEqual(HostResult(host="10.0.0.1", status="up", ports=[_port], extra={"uptime": None}).to_dict(), {
+            "host": "10.0.0.1", "status": "up", "ports": [_port.to_dict()], "uptime": None})
+        self.assertFalse(hasattr(_port, "__dict__"))
+        self.assertRaises(TypeError, ServiceInfo, unknown="x")
+
+    def test_invalid_results(self):
+        self.assertRaises(AppExceptions.DScanResultsSchemaException, HostResult.from_dict, "10.0.0.1")
+        self.assertRaises(AppExceptions.DScanResultsSchemaException, HostResult.from_dict, {"host": "10.0.0.1", "ports": {"extraports": {}}})
+        self.assertRaises(AppExceptions.DScanResultsSchemaException, PortResult.from_dict, {"portid": "22", "state": {"state": "open", "x": "1"}})
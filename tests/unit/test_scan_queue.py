@@ -0,0 +1,175 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import time
+import unittest
+from threading import Thread
+from deltascan.core.batching import ScanBatcher
+from deltascan.core.exceptions import AppExceptions
+from deltascan.core.scan_queue import ScanQueue
+
+
+def _scan(host, profile="P", job=None, **kwargs):
+    return dict({"host": host, "profile": profile, "name": f"scan-{host}-{profile}", "job": job}, **kwargs)
+
+
+def _hosts(queue, n):
+    _hosts = []
+    for _ in range(n):
+        _hosts.extend([_s["host"] for _s in queue.get()])
+        queue.task_done()
+    return _hosts
+
+
+class TestScanQueue(unittest.TestCase):
+    def test_fifo(self):
+        _queue = ScanQueue()
+        _queue.put(_scan("10.0.0.0/24"))
+        _queue.put(_scan("10.0.1.0/24"))
+        self.assertEqual(_queue.queued, 2)
+        self.assertEqual([_s["host"] for _s in _queue.scans()], ["10.0.0.0/24", "10.0.1.0/24"])
+
+        self.assertEqual(_queue.get()[0]["host"], "10.0.0.0/24")
+        self.assertEqual((_queue.queued, _queue.running), (1, 1))
+        self.assertEqual(_queue.get()[0]["host"], "10.0.1.0/24")
+        _queue.task_done()
+        _queue.task_done()
+        self.assertTrue(_queue.idle)
+
+        _stats = _queue.stats()
+        self.assertEqual(_stats["started"], 2)
+        self.assertEqual(_stats["running"], 0)
+        self.assertTrue(_stats["latency"]["max"] >= _stats["latency"]["mean"] >= 0)
+
+    def test_reject_when_full(self):
+        _queue = ScanQueue(max_size=1)
+        _queue.put(_scan("10.0.0.1"))
+        self.assertRaises(AppExceptions.DScanQueueFullException, _queue.put, _scan("10.0.0.2"))
+        self.assertRaises(AppExceptions.DScanQueueFullException, _queue.put, _scan("10.0.0.2"), 0.05)
+        self.assertEqual(_queue.stats()["rejected"], 2)
+
+        # A scan that waits for room is added as soon as a queued scan starts
+        _thread = Thread(target=_queue.put, args=(_scan("10.0.0.3"), 5))
+        _thread.start()
+        _queue.get()
+        _thread.join()
+        self.assertEqual([_s["host"] for _s in _queue.scans()], ["10.0.0.3"])
+
+    def test_unlimited(self):
+        _queue = ScanQueue(max_size=0)
+        for _i in range(10):
+            _queue.put(_scan(f"10.0.0.{_i}"))
+        self.assertEqual(_queue.queued, 10)
+
+    def test_batches(self):
+        _queue = ScanQueue(batcher=ScanBatcher(window=50, max_batch_size=10))
+        _queue.put(_scan("10.0.0.1"))
+        _queue.put(_scan("10.0.0.2"))
+        _queue.put(_scan("10.0.0.3", job="job_uuid"))
+        self.assertEqual(_queue.queued, 3)
+
+        # The scan that can not be batched starts first, the batch after its window
+        self.assertEqual([_s["host"] for _s in _queue.get()], ["10.0.0.3"])
+        self.assertEqual([_s["host"] for _s in _queue.get()], ["10.0.0.1", "10.0.0.2"])
+
+    def test_priorities(self):
+        _queue = ScanQueue()
+        _queue.put(_scan("10.0.0.0/24", priority="low"))
+        _queue.put(_scan("10.0.1.0/24"))
+        _queue.put(_scan("10.0.2.0/24", priority="high"))
+        self.assertRaises(AppExceptions.DScanInputValidationException, _queue.put, _scan("10.0.3.0/24", priority="urgent"))
+        self.assertEqual(_queue.stats()["depth"], {"high": 1, "normal": 1, "low": 1})
+
+        self.assertEqual(_hosts(_queue, 3), ["10.0.2.0/24", "10.0.1.0/24", "10.0.0.0/24"])
+        self.assertEqual(_queue.stats()["depth"], {"high": 0, "normal": 0, "low": 0})
+        self.assertEqual(sorted(_queue.stats()["latency_by_priority"].keys()), ["high", "low", "normal"])
+
+    def test_fair_share(self):
+        _queue = ScanQueue()
+        for _i in range(4):
+            _queue.put(_scan(f"10.0.{_i}.0/24", "FULL"))
+        _queue.put(_scan("10.1.0.0/24", "QUICK"))
+        _queue.put(_scan("10.1.1.0/24", "QUICK"))
+        # The second profile does not wait for all the scans of the first one
+        self.assertEqual(_hosts(_queue, 6), ["10.0.0.0/24", "10.1.0.0/24", "10.0.1.0/24", "10.1.1.0/24", "10.0.2.0/24", "10.0.3.0/24"])
+
+    def test_weighted_fair_share(self):
+        _queue = ScanQueue()
+        for _i in range(4):
+            _queue.put(_scan(f"10.0.{_i}.0/24", "P", share="alice", weight=2))
+            _queue.put(_scan(f"10.1.{_i}.0/24", "P", share="bob"))
+        self.assertEqual(_hosts(_queue, 6), [
+            "10.0.0.0/24", "10.1.0.0/24", "10.0.1.0/24", "10.1.1.0/24", "10.0.2.0/24", "10.0.3.0/24"])
+
+    def test_idle_share_does_not_save_up_time(self):
+        _queue = ScanQueue()
+        for _i in range(3):
+            _queue.put(_scan(f"10.0.{_i}.0/24", "FULL"))
+        _hosts(_queue, 3)
+        _queue.put(_scan("10.0.3.0/24", "FULL"))
+        _queue.put(_scan("10.0.4.0/24", "FULL"))
+        _queue.put(_scan("10.1.0.0/24", "QUICK"))
+        _queue.put(_scan("10.1.1.0/24", "QUICK"))
+        _queue.put(_scan("10.1.2.0/24", "QUICK"))
+        # QUICK joins with the virtual time of FULL instead of 0, so it does not run three scans in a row
+        self.assertEqual(_hosts(_queue, 4), ["10.0.3.0/24", "10.1.0.0/24", "10.0.4.0/24", "10.1.1.0/24"])
+
+    def test_aging(self):
+        _queue = ScanQueue(aging=0.05)
+        _queue.put(_scan("10.0.0.0/24", priority="low"))
+        time.sleep(0.12)
+        _queue.put(_scan("10.0.1.0/24", priority="high"))
+        # The low priority scan has waited two aging periods, so it is treated as a high priority scan that was added first
+        self.assertEqual(_hosts(_queue, 2), ["10.0.0.0/24", "10.0.1.0/24"])
+        self.assertEqual(_queue.stats()["promoted"], 1)
+
+        _queue = ScanQueue(aging=0)
+        _queue.put(_scan("10.0.0.0/24", priority="low"))
+        time.sleep(0.01)
+        _queue.put(_scan("10.0.1.0/24", priority="high"))
+        self.assertEqual(_hosts(_queue, 2), ["10.0.1.0/24", "10.0.0.0/24"])
+
+    def test_close(self):
+        _queue = ScanQueue()
+        _results = []
+        _thread = Thread(target=lambda: _results.append(_queue.get()))
+        _thread.start()
+        _queue.close()
+        _thread.join(5)
+        self.assertEqual(_results, [None])
+
+        _queue.put(_scan("10.0.0.1"))
+        self.assertEqual(_queue.get(), None)
+        _queue.open()
+        self.assertEqual(_queue.get()[0]["host"], "10.0.0.1")
+
+    def test_clear(self):
+        _queue = ScanQueue(batcher=ScanBatcher(window=1000, max_batch_size=10))
+        _queue.put(_scan("10.0.0.1"))
+        _queue.put(_scan("10.0.0.0/24"))
+        self.assertEqual(sorted([_s["host"] for _s in _queue.clear()]), ["10.0.0.0/24", "10.0.0.1"])
+        self.assertTrue(_queue.idle)
+
+    def test_wait_for(self):
+        _queue = ScanQueue()
+        _queue.put(_scan("10.0.0.1"))
+        self.assertFalse(_queue.wait_for(lambda: _queue.idle, 0.01))
+
+        def _worker():
+            _queue.get()
+            _queue.task_done()
+        Thread(target=_worker).start()
+        self.assertTrue(_queue.wait_for(lambda: _queue.idle, 5))
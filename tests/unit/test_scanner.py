@@ -18,6 +18,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 from .test_data.mock_data import (SCAN_NMAP_RESULTS)
 from deltascan.core.scanner import Scanner
+import copy
 import json
 
 
@@ -30,10 +31,11 @@ class TestScanner(unittest.TestCase):
         mock_extract_port_scan_dict_results.assert_called_once()
         mock_nmap.assert_called_once()
 
-    @patch("deltascan.core.parser.xmltodict", MagicMock())
     def test_scan(self):
+        _nmaprun = copy.deepcopy(SCAN_NMAP_RESULTS["nmaprun"])
+        _stream = MagicMock(nmaprun=_nmaprun, read=MagicMock(return_value=iter(_nmaprun["host"])))
         with patch("deltascan.core.scanner.LibNmapWrapper.scan", MagicMock()):
-            with patch("deltascan.core.parser.replace_nested_keys", MagicMock(return_value=SCAN_NMAP_RESULTS)):
+            with patch("deltascan.core.parser.NmapXMLStream", MagicMock(return_value=_stream)):
                 self._scanner = Scanner()
                 results = self._scanner.scan("0.0.0.0", "-sV")
                 print(json.dumps(results, indent=3))
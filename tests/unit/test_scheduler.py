@@ -0,0 +1,126 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+from deltascan.core.scheduler import (
+    CronExpression,
+    ScanScheduler,
+    next_run_time,
+    jitter_offset,
+    parse_cron_field,
+    SCHEDULE_STARTED,
+    SCHEDULE_SKIPPED,
+    SCHEDULE_FAILED)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_parse_cron_field(self):
+        self.assertEqual(parse_cron_field("*", 0, 6), {0, 1, 2, 3, 4, 5, 6})
+        self.assertEqual(parse_cron_field("*/15", 0, 59), {0, 15, 30, 45})
+        self.assertEqual(parse_cron_field("1-5", 0, 6), {1, 2, 3, 4, 5})
+        self.assertEqual(parse_cron_field("0-10/5,30", 0, 59), {0, 5, 10, 30})
+        self.assertEqual(parse_cron_field("50/5", 0, 59), {50, 55})
+        for _field in ["60", "5-1", "*/0", "a", ""]:
+            self.assertRaises(ValueError, parse_cron_field, _field, 0, 59)
+
+    def test_cron_next(self):
+        self.assertEqual(CronExpression("*/15 * * * *").next(datetime(2024, 1, 1, 10, 7, 30)), datetime(2024, 1, 1, 10, 15))
+        self.assertEqual(CronExpression("0 2 * * *").next(datetime(2024, 1, 1, 2, 0)), datetime(2024, 1, 2, 2, 0))
+        self.assertEqual(CronExpression("30 23 31 12 *").next(datetime(2024, 1, 1)), datetime(2024, 12, 31, 23, 30))
+        # 2024-01-01 is a Monday, Sunday is 0 or 7
+        self.assertEqual(CronExpression("0 0 * * 0").next(datetime(2024, 1, 1)), datetime(2024, 1, 7))
+        self.assertEqual(CronExpression("0 0 * * 7").next(datetime(2024, 1, 1)), datetime(2024, 1, 7))
+        # The day of month or the day of week
+        self.assertEqual(CronExpression("0 0 15 * 3").next(datetime(2024, 1, 1)), datetime(2024, 1, 3))
+        self.assertEqual(CronExpression("0 0 29 2 *").next(datetime(2024, 3, 1)), datetime(2028, 2, 29))
+        self.assertRaises(ValueError, CronExpression("0 0 30 2 *").next, datetime(2024, 1, 1))
+        self.assertRaises(ValueError, CronExpression, "0 0 * *")
+        self.assertRaises(ValueError, CronExpression, "0 24 * * *")
+
+    def test_next_run_time(self):
+        _schedule = {"cron": None, "interval": 600, "next_run": datetime(2024, 1, 1, 10, 0)}
+        self.assertEqual(next_run_time(_schedule, datetime(2024, 1, 1, 10, 0)), datetime(2024, 1, 1, 10, 10))
+        self.assertEqual(next_run_time(_schedule, datetime(2024, 1, 1, 10, 2)), datetime(2024, 1, 1, 10, 10))
+        # Missed runs are skipped, the phase is kept
+        self.assertEqual(next_run_time(_schedule, datetime(2024, 1, 1, 11, 5)), datetime(2024, 1, 1, 11, 10))
+        _schedule = {"cron": "0 * * * *", "interval": None, "next_run": datetime(2024, 1, 1, 10, 0)}
+        self.assertEqual(next_run_time(_schedule, datetime(2024, 1, 1, 12, 30)), datetime(2024, 1, 1, 13, 0))
+
+    def test_jitter_offset(self):
+        _run = datetime(2024, 1, 1, 2, 0)
+        self.assertEqual(jitter_offset("nightly", _run, 0), 0)
+        self.assertEqual(jitter_offset("nightly", _run, 300), jitter_offset("nightly", _run, 300))
+        _offsets = [jitter_offset(f"schedule-{_i}", _run, 300) for _i in range(20)]
+        self.assertTrue(all([0 <= _o < 300 for _o in _offsets]))
+        self.assertGreater(len(set(_offsets)), 10)
+
+    def _schedule(self, name, next_run, jitter=0):
+        return {"name": name, "target": "10.0.0.1", "profile_name": "TEST", "cron": None, "interval": 600,
+                "jitter": jitter, "priority": None, "deadline": None, "next_run": next_run, "runs": 0, "skipped": 0}
+
+    def test_run_pending(self):
+        _store = MagicMock()
+        _store.get_schedules.return_value = [
+            self._schedule("due", datetime(2024, 1, 1, 10, 0)),
+            self._schedule("skipped", datetime(2024, 1, 1, 9, 55)),
+            self._schedule("failed", datetime(2024, 1, 1, 10, 0)),
+            self._schedule("later", datetime(2024, 1, 1, 10, 5))]
+        _outcomes = {"skipped": False}
+
+        def _fire_schedule(schedule):
+            if schedule["name"] == "failed":
+                raise ValueError("error")
+            return _outcomes.get(schedule["name"], True)
+
+        _scheduler = ScanScheduler(_store, _fire_schedule, logger=MagicMock())
+        _now = datetime(2024, 1, 1, 10, 1)
+        self.assertEqual(_scheduler.run_pending(_now), 240)
+
+        _updates = {_c.args[0]: _c.kwargs for _c in _store.update_schedule.call_args_list}
+        self.assertEqual(sorted(_updates.keys()), ["due", "failed", "skipped"])
+        self.assertEqual(_updates["due"], {
+            "last_run": _now, "last_status": SCHEDULE_STARTED, "runs": 1, "next_run": datetime(2024, 1, 1, 10, 10)})
+        self.assertEqual(_updates["skipped"], {
+            "last_run": _now, "last_status": SCHEDULE_SKIPPED, "skipped": 1, "next_run": datetime(2024, 1, 1, 10, 5)})
+        self.assertEqual(_updates["failed"], {
+            "last_run": _now, "last_status": SCHEDULE_FAILED, "next_run": datetime(2024, 1, 1, 10, 10)})
+
+    def test_run_pending_jitter(self):
+        _store = MagicMock()
+        _run = datetime(2024, 1, 1, 10, 0)
+        _store.get_schedules.return_value = [self._schedule("nightly", _run, jitter=300)]
+        _fire = MagicMock(return_value=True)
+        _scheduler = ScanScheduler(_store, _fire, logger=MagicMock())
+        _offset = jitter_offset("nightly", _run, 300)
+
+        _scheduler.run_pending(datetime(2024, 1, 1, 10, 0))
+        _fire.assert_not_called()
+        _scheduler.run_pending(datetime(2024, 1, 1, 10, 5))
+        _fire.assert_called_once()
+        self.assertGreater(_offset, 0)
+
+    def test_start_stop(self):
+        _store = MagicMock()
+        _store.get_schedules.return_value = []
+        _scheduler = ScanScheduler(_store, MagicMock(), interval=0.01)
+        _scheduler.start()
+        self.assertTrue(_scheduler.running)
+        _scheduler.stop()
+        self.assertFalse(_scheduler.running)
+        _store.get_schedules.assert_called_with(enabled=True)
@@ -0,0 +1,169 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import http.client
+import json
+import os
+import socket
+import tempfile
+import unittest
+from threading import Event
+from unittest.mock import MagicMock
+from urllib.error import HTTPError
+from urllib.request import (Request, urlopen)
+from deltascan.core.server import DeltaScanServer
+from deltascan.core.exceptions import AppExceptions
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.app = MagicMock()
+        self.app.scan_name.side_effect = lambda h, p: f"scan-{h}-{p}"
+        self.app.scan_status.return_value = {"name": "scan-10.0.0.1-TEST", "status": "queued"}
+        self.server = DeltaScanServer(self.app, "127.0.0.1", 0, logger=MagicMock())
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def request(self, path, body=None):
+        _request = Request(f"{self.server.address}{path}", data=json.dumps(body).encode() if body is not None else None)
+        try:
+            with urlopen(_request, timeout=5) as _r:
+                return _r.status, json.loads(_r.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_start_stop(self):
+        self.app.start_scheduler.assert_called_once()
+        self.app.scan.assert_called_once()
+        self.server.stop()
+        self.server.stop()
+        self.app.cleanup.assert_called_once()
+
+    def test_submit_scan(self):
+        self.assertEqual(self.request("/scans", {"host": "10.0.0.1", "profile": "TEST", "priority": "high", "deadline": 60}),
+                         (202, {"name": "scan-10.0.0.1-TEST", "status": "queued"}))
+        self.app.add_scan.assert_called_once_with("10.0.0.1", "TEST", deadline=60, priority="high", submitter=None)
+
+        self.assertEqual(self.request("/scans", {"host": "10.0.0.1"})[0], 400)
+        self.assertEqual(self.request("/scans", {"host": "10.0.0.1", "profile": "TEST", "deadline": "soon"})[0], 400)
+        self.app.add_scan.side_effect = AppExceptions.DScanInputValidationException("Scan is already queued")
+        self.assertEqual(self.request("/scans", {"host": "10.0.0.1", "profile": "TEST"}), (400, {"error": "Scan is already queued"}))
+        self.app.add_scan.side_effect = AppExceptions.DScanQueueFullException("Scan queue is full")
+        self.assertEqual(self.request("/scans", {"host": "10.0.0.1", "profile": "TEST"})[0], 503)
+
+    def test_scan_status(self):
+        self.assertEqual(self.request("/scans/scan-10.0.0.0%2F24-TEST")[0], 200)
+        self.app.scan_status.assert_called_with("scan-10.0.0.0/24-TEST")
+        self.app.scan_status.return_value = None
+        self.assertEqual(self.request("/scans/scan-10.0.0.2-TEST")[0], 404)
+
+    def test_list_scans_and_diffs(self):
+        self.app.filter_scans.return_value = [{"uuid": "1"}]
+        self.assertEqual(self.request("/scans?host=10.0.0.1&n=2&port_type=open"), (200, [{"uuid": "1"}]))
+        self.app.filter_scans.assert_called_once_with(
+            port_type="open", host="10.0.0.1", profile=None, n_scans=2, from_date=None, to_date=None)
+
+        self.app.filter_diffs.return_value = []
+        self.assertEqual(self.request("/diffs?uuids=a,b&from=2024-01-01%2000:00:00"), (200, []))
+        self.app.filter_diffs.assert_called_once_with(
+            uuids=["a", "b"], host=None, profile=None, n_scans=None, from_date="2024-01-01 00:00:00", to_date=None)
+        self.assertEqual(self.request("/diffs?n=two")[0], 400)
+
+        self.app.filter_scans.side_effect = AppExceptions.DScanEntryNotFound("No scan results found")
+        self.assertEqual(self.request("/scans?host=10.0.0.9")[0], 404)
+
+    def test_export(self):
+        self.app.filter_scans.return_value = [{"uuid": "1"}]
+
+        _dirs = []
+
+        def _export(data, output_file, diffs=False, directory=None):
+            _dirs.append(directory)
+            with open(os.path.join(directory, output_file), "w") as _f:
+                json.dump(data, _f)
+        self.app.export_report.side_effect = _export
+        with tempfile.TemporaryDirectory() as _dir:
+            _cwd = os.getcwd()
+            os.chdir(_dir)
+            try:
+                self.assertEqual(self.request("/export/scans.json?host=10.0.0.1"), (200, [{"uuid": "1"}]))
+                # The report is written away from the working directory and removed once it is sent
+                self.assertEqual(os.listdir(_dir), [])
+                self.assertNotEqual(os.path.realpath(_dirs[0]), os.path.realpath(_dir))
+                self.assertFalse(os.path.exists(_dirs[0]))
+            finally:
+                os.chdir(_cwd)
+
+        # The temporary directory is removed when the export fails
+        def _failed_export(data, output_file, diffs=False, directory=None):
+            _dirs.append(directory)
+            raise AppExceptions.DScanExportError("Filename error")
+        self.app.export_report.side_effect = _failed_export
+        self.assertEqual(self.request("/export/scans.csv")[0], 500)
+        self.assertFalse(os.path.exists(_dirs[1]))
+        self.assertEqual(self.request("/export/scans.xml")[0], 404)
+
+    def test_reload_profiles(self):
+        self.app.reload_profiles.return_value = {"TEST": {"arguments": "-sS"}}
+        self.assertEqual(self.request("/profiles/reload", {}), (200, ["TEST"]))
+        self.app.reload_profiles.assert_called_once()
+
+    def test_unknown_path_and_method(self):
+        self.assertEqual(self.request("/unknown")[0], 404)
+        self.assertEqual(self.request("/jobs", {})[0], 405)
+        self.app.scan_jobs.side_effect = ValueError("error")
+        self.assertEqual(self.request("/jobs"), (500, {"error": "error"}))
+
+    def test_concurrent_requests(self):
+        # The first request is answered only after a second request has been handled
+        _second = Event()
+        self.app.filter_scans.side_effect = lambda **kwargs: [{"handled": _second.wait(5)}]
+        self.app.scan_jobs.side_effect = lambda: _second.set() or []
+
+        _result = {}
+        _thread = __import__("threading").Thread(target=lambda: _result.update(first=self.request("/scans")))
+        _thread.start()
+        self.assertEqual(self.request("/jobs"), (200, []))
+        _thread.join()
+        self.assertEqual(_result["first"], (200, [{"handled": True}]))
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            _server = DeltaScanServer(self.app, socket_path=os.path.join(_dir, "deltascan.sock"), logger=MagicMock())
+            _server.start()
+            try:
+                self.app.list_profiles.return_value = [{"profile_name": "TEST"}]
+                _conn = UnixHTTPConnection(_server.address)
+                _conn.request("GET", "/profiles")
+                _response = _conn.getresponse()
+                self.assertEqual((_response.status, json.loads(_response.read())), (200, [{"profile_name": "TEST"}]))
+                _conn.close()
+            finally:
+                _server.stop()
+            self.assertFalse(os.path.exists(os.path.join(_dir, "deltascan.sock")))
@@ -0,0 +1,202 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import os
+import tempfile
+import time
+import unittest
+from threading import Lock
+from unittest.mock import MagicMock
+from deltascan.core.sharding import (
+    plan_shards,
+    count_shards,
+    merge_scan_results,
+    ShardedScanner,
+    ShardsProgress)
+from deltascan.core.nmap.spool import NmapSpool
+
+
+class FakeScanner:
+    """
+    Returns one host per shard and reports the given progress values.
+    """
+    def __init__(self, fail_on=None, cancel_on=None):
+        self.calls = []
+        self.args = []
+        self.logs = []
+        self.spools = []
+        self.fail_on = fail_on
+        self.cancel_on = cancel_on
+        self.running = 0
+        self.max_running = 0
+        self._lock = Lock()
+
+    def scan(self, target, scan_args, ui_context, logger=None, name=None, _cancel_evt=None, progress_rate=None,
+             progress_queue_size=None, progress_callback=None, host_callback=None, log_capture=None, spool=None,
+             grepable=False):
+        with self._lock:
+            self.calls.append(target)
+            self.args.append(scan_args)
+            self.logs.append(log_capture)
+            self.spools.append(spool)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.001)
+        with self._lock:
+            self.running -= 1
+        if target == self.fail_on:
+            raise ValueError("nmap failed")
+        if target == self.cancel_on:
+            return None
+        if progress_callback is not None:
+            progress_callback(50)
+            progress_callback(100)
+        if host_callback is not None:
+            host_callback({"host": target.split("/")[0]})
+        return {
+            "results": [{"host": target.split("/")[0]}],
+            "args": f"nmap -sS {target}",
+            "scaninfo": {},
+            "start": "1",
+            "runstats": {"finished": {"time": "2"}},
+        }
+
+
+class TestSharding(unittest.TestCase):
+    def test_plan_shards(self):
+        self.assertEqual(list(plan_shards("10.0.0.1", 256)), ["10.0.0.1"])
+        self.assertEqual(list(plan_shards("10.0.0.0/24", 256)), ["10.0.0.0/24"])
+        self.assertEqual(list(plan_shards("10.0.0.0/24", 0)), ["10.0.0.0/24"])
+        self.assertEqual(list(plan_shards("10.0.0.0/23", 256)), ["10.0.0.0/24", "10.0.1.0/24"])
+        self.assertEqual(len(list(plan_shards("10.0.0.0/16", 256))), 256)
+        self.assertEqual(list(plan_shards("10.0.0.0/24", 100)), ["10.0.0.0/26", "10.0.0.64/26", "10.0.0.128/26", "10.0.0.192/26"])
+        self.assertEqual(list(plan_shards("fqdn.com/23", 256)), ["fqdn.com/23"])
+        # The shards of a large subnet are generated as they are consumed
+        self.assertEqual(next(plan_shards("10.0.0.0/8", 256)), "10.0.0.0/24")
+
+    def test_count_shards(self):
+        self.assertEqual(count_shards("10.0.0.1", 256), 1)
+        self.assertEqual(count_shards("10.0.0.0/24", 0), 1)
+        self.assertEqual(count_shards("10.0.0.0/23", 256), 2)
+        self.assertEqual(count_shards("10.0.0.0/8", 256), 65536)
+        self.assertEqual(count_shards("10.0.0.0/24", 100), 4)
+        self.assertEqual(count_shards("fqdn.com/23", 256), 1)
+
+    def test_merge_scan_results(self):
+        _r = merge_scan_results("10.0.0.0/23", [
+            {"results": [{"host": "10.0.0.1"}], "args": "nmap -sS 10.0.0.0/24", "scaninfo": "i", "start": "1", "runstats": "a"},
+            {"results": [{"host": "10.0.1.1"}], "args": "nmap -sS 10.0.1.0/24", "scaninfo": "i", "start": "2", "runstats": "b"}])
+        self.assertEqual(_r, {
+            "results": [{"host": "10.0.0.1"}, {"host": "10.0.1.1"}],
+            "args": "nmap -sS 10.0.0.0/23",
+            "scaninfo": "i",
+            "start": "1",
+            "runstats": "b"})
+
+    def test_scan_single_shard(self):
+        _scanner = FakeScanner()
+        _r = ShardedScanner.scan("10.0.0.1", "-sS", scanner=_scanner, shard_size=256)
+        self.assertEqual(_scanner.calls, ["10.0.0.1"])
+        self.assertEqual(_r["results"], [{"host": "10.0.0.1"}])
+
+    def test_scan_shards(self):
+        _scanner = FakeScanner()
+        _r = ShardedScanner.scan("10.0.0.0/22", "-sS", scanner=_scanner, shard_size=256, max_parallel_shards=2)
+        self.assertEqual(sorted(_scanner.calls), ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24", "10.0.3.0/24"])
+        self.assertEqual(_r["results"], [{"host": "10.0.0.0"}, {"host": "10.0.1.0"}, {"host": "10.0.2.0"}, {"host": "10.0.3.0"}])
+        self.assertEqual(_r["args"], "nmap -sS 10.0.0.0/22")
+
+    def test_scan_shards_bounded(self):
+        _scanner = FakeScanner()
+        _r = ShardedScanner.scan("10.0.0.0/20", "-sS", scanner=_scanner, shard_size=16, max_parallel_shards=4)
+        self.assertLessEqual(_scanner.max_running, 4)
+        self.assertEqual(len(_scanner.calls), 256)
+        # The results are merged in the order of the shards, whichever shard ends first
+        self.assertEqual([_h["host"] for _h in _r["results"]], [f"10.0.{_i // 16}.{_i % 16 * 16}" for _i in range(256)])
+
+    def test_scan_shards_host_callback(self):
+        _hosts = []
+        ShardedScanner.scan("10.0.0.0/23", "-sS", scanner=FakeScanner(), shard_size=256, host_callback=_hosts.append)
+        self.assertEqual(sorted([_h["host"] for _h in _hosts]), ["10.0.0.0", "10.0.1.0"])
+
+    def test_scan_shards_log_capture(self):
+        _log = MagicMock(spill_file=None)
+        _scanner = FakeScanner()
+        ShardedScanner.scan("10.0.0.1", "-sS", scanner=_scanner, log_capture=_log)
+        self.assertEqual(_scanner.logs, [_log])
+
+        _scanner = FakeScanner()
+        ShardedScanner.scan("10.0.0.0/23", "-sS", scanner=_scanner, shard_size=256, log_capture=_log)
+        self.assertEqual(_scanner.logs, [None, None])
+
+        with tempfile.TemporaryDirectory() as _dir:
+            _scanner = FakeScanner()
+            _log = MagicMock(spill_file=os.path.join(_dir, "scan.log"), tail_size=10)
+            ShardedScanner.scan("10.0.0.0/23", "-sS", scanner=_scanner, shard_size=256, max_parallel_shards=1, log_capture=_log)
+            self.assertEqual([_l.spill_file for _l in _scanner.logs], [os.path.join(_dir, "scan.log.0"), os.path.join(_dir, "scan.log.1")])
+
+    def test_scan_shards_spool(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            _spool = NmapSpool(os.path.join(_dir, "scan.xml"))
+            _scanner = FakeScanner()
+            ShardedScanner.scan("10.0.0.1", "-sS", scanner=_scanner, spool=_spool)
+            self.assertEqual(_scanner.spools, [_spool])
+
+            _scanner = FakeScanner()
+            ShardedScanner.scan("10.0.0.0/23", "-sS", scanner=_scanner, shard_size=256, max_parallel_shards=1, spool=_spool)
+            self.assertEqual([_s.path for _s in _scanner.spools], [os.path.join(_dir, "scan.0.xml"), os.path.join(_dir, "scan.1.xml")])
+
+    def test_scan_shards_split_max_rate(self):
+        _scanner = FakeScanner()
+        _progress = []
+        ShardedScanner.scan("10.0.0.0/22", "-sS --max-rate 1000", scanner=_scanner, shard_size=256, max_parallel_shards=2,
+                            progress_callback=_progress.append)
+        self.assertEqual(_scanner.args, ["-sS --max-rate 500"] * 4)
+        self.assertEqual(_progress[-1], 100)
+
+    def test_scan_shard_cancelled(self):
+        _scanner = FakeScanner(cancel_on="10.0.1.0/24")
+        self.assertEqual(ShardedScanner.scan("10.0.0.0/23", "-sS", scanner=_scanner, shard_size=256), None)
+
+        # The rest of the shards are not started once a shard is cancelled
+        _scanner = FakeScanner(cancel_on="10.0.0.0/24")
+        self.assertEqual(ShardedScanner.scan("10.0.0.0/22", "-sS", scanner=_scanner, shard_size=256, max_parallel_shards=1), None)
+        self.assertEqual(_scanner.calls, ["10.0.0.0/24"])
+
+    def test_scan_shard_failed(self):
+        _scanner = FakeScanner(fail_on="10.0.1.0/24")
+        self.assertRaises(ValueError, ShardedScanner.scan, "10.0.0.0/23", "-sS", scanner=_scanner, shard_size=256)
+
+    def test_shards_progress(self):
+        _progress_bar = MagicMock()
+        _ui_context = {
+            "ui_live": MagicMock(is_started=True),
+            "ui_instances": {
+                "progress_bar": {"scan": {"instance": _progress_bar, "id": 1}},
+                "text": {"scan": {"instance": MagicMock()}}}}
+        _progress = ShardsProgress(_ui_context, "scan", 1024)
+        _progress.start(0, 256)
+        _progress.start(1, 768)
+        _progress.update(0, 100)
+        self.assertEqual(_progress.progress, 25)
+        _progress.update(1, 50)
+        self.assertEqual(_progress.progress, 62)
+        _progress_bar.update.assert_called_with(1, completed=62)
+        # An ended shard keeps its progress
+        _progress.done(0)
+        self.assertEqual(_progress.progress, 62)
+        _progress.update(0, 10)
+        self.assertEqual(_progress.progress, 62)
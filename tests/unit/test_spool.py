@@ -0,0 +1,60 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import os
+import tempfile
+import time
+import unittest
+from deltascan.core.nmap.spool import (NmapSpool, clean_spool_dir)
+
+
+class TestNmapSpool(unittest.TestCase):
+    def test_for_scan(self):
+        self.assertEqual(NmapSpool.for_scan("scan-10.0.0.0/24-P", None), None)
+        _spool = NmapSpool.for_scan("scan-10.0.0.0/24-P", "/tmp/spool", keep=True)
+        self.assertTrue(os.path.basename(_spool.path).startswith("scan-10.0.0.0_24-P_"))
+        self.assertTrue(_spool.path.endswith(".xml"))
+        self.assertTrue(_spool.shard(3).path.endswith(".3.xml"))
+        self.assertTrue(_spool.shard(3).keep)
+
+    def test_write_and_finish(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            _spool = NmapSpool(os.path.join(_dir, "spool", "scan.xml"))
+            _spool.write("<a>")
+            _spool.write("<b>")
+            _spool.close()
+            with open(_spool.path) as _f:
+                self.assertEqual(_f.read(), "<a><b>")
+            _spool.finish()
+            self.assertFalse(os.path.exists(_spool.path))
+
+            with NmapSpool(os.path.join(_dir, "kept.xml"), keep=True) as _spool:
+                pass
+            # A spool without output is still created
+            self.assertEqual(os.path.getsize(_spool.path), 0)
+
+    def test_clean_spool_dir(self):
+        with tempfile.TemporaryDirectory() as _dir:
+            for _name in ["old.xml", "new.xml", "old.log"]:
+                open(os.path.join(_dir, _name), "w").close()
+            _old = time.time() - 3 * 3600
+            os.utime(os.path.join(_dir, "old.xml"), (_old, _old))
+            os.utime(os.path.join(_dir, "old.log"), (_old, _old))
+
+            self.assertEqual(clean_spool_dir(_dir, 0), 0)
+            self.assertEqual(clean_spool_dir(_dir, 2), 1)
+            self.assertEqual(sorted(os.listdir(_dir)), ["new.xml", "old.log"])
@@ -0,0 +1,115 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import unittest
+from threading import Thread
+from unittest.mock import MagicMock
+from deltascan.core.status import (
+    ScanStatusRegistry,
+    UIRenderLoop)
+from deltascan.core.nmap.libnmap_wrapper import update_scan_ui
+from deltascan.core.rate import show_allocation
+
+
+def ui_context(names, show_nmap_logs=True):
+    _registry = ScanStatusRegistry()
+    return {
+        "ui_live": MagicMock(is_started=True),
+        "ui_status": _registry,
+        "show_nmap_logs": show_nmap_logs,
+        "ui_instances": {
+            "progress_bar": {_n: {"instance": MagicMock(), "id": _i} for _i, _n in enumerate(names)},
+            "text": {_n: {"instance": MagicMock()} for _n in names}}}
+
+
+class TestStatus(unittest.TestCase):
+    def test_registry_coalesces_updates(self):
+        _registry = ScanStatusRegistry()
+        _registry.publish("scan", 10, "a")
+        _registry.publish("scan", 20)
+        _registry.publish("other", description="100 pps")
+        self.assertEqual(_registry.collect(), {
+            "scan": {"progress": 20, "stdout": "a"},
+            "other": {"description": "100 pps"}})
+        self.assertEqual(_registry.collect(), {})
+
+        _registry.publish("scan", 100, "b", True)
+        self.assertEqual(_registry.collect(), {"scan": {"progress": 100, "stdout": ""}})
+        self.assertEqual(_registry.status("scan"), {"progress": 100, "stdout": ""})
+        _registry.remove("scan")
+        self.assertEqual(_registry.status("scan"), {})
+
+    def test_registry_concurrent_publish(self):
+        _registry = ScanStatusRegistry()
+
+        def _publish(name):
+            for _p in range(1000):
+                _registry.publish(name, _p)
+
+        _threads = [Thread(target=_publish, args=(f"scan-{_i}",)) for _i in range(8)]
+        for _t in _threads:
+            _t.start()
+        for _t in _threads:
+            _t.join()
+        self.assertEqual(_registry.collect(), {f"scan-{_i}": {"progress": 999} for _i in range(8)})
+
+    def test_publish_from_scans(self):
+        _ui = ui_context(["scan"])
+        update_scan_ui(_ui, "scan", 42, "nmap output")
+        show_allocation(_ui, "scan", "100 pps")
+        # Nothing is drawn by the scan threads
+        _ui["ui_instances"]["progress_bar"]["scan"]["instance"].update.assert_not_called()
+        self.assertEqual(_ui["ui_status"].collect(), {"scan": {"progress": 42, "stdout": "nmap output", "description": "100 pps"}})
+
+    def test_render_frame(self):
+        _ui = ui_context(["scan", "other"])
+        _renderer = UIRenderLoop(_ui)
+        for _p in range(100):
+            update_scan_ui(_ui, "scan", _p, f"output {_p}")
+        _renderer.render()
+
+        _bar = _ui["ui_instances"]["progress_bar"]["scan"]["instance"]
+        _text = _ui["ui_instances"]["text"]["scan"]["instance"]
+        _bar.update.assert_called_once_with(0, completed=99)
+        _text.append.assert_called_once_with("output 99")
+        _ui["ui_instances"]["progress_bar"]["other"]["instance"].update.assert_not_called()
+        _ui["ui_live"].refresh.assert_called_once()
+
+        # The logs are only cleared if they are not shown
+        _ui["show_nmap_logs"] = False
+        update_scan_ui(_ui, "scan", 100, "more output")
+        _renderer.render()
+        _text.append.assert_called_once_with("output 99")
+        update_scan_ui(_ui, "scan", 100, None, True)
+        _renderer.render()
+        _text.append.assert_called_with("")
+
+        # Unknown scans and a stopped display are skipped
+        _ui["ui_live"].is_started = False
+        update_scan_ui(_ui, "unknown", 10)
+        _renderer.render()
+        self.assertEqual(_ui["ui_live"].refresh.call_count, 3)
+
+    def test_render_loop(self):
+        _ui = ui_context(["scan"])
+        _renderer = UIRenderLoop(_ui, frame_rate=100)
+        _renderer.start()
+        self.assertTrue(_renderer.running)
+        update_scan_ui(_ui, "scan", 100, None, True)
+        _renderer.stop()
+        self.assertFalse(_renderer.running)
+        _ui["ui_instances"]["progress_bar"]["scan"]["instance"].update.assert_called_with(0, completed=100)
@@ -22,6 +22,7 @@ from .test_data.mock_data import (
     SCANS_FROM_DB_JSON_STRING_TEST_V1, SCANS_FROM_DB_TEST_V1)
 from deltascan.core.exceptions import StoreExceptions
 from deltascan.core.store import Store
+from deltascan.core.projection import FieldProjection
 
 
 class TestStore(unittest.TestCase):
@@ -46,9 +47,49 @@ class TestStore(unittest.TestCase):
             json.dumps(SCANS_FROM_DB_TEST_V1[0]["results"], sort_keys=True),
             "hash_string",
             None,
-            created_at=None
+            created_at=None,
+            projection=None
         )
 
+    @patch("deltascan.core.store.uuid", MagicMock(uuid4=MagicMock(return_value="uuid")))
+    @patch("deltascan.core.store.hash_string", MagicMock(return_value="hash_string"))
+    def test_save_scans_with_projection(self):
+        _projection = FieldProjection(drop=["ports.servicefp", "hops"])
+        self.store.save_scans(
+            "profile_name",
+            "host_with_subnet",
+            [copy.deepcopy(SCANS_FROM_DB_TEST_V1[0]["results"])],
+            projection=_projection)
+
+        _args, _kwargs = self.store.rdbms.create_port_scan.call_args
+        _results = json.loads(_args[5])
+        self.assertEqual((_results["hops"], _results["ports"][0]["servicefp"]), (["unknown"], ""))
+        self.assertEqual(_kwargs["projection"], _projection.spec)
+
+    @patch("deltascan.core.store.uuid", MagicMock(uuid4=MagicMock(return_value="uuid")))
+    @patch("deltascan.core.store.hash_string", MagicMock(return_value="hash_string"))
+    def test_save_scans_with_job(self):
+        self.store.save_scans(
+            "profile_name",
+            "host_with_subnet",
+            [SCANS_FROM_DB_TEST_V1[0]["results"]],
+            job_uuid="job_uuid")
+
+        self.store.rdbms.create_scan_job_host.assert_called_once_with("job_uuid", "0.0.0.0", "uuid")
+
+    def test_get_scan_job(self):
+        self.store.rdbms.get_scan_jobs.return_value = [{"uuid": "job_uuid", "target": "10.0.0.0/30"}]
+        self.store.rdbms.get_scan_job_hosts.return_value = [{"host": "10.0.0.1", "scan_uuid": "uuid"}]
+
+        _job = self.store.get_scan_job()
+        self.store.rdbms.get_scan_jobs.assert_called_once_with(status=["running", "cancelled", "failed", "timed_out"], limit=1)
+        self.assertEqual(_job["hosts"], [{"host": "10.0.0.1", "scan_uuid": "uuid"}])
+        self.assertEqual(_job["pending"], 3)
+
+        self.store.rdbms.get_scan_jobs.return_value = []
+        with self.assertRaises(StoreExceptions.DScanEntryNotFound):
+            self.store.get_scan_job("job_uuid")
+
     @patch("deltascan.core.store.uuid", MagicMock(uuid4=MagicMock(return_value="uuid")))
     @patch("deltascan.core.store.hash_string", MagicMock(return_value="hash_string"))
     def test_save_scans_error(self):
@@ -0,0 +1,71 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import time
+import unittest
+from threading import Event
+from deltascan.core.watchdog import ScanWatchdog
+
+
+class TestWatchdog(unittest.TestCase):
+    def test_watch_without_deadline(self):
+        _watchdog = ScanWatchdog()
+        self.assertEqual(_watchdog.watch("scan", None), None)
+        self.assertEqual(_watchdog.watch("scan", 0), None)
+        self.assertEqual(_watchdog.stats()["watched"], {})
+
+    def test_check(self):
+        _watchdog = ScanWatchdog(interval=60)
+        _evt_1 = Event()
+        _evt_2 = Event()
+        _scan_1 = _watchdog.watch("scan-1", 10, _evt_1, "TEST_V1")
+        _scan_2 = _watchdog.watch("scan-2", 100, _evt_2, "TEST_V1")
+
+        self.assertEqual(_watchdog.check(_scan_1.started + 5), [])
+        self.assertEqual(_watchdog.check(_scan_1.started + 20), [_scan_1])
+        self.assertTrue(_evt_1.is_set())
+        self.assertTrue(_scan_1.timed_out)
+        self.assertFalse(_evt_2.is_set())
+        self.assertFalse(_scan_2.timed_out)
+
+        _stats = _watchdog.stats()
+        self.assertEqual(list(_stats["watched"].keys()), ["scan-2"])
+        self.assertEqual(_stats["timeouts"], 1)
+        self.assertEqual(_stats["timeouts_by_profile"], {"TEST_V1": 1})
+        self.assertEqual(_stats["timed_out"][0]["name"], "scan-1")
+        self.assertEqual(_stats["timed_out"][0]["deadline"], 10)
+
+        _watchdog.unwatch(_scan_2)
+        _watchdog.unwatch(None)
+        self.assertEqual(_watchdog.stats()["watched"], {})
+
+    def test_watchdog_thread(self):
+        _watchdog = ScanWatchdog(interval=0.01)
+        _evt = Event()
+        _scan = _watchdog.watch("scan", 0.05, _evt)
+        self.assertTrue(_evt.wait(5))
+        self.assertTrue(_scan.timed_out)
+        self.assertEqual(_watchdog.stats()["timeouts_by_profile"], {})
+
+        # The thread exits when no scans are left and starts again with the next one
+        for _ in range(100):
+            if _watchdog._thread is None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(_watchdog._thread, None)
+        _evt = Event()
+        _watchdog.watch("scan", 0.05, _evt)
+        self.assertTrue(_evt.wait(5))
@@ -0,0 +1,121 @@
+# DeltaScan - Network scanning tool
+#     Copyright (C) 2024 Logisek
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import unittest
+import xml.etree.ElementTree as ET
+import xmltodict
+from deltascan.core.nmap.xml_stream import (NmapXMLStream, element_to_dict)
+from deltascan.core.nmap.host_stream import NmapHostStream
+from deltascan.core.utils import replace_nested_keys
+from deltascan.core.parser import Parser
+from .test_data.mock_data import NMAP_XML_TWO_HOSTS
+
+NMAP_XML_HOST = """<host><status state="up" reason="echo-reply" reason_ttl="63"/>
+<address addr="10.0.0.1" addrtype="ipv4"/><address addr="AA:BB:CC:DD:EE:FF" addrtype="mac"/>
+<hostnames/>
+<ports><extraports state="closed" count="998"><extrareasons reason="reset" count="998"/></extraports>
+<port protocol="tcp" portid="22"><state state="open" reason="syn-ack" reason_ttl="63"/>
+<service name="ssh" servicefp="SF:a&#xa;b" method="probed" conf="10"><cpe>cpe:/a:openbsd:openssh</cpe><cpe>cpe:/o:linux</cpe></service>
+<script id="ssh-hostkey" output="&#xa;  256 aa&#xa;"><table><elem key="type">ecdsa</elem><elem key="bits">256</elem></table></script></port>
+</ports>
+<hostscript><script id="smb" output="x">  mixed <b>text</b> tail </script></hostscript>
+</host>"""
+
+# The layout of the output of `nmap -oX - -sV -sC`, with the line breaks that nmap writes
+NMAP_XML_SERVICE_SCAN = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE nmaprun>
+<nmaprun scanner="nmap" args="nmap -oX - -sV -sC 10.0.0.5" start="1718000000" version="7.94" xmloutputversion="1.05">
+<scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>
+<verbose level="0"/>
+<debugging level="0"/>
+<host starttime="1718000001" endtime="1718000030"><status state="up" reason="echo-reply" reason_ttl="63"/>
+<address addr="10.0.0.5" addrtype="ipv4"/>
+<hostnames>
+</hostnames>
+<ports><extraports state="closed" count="999">
+<extrareasons reason="reset" count="999" proto="tcp" ports="1-442,444-1000"/>
+</extraports>
+<port protocol="tcp" portid="443"><state state="open" reason="syn-ack" reason_ttl="63"/>
+<service name="http" product="nginx" tunnel="ssl" method="probed" conf="10"><cpe>cpe:/a:igor_sysoev:nginx</cpe></service>
+<script id="ssl-cert" output="Subject: commonName=example.local&#xa;Not valid after:  2025-06-10T00:00:00">
+<table key="subject">
+<elem key="commonName">example.local</elem>
+</table>
+<elem key="pem">-----BEGIN CERTIFICATE-----&#xa;MIIBszCCAVmgAwIBAgIUQ&#xa;-----END CERTIFICATE-----&#xa;</elem>
+</script><script id="http-title" output="Welcome&#xa;"><elem key="title">Welcome&#xa;</elem>
+</script></port>
+</ports>
+<times srtt="512" rttvar="128" to="100000"/>
+</host>
+<runstats><finished time="1718000030" timestr="Mon Jun 10 00:00:30 2024" elapsed="30.00" exit="success"/><hosts up="1" down="0" total="1"/>
+</runstats>
+</nmaprun>
+"""
+
+
+class TestNmapXMLStream(unittest.TestCase):
+    def test_element_to_dict_matches_xmltodict(self):
+        for _xml in [NMAP_XML_HOST] + NmapHostStream().feed(NMAP_XML_TWO_HOSTS):
+            self.assertEqual(element_to_dict(ET.fromstring(_xml)), replace_nested_keys(xmltodict.parse(_xml))["host"])
+
+    def test_whitespace_text_matches_xmltodict(self):
+        _expected = replace_nested_keys(xmltodict.parse(NMAP_XML_SERVICE_SCAN))["nmaprun"]["host"]
+        self.assertEqual(list(NmapXMLStream().read(NMAP_XML_SERVICE_SCAN)), [_expected])
+        # The parsed hosts keep the text of empty hostnames and the multi-line text as xmltodict does,
+        # so they hash as the hosts of the scans that were parsed with xmltodict
+        _host = Parser.extract_port_scan_dict_results(NMAP_XML_SERVICE_SCAN)["results"][0]
+        self.assertEqual(_host["hostnames"], "\n")
+        self.assertEqual(_host["hostnames"], _expected["hostnames"])
+        self.assertEqual(element_to_dict(ET.fromstring("<a><b>\n  x\n</b></a>")), {"b": "\n  x\n"})
+
+    def test_element_to_dict_attribute_over_element(self):
+        self.assertEqual(element_to_dict(ET.fromstring("<a name='x'><name>y</name><b/></a>")), {"name": "x", "b": None})
+
+    def test_read_whole_document(self):
+        _stream = NmapXMLStream()
+        _hosts = list(_stream.read(NMAP_XML_TWO_HOSTS))
+        _expected = replace_nested_keys(xmltodict.parse(NMAP_XML_TWO_HOSTS))["nmaprun"]
+        self.assertEqual(_hosts, _expected["host"])
+        self.assertEqual(_stream.nmaprun["args"], _expected["args"])
+        self.assertEqual(_stream.nmaprun["scaninfo"], _expected["scaninfo"])
+        self.assertEqual(_stream.nmaprun["runstats"], _expected["runstats"])
+        # The hosts and the progress of the tasks are not kept
+        self.assertNotIn("host", _stream.nmaprun)
+        self.assertNotIn("taskprogress", _stream.nmaprun)
+
+    def test_read_in_chunks(self):
+        _expected = list(NmapXMLStream().read(NMAP_XML_TWO_HOSTS))
+        for _size in [1, 7, 64]:
+            self.assertEqual(list(NmapXMLStream().read(NMAP_XML_TWO_HOSTS, _size)), _expected)
+            self.assertEqual(list(NmapXMLStream().read(NMAP_XML_TWO_HOSTS.encode(), _size)), _expected)
+
+    def test_host_is_returned_once_complete(self):
+        _stream = NmapXMLStream()
+        self.assertEqual(_stream.feed("<nmaprun args='nmap'><host><address addr='10.0.0.1'/>"), [])
+        self.assertEqual(_stream.feed("<hostnames/></ho"), [])
+        self.assertEqual(_stream.feed("st><hosthint/>"), [{"address": {"addr": "10.0.0.1"}, "hostnames": None}])
+        # The finished host is dropped from the document
+        self.assertEqual(len(_stream._root), 0)
+
+    def test_single_host_document(self):
+        _stream = NmapXMLStream()
+        self.assertEqual(len(list(_stream.read(NMAP_XML_HOST))), 1)
+        self.assertIsNone(_stream.nmaprun)
+
+    def test_malformed_document(self):
+        self.assertRaises(ET.ParseError, list, NmapXMLStream().read("<nmaprun><host>"))
+        self.assertRaises(ET.ParseError, list, NmapXMLStream().read(""))